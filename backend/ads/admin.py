@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Program, Report, PartnerCredential, CustomSuggestedKeyword, LogEntry, ProgramRegistry
+from .models import Program, Report, PartnerCredential, CustomSuggestedKeyword, LogEntry, ProgramRegistry, ProfileRecord
 
 
 @admin.register(Program)
@@ -99,3 +99,17 @@ class LogEntryAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         # Logs are read-only
         return False
+
+
+@admin.register(ProfileRecord)
+class ProfileRecordAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'kind', 'reason', 'name', 'method', 'status_code', 'duration', 'sample_count', 'download_link')
+    list_filter = ('kind', 'reason', 'method')
+    search_fields = ('request_id', 'name', 'user')
+    readonly_fields = [field.name for field in ProfileRecord._meta.fields]
+    ordering = ('-created_at',)
+    list_per_page = 50
+
+    def download_link(self, obj):
+        return format_html('<a href="/api/profiles/{}/">download</a>', obj.request_id)
+    download_link.short_description = 'Stacks'
@@ -1,22 +1,88 @@
 """
-Асинхронний сервіс для роботи з Business через asyncpg.
-Використовує пряме підключення до PostgreSQL для швидкого bulk збереження.
+Єдиний сервіс business details (Yelp Fusion API) з персистентним кешем у Business.
+
+Раніше назви бізнесів завантажувались трьома різними шляхами (синхронний
+get_business_details у циклі, backfill з time.sleep(0.2) та окремий asyncpg
+сервіс). Тепер усі вони йдуть через AsyncBusinessService.resolve():
+
+- Business - персистентний кеш (name / url / alias);
+- негативний кеш: невдалі запити не повторюються до next_retry_at,
+  інтервал росте експоненційно з кожною невдачею;
+- застарілі записи (старші за BUSINESS_DETAILS_STALE_AFTER) віддаються одразу,
+  а оновлюються у фоновому потоці;
+- всі запити до Fusion проходять через спільний token bucket.
 """
 import asyncio
-import asyncpg
 import logging
-from typing import Dict, List, Set
-from django.conf import settings
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterable, Optional, Set, Tuple
+
 import aiohttp
+import asyncpg
+from django.conf import settings
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from . import tracing
+from .metrics import aiohttp_trace_config
+from .models import Business, ProgramRegistry
+from .services import YelpService
 
 logger = logging.getLogger(__name__)
 
 
+class TokenBucket:
+    """
+    Token bucket, спільний для всіх потоків і event loop-ів процесу.
+
+    reserve() одразу резервує токен і повертає, скільки секунд треба почекати,
+    тому обмеження працює і коли кожна фаза синхронізації має свій event loop.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
 class AsyncBusinessService:
-    """Асинхронний сервіс для роботи з Business через asyncpg."""
-    
-    FUSION_BASE = 'https://api.yelp.com'
-    
+    """Business details з Yelp Fusion API з кешем у БД, негативним кешем та rate limit."""
+
+    # Негативний кеш: 5 хв → 10 хв → ... але не більше 7 днів
+    NEGATIVE_TTL_BASE = 300
+    NEGATIVE_TTL_MAX = 7 * 24 * 3600
+
+    MAX_CONCURRENT = 10
+
+    _bucket: Optional[TokenBucket] = None
+    _bucket_lock = threading.Lock()
+
+    _refresh_queue: Set[str] = set()
+    _refresh_lock = threading.Lock()
+    _refresh_event = threading.Event()
+    _refresh_thread: Optional[threading.Thread] = None
+
     @classmethod
     async def get_db_pool(cls):
         """Створює asyncpg connection pool."""
@@ -28,159 +94,289 @@ class AsyncBusinessService:
             user=db_config['USER'],
             password=db_config['PASSWORD'],
             min_size=5,
-            max_size=20
+            max_size=20,
+            init=tracing.init_asyncpg_connection,
         )
-    
+
+    # ------------------------------------------------------------ settings
+
+    @classmethod
+    def get_bucket(cls) -> TokenBucket:
+        """Token bucket під квоти Fusion (YELP_FUSION_RATE_PER_SECOND / YELP_FUSION_BURST)."""
+        if cls._bucket is None:
+            with cls._bucket_lock:
+                if cls._bucket is None:
+                    cls._bucket = TokenBucket(
+                        rate=float(getattr(settings, 'YELP_FUSION_RATE_PER_SECOND', 5)),
+                        capacity=int(getattr(settings, 'YELP_FUSION_BURST', 10)),
+                    )
+        return cls._bucket
+
+    @classmethod
+    def stale_after(cls) -> timedelta:
+        return timedelta(days=getattr(settings, 'BUSINESS_DETAILS_STALE_AFTER_DAYS', 30))
+
+    @classmethod
+    def negative_ttl(cls, attempts: int) -> timedelta:
+        seconds = min(cls.NEGATIVE_TTL_BASE * (2 ** max(attempts - 1, 0)), cls.NEGATIVE_TTL_MAX)
+        return timedelta(seconds=seconds)
+
+    # ------------------------------------------------------------ DB cache
+
     @classmethod
-    async def get_existing_businesses(cls, pool: asyncpg.Pool, business_ids: Set[str]) -> Dict[str, Dict]:
+    def _classify(cls, business_ids: Set[str]) -> Tuple[Dict[str, Dict], Set[str], Set[str], Dict[str, Business]]:
         """
-        Bulk запит існуючих businesses з БД.
-        
+        Розбиває business_ids за станом кешу.
+
         Returns:
-            Dict[business_id -> {name, url, alias}]
+            (known, stale, to_fetch, rows): known - {id: {name, url, alias}} (включно зі stale),
+            stale - ids з застарілими даними, to_fetch - ids яких немає або чий
+            негативний кеш вже прострочений, rows - завантажені Business.
         """
-        if not business_ids:
-            return {}
-        
-        query = """
-            SELECT yelp_business_id, name, url, alias
-            FROM ads_business
-            WHERE yelp_business_id = ANY($1)
-                AND name IS NOT NULL
-                AND name != ''
-                AND fetch_failed = FALSE
-        """
-        
-        async with pool.acquire() as conn:
-            rows = await conn.fetch(query, list(business_ids))
-        
-        result = {
-            row['yelp_business_id']: {
-                'name': row['name'],
-                'url': row['url'],
-                'alias': row['alias']
-            }
-            for row in rows
-        }
-        
-        logger.info(f"💾 [DB] Found {len(result)}/{len(business_ids)} businesses in cache")
-        return result
-    
+        now = timezone.now()
+        stale_before = now - cls.stale_after()
+        rows = {b.yelp_business_id: b for b in Business.objects.filter(yelp_business_id__in=business_ids)}
+
+        known, stale, to_fetch = {}, set(), set()
+        for business_id in business_ids:
+            row = rows.get(business_id)
+            if row is None:
+                to_fetch.add(business_id)
+                continue
+
+            retry_allowed = row.next_retry_at is None or row.next_retry_at <= now
+
+            if row.name:
+                known[business_id] = {'name': row.name, 'url': row.url, 'alias': row.alias}
+                if row.cached_at and row.cached_at < stale_before and retry_allowed:
+                    stale.add(business_id)
+                continue
+
+            # Негативний кеш: не чіпаємо до next_retry_at
+            if retry_allowed:
+                to_fetch.add(business_id)
+
+        return known, stale, to_fetch, rows
+
     @classmethod
-    async def fetch_business_from_api(
-        cls, 
-        session: aiohttp.ClientSession, 
-        business_id: str, 
-        semaphore: asyncio.Semaphore
-    ):
+    def get_cached(cls, business_ids: Iterable[str]) -> Tuple[Dict[str, Dict], Set[str]]:
         """
-        Завантажує один business з Yelp Fusion API.
-        
-        Semaphore обмежує concurrent requests (rate limiting).
+        Тільки БД, без жодних запитів до API.
+
+        Returns:
+            (known, unresolved): unresolved - ids, яких немає в кеші або які застаріли
+            (їх варто віддати в enqueue_refresh).
         """
+        business_ids = {b for b in business_ids if b}
+        if not business_ids:
+            return {}, set()
+        known, stale, to_fetch, _ = cls._classify(business_ids)
+        return known, stale | to_fetch
+
+    @classmethod
+    def _store_results(cls, results: Dict[str, Optional[Dict]], rows: Dict[str, Business]) -> None:
+        """Зберігає успішні відповіді та оновлює негативний кеш для невдалих."""
+        now = timezone.now()
+        successes, failures = [], []
+
+        for business_id, data in results.items():
+            row = rows.get(business_id)
+            if data and data.get('name'):
+                successes.append(Business(
+                    yelp_business_id=business_id,
+                    name=data['name'][:255],
+                    url=data.get('url'),
+                    alias=data.get('alias'),
+                    fetch_failed=False,
+                    fetch_attempts=0,
+                    next_retry_at=None,
+                ))
+            else:
+                attempts = (row.fetch_attempts if row else 0) + 1
+                failures.append(Business(
+                    yelp_business_id=business_id,
+                    name=row.name if row else None,
+                    url=row.url if row else None,
+                    alias=row.alias if row else None,
+                    # Якщо назва вже є (невдалий refresh) - дані лишаються валідними
+                    fetch_failed=not (row and row.name),
+                    fetch_attempts=attempts,
+                    next_retry_at=now + cls.negative_ttl(attempts),
+                ))
+
+        if successes:
+            Business.objects.bulk_create(
+                successes,
+                update_conflicts=True,
+                unique_fields=['yelp_business_id'],
+                update_fields=['name', 'url', 'alias', 'fetch_failed', 'fetch_attempts', 'next_retry_at', 'cached_at'],
+            )
+            # Лінкуємо програми, що ще не мають FK (read path читає business__name)
+            ProgramRegistry.objects.filter(
+                yelp_business_id__in=[b.yelp_business_id for b in successes],
+                business__isnull=True,
+            ).update(business=Subquery(
+                Business.objects.filter(yelp_business_id=OuterRef('yelp_business_id')).values('id')[:1]
+            ))
+        if failures:
+            # cached_at не оновлюємо - він означає час останнього УСПІШНОГО завантаження
+            Business.objects.bulk_create(
+                failures,
+                update_conflicts=True,
+                unique_fields=['yelp_business_id'],
+                update_fields=['fetch_failed', 'fetch_attempts', 'next_retry_at'],
+            )
+
+        logger.info(f"💾 [BUSINESS] Saved {len(successes)} businesses, {len(failures)} negative-cached")
+
+    # ----------------------------------------------------------- Fusion API
+
+    @classmethod
+    async def _fetch_one(cls, session: aiohttp.ClientSession, business_id: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        """Один запит до Fusion через token bucket. None - невдача (піде в негативний кеш)."""
         async with semaphore:
-            url = f"{cls.FUSION_BASE}/v3/businesses/{business_id}"
+            await cls.get_bucket().acquire()
+            url = f"{YelpService.FUSION_BASE}/v3/businesses/{business_id}"
             try:
                 async with session.get(url) as response:
                     if response.status == 200:
                         data = await response.json()
-                        return {
-                            'yelp_business_id': business_id,
-                            'name': data.get('name'),
-                            'url': data.get('url'),
-                            'alias': data.get('alias'),
-                            'fetch_failed': False
-                        }
-                    elif response.status == 404:
+                        return {'name': data.get('name'), 'url': data.get('url'), 'alias': data.get('alias')}
+                    if response.status == 404:
                         logger.debug(f"Business {business_id} not found (404)")
-                        return {'yelp_business_id': business_id, 'fetch_failed': True}
                     else:
                         logger.warning(f"Business {business_id} fetch failed with status {response.status}")
-                        return {'yelp_business_id': business_id, 'fetch_failed': True}
             except Exception as e:
                 logger.warning(f"Failed to fetch {business_id}: {e}")
-                return {'yelp_business_id': business_id, 'fetch_failed': True}
-        
         return None
-    
+
     @classmethod
-    async def fetch_businesses_async(
-        cls, 
-        business_ids: Set[str],
-        api_key: str,
-        max_concurrent: int = 20
-    ) -> List[Dict]:
-        """
-        Паралельно завантажує businesses з Yelp Fusion API.
-        
-        Args:
-            business_ids: Set of business IDs to fetch
-            api_key: Yelp Fusion API key
-            max_concurrent: Max concurrent requests (rate limiting)
-        
-        Returns:
-            List of business dicts
-        """
+    async def fetch_from_api(cls, business_ids: Set[str], api_key: str, max_concurrent: int = None) -> Dict[str, Optional[Dict]]:
+        """Паралельно завантажує businesses з Fusion API (semaphore + token bucket)."""
         if not business_ids:
-            return []
-        
-        semaphore = asyncio.Semaphore(max_concurrent)
+            return {}
+
+        semaphore = asyncio.Semaphore(max_concurrent or cls.MAX_CONCURRENT)
         headers = {'Authorization': f'Bearer {api_key}'}
-        
-        async with aiohttp.ClientSession(headers=headers) as session:
-            tasks = [
-                cls.fetch_business_from_api(session, bid, semaphore)
-                for bid in business_ids
-            ]
-            results = await asyncio.gather(*tasks)
-        
-        # Фільтруємо None
-        businesses = [r for r in results if r]
-        successful = len([b for b in businesses if not b.get('fetch_failed')])
+        timeout = aiohttp.ClientTimeout(total=30)
+
+        async with aiohttp.ClientSession(
+            headers=headers, timeout=timeout, trace_configs=[aiohttp_trace_config()]
+        ) as session:
+            ordered = list(business_ids)
+            results = await asyncio.gather(*(cls._fetch_one(session, bid, semaphore) for bid in ordered))
+
+        fetched = dict(zip(ordered, results))
+        successful = sum(1 for r in results if r and r.get('name'))
         logger.info(f"📡 [API] Fetched {successful}/{len(business_ids)} businesses successfully")
-        
-        return businesses
-    
+        return fetched
+
     @classmethod
-    async def save_businesses_to_db(cls, pool: asyncpg.Pool, businesses: List[Dict]) -> int:
-        """
-        Bulk збереження businesses в БД через asyncpg.
-        
-        Використовує INSERT ... ON CONFLICT для upsert.
+    def _run(cls, coro):
+        """Виконує корутину з синхронного коду (навіть якщо в потоці вже є запущений loop)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            loop = asyncio.new_event_loop()
+            try:
+                return loop.run_until_complete(coro)
+            finally:
+                loop.close()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(cls._run, coro).result()
+
+    # ---------------------------------------------------------------- public
+
+    @classmethod
+    def resolve(
+        cls,
+        business_ids: Iterable[str],
+        api_key: str = None,
+        refresh_stale: bool = False,
+        max_concurrent: int = None,
+    ) -> Dict[str, Dict]:
         """
-        if not businesses:
-            return 0
-        
-        query = """
-            INSERT INTO ads_business (yelp_business_id, name, url, alias, cached_at, fetch_failed)
-            VALUES ($1, $2, $3, $4, NOW(), $5)
-            ON CONFLICT (yelp_business_id) 
-            DO UPDATE SET
-                name = EXCLUDED.name,
-                url = EXCLUDED.url,
-                alias = EXCLUDED.alias,
-                cached_at = NOW(),
-                fetch_failed = EXCLUDED.fetch_failed
+        Головний метод: DB → Fusion API (тільки для відсутніх) → DB.
+
+        Args:
+            business_ids: ids для резолву
+            api_key: Fusion API key (за замовчуванням settings.YELP_FUSION_API_KEY)
+            refresh_stale: перезавантажити застарілі записи зараз, а не у фоні
+            max_concurrent: ліміт паралельних запитів (поверх token bucket)
+
+        Returns:
+            Dict[business_id -> {name, url, alias}] для всіх відомих бізнесів
         """
-        
-        async with pool.acquire() as conn:
-            await conn.executemany(
-                query,
-                [
-                    (
-                        b['yelp_business_id'],
-                        b.get('name'),
-                        b.get('url'),
-                        b.get('alias'),
-                        b.get('fetch_failed', False)
-                    )
-                    for b in businesses
-                ]
-            )
-        
-        logger.info(f"💾 [ASYNCPG] Saved {len(businesses)} businesses to DB")
-        return len(businesses)
-    
+        business_ids = {b for b in business_ids if b}
+        if not business_ids:
+            return {}
+
+        known, stale, to_fetch, rows = cls._classify(business_ids)
+        if refresh_stale:
+            to_fetch |= stale
+        elif stale:
+            cls.enqueue_refresh(stale)
+
+        if not to_fetch:
+            logger.info(f"✅ [BUSINESS] All {len(business_ids)} businesses resolved from DB")
+            return known
+
+        api_key = api_key or getattr(settings, 'YELP_FUSION_API_KEY', '')
+        if not api_key:
+            logger.warning("⚠️  YELP_FUSION_API_KEY not set, skipping business details fetch")
+            return known
+
+        logger.info(f"📡 [BUSINESS] Need to fetch {len(to_fetch)}/{len(business_ids)} businesses from API")
+        fetched = cls._run(cls.fetch_from_api(to_fetch, api_key, max_concurrent))
+        cls._store_results(fetched, rows)
+
+        for business_id, data in fetched.items():
+            if data and data.get('name'):
+                known[business_id] = data
+        return known
+
+    @classmethod
+    def enqueue_refresh(cls, business_ids: Iterable[str]) -> None:
+        """Ставить ids у чергу фонового резолвера (дублікати схлопуються)."""
+        business_ids = {b for b in business_ids if b}
+        if not business_ids:
+            return
+
+        with cls._refresh_lock:
+            cls._refresh_queue |= business_ids
+            if cls._refresh_thread is None or not cls._refresh_thread.is_alive():
+                cls._refresh_thread = threading.Thread(
+                    target=cls._refresh_worker, name='business-resolver', daemon=True
+                )
+                cls._refresh_thread.start()
+        cls._refresh_event.set()
+
+    @classmethod
+    def _refresh_worker(cls, batch_size: int = 50, idle_timeout: float = 60.0):
+        """Фоновий резолвер: розбирає чергу пачками; завершується після idle_timeout без роботи."""
+        while True:
+            if not cls._refresh_event.wait(idle_timeout):
+                with cls._refresh_lock:
+                    if not cls._refresh_queue:
+                        cls._refresh_thread = None
+                        return
+
+            with cls._refresh_lock:
+                batch = set(list(cls._refresh_queue)[:batch_size])
+                cls._refresh_queue -= batch
+                if not cls._refresh_queue:
+                    cls._refresh_event.clear()
+
+            if not batch:
+                continue
+            try:
+                cls.resolve(batch, refresh_stale=True)
+            except Exception as e:
+                logger.error(f"❌ [BUSINESS] Background refresh failed: {e}")
+            finally:
+                connection.close()
+
     @classmethod
     async def link_programs_to_businesses(cls, pool: asyncpg.Pool, username: str) -> int:
         """
@@ -195,68 +391,11 @@ class AsyncBusinessService:
                 AND pr.username = $1
                 AND pr.business_id IS NULL
         """
-        
+
         async with pool.acquire() as conn:
             result = await conn.execute(query, username)
-        
+
         # Парсимо результат "UPDATE N"
         updated = int(result.split()[-1]) if result else 0
         logger.info(f"🔗 [ASYNCPG] Linked {updated} programs to businesses for {username}")
         return updated
-    
-    @classmethod
-    async def sync_businesses(
-        cls,
-        business_ids: Set[str],
-        api_key: str,
-        username: str,
-        max_concurrent: int = 20
-    ) -> Dict[str, Dict]:
-        """
-        Головний метод: синхронізує businesses (DB → API → DB).
-        
-        Returns:
-            Dict[business_id -> {name, url, alias}]
-        """
-        if not business_ids:
-            logger.info("No business IDs to sync")
-            return {}
-        
-        pool = await cls.get_db_pool()
-        
-        try:
-            # 1. Перевіряємо що вже є в БД
-            existing = await cls.get_existing_businesses(pool, business_ids)
-            
-            # 2. Визначаємо що треба завантажити
-            to_fetch = business_ids - set(existing.keys())
-            
-            if not to_fetch:
-                logger.info("✅ All businesses already in DB")
-                # ⚠️ НЕ лінкуємо тут - це буде зроблено окремо в async_sync_service
-                return existing
-            
-            logger.info(f"📡 Need to fetch {len(to_fetch)} businesses from API")
-            
-            # 3. Завантажуємо з API (паралельно)
-            new_businesses = await cls.fetch_businesses_async(to_fetch, api_key, max_concurrent)
-            
-            # 4. Зберігаємо в БД
-            await cls.save_businesses_to_db(pool, new_businesses)
-            
-            # 5. ⚠️ НЕ лінкуємо тут - це буде зроблено окремо в async_sync_service після збереження програм
-            
-            # 6. Додаємо нові до результату
-            for b in new_businesses:
-                if not b.get('fetch_failed') and b.get('name'):
-                    existing[b['yelp_business_id']] = {
-                        'name': b['name'],
-                        'url': b.get('url'),
-                        'alias': b.get('alias')
-                    }
-            
-            return existing
-        
-        finally:
-            await pool.close()
-
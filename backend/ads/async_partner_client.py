@@ -0,0 +1,205 @@
+"""
+Асинхронний клієнт Yelp Partner API для async views (ASYNC_VIEWS=True під ASGI).
+
+Дзеркало відповідних методів YelpService (ті ж URL, fallback-и та retry політика
+make_yelp_request_with_retry), але на aiohttp: поки запит до Yelp чекає відповідь,
+воркер обслуговує інші запити замість того, щоб тримати потік.
+
+Одна ClientSession (пул з'єднань) на event loop — створюється ліниво при першому запиті.
+"""
+import asyncio
+import base64
+import json
+import logging
+import weakref
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import aiohttp_trace_config, record_cache
+from .services import YelpService
+from .stampede_cache import HIT, MISS, STALE, StampedeCache
+
+logger = logging.getLogger(__name__)
+
+
+class PartnerAPIError(Exception):
+    """Відповідь Yelp з кодом >= 400 (аналог requests.HTTPError для async коду)."""
+
+    def __init__(self, status: int, payload=None, text: str = ''):
+        super().__init__(f"{status} error from Yelp Partner API")
+        self.status = status
+        self.payload = payload
+        self.text = text
+
+
+_sessions: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]' = weakref.WeakKeyDictionary()
+
+
+def get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30, connect=10),
+            connector=aiohttp.TCPConnector(limit=getattr(settings, 'ASYNC_PARTNER_POOL_SIZE', 100)),
+            trace_configs=[aiohttp_trace_config()],
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close():
+    """Закрити сесію поточного event loop (shutdown / тести)."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class AsyncPartnerClient:
+    PARTNER_BASE = getattr(settings, 'YELP_PARTNER_BASE', 'https://partner-api.yelp.com')
+    MAX_ATTEMPTS = 3
+
+    @classmethod
+    async def _auth_header(cls, auth: Optional[Tuple[str, str]] = None) -> str:
+        username, password = auth or await sync_to_async(YelpService._get_partner_auth)()
+        return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+    @classmethod
+    async def _request(cls, method: str, url: str, retry: bool = False, auth=None, **kwargs) -> Tuple[int, Optional[Dict], str]:
+        """
+        Один запит → (status, json або None, text). retry=True — як make_yelp_request_with_retry:
+        5xx і мережеві помилки повторюються з backoff 1s, 2s; 4xx — ні. auth — (username, password),
+        інакше креденшали з YelpService._get_partner_auth.
+        """
+        kwargs['headers'] = {**kwargs.get('headers', {}), 'Authorization': await cls._auth_header(auth)}
+        attempts = cls.MAX_ATTEMPTS if retry else 1
+        for attempt in range(1, attempts + 1):
+            try:
+                async with get_session().request(method, url, **kwargs) as resp:
+                    text = await resp.text()
+                    status = resp.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt < attempts:
+                    wait_time = 2 ** (attempt - 1)
+                    logger.warning(f"Network error: {e}, retrying in {wait_time}s (attempt {attempt}/{attempts})")
+                    await asyncio.sleep(wait_time)
+                    continue
+                raise
+            if status >= 500 and attempt < attempts:
+                wait_time = 2 ** (attempt - 1)
+                logger.warning(f"Server error {status} from {url}, retrying in {wait_time}s (attempt {attempt}/{attempts})")
+                await asyncio.sleep(wait_time)
+                continue
+            try:
+                payload = json.loads(text) if text else None
+            except ValueError:
+                payload = None
+            return status, payload, text
+
+    @staticmethod
+    def _raise_for_status(status: int, payload, text: str):
+        if status >= 400:
+            raise PartnerAPIError(status, payload, text)
+
+    @classmethod
+    async def get_program_info(cls, program_id: str) -> Dict:
+        """Async YelpService.get_program_info."""
+        status, payload, text = await cls._request('GET', f'{cls.PARTNER_BASE}/v1/programs/info/{program_id}', retry=True)
+        cls._raise_for_status(status, payload, text)
+        return payload
+
+    @classmethod
+    async def get_program_status(cls, program_id: str) -> Dict:
+        """Async YelpService.get_program_status (ті ж відповіді для 500/404 — job протух або не існує)."""
+        status, payload, text = await cls._request('GET', f'{cls.PARTNER_BASE}/v1/reseller/status/{program_id}')
+        if status == 500:
+            logger.warning(f"⚠️ AsyncPartnerClient.get_program_status: Job {program_id} not found or expired (500)")
+            if isinstance(payload, dict):
+                error = payload.get('error', {})
+                error_id, error_desc = error.get('id', 'UNKNOWN'), error.get('description', 'Job not found')
+            else:
+                error_id, error_desc = 'JOB_NOT_FOUND', 'Job ID expired or does not exist'
+            return {
+                'job_id': program_id,
+                'status': 'UNKNOWN',
+                'error': {
+                    'id': error_id,
+                    'description': error_desc
+                },
+                'message': 'Job not found in Yelp system (may have expired)'
+            }
+        if status == 404:
+            logger.warning(f"⚠️ AsyncPartnerClient.get_program_status: Job {program_id} not found (404)")
+            return {
+                'job_id': program_id,
+                'status': 'NOT_FOUND',
+                'error': {
+                    'id': 'JOB_NOT_FOUND',
+                    'description': 'Job ID not found'
+                },
+                'message': 'Job not found in Yelp system'
+            }
+        cls._raise_for_status(status, payload, text)
+        return payload
+
+    @classmethod
+    async def get_program_features(cls, program_id: str) -> Dict:
+        """Async YelpService.get_program_features (з власними suggested keywords, той самий кеш)."""
+        key = YelpService.features_cache_key(program_id)
+        stampede = StampedeCache(cache)
+        cached, cache_status = await sync_to_async(stampede.peek)(key)
+        if cache_status == HIT:
+            record_cache('program_features', cache_status)
+            return cached
+
+        generation = await sync_to_async(stampede.generation)(key)
+        status, payload, text = await cls._request('GET', f'{cls.PARTNER_BASE}/program/{program_id}/features/v1', retry=True)
+        if status >= 400 and cache_status == STALE:
+            logger.warning(f"⚠️ AsyncPartnerClient.get_program_features: {status} for {program_id}, serving stale value")
+            record_cache('program_features', STALE)
+            return cached
+        cls._raise_for_status(status, payload, text)
+        await sync_to_async(YelpService._merge_custom_keywords)(program_id, payload)
+        await sync_to_async(stampede.put)(
+            key, payload, ttl=settings.FEATURES_CACHE_TTL, stale_ttl=settings.FEATURES_CACHE_STALE_TTL,
+            generation=generation,
+        )
+        record_cache('program_features', MISS)
+        return payload
+
+    @classmethod
+    async def update_program_features(cls, program_id: str, features_payload: Dict, auth=None, retry: bool = False) -> Dict:
+        """Async YelpService.update_program_features (Yelp чекає вміст без обгортки 'features'; лише змінені типи)."""
+        yelp_payload = features_payload['features'] if 'features' in features_payload else features_payload
+        diff, cached = await sync_to_async(YelpService._plan_features_update)(program_id, yelp_payload)
+        if diff is not None:
+            if diff.is_noop:
+                await sync_to_async(YelpService._record_features_change)(program_id, diff)
+                return cached
+            yelp_payload = diff.changed
+        await sync_to_async(YelpService.invalidate_program_features)(program_id)
+        status, payload, text = await cls._request(
+            'POST', f'{cls.PARTNER_BASE}/program/{program_id}/features/v1', retry=retry, auth=auth,
+            json=yelp_payload, headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+        )
+        cls._raise_for_status(status, payload, text)
+        await sync_to_async(YelpService.invalidate_program_features)(program_id)
+        if diff is not None:
+            await sync_to_async(YelpService._record_features_change)(program_id, diff)
+        return payload
+
+    @classmethod
+    async def delete_program_features(cls, program_id: str, features_list) -> Dict:
+        """Async YelpService.delete_program_features."""
+        await sync_to_async(YelpService.invalidate_program_features)(program_id)
+        status, payload, text = await cls._request(
+            'DELETE', f'{cls.PARTNER_BASE}/program/{program_id}/features/v1', json={'features': features_list},
+        )
+        cls._raise_for_status(status, payload, text)
+        await sync_to_async(YelpService.invalidate_program_features)(program_id)
+        await sync_to_async(YelpService._record_features_deleted)(program_id, features_list)
+        return payload
@@ -9,6 +9,8 @@ from typing import Dict, List
 from django.conf import settings
 from datetime import datetime
 
+from . import tracing
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,7 +28,8 @@ class AsyncProgramService:
             user=db_config['USER'],
             password=db_config['PASSWORD'],
             min_size=5,
-            max_size=20
+            max_size=20,
+            init=tracing.init_asyncpg_connection,
         )
     
     @classmethod
@@ -18,7 +18,11 @@ import aiohttp
 from aiohttp import BasicAuth
 from aiohttp_retry import RetryClient, ExponentialRetry
 
+from . import tracing
+from .metrics import SyncTimer, aiohttp_trace_config
 from .models import ProgramRegistry, PartnerCredential
+from .profiler import profiled_sync
+from .rollup_service import BusinessRollupService
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +38,7 @@ class AsyncProgramSyncService:
     - Server-Sent Events для real-time прогресу
     """
     
-    PARTNER_BASE = 'https://partner-api.yelp.com'
+    PARTNER_BASE = getattr(settings, 'YELP_PARTNER_BASE', 'https://partner-api.yelp.com')
     
     @classmethod
     async def fetch_batch_async(
@@ -65,9 +69,13 @@ class AsyncProgramSyncService:
             'program_status': 'ALL'
         }
         
+        page_span = tracing.start_span(
+            'yelp.programs.page', tracing.KIND_CLIENT, **{'http.method': 'GET', 'offset': offset, 'limit': limit},
+        )
         try:
             auth = BasicAuth(username, password)
             async with session.get(url, params=params, auth=auth) as response:
+                page_span.set_attribute('http.status_code', response.status)
                 response.raise_for_status()
                 data = await response.json()
                 
@@ -85,11 +93,15 @@ class AsyncProgramSyncService:
                         program['partner_business_id'] = None
                 
                 logger.debug(f"✅ [ASYNC] Fetched batch at offset {offset}: {len(programs)} programs")
+                page_span.set_attribute('programs', len(programs))
                 return programs, total
                 
         except Exception as e:
             logger.error(f"❌ [ASYNC] Error fetching batch at offset {offset}: {e}")
+            page_span.record_exception(e)
             return [], 0
+        finally:
+            page_span.end()
     
     @classmethod
     async def fetch_all_programs_async(
@@ -123,7 +135,7 @@ class AsyncProgramSyncService:
         
         timeout = aiohttp.ClientTimeout(total=30, connect=10)
         
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with aiohttp.ClientSession(timeout=timeout, trace_configs=[aiohttp_trace_config()]) as session:
             retry_client = RetryClient(
                 client_session=session,
                 retry_options=retry_options
@@ -362,6 +374,8 @@ class AsyncProgramSyncService:
                 return [], 0
     
     @classmethod
+    @profiled_sync('asyncio')
+    @tracing.traced('sync.asyncio')
     def sync_with_asyncio(cls, username: str, batch_size: int = 40):
         """
         Синхронна обгортка для асинхронної синхронізації.
@@ -381,13 +395,16 @@ class AsyncProgramSyncService:
         
         # Початок загального таймінгу
         sync_start_time = time.time()
+        timer = SyncTimer('asyncio')
         
         try:
             # Отримуємо credentials ДО async частини
             from .models import PartnerCredential
             cred_start = time.time()
+            phase = tracing.start_span('sync.credentials')
             try:
                 cred = PartnerCredential.objects.filter(username=username).first()
+                phase.end()
                 if not cred:
                     yield {
                         'type': 'error',
@@ -398,6 +415,8 @@ class AsyncProgramSyncService:
                 cred_time = time.time() - cred_start
                 logger.info(f"⏱️  [TIMING] Get credentials: {cred_time:.3f}s")
             except Exception as e:
+                phase.record_exception(e)
+                phase.end()
                 logger.error(f"❌ [ASYNC] Failed to get credentials: {e}")
                 yield {
                     'type': 'error',
@@ -431,9 +450,11 @@ class AsyncProgramSyncService:
                 # Reason: Yelp API processes requests slowly (~4s each), HTTP/2 multiplexing doesn't help
                 # Result: aiohttp (3.6s) is faster than HTTP/2 (5.3s)
                 logger.info(f"🔄 [ASYNC] Using aiohttp method (HTTP/2 disabled - slower for this API)...")
-                all_programs, total = loop.run_until_complete(
-                    cls.fetch_all_programs_async(username, password, batch_size, progress_callback)
-                )
+                with tracing.span('sync.api_fetch', batch_size=batch_size) as phase:
+                    all_programs, total = loop.run_until_complete(
+                        cls.fetch_all_programs_async(username, password, batch_size, progress_callback)
+                    )
+                    phase.set_attribute('programs', len(all_programs))
             finally:
                 loop.close()
             
@@ -447,339 +468,466 @@ class AsyncProgramSyncService:
                 for event in progress_events:
                     yield event
             
-            if not all_programs:
+            yield from cls._apply_fetched_programs(username, all_programs, total, api_elapsed, sync_start_time, timer)
+            
+        except Exception as e:
+            logger.error(f"❌ [ASYNC] Sync failed: {e}", exc_info=True)
+            timer.finish(result='error')
+            yield {
+                'type': 'error',
+                'message': f'Async sync failed: {str(e)}'
+            }
+
+    @classmethod
+    async def sync_events_async(cls, username: str, batch_size: int = 40):
+        """
+        Нативна async версія sync_with_asyncio для ASGI (ASYNC_VIEWS=True): завантаження з API
+        йде прямо в event loop сервера, прогрес віддається одразу (а не після завершення fetch),
+        блокуюча DB-частина (_apply_fetched_programs) — крок за кроком в окремому потоці.
+
+        Yields:
+            Dict з прогресом синхронізації (для SSE)
+        """
+        yield {
+            'type': 'start',
+            'message': '🚀 Starting ASYNC synchronization...'
+        }
+
+        sync_start_time = time.time()
+        timer = SyncTimer('asyncio')
+        root = tracing.start_span('sync.asyncio', username=username)
+        try:
+            with tracing.span('sync.credentials'):
+                cred = await PartnerCredential.objects.filter(username=username).afirst()
+            if not cred:
                 yield {
                     'type': 'error',
-                    'message': 'Failed to fetch programs from API'
+                    'message': 'No credentials found for user'
                 }
                 return
-            
+
+            logger.info(f"🔄 [ASYNC] Starting native async sync for {username}")
+            api_start_time = time.time()
+            progress_events: asyncio.Queue = asyncio.Queue()
+
+            def progress_callback(completed, total):
+                progress_events.put_nowait({
+                    'type': 'progress',
+                    'message': f'⚡ Fetching from API: {completed}/{total} batches',
+                    'completed': completed,
+                    'total': total,
+                    'percentage': int((completed / total) * 100)
+                })
+
+            with tracing.span('sync.api_fetch', batch_size=batch_size) as phase:
+                fetch = asyncio.ensure_future(
+                    cls.fetch_all_programs_async(username, cred.password, batch_size, progress_callback)
+                )
+                try:
+                    while not fetch.done():
+                        waiter = asyncio.ensure_future(progress_events.get())
+                        await asyncio.wait({fetch, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                        if waiter.done():
+                            yield waiter.result()
+                        else:
+                            waiter.cancel()
+                    while not progress_events.empty():
+                        yield progress_events.get_nowait()
+                    all_programs, total = fetch.result()
+                finally:
+                    # Клієнт відключився посеред fetch — не лишаємо запити висіти
+                    fetch.cancel()
+                phase.set_attribute('programs', len(all_programs))
+
+            api_elapsed = time.time() - api_start_time
+            logger.info(f"⏱️  [TIMING] ⚡ Yelp API fetch: {api_elapsed:.3f}s for {len(all_programs)} programs")
+
+            # Генератор, а не один виклик: кожна подія йде клієнту, щойно фаза завершилась.
+            # thread_sensitive: ASGIHandler дає кожному запиту власний sync-потік, тож ORM
+            # генератора завжди в одному потоці й не блокує інші запити воркера.
+            steps = cls._apply_fetched_programs(username, all_programs, total, api_elapsed, sync_start_time, timer)
+            next_step = sync_to_async(next)
+            try:
+                while True:
+                    event = await next_step(steps, None)
+                    if event is None:
+                        break
+                    yield event
+            finally:
+                await sync_to_async(steps.close)()
+
+        except Exception as e:
+            logger.error(f"❌ [ASYNC] Sync failed: {e}", exc_info=True)
+            root.record_exception(e)
+            timer.finish(result='error')
             yield {
-                'type': 'info',
-                'total_api': total,
-                'message': f'⚡ Fetched {len(all_programs)} programs from API in {api_elapsed:.2f}s'
+                'type': 'error',
+                'message': f'Async sync failed: {str(e)}'
             }
-            
-            # Отримуємо існуючі program_ids з БД
-            db_query_start = time.time()
-            db_program_ids = set(
-                ProgramRegistry.objects.filter(username=username)
-                .values_list('program_id', flat=True)
-            )
-            db_query_time = time.time() - db_query_start
-            logger.info(f"⏱️  [TIMING] 💾 DB query (existing programs): {db_query_time:.3f}s")
-            
-            total_db_before = len(db_program_ids)
-            
+        finally:
+            root.end()
+
+    @classmethod
+    def _apply_fetched_programs(cls, username: str, all_programs: List[Dict], total: int,
+                                api_elapsed: float, sync_start_time: float, timer: SyncTimer):
+        """
+        DB-частина синхронізації (diff, add, update, delete, businesses, rollup) для вже
+        завантажених програм. Блокуюча (ORM + власні event loop-и для asyncpg), тож з async
+        коду виконується в окремому потоці (sync_events_async).
+
+        Yields:
+            Dict з прогресом синхронізації (для SSE)
+        """
+        if not all_programs:
+            timer.finish(result='error')
             yield {
-                'type': 'info',
-                'total_db': total_db_before,
-                'message': f'💾 Database has {total_db_before} programs'
+                'type': 'error',
+                'message': 'Failed to fetch programs from API'
+            }
+            return
+        
+        yield {
+            'type': 'info',
+            'total_api': total,
+            'message': f'⚡ Fetched {len(all_programs)} programs from API in {api_elapsed:.2f}s'
+        }
+        
+        # Отримуємо існуючі program_ids з БД
+        db_query_start = time.time()
+        phase = tracing.start_span('sync.diff')
+        db_program_ids = set(
+            ProgramRegistry.objects.filter(username=username)
+            .values_list('program_id', flat=True)
+        )
+        db_query_time = time.time() - db_query_start
+        logger.info(f"⏱️  [TIMING] 💾 DB query (existing programs): {db_query_time:.3f}s")
+        
+        total_db_before = len(db_program_ids)
+        
+        yield {
+            'type': 'info',
+            'total_db': total_db_before,
+            'message': f'💾 Database has {total_db_before} programs'
+        }
+        
+        # Знаходимо нові та існуючі програми
+        api_program_ids = {p.get('program_id') for p in all_programs if p.get('program_id')}
+        missing_ids = api_program_ids - db_program_ids
+        common_ids = api_program_ids & db_program_ids
+        deleted_ids = db_program_ids - api_program_ids
+        # Знімок полів rollup-у до sync: перерахуємо лише бізнеси програм, що реально змінились
+        rollup_before = BusinessRollupService.snapshot(username)
+        phase.set_attribute('missing', len(missing_ids))
+        phase.set_attribute('common', len(common_ids))
+        phase.set_attribute('deleted', len(deleted_ids))
+        phase.end()
+        
+        logger.info(f"📥 [ASYNC] Missing in DB: {len(missing_ids)} programs")
+        logger.info(f"🔄 [ASYNC] Common programs: {len(common_ids)}")
+        logger.info(f"🗑️  [ASYNC] Deleted from API: {len(deleted_ids)} programs")
+        
+        yield {
+            'type': 'info',
+            'message': f'📊 Analysis: +{len(missing_ids)} to add, ~{len(common_ids)} to update, -{len(deleted_ids)} to delete'
+        }
+        
+        # Зберігаємо нові програми (Django ORM - синхронно)
+        added = 0
+        save_time = 0
+        if missing_ids:
+            yield {
+                'type': 'progress',
+                'message': f'📥 Adding {len(missing_ids)} new programs...',
+                'synced': 0,
+                'total': len(missing_ids),
+                'percentage': 0
             }
             
-            # Знаходимо нові та існуючі програми
-            api_program_ids = {p.get('program_id') for p in all_programs if p.get('program_id')}
-            missing_ids = api_program_ids - db_program_ids
-            common_ids = api_program_ids & db_program_ids
-            deleted_ids = db_program_ids - api_program_ids
+            logger.info(f"💾 [ASYNC] Saving {len(missing_ids)} new programs to DB...")
+            from .sync_service import ProgramSyncService
+            programs_to_add = [p for p in all_programs if p.get('program_id') in missing_ids]
             
-            logger.info(f"📥 [ASYNC] Missing in DB: {len(missing_ids)} programs")
-            logger.info(f"🔄 [ASYNC] Common programs: {len(common_ids)}")
-            logger.info(f"🗑️  [ASYNC] Deleted from API: {len(deleted_ids)} programs")
+            save_start = time.time()
+            try:
+                with tracing.span('sync.add', programs=len(programs_to_add)):
+                    added = ProgramSyncService._save_programs_batch(username, programs_to_add)
+                save_time = time.time() - save_start
+                logger.info(f"✅ [ASYNC] Saved {added} new programs to DB")
+                logger.info(f"⏱️  [TIMING] 💾 DB save (bulk_create): {save_time:.3f}s")
+                logger.info(f"⏱️  [TIMING] 🚀 Save speed: {added / save_time:.0f} programs/second")
+            except Exception as e:
+                save_time = time.time() - save_start
+                logger.error(f"❌ [ASYNC] Failed to save programs: {e}", exc_info=True)
+                added = 0
             
             yield {
-                'type': 'info',
-                'message': f'📊 Analysis: +{len(missing_ids)} to add, ~{len(common_ids)} to update, -{len(deleted_ids)} to delete'
+                'type': 'progress',
+                'message': f'✅ Added {added} new programs',
+                'synced': added,
+                'total': len(missing_ids),
+                'added': added,
+                'percentage': 100
             }
-            
-            # Зберігаємо нові програми (Django ORM - синхронно)
-            added = 0
-            if missing_ids:
-                yield {
-                    'type': 'progress',
-                    'message': f'📥 Adding {len(missing_ids)} new programs...',
-                    'synced': 0,
-                    'total': len(missing_ids),
-                    'percentage': 0
-                }
-                
-                logger.info(f"💾 [ASYNC] Saving {len(missing_ids)} new programs to DB...")
-                from .sync_service import ProgramSyncService
-                programs_to_add = [p for p in all_programs if p.get('program_id') in missing_ids]
+        
+        # Оновлюємо існуючі програми (ASYNCPG - швидко!)
+        updated = 0
+        update_time = 0
+        if common_ids:
+            logger.info(f"🔄 [ASYNC] Updating {len(common_ids)} existing programs...")
+            
+            programs_to_update = [p for p in all_programs if p.get('program_id') in common_ids]
+            
+            # Підготовка даних для asyncpg
+            from .sync_service import ProgramSyncService
+            programs_data = []
+            
+            for program in programs_to_update:
+                # Витягуємо business_id
+                yelp_business_id = program.get('yelp_business_id')
+                if not yelp_business_id:
+                    businesses = program.get('businesses', [])
+                    if businesses and len(businesses) > 0:
+                        yelp_business_id = businesses[0].get('yelp_business_id')
+                
+                # Визначаємо статус
+                status = ProgramSyncService._determine_program_status(
+                    program.get('program_status'),
+                    program.get('program_pause_status'),
+                    program.get('start_date'),
+                    program.get('end_date')
+                )
                 
-                save_start = time.time()
+                # Парсимо дати
+                from datetime import datetime
+                start_date = None
+                end_date = None
                 try:
-                    added = ProgramSyncService._save_programs_batch(username, programs_to_add)
-                    save_time = time.time() - save_start
-                    logger.info(f"✅ [ASYNC] Saved {added} new programs to DB")
-                    logger.info(f"⏱️  [TIMING] 💾 DB save (bulk_create): {save_time:.3f}s")
-                    logger.info(f"⏱️  [TIMING] 🚀 Save speed: {added / save_time:.0f} programs/second")
-                except Exception as e:
-                    save_time = time.time() - save_start
-                    logger.error(f"❌ [ASYNC] Failed to save programs: {e}", exc_info=True)
-                    added = 0
-                
-                yield {
-                    'type': 'progress',
-                    'message': f'✅ Added {added} new programs',
-                    'synced': added,
-                    'total': len(missing_ids),
-                    'added': added,
-                    'percentage': 100
-                }
+                    if program.get('start_date'):
+                        start_date = datetime.strptime(program.get('start_date'), '%Y-%m-%d').date()
+                    if program.get('end_date'):
+                        end_date = datetime.strptime(program.get('end_date'), '%Y-%m-%d').date()
+                except:
+                    pass
+                
+                # Program metrics
+                program_metrics = program.get('program_metrics', {})
+                budget_cents = program_metrics.get('budget', 0) if program_metrics else 0
+                budget = budget_cents / 100.0 if budget_cents else None
+                
+                # Partner business ID
+                partner_business_id = None
+                businesses = program.get('businesses', [])
+                if businesses and len(businesses) > 0:
+                    partner_business_id = businesses[0].get('partner_business_id')
+                
+                programs_data.append({
+                    'program_id': program.get('program_id'),
+                    'yelp_business_id': yelp_business_id,
+                    'status': status,
+                    'program_name': program.get('program_type'),
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'program_status': program.get('program_status'),
+                    'program_pause_status': program.get('program_pause_status'),
+                    'budget': budget,
+                    'currency': program_metrics.get('currency') if program_metrics else 'USD',
+                    'is_autobid': program_metrics.get('is_autobid') if program_metrics else None,
+                    'max_bid': program_metrics.get('max_bid', 0) / 100.0 if program_metrics and program_metrics.get('max_bid') else None,
+                    'billed_impressions': program_metrics.get('billed_impressions', 0) if program_metrics else 0,
+                    'billed_clicks': program_metrics.get('billed_clicks', 0) if program_metrics else 0,
+                    'ad_cost': program_metrics.get('ad_cost', 0) / 100.0 if program_metrics else 0,
+                    'fee_period': program_metrics.get('fee_period') if program_metrics else None,
+                    'partner_business_id': partner_business_id,
+                    'active_features': program.get('active_features', []),
+                    'available_features': program.get('available_features', []),
+                    'businesses': businesses,
+                })
             
-            # Оновлюємо існуючі програми (ASYNCPG - швидко!)
-            updated = 0
-            update_time = 0
-            if common_ids:
-                logger.info(f"🔄 [ASYNC] Updating {len(common_ids)} existing programs...")
-                
-                programs_to_update = [p for p in all_programs if p.get('program_id') in common_ids]
-                
-                # Підготовка даних для asyncpg
-                from .sync_service import ProgramSyncService
-                programs_data = []
-                
-                for program in programs_to_update:
-                    # Витягуємо business_id
-                    yelp_business_id = program.get('yelp_business_id')
-                    if not yelp_business_id:
-                        businesses = program.get('businesses', [])
-                        if businesses and len(businesses) > 0:
-                            yelp_business_id = businesses[0].get('yelp_business_id')
-                    
-                    # Визначаємо статус
-                    status = ProgramSyncService._determine_program_status(
-                        program.get('program_status'),
-                        program.get('program_pause_status'),
-                        program.get('start_date'),
-                        program.get('end_date')
-                    )
-                    
-                    # Парсимо дати
-                    from datetime import datetime
-                    start_date = None
-                    end_date = None
-                    try:
-                        if program.get('start_date'):
-                            start_date = datetime.strptime(program.get('start_date'), '%Y-%m-%d').date()
-                        if program.get('end_date'):
-                            end_date = datetime.strptime(program.get('end_date'), '%Y-%m-%d').date()
-                    except:
-                        pass
-                    
-                    # Program metrics
-                    program_metrics = program.get('program_metrics', {})
-                    budget_cents = program_metrics.get('budget', 0) if program_metrics else 0
-                    budget = budget_cents / 100.0 if budget_cents else None
-                    
-                    # Partner business ID
-                    partner_business_id = None
-                    businesses = program.get('businesses', [])
-                    if businesses and len(businesses) > 0:
-                        partner_business_id = businesses[0].get('partner_business_id')
-                    
-                    programs_data.append({
-                        'program_id': program.get('program_id'),
-                        'yelp_business_id': yelp_business_id,
-                        'status': status,
-                        'program_name': program.get('program_type'),
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'program_status': program.get('program_status'),
-                        'program_pause_status': program.get('program_pause_status'),
-                        'budget': budget,
-                        'currency': program_metrics.get('currency') if program_metrics else 'USD',
-                        'is_autobid': program_metrics.get('is_autobid') if program_metrics else None,
-                        'max_bid': program_metrics.get('max_bid', 0) / 100.0 if program_metrics and program_metrics.get('max_bid') else None,
-                        'billed_impressions': program_metrics.get('billed_impressions', 0) if program_metrics else 0,
-                        'billed_clicks': program_metrics.get('billed_clicks', 0) if program_metrics else 0,
-                        'ad_cost': program_metrics.get('ad_cost', 0) / 100.0 if program_metrics else 0,
-                        'fee_period': program_metrics.get('fee_period') if program_metrics else None,
-                        'partner_business_id': partner_business_id,
-                        'active_features': program.get('active_features', []),
-                        'available_features': program.get('available_features', []),
-                        'businesses': businesses,
-                    })
-                
-                update_start = time.time()
+            update_start = time.time()
+            try:
+                # ⚡ Використовуємо AsyncProgramService для швидкого UPDATE
+                from .async_program_service import AsyncProgramService
+                from .async_business_service import AsyncBusinessService
+                
+                # Створюємо новий event loop для async операції
+                update_loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(update_loop)
+                
                 try:
-                    # ⚡ Використовуємо AsyncProgramService для швидкого UPDATE
-                    from .async_program_service import AsyncProgramService
-                    from .async_business_service import AsyncBusinessService
-                    
-                    # Створюємо новий event loop для async операції
-                    update_loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(update_loop)
-                    
-                    try:
+                    with tracing.span('sync.update', programs=len(programs_data)):
                         pool = update_loop.run_until_complete(AsyncBusinessService.get_db_pool())
                         updated = update_loop.run_until_complete(
                             AsyncProgramService.bulk_update_programs(pool, username, programs_data)
                         )
                         update_loop.run_until_complete(pool.close())
-                    finally:
-                        update_loop.close()
-                    
-                    update_time = time.time() - update_start
-                    logger.info(f"✅ [ASYNCPG] Updated {updated} programs in {update_time:.3f}s")
-                    logger.info(f"⏱️  [TIMING] 💾 DB update (asyncpg): {update_time:.3f}s")
-                    logger.info(f"⏱️  [TIMING] 🚀 Update speed: {updated / update_time:.0f} programs/second")
-                except Exception as e:
-                    update_time = time.time() - update_start
-                    logger.error(f"❌ [ASYNCPG] Failed to update programs: {e}", exc_info=True)
-                    updated = 0
+                finally:
+                    update_loop.close()
                 
-                yield {
-                    'type': 'info',
-                    'message': f'🔄 Updated {updated} existing programs in {update_time:.2f}s'
-                }
+                update_time = time.time() - update_start
+                logger.info(f"✅ [ASYNCPG] Updated {updated} programs in {update_time:.3f}s")
+                logger.info(f"⏱️  [TIMING] 💾 DB update (asyncpg): {update_time:.3f}s")
+                logger.info(f"⏱️  [TIMING] 🚀 Update speed: {updated / update_time:.0f} programs/second")
+            except Exception as e:
+                update_time = time.time() - update_start
+                logger.error(f"❌ [ASYNCPG] Failed to update programs: {e}", exc_info=True)
+                updated = 0
             
-            # Видаляємо застарілі програми
-            deleted = 0
-            delete_time = 0
-            if deleted_ids:
-                logger.warning(f"🗑️  [ASYNC] Deleting {len(deleted_ids)} obsolete programs")
-                delete_start = time.time()
+            yield {
+                'type': 'info',
+                'message': f'🔄 Updated {updated} existing programs in {update_time:.2f}s'
+            }
+        
+        # Видаляємо застарілі програми
+        deleted = 0
+        delete_time = 0
+        if deleted_ids:
+            logger.warning(f"🗑️  [ASYNC] Deleting {len(deleted_ids)} obsolete programs")
+            delete_start = time.time()
+            with tracing.span('sync.delete', programs=len(deleted_ids)):
                 deleted, _ = ProgramRegistry.objects.filter(
                     username=username,
                     program_id__in=deleted_ids
                 ).delete()
-                delete_time = time.time() - delete_start
-                logger.info(f"⏱️  [TIMING] 🗑️  DB delete: {delete_time:.3f}s")
-                
-                yield {
-                    'type': 'info',
-                    'message': f'🗑️  Deleted {deleted} obsolete programs'
-                }
+            delete_time = time.time() - delete_start
+            logger.info(f"⏱️  [TIMING] 🗑️  DB delete: {delete_time:.3f}s")
+            
+            yield {
+                'type': 'info',
+                'message': f'🗑️  Deleted {deleted} obsolete programs'
+            }
+        
+        # ✅ ТЕПЕР програми вже збережені в БД! Можна синхронізувати businesses
+        logger.info(f"🔍 [DEBUG] Collecting business_ids from {len(all_programs)} programs...")
+        business_ids = {
+            p.get('yelp_business_id') 
+            for p in all_programs 
+            if p.get('yelp_business_id')
+        }
+        logger.info(f"🔍 [DEBUG] Collected {len(business_ids)} unique business_ids")
+        
+        business_time = 0
+        businesses_map = {}
+        if business_ids:
+            logger.info(f"📊 Found {len(business_ids)} unique businesses")
             
-            # ✅ ТЕПЕР програми вже збережені в БД! Можна синхронізувати businesses
-            logger.info(f"🔍 [DEBUG] Collecting business_ids from {len(all_programs)} programs...")
-            business_ids = {
-                p.get('yelp_business_id') 
-                for p in all_programs 
-                if p.get('yelp_business_id')
+            yield {
+                'type': 'progress',
+                'message': f'🏢 Syncing {len(business_ids)} businesses...',
+                'percentage': 80
             }
-            logger.info(f"🔍 [DEBUG] Collected {len(business_ids)} unique business_ids")
             
-            business_time = 0
-            businesses_map = {}
-            if business_ids:
-                logger.info(f"📊 Found {len(business_ids)} unique businesses")
+            business_start = time.time()
+            api_key = settings.YELP_FUSION_API_KEY
+            
+            if not api_key:
+                logger.warning("⚠️  YELP_FUSION_API_KEY not set, skipping business names")
+            else:
+                from .async_business_service import AsyncBusinessService
                 
-                yield {
-                    'type': 'progress',
-                    'message': f'🏢 Syncing {len(business_ids)} businesses...',
-                    'percentage': 80
-                }
+                try:
+                    # 1. Резолвимо businesses (DB кеш → Fusion API з token bucket → DB)
+                    with tracing.span('sync.business_resolve', businesses=len(business_ids)):
+                        businesses_map = AsyncBusinessService.resolve(
+                            business_ids,
+                            api_key=api_key,
+                            max_concurrent=5  # Поверх token bucket (знижено з 20 до 5 щоб уникнути 429)
+                        )
+                except Exception as e:
+                    logger.error(f"❌ Failed to sync businesses: {e}", exc_info=True)
+                    businesses_map = {}
                 
-                business_start = time.time()
-                api_key = settings.YELP_FUSION_API_KEY
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
                 
-                if not api_key:
-                    logger.warning("⚠️  YELP_FUSION_API_KEY not set, skipping business names")
-                else:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    
-                    try:
-                        from .async_business_service import AsyncBusinessService
+                try:
+                    with tracing.span('sync.link') as phase:
                         pool = loop.run_until_complete(AsyncBusinessService.get_db_pool())
                         
-                        # 1. Завантажуємо businesses (API + save to DB)
-                        businesses_map = loop.run_until_complete(
-                            AsyncBusinessService.sync_businesses(
-                                business_ids,
-                                api_key,
-                                username,
-                                max_concurrent=5  # Rate limit (знижено з 20 до 5 щоб уникнути 429)
-                            )
-                        )
-                        
                         # 2. ⚡ ВАЖЛИВО: Лінкуємо програми ДО businesses (тепер програми вже є в БД!)
                         linked_count = loop.run_until_complete(
                             AsyncBusinessService.link_programs_to_businesses(pool, username)
                         )
+                        phase.set_attribute('linked', linked_count)
                         logger.info(f"🔗 [ASYNCPG] Linked {linked_count} programs to businesses")
                         
                         loop.run_until_complete(pool.close())
-                    except Exception as e:
-                        logger.error(f"❌ Failed to sync businesses: {e}", exc_info=True)
-                        businesses_map = {}
-                    finally:
-                        loop.close()
-                
-                business_time = time.time() - business_start
-                logger.info(f"⏱️  [TIMING] 🏢 Business sync: {business_time:.3f}s ({len(businesses_map)} businesses)")
-                
-                yield {
-                    'type': 'info',
-                    'message': f'✅ Synced {len(businesses_map)}/{len(business_ids)} businesses in {business_time:.2f}s'
-                }
+                except Exception as e:
+                    logger.error(f"❌ Failed to link programs to businesses: {e}", exc_info=True)
+                finally:
+                    loop.close()
             
-            # Backfill business names - ВІДКЛЮЧЕНО (business names тепер через AsyncBusinessService)
-            # backfill_time = 0
-            # try:
-            #     backfill_start = time.time()
-            #     from .sync_service import ProgramSyncService
-            #     backfill_result = ProgramSyncService.backfill_missing_business_names(
-            #         username, max_fetch=50
-            #     )
-            #     backfill_time = time.time() - backfill_start
-            #     
-            #     if backfill_result.get('fetched', 0) > 0:
-            #         logger.info(f"⏱️  [TIMING] 📡 Backfill business names: {backfill_time:.3f}s for {backfill_result['fetched']} names")
-            #         yield {
-            #             'type': 'info',
-            #             'message': f"📡 Fetched {backfill_result['fetched']} business names"
-            #         }
-            # except Exception as e:
-            #     logger.warning(f"⚠️  [ASYNC] Backfill failed: {e}")
-            
-            backfill_time = 0
-            logger.debug(f"⏭️  [SKIP] Backfill skipped (business names handled by AsyncBusinessService)")
-            
-            # Фінальний результат
-            total_db_after = ProgramRegistry.objects.filter(username=username).count()
-            
-            # Загальний час синхронізації
-            total_sync_time = time.time() - sync_start_time
-            message = f'✅ ASYNC sync complete: +{added} added, ~{updated} updated, -{deleted} deleted'
-            
-            logger.info(f"📊 [ASYNC] {message}")
-            logger.info(f"⏱️  [TIMING] ⭐ TOTAL SYNC TIME: {total_sync_time:.3f}s")
-            logger.info(f"⏱️  [TIMING] 📊 Breakdown:")
-            logger.info(f"⏱️  [TIMING]   - Yelp API fetch: {api_elapsed:.3f}s ({api_elapsed/total_sync_time*100:.1f}%)")
-            if added > 0:
-                logger.info(f"⏱️  [TIMING]   - DB save: {save_time:.3f}s ({save_time/total_sync_time*100:.1f}%)")
-            if updated > 0:
-                logger.info(f"⏱️  [TIMING]   - DB update: {update_time:.3f}s ({update_time/total_sync_time*100:.1f}%)")
-            if business_time > 0:
-                logger.info(f"⏱️  [TIMING]   - Business sync: {business_time:.3f}s ({business_time/total_sync_time*100:.1f}%)")
-            if backfill_time > 0:
-                logger.info(f"⏱️  [TIMING]   - Business names (backfill): {backfill_time:.3f}s ({backfill_time/total_sync_time*100:.1f}%)")
+            business_time = time.time() - business_start
+            logger.info(f"⏱️  [TIMING] 🏢 Business sync: {business_time:.3f}s ({len(businesses_map)} businesses)")
             
             yield {
-                'type': 'complete',
-                'status': 'synced',
-                'added': added,
-                'updated': updated,
-                'deleted': deleted,
-                'total_synced': total_db_after,
-                'message': message,
-                'timing': {
-                    'total': round(total_sync_time, 3),
-                    'api': round(api_elapsed, 3),
-                    'save': round(save_time, 3) if added > 0 else 0,
-                    'update': round(update_time, 3) if updated > 0 else 0,
-                    'backfill': round(backfill_time, 3) if backfill_time > 0 else 0
-                }
+                'type': 'info',
+                'message': f'✅ Synced {len(businesses_map)}/{len(business_ids)} businesses in {business_time:.2f}s'
             }
-            
-        except Exception as e:
-            logger.error(f"❌ [ASYNC] Sync failed: {e}", exc_info=True)
-            yield {
-                'type': 'error',
-                'message': f'Async sync failed: {str(e)}'
+        
+        # Backfill business names - ВІДКЛЮЧЕНО (business names тепер через AsyncBusinessService)
+        # backfill_time = 0
+        # try:
+        #     backfill_start = time.time()
+        #     from .sync_service import ProgramSyncService
+        #     backfill_result = ProgramSyncService.backfill_missing_business_names(
+        #         username, max_fetch=50
+        #     )
+        #     backfill_time = time.time() - backfill_start
+        #     
+        #     if backfill_result.get('fetched', 0) > 0:
+        #         logger.info(f"⏱️  [TIMING] 📡 Backfill business names: {backfill_time:.3f}s for {backfill_result['fetched']} names")
+        #         yield {
+        #             'type': 'info',
+        #             'message': f"📡 Fetched {backfill_result['fetched']} business names"
+        #         }
+        # except Exception as e:
+        #     logger.warning(f"⚠️  [ASYNC] Backfill failed: {e}")
+        
+        backfill_time = 0
+        logger.debug(f"⏭️  [SKIP] Backfill skipped (business names handled by AsyncBusinessService)")
+        
+        with tracing.span('sync.rollup'):
+            BusinessRollupService.safe_refresh_changed(username, rollup_before)
+        
+        # Фінальний результат
+        total_db_after = ProgramRegistry.objects.filter(username=username).count()
+        
+        # Загальний час синхронізації
+        total_sync_time = time.time() - sync_start_time
+        message = f'✅ ASYNC sync complete: +{added} added, ~{updated} updated, -{deleted} deleted'
+        
+        logger.info(f"📊 [ASYNC] {message}")
+        logger.info(f"⏱️  [TIMING] ⭐ TOTAL SYNC TIME: {total_sync_time:.3f}s")
+        for phase, seconds in (
+            ('api_fetch', api_elapsed), ('db_compare', db_query_time), ('db_insert', save_time),
+            ('db_update', update_time), ('db_delete', delete_time), ('business_sync', business_time),
+        ):
+            timer.record(phase, seconds)
+        timer.finish(added, updated, deleted)
+        logger.info(f"⏱️  [TIMING] 📊 Breakdown:")
+        logger.info(f"⏱️  [TIMING]   - Yelp API fetch: {api_elapsed:.3f}s ({api_elapsed/total_sync_time*100:.1f}%)")
+        if added > 0:
+            logger.info(f"⏱️  [TIMING]   - DB save: {save_time:.3f}s ({save_time/total_sync_time*100:.1f}%)")
+        if updated > 0:
+            logger.info(f"⏱️  [TIMING]   - DB update: {update_time:.3f}s ({update_time/total_sync_time*100:.1f}%)")
+        if business_time > 0:
+            logger.info(f"⏱️  [TIMING]   - Business sync: {business_time:.3f}s ({business_time/total_sync_time*100:.1f}%)")
+        if backfill_time > 0:
+            logger.info(f"⏱️  [TIMING]   - Business names (backfill): {backfill_time:.3f}s ({backfill_time/total_sync_time*100:.1f}%)")
+        
+        yield {
+            'type': 'complete',
+            'status': 'synced',
+            'added': added,
+            'updated': updated,
+            'deleted': deleted,
+            'total_synced': total_db_after,
+            'message': message,
+            'timing': {
+                'total': round(total_sync_time, 3),
+                'api': round(api_elapsed, 3),
+                'save': round(save_time, 3) if added > 0 else 0,
+                'update': round(update_time, 3) if updated > 0 else 0,
+                'backfill': round(backfill_time, 3) if backfill_time > 0 else 0
             }
-
+        }
@@ -0,0 +1,220 @@
+"""
+Нативні async views для I/O-bound ендпоінтів (ASYNC_VIEWS=True, запуск під ASGI).
+
+Під WSGI кожен запит до Yelp (features, status, program info — 0.3-4s) тримає потік
+воркера, а SSE синхронізація — потік на весь час sync. Тут очікування Yelp відбувається
+в event loop (AsyncPartnerClient, AsyncProgramSyncService.sync_events_async), тож один
+воркер обслуговує сотні одночасних запитів.
+
+Контракт (URL, коди відповідей, тіла помилок) той самий, що у відповідних APIView
+з views.py. Автентифікація — ті ж DEFAULT_AUTHENTICATION_CLASSES (ORM → sync_to_async).
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .async_partner_client import AsyncPartnerClient, PartnerAPIError
+from .async_sync_service import AsyncProgramSyncService
+from .bulk_service import BulkProgramService
+from .serializers import (
+    BulkProgramFeaturesSerializer,
+    ProgramFeaturesRequestSerializer,
+    ProgramFeaturesDeleteSerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _drf_request(request) -> Request:
+    """DRF Request з тими ж парсерами/автентифікаторами, що й у APIView; user резолвиться одразу (ORM)."""
+    drf_request = Request(
+        request,
+        parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    drf_request.user  # noqa: B018 — запускає автентифікацію
+    return drf_request
+
+
+class AsyncAPIView(View):
+    """База async views: csrf_exempt (як APIView), DRF автентифікація, 401 на невдалу."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            self.drf_request = await sync_to_async(_drf_request)(request)
+        except exceptions.AuthenticationFailed as e:
+            return JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        request.user = self.drf_request.user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncJobStatusView(AsyncAPIView):
+    async def get(self, request, program_id):
+        try:
+            data = await AsyncPartnerClient.get_program_status(program_id)
+            logger.info(f"✅ AsyncJobStatusView: Status retrieved for program {program_id}: {data.get('status')}")
+            return JsonResponse(data)
+        except Exception as e:
+            logger.error(f"❌ AsyncJobStatusView: Error getting status for program {program_id}: {e}")
+            raise
+
+
+class AsyncPartnerProgramInfoView(AsyncAPIView):
+    """Return program info from Yelp for a specific program id."""
+
+    async def get(self, request, program_id):
+        try:
+            return JsonResponse(await AsyncPartnerClient.get_program_info(program_id))
+        except Exception as e:
+            logger.error(f"Error getting partner program info for program_id {program_id}: {e}")
+            raise
+
+
+class AsyncProgramFeaturesView(AsyncAPIView):
+    """Get, update and delete program features"""
+
+    async def get(self, request, program_id):
+        try:
+            data = await AsyncPartnerClient.get_program_features(program_id)
+            logger.info(f"✅ AsyncProgramFeaturesView.GET: Successfully retrieved features for program_id: {program_id}")
+            return JsonResponse(data)
+        except PartnerAPIError as e:
+            if e.status == 404:
+                logger.warning(f"Program not found: {program_id}")
+                return JsonResponse({"detail": "Program not found"}, status=status.HTTP_404_NOT_FOUND)
+            if e.status == 400:
+                logger.warning(f"Bad request for program features: {program_id}")
+                return JsonResponse(
+                    {"detail": "Invalid program ID or program doesn't support features"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            logger.error(f"HTTP error getting program features for {program_id}: {e}")
+            raise
+
+    async def post(self, request, program_id):
+        payload = self.drf_request.data
+        serializer = ProgramFeaturesRequestSerializer(data=payload)
+        if not serializer.is_valid():
+            logger.error(f"❌ AsyncProgramFeaturesView.POST: Validation errors for {program_id}: {serializer.errors}")
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            data = await AsyncPartnerClient.update_program_features(program_id, payload)
+            logger.info(f"✅ AsyncProgramFeaturesView.POST: Successfully updated features for program_id: {program_id}")
+            return JsonResponse(data)
+        except PartnerAPIError as e:
+            if e.status == 404:
+                logger.warning(f"Program not found for features update: {program_id}")
+                return JsonResponse({"detail": "Program not found"}, status=status.HTTP_404_NOT_FOUND)
+            if e.status == 400:
+                logger.warning(f"Bad request for program features update: {program_id}")
+                if not isinstance(e.payload, dict):
+                    return JsonResponse({"error": "Invalid features data"}, status=status.HTTP_400_BAD_REQUEST)
+                if 'error' in e.payload:
+                    yelp_error = e.payload['error']
+                    return JsonResponse({
+                        "error": yelp_error.get('description', yelp_error.get('id', 'Unknown error')),
+                        "error_id": yelp_error.get('id'),
+                        "full_response": e.payload
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                return JsonResponse(e.payload, status=status.HTTP_400_BAD_REQUEST)
+            logger.error(f"HTTP error updating program features for {program_id}: {e}")
+            raise
+
+    async def delete(self, request, program_id):
+        serializer = ProgramFeaturesDeleteSerializer(data=self.drf_request.data)
+        if not serializer.is_valid():
+            logger.error(f"❌ AsyncProgramFeaturesView.DELETE: Validation errors for {program_id}: {serializer.errors}")
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            data = await AsyncPartnerClient.delete_program_features(program_id, serializer.validated_data['features'])
+            logger.info(f"✅ AsyncProgramFeaturesView.DELETE: Successfully deleted features for program_id: {program_id}")
+            return JsonResponse(data)
+        except PartnerAPIError as e:
+            if e.status == 404:
+                logger.warning(f"Program not found for features deletion: {program_id}")
+                return JsonResponse({"detail": "Program not found"}, status=status.HTTP_404_NOT_FOUND)
+            if e.status == 400:
+                logger.warning(f"Bad request for program features deletion: {program_id}")
+                if isinstance(e.payload, dict):
+                    return JsonResponse(e.payload, status=status.HTTP_400_BAD_REQUEST)
+                return JsonResponse({"detail": "Invalid features data"}, status=status.HTTP_400_BAD_REQUEST)
+            logger.error(f"HTTP error deleting program features for {program_id}: {e}")
+            raise
+
+
+class AsyncProgramSyncStreamView(AsyncAPIView):
+    """
+    SSE синхронізація (як ProgramSyncStreamView), але події генеруються в event loop:
+    потік воркера не зайнятий на весь час sync, прогрес API fetch приходить одразу.
+    """
+
+    async def post(self, request):
+        if not request.user or not request.user.is_authenticated:
+            return JsonResponse({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        username = request.user.username
+        batch_size = int(self.drf_request.data.get('batch_size', 40))
+        logger.info(f"🚀 [ASYNC-SSE] Native async sync stream requested by {username} (batch_size={batch_size})")
+
+        async def event_stream():
+            event_count = 0
+            try:
+                async for progress_event in AsyncProgramSyncService.sync_events_async(username, batch_size=batch_size):
+                    event_count += 1
+                    yield f"data: {json.dumps(progress_event, ensure_ascii=False)}\n\n"
+                logger.info(f"✅ [ASYNC-SSE] Async sync stream completed for {username} ({event_count} events sent)")
+            except Exception as e:
+                logger.error(f"❌ [ASYNC-SSE] Stream error for {username}: {e}", exc_info=True)
+                error_event = json.dumps({
+                    'type': 'error',
+                    'message': f'Async sync failed: {str(e)}'
+                })
+                yield f"data: {error_event}\n\n"
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Disable nginx buffering
+        return response
+
+
+class AsyncBulkProgramFeaturesView(AsyncAPIView):
+    """
+    Bulk features (як BulkProgramFeaturesView), але SSE стрім — async генератор: під ASGI
+    Django не збирає його в список, тож result кожної програми приходить одразу.
+    """
+
+    async def post(self, request):
+        serializer = BulkProgramFeaturesSerializer(data=self.drf_request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        program_ids = serializer.validated_data['program_ids']
+        features = serializer.validated_data['features']
+        username = request.user.username if request.user and request.user.is_authenticated else None
+        logger.info(f"🎯 [ASYNC-SSE] Bulk features {list(features)} for {len(program_ids)} programs requested by {username}")
+
+        async def event_stream():
+            try:
+                async for event in BulkProgramService.bulk_update_features_stream_async(program_ids, features, username=username):
+                    yield f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+            except Exception as e:
+                logger.error(f"❌ [ASYNC-SSE] Bulk features stream error for {username}: {e}", exc_info=True)
+                yield f"data: {json.dumps({'type': 'error', 'message': f'Bulk features failed: {e}'})}\n\n"
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Disable nginx buffering
+        return response
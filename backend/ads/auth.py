@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework.authentication import BasicAuthentication
 from rest_framework import exceptions
 from rest_framework.permissions import BasePermission
@@ -87,3 +90,17 @@ class AllowAnyWithLogging(BasePermission):
     def has_permission(self, request, view):
         logger.info(f"🔐 AllowAnyWithLogging.has_permission: user={request.user}, authenticated={request.user.is_authenticated}")
         return True
+
+
+class HasProfilesToken(BasePermission):
+    """
+    Authorization: Bearer <PROFILES_TOKEN> for /api/profiles/.
+
+    StoringBasicAuthentication accepts any password (and get_or_creates the user), so
+    is_staff proves nothing here. Without PROFILES_TOKEN the endpoints are closed.
+    """
+
+    def has_permission(self, request, view):
+        token = getattr(settings, 'PROFILES_TOKEN', '')
+        supplied = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(token) and hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
@@ -0,0 +1,241 @@
+"""
+Допоміжні вимірювачі для benchmark-команд (benchmark_sync_engines, benchmark_read_paths).
+
+- QueryCounter — SQL запити та змінені рядки на ВСІХ з'єднаннях, включно з потоками
+  (sync_with_streaming_parallel / fetch_all_programs_batch відкривають власні з'єднання)
+  та asyncpg-пулами (через tracing.init_asyncpg_connection). asyncpg не повідомляє кількість
+  змінених рядків, тож після його INSERT/UPDATE/DELETE rows_written невідомий (None);
+- PeakRSS — пік RSS процесу під час блоку (фоновий семплер /proc/self/statm);
+- TrackedCache — default cache, що пам'ятає ключі бенчмарку й чистить лише їх
+  (спільний Redis не можна FLUSHDB-нути: там кеші й lock-и всіх користувачів);
+- percentile — перцентилі без numpy.
+"""
+import json
+import os
+import resource
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import tracing
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class QueryCounter:
+    """
+    Рахує запити на всіх з'єднаннях, поки активний.
+
+        with QueryCounter() as counter:
+            ...
+        counter.queries, counter.rows_written, counter.by_statement
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.django_rows_written = 0
+        self.asyncpg_writes = 0
+        self.by_statement: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wrapped = []
+
+    @property
+    def rows_written(self) -> Optional[int]:
+        return None if self.asyncpg_writes else self.django_rows_written
+
+    @staticmethod
+    def _statement(sql) -> str:
+        return sql.lstrip().split(None, 1)[0].upper() if sql and sql.strip() else ''
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        statement = self._statement(sql)
+        rowcount = getattr(context.get('cursor'), 'rowcount', 0) or 0
+        with self._lock:
+            self.queries += 1
+            self.by_statement[statement] = self.by_statement.get(statement, 0) + 1
+            if statement in WRITE_STATEMENTS and rowcount > 0:
+                self.django_rows_written += rowcount
+        return result
+
+    def _on_asyncpg_query(self, record):
+        statement = self._statement(record.query)
+        with self._lock:
+            self.queries += 1
+            self.by_statement[statement] = self.by_statement.get(statement, 0) + 1
+            if statement in WRITE_STATEMENTS:
+                self.asyncpg_writes += 1
+
+    def _install(self, connection):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+            self._wrapped.append(connection)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        self._install(connection)
+
+    def __enter__(self) -> 'QueryCounter':
+        for alias in connections:
+            self._install(connections[alias])
+        connection_created.connect(self._on_connection_created, weak=False, dispatch_uid=id(self))
+        tracing.add_asyncpg_observer(self._on_asyncpg_query)
+        return self
+
+    def __exit__(self, *exc_info):
+        tracing.remove_asyncpg_observer(self._on_asyncpg_query)
+        connection_created.disconnect(dispatch_uid=id(self))
+        for connection in self._wrapped:
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+        self._wrapped = []
+
+
+class TrackedCache:
+    """
+    Проксі над default cache: запам'ятовує ключі, які читали чи писали запити бенчмарку,
+    і clear() видаляє лише їх. Підміняє caches['default'] поточного потоку, поки активний.
+
+        with TrackedCache() as tracked:
+            client.get(...)
+            tracked.clear()
+    """
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+        self.keys = set()
+        self._backend = None
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def _track(self, key):
+        self.keys.add(key)
+        return key
+
+    def get(self, key, *args, **kwargs):
+        return self._backend.get(self._track(key), *args, **kwargs)
+
+    def get_many(self, keys, *args, **kwargs):
+        self.keys.update(keys)
+        return self._backend.get_many(keys, *args, **kwargs)
+
+    def has_key(self, key, *args, **kwargs):
+        return self._backend.has_key(self._track(key), *args, **kwargs)
+
+    def set(self, key, *args, **kwargs):
+        return self._backend.set(self._track(key), *args, **kwargs)
+
+    def add(self, key, *args, **kwargs):
+        return self._backend.add(self._track(key), *args, **kwargs)
+
+    def get_or_set(self, key, *args, **kwargs):
+        return self._backend.get_or_set(self._track(key), *args, **kwargs)
+
+    def set_many(self, data, *args, **kwargs):
+        self.keys.update(data)
+        return self._backend.set_many(data, *args, **kwargs)
+
+    def clear(self):
+        if self.keys:
+            self._backend.delete_many(list(self.keys))
+
+    def __enter__(self) -> 'TrackedCache':
+        self._backend = caches[self.alias]
+        caches[self.alias] = self
+        return self
+
+    def __exit__(self, *exc_info):
+        caches[self.alias] = self._backend
+
+
+def current_rss_bytes() -> int:
+    """Поточний RSS процесу (Linux /proc; інакше — ru_maxrss як наближення)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    """Пік RSS за час блоку (семплінг кожні interval секунд)."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def __enter__(self) -> 'PeakRSS':
+        self.start = self.peak = current_rss_bytes()
+        self._thread = threading.Thread(target=self._sample, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / 1024 / 1024, 1)
+
+    @property
+    def delta_mb(self) -> float:
+        return round((self.peak - self.start) / 1024 / 1024, 1)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Перцентиль з лінійною інтерполяцією (як numpy.percentile за замовчуванням)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, config: Dict, results: List[Dict]) -> str:
+    """Зберігає результати у JSON (для порівняння з --baseline)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'config': config,
+            'results': results,
+        }, f, indent=2, default=str)
+    return path
+
+
+def load_baseline(path: str, key_fields: List[str]) -> Dict[tuple, Dict]:
+    """Результати попереднього запуску, проіндексовані за key_fields."""
+    with open(path) as f:
+        data = json.load(f)
+    return {tuple(row.get(field) for field in key_fields): row for row in data.get('results', [])}
+
+
+def default_output_path(prefix: str) -> str:
+    return os.path.join('benchmark_results', f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}.json")
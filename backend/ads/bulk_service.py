@@ -0,0 +1,267 @@
+"""
+Сервіс для масових операцій над програмами (pause / resume / edit / features).
+
+Валідація виконується один раз для всього запиту, запити до Partner API
+розсилаються паралельно з обмеженою кількістю потоків (retry вже всередині
+make_yelp_request_with_retry), а ProgramRegistry оновлюється одним UPDATE.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, Callable, Dict, Iterator, List
+
+import requests
+from asgiref.sync import sync_to_async
+from django.db import connection, models
+from django.utils import timezone
+
+from .async_partner_client import AsyncPartnerClient, PartnerAPIError
+from .models import ProgramRegistry
+from .rollup_service import BusinessRollupService
+from .services import YelpService
+
+logger = logging.getLogger(__name__)
+
+
+class BulkProgramService:
+    """Масові операції над програмами з per-program звітом."""
+
+    # Partner API не любить агресивний паралелізм (429) - тримаємо невеликий пул
+    MAX_WORKERS = 8
+
+    @classmethod
+    def _run_one(cls, operation: Callable, program_id: str) -> Dict:
+        """Виконує операцію для однієї програми і повертає рядок звіту."""
+        try:
+            result = operation(program_id)
+            return {'program_id': program_id, 'success': True, 'result': result}
+        except requests.HTTPError as e:
+            status_code = e.response.status_code if e.response is not None else None
+            error_message = str(e)
+            if e.response is not None:
+                try:
+                    error_message = f"Yelp API Error: {e.response.json()}"
+                except ValueError:
+                    error_message = f"Yelp API Error: {e.response.text}"
+            logger.error(f"❌ [BULK] {program_id}: {error_message}")
+            return {'program_id': program_id, 'success': False, 'status_code': status_code, 'error': error_message}
+        except Exception as e:
+            logger.error(f"❌ [BULK] {program_id}: unexpected error {e}")
+            return {'program_id': program_id, 'success': False, 'status_code': None, 'error': str(e)}
+        finally:
+            # Кожен потік пулу має власне DB-з'єднання - не залишаємо його відкритим
+            connection.close()
+
+    @classmethod
+    def _fan_out_iter(cls, program_ids: List[str], operation: Callable, max_workers: int = None) -> Iterator[Dict]:
+        """Паралельно виконує операцію для всіх програм, віддаючи рядки звіту в порядку завершення."""
+        max_workers = min(max_workers or cls.MAX_WORKERS, len(program_ids)) or 1
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [executor.submit(cls._run_one, operation, program_id) for program_id in program_ids]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Клієнт стріму відключився - виклики, що ще не стартували, не запускаємо
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @classmethod
+    async def _run_one_async(cls, operation: Callable, program_id: str, semaphore: asyncio.Semaphore) -> Dict:
+        """Async _run_one: той самий рядок звіту, семафор замість пулу потоків."""
+        async with semaphore:
+            try:
+                result = await operation(program_id)
+                return {'program_id': program_id, 'success': True, 'result': result}
+            except PartnerAPIError as e:
+                error_message = f"Yelp API Error: {e.payload if e.payload is not None else e.text}"
+                logger.error(f"❌ [BULK] {program_id}: {error_message}")
+                return {'program_id': program_id, 'success': False, 'status_code': e.status, 'error': error_message}
+            except Exception as e:
+                logger.error(f"❌ [BULK] {program_id}: unexpected error {e}")
+                return {'program_id': program_id, 'success': False, 'status_code': None, 'error': str(e)}
+
+    @classmethod
+    async def _fan_out_aiter(cls, program_ids: List[str], operation: Callable, max_workers: int = None) -> AsyncIterator[Dict]:
+        """Async _fan_out_iter: не більше max_workers одночасних викликів, рядки в порядку завершення."""
+        semaphore = asyncio.Semaphore(min(max_workers or cls.MAX_WORKERS, len(program_ids)) or 1)
+        tasks = [asyncio.ensure_future(cls._run_one_async(operation, program_id, semaphore)) for program_id in program_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Клієнт стріму відключився - незавершені виклики скасовуємо
+            for task in tasks:
+                task.cancel()
+
+    @classmethod
+    def _fan_out(cls, program_ids: List[str], operation: Callable, max_workers: int = None) -> List[Dict]:
+        """Паралельно виконує операцію для всіх програм, зберігаючи порядок у звіті."""
+        results = {r['program_id']: r for r in cls._fan_out_iter(program_ids, operation, max_workers)}
+        return [results[program_id] for program_id in program_ids]
+
+    @classmethod
+    def _build_report(cls, action: str, results: List[Dict], registry_updated: int) -> Dict:
+        succeeded = sum(1 for r in results if r['success'])
+        return {
+            'action': action,
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'registry_updated': registry_updated,
+            'results': results,
+        }
+
+    @classmethod
+    def _succeeded_ids(cls, results: List[Dict]) -> List[str]:
+        return [r['program_id'] for r in results if r['success']]
+
+    @classmethod
+    def bulk_pause(cls, program_ids: List[str], username: str = None) -> Dict:
+        auth = YelpService._get_partner_auth(username)
+        logger.info(f"⏸️ [BULK] Pausing {len(program_ids)} programs")
+
+        results = cls._fan_out(program_ids, lambda pid: YelpService.pause_program(pid, auth=auth))
+
+        updated = 0
+        ok_ids = cls._succeeded_ids(results)
+        if username and ok_ids:
+            updated = ProgramRegistry.objects.filter(
+                username=username, program_id__in=ok_ids
+            ).update(program_pause_status='PAUSED', status='PAUSED', updated_at=timezone.now())
+
+        if updated:
+            BusinessRollupService.safe_refresh_for_programs(username, ok_ids)
+
+        return cls._build_report('pause', results, updated)
+
+    @classmethod
+    def bulk_resume(cls, program_ids: List[str], username: str = None) -> Dict:
+        auth = YelpService._get_partner_auth(username)
+        logger.info(f"▶️ [BULK] Resuming {len(program_ids)} programs")
+
+        results = cls._fan_out(program_ids, lambda pid: YelpService.resume_program(pid, auth=auth))
+
+        updated = 0
+        ok_ids = cls._succeeded_ids(results)
+        if username and ok_ids:
+            # Та сама логіка, що й ProgramSyncService._determine_program_status (без PAUSED)
+            today = date.today()
+            updated = ProgramRegistry.objects.filter(
+                username=username, program_id__in=ok_ids
+            ).update(
+                program_pause_status='NOT_PAUSED',
+                updated_at=timezone.now(),
+                status=models.Case(
+                    models.When(start_date__gt=today, then=models.Value('FUTURE')),
+                    models.When(end_date__lt=today, then=models.Value('PAST')),
+                    models.When(
+                        program_status='ACTIVE', start_date__lte=today, end_date__gte=today,
+                        then=models.Value('CURRENT'),
+                    ),
+                    default=models.Value('INACTIVE'),
+                    output_field=models.CharField(),
+                ),
+            )
+
+        if updated:
+            BusinessRollupService.safe_refresh_for_programs(username, ok_ids)
+
+        return cls._build_report('resume', results, updated)
+
+    @classmethod
+    def bulk_edit(cls, program_ids: List[str], payload: Dict, username: str = None) -> Dict:
+        """
+        Застосовує однаковий edit payload (суми в доларах) до всіх програм.
+
+        Payload має бути вже провалідований BulkEditProgramsSerializer.
+        """
+        auth = YelpService._get_partner_auth(username)
+        logger.info(f"🔧 [BULK] Editing {len(program_ids)} programs with {payload}")
+
+        # edit_program логує payload через json.dumps - Decimal туди не пролазить
+        api_payload = {
+            key: float(value) if isinstance(value, Decimal) else value
+            for key, value in payload.items()
+            if value is not None
+        }
+        results = cls._fan_out(program_ids, lambda pid: YelpService.edit_program(pid, api_payload, auth=auth))
+
+        registry_fields = {}
+        if payload.get('budget') is not None:
+            registry_fields['budget'] = payload['budget']
+        if 'is_autobid' in payload:
+            registry_fields['is_autobid'] = payload['is_autobid']
+            if payload['is_autobid']:
+                registry_fields['max_bid'] = None
+        if payload.get('max_bid') is not None:
+            registry_fields['max_bid'] = payload['max_bid']
+            registry_fields.setdefault('is_autobid', False)
+
+        updated = 0
+        ok_ids = cls._succeeded_ids(results)
+        if username and ok_ids and registry_fields:
+            updated = ProgramRegistry.objects.filter(
+                username=username, program_id__in=ok_ids
+            ).update(updated_at=timezone.now(), **registry_fields)
+
+        if updated:
+            BusinessRollupService.safe_refresh_for_programs(username, ok_ids)
+
+        return cls._build_report('edit', results, updated)
+
+    @classmethod
+    def bulk_update_features_stream(cls, program_ids: List[str], features: Dict, username: str = None) -> Iterator[Dict]:
+        """
+        Застосовує однаковий features payload до всіх програм, віддаючи події для SSE:
+        start → result (по одній на програму, в порядку завершення) → complete.
+
+        Payload має бути вже провалідований BulkProgramFeaturesSerializer. Кожна програма
+        проходить через diff із features-кешем, тож програми, де конфігурація вже така сама,
+        не викликають Partner API.
+        """
+        auth = YelpService._get_partner_auth(username)
+        logger.info(f"🎯 [BULK] Applying features {list(features)} to {len(program_ids)} programs")
+        yield {'type': 'start', 'action': 'features', 'total': len(program_ids), 'features': list(features)}
+
+        succeeded = 0
+        for index, row in enumerate(cls._fan_out_iter(
+            program_ids,
+            lambda pid: YelpService.update_program_features(pid, {'features': features}, auth=auth, retry=True),
+        ), start=1):
+            succeeded += row['success']
+            yield {'type': 'result', 'completed': index, **row}
+
+        logger.info(f"🎯 [BULK] Features applied: {succeeded}/{len(program_ids)} succeeded")
+        yield {
+            'type': 'complete', 'action': 'features', 'total': len(program_ids),
+            'succeeded': succeeded, 'failed': len(program_ids) - succeeded,
+        }
+
+    @classmethod
+    async def bulk_update_features_stream_async(cls, program_ids: List[str], features: Dict, username: str = None) -> AsyncIterator[Dict]:
+        """
+        Async bulk_update_features_stream для ASGI (ASYNC_VIEWS=True): ті ж події, але виклики
+        Partner API йдуть через AsyncPartnerClient в event loop, тож кожен result віддається
+        клієнту одразу, а не після завершення всього bulk-запуску.
+        """
+        auth = await sync_to_async(YelpService._get_partner_auth)(username)
+        logger.info(f"🎯 [BULK] Applying features {list(features)} to {len(program_ids)} programs (async)")
+        yield {'type': 'start', 'action': 'features', 'total': len(program_ids), 'features': list(features)}
+
+        succeeded = 0
+        index = 0
+        async for row in cls._fan_out_aiter(
+            program_ids,
+            lambda pid: AsyncPartnerClient.update_program_features(pid, {'features': features}, auth=auth, retry=True),
+        ):
+            index += 1
+            succeeded += row['success']
+            yield {'type': 'result', 'completed': index, **row}
+
+        logger.info(f"🎯 [BULK] Features applied: {succeeded}/{len(program_ids)} succeeded")
+        yield {
+            'type': 'complete', 'action': 'features', 'total': len(program_ids),
+            'succeeded': succeeded, 'failed': len(program_ids) - succeeded,
+        }
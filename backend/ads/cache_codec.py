@@ -0,0 +1,147 @@
+"""
+Кодеки для бінарних payload-ів у Redis (chunks програм, grouped results).
+
+Формат значення: MAGIC (2 байти) + VERSION (1 байт) + codec id (1 байт) + тіло.
+Завдяки заголовку читач сам визначає кодек, тож зміна REDIS_CACHE_CODEC
+не ламає вже закешовані ключі; значення без заголовка — старий plain JSON.
+
+msgpack / zstandard / lz4 — опціональні залежності: якщо бібліотеки немає,
+кодек недоступний і використовується json+zlib.
+"""
+import json
+import logging
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - залежить від оточення
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'YC'
+VERSION = 1
+HEADER_SIZE = len(MAGIC) + 2
+
+DEFAULT_CODEC = 'msgpack-zstd'
+FALLBACK_CODEC = 'json-zlib'
+
+
+class CacheCodecError(ValueError):
+    """Значення в кеші неможливо декодувати (невідома версія/кодек або бібліотека недоступна)."""
+
+
+class CacheCodec:
+    """Пара serialize/compress з власним id у заголовку."""
+
+    def __init__(self, name: str, codec_id: int,
+                 dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any],
+                 compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]):
+        self.name = name
+        self.codec_id = codec_id
+        self._dumps = dumps
+        self._loads = loads
+        self._compress = compress
+        self._decompress = decompress
+
+    def encode(self, value: Any) -> bytes:
+        header = MAGIC + bytes((VERSION, self.codec_id))
+        return header + self._compress(self._dumps(value))
+
+    def decode_body(self, body: bytes) -> Any:
+        return self._loads(self._decompress(body))
+
+    def __repr__(self):
+        return f"<CacheCodec {self.name}>"
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def _identity(data: bytes) -> bytes:
+    return data
+
+
+def _build_codecs() -> Dict[str, CacheCodec]:
+    codecs = {
+        'json': CacheCodec('json', 0, _json_dumps, json.loads, _identity, _identity),
+        'json-zlib': CacheCodec('json-zlib', 1, _json_dumps, json.loads,
+                                lambda data: zlib.compress(data, 6), zlib.decompress),
+    }
+    if msgpack is not None:
+        def msgpack_dumps(value):
+            return msgpack.packb(value, use_bin_type=True)
+
+        def msgpack_loads(data):
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+        codecs['msgpack'] = CacheCodec('msgpack', 2, msgpack_dumps, msgpack_loads, _identity, _identity)
+        if zstandard is not None:
+            # Компресори zstandard не потокобезпечні — створюємо на кожен виклик (це дешево)
+            codecs['msgpack-zstd'] = CacheCodec(
+                'msgpack-zstd', 3, msgpack_dumps, msgpack_loads,
+                lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+                lambda data: zstandard.ZstdDecompressor().decompress(data),
+            )
+        if lz4_frame is not None:
+            codecs['msgpack-lz4'] = CacheCodec(
+                'msgpack-lz4', 4, msgpack_dumps, msgpack_loads, lz4_frame.compress, lz4_frame.decompress,
+            )
+    return codecs
+
+
+CODECS: Dict[str, CacheCodec] = _build_codecs()
+CODECS_BY_ID: Dict[int, CacheCodec] = {codec.codec_id: codec for codec in CODECS.values()}
+
+_warned_unavailable = set()
+
+
+def get_codec(name: Optional[str] = None) -> CacheCodec:
+    """
+    Кодек за назвою (за замовчуванням settings.REDIS_CACHE_CODEC).
+
+    Якщо потрібна бібліотека не встановлена — json-zlib (з одним попередженням у лог).
+    """
+    name = name or getattr(settings, 'REDIS_CACHE_CODEC', DEFAULT_CODEC)
+    codec = CODECS.get(name)
+    if codec is None:
+        if name not in _warned_unavailable:
+            _warned_unavailable.add(name)
+            logger.warning(f"⚠️ [CACHE] Codec '{name}' is not available, falling back to {FALLBACK_CODEC}")
+        codec = CODECS[FALLBACK_CODEC]
+    return codec
+
+
+def encode(value: Any, codec: Optional[str] = None) -> bytes:
+    return get_codec(codec).encode(value)
+
+
+def decode(data) -> Any:
+    """Декодує значення з кешу за його заголовком (або як legacy plain JSON)."""
+    if isinstance(data, str):
+        return json.loads(data)
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+    if len(data) < HEADER_SIZE:
+        raise CacheCodecError("Truncated cache value header")
+    version, codec_id = data[2], data[3]
+    if version != VERSION:
+        raise CacheCodecError(f"Unsupported cache value version {version}")
+    codec = CODECS_BY_ID.get(codec_id)
+    if codec is None:
+        raise CacheCodecError(f"Cache codec id {codec_id} is not available in this process")
+    return codec.decode_body(data[HEADER_SIZE:])
@@ -0,0 +1,61 @@
+"""
+Diff запитаної конфігурації features з відомим поточним станом програми.
+
+POST /program/{id}/features/v1 у Yelp оновлює лише передані типи features, тож
+незмінені типи можна не надсилати, а запит без жодної зміни — не надсилати зовсім.
+
+Базою є лише свіже значення features-кешу (HIT) того ж покоління, що й ключ: кожен запис
+інвалідує ключ до і після POST, тож значення, прочитане з Yelp до нашого останнього запису
+(або під час нього), базою не стане. Протухле значення чи рядки ProgramFeature могли
+розійтися зі станом у Yelp (зміни через їхній UI), і diff проти них міг би проковтнути
+потрібне оновлення — тоді надсилаємо payload повністю.
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Поля, які Yelp повертає, але не приймає назад (і які ми домішуємо самі)
+READ_ONLY_FIELDS = {
+    'NEGATIVE_KEYWORD_TARGETING': {'suggested_keywords'},
+}
+
+BASELINE_CACHE = 'cache'
+BASELINE_NONE = 'none'
+
+
+def _canonical(feature_type: str, configuration) -> str:
+    if isinstance(configuration, dict):
+        read_only = READ_ONLY_FIELDS.get(feature_type, ())
+        configuration = {k: v for k, v in configuration.items() if k not in read_only}
+    return json.dumps(configuration, sort_keys=True, default=str)
+
+
+@dataclass
+class FeatureDiff:
+    changed: Dict[str, dict] = field(default_factory=dict)
+    unchanged: List[str] = field(default_factory=list)
+    baseline: str = BASELINE_NONE
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.changed and bool(self.unchanged)
+
+    def summary(self) -> str:
+        """Компактний рядок для логу: 'changed=[AD_GOAL] unchanged=2 baseline=cache'."""
+        return f"changed=[{','.join(sorted(self.changed))}] unchanged={len(self.unchanged)} baseline={self.baseline}"
+
+
+def diff_features(current: Optional[Dict[str, dict]], requested: Dict[str, dict]) -> FeatureDiff:
+    """
+    current — features з відповіді Yelp ({'AD_GOAL': {...}, ...}) або None, якщо стан невідомий;
+    requested — вміст 'features' з запиту оператора.
+    """
+    if current is None:
+        return FeatureDiff(changed=dict(requested), baseline=BASELINE_NONE)
+    diff = FeatureDiff(baseline=BASELINE_CACHE)
+    for feature_type, configuration in requested.items():
+        if feature_type in current and _canonical(feature_type, current[feature_type]) == _canonical(feature_type, configuration):
+            diff.unchanged.append(feature_type)
+        else:
+            diff.changed[feature_type] = configuration
+    return diff
@@ -0,0 +1,90 @@
+"""
+Per-request статистика: SQL запити та час БД, вихідні HTTP виклики, кеш, CPU.
+
+RequestInstrumentationMiddleware створює RequestStats на кожен запит і кладе його в
+contextvar; metrics.observe_yelp_call / metrics.record_cache дописують у поточний
+RequestStats (asyncio-задачі успадковують контекст, потоки ThreadPoolExecutor — ні).
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+_current_stats: ContextVar[Optional['RequestStats']] = ContextVar('request_stats', default=None)
+
+CACHE_HIT_RESULTS = ('hit', 'stale')
+
+
+class QueryBudgetExceeded(Exception):
+    """Запит перевищив бюджет (REQUEST_BUDGET_RAISE=True — для тестів/CI)."""
+
+
+class RequestStats:
+    """Лічильники одного запиту."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.http_calls = 0
+        self.http_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cpu_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper: рахує запити та їх час."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    def as_log_fields(self) -> Dict:
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_seconds * 1000, 1),
+            'http_calls': self.http_calls,
+            'http_ms': round(self.http_seconds * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cpu_ms': round(self.cpu_seconds * 1000, 1),
+        }
+
+    def server_timing(self) -> str:
+        """Значення заголовка Server-Timing (видно у DevTools → Network → Timing)."""
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+            f'http;dur={self.http_seconds * 1000:.1f};desc="{self.http_calls} calls"',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+            f'cpu;dur={self.cpu_seconds * 1000:.1f}',
+            f'total;dur={self.total_seconds * 1000:.1f}',
+        ])
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+
+def activate(stats: RequestStats):
+    return _current_stats.set(stats)
+
+
+def deactivate(token):
+    _current_stats.reset(token)
+
+
+def record_http(seconds: float):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.http_calls += 1
+        stats.http_seconds += seconds
+
+
+def record_cache_result(result: str):
+    stats = _current_stats.get()
+    if stats is not None:
+        if result in CACHE_HIT_RESULTS:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
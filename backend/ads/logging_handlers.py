@@ -1,4 +1,7 @@
+import json
 import logging
+import re
+
 from django.utils import timezone
 
 
@@ -41,3 +44,56 @@ class DatabaseLogHandler(logging.Handler):
             print(f"Error saving log to database: {e}", file=sys.stderr)
             self.handleError(record)
 
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Структурований лог: один JSON-об'єкт на рядок зі стандартними полями та всім,
+    що передано в extra= (path, status_code, queries, request_id ...). LOG_FORMAT=json.
+    """
+
+    RESERVED = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, record):
+        payload = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        payload.update({key: value for key, value in record.__dict__.items() if key not in self.RESERVED})
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+# ------------------------------------------------------------------ redaction
+
+SENSITIVE_HEADERS = frozenset({'authorization', 'proxy-authorization', 'cookie', 'set-cookie', 'x-api-key', 'x-csrftoken'})
+SENSITIVE_KEY_PATTERN = re.compile(r'(password|secret|token|api_key|apikey|authorization)', re.IGNORECASE)
+REDACTED = '***'
+
+
+def redact_headers(headers) -> dict:
+    """Копія заголовків з прихованими значеннями Authorization/Cookie/ключів API."""
+    return {key: (REDACTED if key.lower() in SENSITIVE_HEADERS else value) for key, value in headers.items()}
+
+
+def _redact_value(value):
+    if isinstance(value, dict):
+        return {
+            key: (REDACTED if SENSITIVE_KEY_PATTERN.search(str(key)) else _redact_value(item))
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact_value(item) for item in value]
+    return value
+
+
+def redact_body(body: str, limit: int = 1000) -> str:
+    """JSON-тіло з прихованими секретними ключами, обрізане до limit символів."""
+    try:
+        body = json.dumps(_redact_value(json.loads(body)), ensure_ascii=False)
+    except (ValueError, TypeError):
+        pass
+    return body if len(body) <= limit else f"{body[:limit]}... ({len(body)} chars)"
@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from ads import cache_codec
+from ads.partner_simulator import build_programs
+from ads.redis_service import ProgramGroupingService
+
+
+def build_cached_programs(count: int, businesses: int, seed: int = 42):
+    """Програми симулятора у формі, в якій їх кешує ProgramGroupingService (з плоским yelp_business_id)."""
+    return [
+        {**program, **program['businesses'][0]}
+        for program in build_programs(count, businesses, seed=seed)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark Redis cache codecs (size and encode/decode time) on realistic program payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--programs', type=int, default=5000, help='Number of programs (default: 5000)')
+        parser.add_argument('--businesses', type=int, default=800, help='Number of distinct businesses (default: 800)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions per codec (default: 5)')
+        parser.add_argument(
+            '--codecs', nargs='+', default=None,
+            help=f"Codecs to compare (default: all available: {', '.join(cache_codec.CODECS)})",
+        )
+
+    def handle(self, *args, **options):
+        programs = build_cached_programs(options['programs'], options['businesses'])
+        grouped = ProgramGroupingService(redis_service=None).group_programs_by_business(programs)
+        payloads = {
+            'chunk (1000 programs)': programs[:1000],
+            'grouped result': {
+                'total_programs': len(programs),
+                'total_businesses': len(grouped),
+                'grouped_by_business': grouped,
+                'from_cache': False,
+                'cached_until': None,
+            },
+        }
+
+        names = options['codecs'] or list(cache_codec.CODECS)
+        missing = [name for name in names if name not in cache_codec.CODECS]
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Not available (missing libraries): {', '.join(missing)}"))
+        names = [name for name in names if name in cache_codec.CODECS]
+
+        for label, payload in payloads.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+            self.stdout.write(f"{'codec':<14}{'bytes':>12}{'vs json':>9}{'encode ms':>11}{'decode ms':>11}")
+            baseline = len(cache_codec.encode(payload, 'json'))
+            for name in names:
+                encode_times, decode_times = [], []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    data = cache_codec.encode(payload, name)
+                    encode_times.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    cache_codec.decode(data)
+                    decode_times.append(time.perf_counter() - started)
+                self.stdout.write(
+                    f"{name:<14}{len(data):>12,}{baseline / len(data):>8.1f}x"
+                    f"{statistics.median(encode_times) * 1000:>11.1f}{statistics.median(decode_times) * 1000:>11.1f}"
+                )
@@ -0,0 +1,216 @@
+import base64
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from ads.benchmark_utils import QueryCounter, TrackedCache, default_output_path, load_baseline, percentile, write_results
+from ads.models import Business, BusinessRollup, ProgramRegistry
+from ads.partner_simulator import build_programs
+from ads.rollup_service import BusinessRollupService
+from ads.sync_service import ProgramSyncService
+
+BENCH_USER_PREFIX = 'benchmark-read'
+BENCH_PASSWORD = 'benchmark'
+
+# (endpoint, label, query params); {business_id} підставляється найбільшим бізнесом користувача
+SCENARIOS = [
+    ('/api/reseller/programs', 'default page', {'program_status': 'CURRENT', 'offset': 0, 'limit': 20}),
+    ('/api/reseller/programs', 'ALL, deep page', {'program_status': 'ALL', 'offset': 1000, 'limit': 100}),
+    ('/api/reseller/programs', 'type=CPC', {'program_status': 'ALL', 'program_type': 'CPC', 'limit': 20}),
+    ('/api/reseller/programs', 'business', {'program_status': 'ALL', 'business_id': '{business_id}', 'limit': 20}),
+    ('/api/reseller/available-filters', 'no filters', {}),
+    ('/api/reseller/available-filters', 'CURRENT', {'program_status': 'CURRENT'}),
+    ('/api/reseller/available-filters', 'FUTURE (live)', {'program_status': 'FUTURE'}),
+    ('/api/reseller/available-filters', 'CURRENT+CPC', {'program_status': 'CURRENT', 'program_type': 'CPC'}),
+    ('/api/reseller/available-filters', 'business', {'business_id': '{business_id}'}),
+    ('/api/reseller/business-ids', 'no filters', {}),
+    ('/api/reseller/business-ids', 'CURRENT', {'program_status': 'CURRENT'}),
+    ('/api/reseller/business-ids', 'PAUSED+CPC', {'program_status': 'PAUSED', 'program_type': 'CPC'}),
+]
+
+
+def parse_status_mix(value):
+    """'ACTIVE=6,INACTIVE=3,TERMINATED=1' → {'ACTIVE': 6.0, ...}"""
+    try:
+        mix = {name.strip().upper(): float(weight) for name, weight in (part.split('=') for part in value.split(','))}
+    except ValueError:
+        raise CommandError(f"Invalid --status-mix '{value}', expected e.g. ACTIVE=6,INACTIVE=3,TERMINATED=1")
+    return mix
+
+
+def username_for(index):
+    return f"{BENCH_USER_PREFIX}-{index}"
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic ProgramRegistry/Business data and benchmark ProgramListView, '
+        'AvailableFiltersView and BusinessIdsView (p50/p95/p99, queries, bytes; cold and warm cache)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3, help='Seeded users; the first one is measured (default: 3)')
+        parser.add_argument('--programs', type=int, default=10000, help='Programs per user (default: 10000)')
+        parser.add_argument('--businesses', type=int, default=2000, help='Businesses per user (default: 2000)')
+        parser.add_argument('--status-mix', default='ACTIVE=6,INACTIVE=3,TERMINATED=1', help='program_status weights')
+        parser.add_argument('--paused-share', type=float, default=0.1, help='Share of paused programs (default: 0.1)')
+        parser.add_argument('--named-share', type=float, default=0.9, help='Share of businesses with a resolved name (default: 0.9)')
+        parser.add_argument('--iterations', type=int, default=30, help='Measured requests per scenario and mode (default: 30)')
+        parser.add_argument('--modes', nargs='+', choices=['cold', 'warm'], default=['cold', 'warm'])
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse data seeded by a previous run')
+        parser.add_argument('--cleanup', action='store_true', help='Delete seeded data afterwards')
+        parser.add_argument('--output', default=None, help='JSON results path (default: benchmark_results/read_paths_<timestamp>.json)')
+        parser.add_argument('--baseline', default=None, help='Previous results JSON to compare p95 against')
+
+    def handle(self, *args, **options):
+        status_mix = parse_status_mix(options['status_mix'])
+        if not options['skip_seed']:
+            self._seed(options, status_mix)
+
+        username = username_for(0)
+        if not ProgramRegistry.objects.filter(username=username).exists():
+            raise CommandError(f"No seeded data for {username}; run without --skip-seed first")
+
+        baseline = load_baseline(options['baseline'], ['endpoint', 'scenario', 'mode']) if options['baseline'] else {}
+        top_business = (
+            BusinessRollup.objects.filter(username=username).exclude(yelp_business_id='')
+            .order_by('-total_count').values_list('yelp_business_id', flat=True).first()
+        )
+        auth = 'Basic ' + base64.b64encode(f"{username}:{BENCH_PASSWORD}".encode()).decode()
+        client = Client(HTTP_AUTHORIZATION=auth)
+
+        self.stdout.write(
+            f"\n{'endpoint':<32}{'scenario':<17}{'mode':<6}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}"
+            f"{'queries':>9}{'bytes':>10}"
+        )
+        results = []
+        try:
+            # Чистимо лише ключі, яких торкались запити бенчмарку (не FLUSHDB спільного Redis);
+            # фоновий prewarm features зі списку програм ходив би в Yelp під час вимірів
+            with TrackedCache() as tracked_cache, override_settings(FEATURES_PREWARM_LIMIT=0):
+                for endpoint, label, params in SCENARIOS:
+                    params = {k: (top_business if v == '{business_id}' else v) for k, v in params.items()}
+                    for mode in options['modes']:
+                        row = self._measure(client, tracked_cache, endpoint, params, mode, options['iterations'])
+                        row.update({'endpoint': endpoint, 'scenario': label, 'mode': mode, 'params': params})
+                        results.append(row)
+                        self._print_row(row, baseline)
+        finally:
+            if options['cleanup']:
+                self._cleanup(options['users'])
+
+        path = write_results(options['output'] or default_output_path('read_paths'), {
+            key: options[key] for key in
+            ('users', 'programs', 'businesses', 'status_mix', 'paused_share', 'named_share', 'iterations', 'modes')
+        }, results)
+        self.stdout.write(self.style.SUCCESS(f"\n💾 Results saved to {path}"))
+
+    def _seed(self, options, status_mix):
+        started = time.perf_counter()
+        self._cleanup(options['users'])
+        for index in range(options['users']):
+            username = username_for(index)
+            programs = build_programs(
+                options['programs'], options['businesses'], seed=1000 + index,
+                status_weights=status_mix, paused_share=options['paused_share'],
+            )
+            business_ids = sorted({p['businesses'][0]['yelp_business_id'] for p in programs})
+            named = int(len(business_ids) * options['named_share'])
+            Business.objects.bulk_create(
+                [Business(yelp_business_id=business_id, name=f"Benchmark Business {i}" if i < named else None)
+                 for i, business_id in enumerate(business_ids)],
+                ignore_conflicts=True, batch_size=1000,
+            )
+            business_pks = dict(
+                Business.objects.filter(yelp_business_id__in=business_ids).values_list('yelp_business_id', 'id')
+            )
+            ProgramRegistry.objects.bulk_create(
+                [self._registry_row(username, program, business_pks) for program in programs],
+                batch_size=1000,
+            )
+            BusinessRollupService.refresh(username)
+            self.stdout.write(f"🌱 Seeded {username}: {len(programs)} programs, {len(business_ids)} businesses")
+        self.stdout.write(f"🌱 Seeding took {time.perf_counter() - started:.1f}s")
+
+    @staticmethod
+    def _registry_row(username, program, business_pks):
+        business_id = program['businesses'][0]['yelp_business_id']
+        metrics = program.get('program_metrics') or {}
+        start_date = date.fromisoformat(program['start_date'])
+        end_date = date.fromisoformat(program['end_date']) if program['end_date'] else None
+        return ProgramRegistry(
+            username=username,
+            program_id=program['program_id'],
+            yelp_business_id=business_id,
+            business_id=business_pks.get(business_id),
+            status=ProgramSyncService._determine_program_status(
+                program['program_status'], program['program_pause_status'], program['start_date'], program['end_date'],
+            ),
+            program_name=program['program_type'],
+            start_date=start_date,
+            end_date=end_date,
+            program_status=program['program_status'],
+            program_pause_status=program['program_pause_status'],
+            budget=Decimal(metrics['budget']) / 100 if metrics else None,
+            currency=metrics.get('currency', 'USD'),
+            is_autobid=metrics.get('is_autobid'),
+            max_bid=Decimal(metrics['max_bid']) / 100 if metrics.get('max_bid') else None,
+            billed_impressions=metrics.get('billed_impressions', 0),
+            billed_clicks=metrics.get('billed_clicks', 0),
+            ad_cost=Decimal(metrics.get('ad_cost', 0)) / 100,
+            fee_period=metrics.get('fee_period'),
+            active_features=program['active_features'],
+            available_features=program['available_features'],
+            businesses=program['businesses'],
+        )
+
+    @staticmethod
+    def _cleanup(users):
+        usernames = [username_for(index) for index in range(users)]
+        seeded = ProgramRegistry.objects.filter(username__in=usernames)
+        business_ids = set(seeded.values_list('yelp_business_id', flat=True))
+        seeded.delete()
+        BusinessRollup.objects.filter(username__in=usernames).delete()
+        # Лише синтетичні бізнеси, на які більше не посилаються реальні програми
+        Business.objects.filter(yelp_business_id__in=business_ids, programs__isnull=True).delete()
+
+    @staticmethod
+    def _measure(client, tracked_cache, endpoint, params, mode, iterations):
+        # Прогрів кешу та з'єднань; заодно TrackedCache дізнається ключі сценарію
+        client.get(endpoint, params)
+        timings, queries, sizes, statuses = [], [], [], set()
+        for _ in range(iterations):
+            if mode == 'cold':
+                tracked_cache.clear()
+            with QueryCounter() as counter:
+                started = time.perf_counter()
+                response = client.get(endpoint, params)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.queries)
+            sizes.append(len(response.content))
+            statuses.add(response.status_code)
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'queries': round(sum(queries) / len(queries), 1),
+            'response_bytes': max(sizes),
+            'status_codes': sorted(statuses),
+        }
+
+    def _print_row(self, row, baseline):
+        line = (
+            f"{row['endpoint']:<32}{row['scenario']:<17}{row['mode']:<6}{row['p50_ms']:>8.1f}{row['p95_ms']:>8.1f}"
+            f"{row['p99_ms']:>8.1f}{row['queries']:>9}{row['response_bytes']:>10,}"
+        )
+        previous = baseline.get((row['endpoint'], row['scenario'], row['mode']))
+        if previous and previous.get('p95_ms'):
+            ratio = row['p95_ms'] / previous['p95_ms']
+            line += f"  ({ratio:.2f}x p95 vs baseline)"
+            style = self.style.ERROR if ratio > 1.2 else self.style.SUCCESS if ratio < 0.8 else None
+            line = style(line) if style else line
+        self.stdout.write(line if row['status_codes'] == [200] else self.style.WARNING(f"{line}  HTTP {row['status_codes']}"))
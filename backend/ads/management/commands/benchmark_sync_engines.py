@@ -0,0 +1,174 @@
+import asyncio
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ads.async_sync_service import AsyncProgramSyncService
+from ads.benchmark_utils import PeakRSS, QueryCounter, default_output_path, load_baseline, write_results
+from ads.models import BusinessRollup, PartnerCredential, ProgramRegistry
+from ads.partner_simulator import LATENCY_PROFILES, SimulatorConfig, SimulatorServer
+from ads.services import YelpService
+from ads.sync_service import ProgramSyncService
+
+BENCH_USERNAME = 'benchmark-sync'
+BENCH_PASSWORD = 'benchmark'
+
+
+def _drain(events):
+    """Проганяє SSE-генератор до кінця; повертає (статус, останню подію)."""
+    last = {}
+    for event in events:
+        last = event
+    return ('ok' if last.get('type') == 'complete' else last.get('type', 'empty')), last
+
+
+def run_sequential(batch_size):
+    result = ProgramSyncService.sync_programs(BENCH_USERNAME, batch_size=batch_size)
+    return ('ok' if result.get('status') != 'error' else 'error'), result
+
+
+def run_streaming(batch_size):
+    return _drain(ProgramSyncService.sync_with_streaming(BENCH_USERNAME, batch_size=batch_size))
+
+
+def run_thread_pool(batch_size):
+    return _drain(ProgramSyncService.sync_with_streaming_parallel(BENCH_USERNAME, batch_size=batch_size))
+
+
+def run_asyncio(batch_size):
+    return _drain(AsyncProgramSyncService.sync_with_asyncio(BENCH_USERNAME, batch_size=batch_size))
+
+
+def run_http2(batch_size):
+    # Лише завантаження (без запису в БД) — у sync_with_asyncio HTTP/2 вимкнено
+    loop = asyncio.new_event_loop()
+    try:
+        programs, total = loop.run_until_complete(
+            AsyncProgramSyncService.fetch_all_programs_http2(BENCH_USERNAME, BENCH_PASSWORD, batch_size)
+        )
+    finally:
+        loop.close()
+    return ('ok' if programs and len(programs) >= total else 'error'), {'fetched': len(programs), 'total': total}
+
+
+# asyncio-движок оновлює існуючі рядки через asyncpg: QueryCounter рахує ці запити,
+# але asyncpg не віддає кількість рядків — rows_written для такого прогону null, а не заниження
+ENGINES = {
+    'sequential': run_sequential,
+    'streaming': run_streaming,
+    'thread_pool': run_thread_pool,
+    'asyncio': run_asyncio,
+    'http2': run_http2,
+}
+FETCH_ONLY_ENGINES = {'http2'}
+
+
+@contextmanager
+def pointed_at(url):
+    """Тимчасово перенаправляє Partner/Fusion клієнтів на симулятор."""
+    saved = (YelpService.PARTNER_BASE, YelpService.FUSION_BASE, AsyncProgramSyncService.PARTNER_BASE)
+    YelpService.PARTNER_BASE = YelpService.FUSION_BASE = AsyncProgramSyncService.PARTNER_BASE = url
+    try:
+        yield
+    finally:
+        YelpService.PARTNER_BASE, YelpService.FUSION_BASE, AsyncProgramSyncService.PARTNER_BASE = saved
+
+
+def reset_user_data():
+    ProgramRegistry.objects.filter(username=BENCH_USERNAME).delete()
+    BusinessRollup.objects.filter(username=BENCH_USERNAME).delete()
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark program sync engines against the local partner API simulator '
+        '(wall time, peak RSS, DB queries and rows written) and save results as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000], help='Program counts (default: 1000 10000 50000)')
+        parser.add_argument('--latency', nargs='+', choices=list(LATENCY_PROFILES), default=['lan'], help='Simulator latency profiles (default: lan)')
+        parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+        parser.add_argument('--batch-size', type=int, default=40)
+        parser.add_argument('--businesses-ratio', type=float, default=0.2, help='Distinct businesses per program (default: 0.2)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Simulated 5xx share (default: 0)')
+        parser.add_argument('--rate-limit', type=float, default=None, help='Simulated per-client rate limit, req/s (default: off)')
+        parser.add_argument('--no-resync', action='store_true', help='Skip the second (no-change) sync pass')
+        parser.add_argument('--output', default=None, help='JSON results path (default: benchmark_results/sync_engines_<timestamp>.json)')
+        parser.add_argument('--baseline', default=None, help='Previous results JSON to compare wall time against')
+
+    def handle(self, *args, **options):
+        baseline = load_baseline(options['baseline'], ['engine', 'programs', 'latency', 'phase']) if options['baseline'] else {}
+        phases = ['initial'] if options['no_resync'] else ['initial', 'resync']
+
+        PartnerCredential.objects.update_or_create(username=BENCH_USERNAME, defaults={'password': BENCH_PASSWORD})
+        results = []
+        self.stdout.write(
+            f"{'engine':<12}{'programs':>9}{'latency':>9}{'phase':>9}{'wall s':>9}{'peak MB':>9}"
+            f"{'+MB':>7}{'queries':>9}{'rows':>9}{'in db':>8}{'http':>8}  status"
+        )
+        try:
+            for latency in options['latency']:
+                for size in options['sizes']:
+                    config = SimulatorConfig(
+                        programs=size,
+                        businesses=max(1, int(size * options['businesses_ratio'])),
+                        latency=latency,
+                        error_rate=options['error_rate'],
+                        rate_limit=options['rate_limit'],
+                    )
+                    with SimulatorServer(config) as server, pointed_at(server.url):
+                        for engine in options['engines']:
+                            reset_user_data()
+                            for phase in phases:
+                                if engine in FETCH_ONLY_ENGINES and phase != 'initial':
+                                    continue
+                                row = self._run(engine, options['batch_size'], server)
+                                row.update({'engine': engine, 'programs': size, 'latency': latency, 'phase': phase})
+                                results.append(row)
+                                self._print_row(row, baseline)
+        finally:
+            reset_user_data()
+
+        path = write_results(options['output'] or default_output_path('sync_engines'), {
+            key: options[key] for key in
+            ('sizes', 'latency', 'engines', 'batch_size', 'businesses_ratio', 'error_rate', 'rate_limit')
+        }, results)
+        self.stdout.write(self.style.SUCCESS(f"\n💾 Results saved to {path}"))
+
+    def _run(self, engine, batch_size, server):
+        requests_before = server.stats['requests']
+        started = time.perf_counter()
+        try:
+            with PeakRSS() as rss, QueryCounter() as queries:
+                status, detail = ENGINES[engine](batch_size)
+        except Exception as e:
+            raise CommandError(f"{engine} crashed: {e}") from e
+        wall = time.perf_counter() - started
+        return {
+            'status': status,
+            'wall_seconds': round(wall, 3),
+            'peak_rss_mb': rss.peak_mb,
+            'rss_delta_mb': rss.delta_mb,
+            'queries': queries.queries,
+            'queries_by_statement': queries.by_statement,
+            'rows_written': queries.rows_written,
+            'programs_in_db': ProgramRegistry.objects.filter(username=BENCH_USERNAME).count(),
+            'http_requests': server.stats['requests'] - requests_before,
+            'detail': {k: v for k, v in detail.items() if isinstance(v, (int, float, str))},
+        }
+
+    def _print_row(self, row, baseline):
+        line = (
+            f"{row['engine']:<12}{row['programs']:>9}{row['latency']:>9}{row['phase']:>9}{row['wall_seconds']:>9.2f}"
+            f"{row['peak_rss_mb']:>9.1f}{row['rss_delta_mb']:>7.1f}{row['queries']:>9}{'-' if row['rows_written'] is None else row['rows_written']:>9}"
+            f"{row['programs_in_db']:>8}{row['http_requests']:>8}  {row['status']}"
+        )
+        previous = baseline.get((row['engine'], row['programs'], row['latency'], row['phase']))
+        if previous and previous.get('wall_seconds'):
+            ratio = row['wall_seconds'] / previous['wall_seconds']
+            line += f"  ({ratio:.2f}x vs baseline)"
+            style = self.style.ERROR if ratio > 1.2 else self.style.SUCCESS if ratio < 0.8 else None
+            line = style(line) if style else line
+        self.stdout.write(line if row['status'] == 'ok' else self.style.WARNING(line))
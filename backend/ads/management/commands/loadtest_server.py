@@ -0,0 +1,171 @@
+import base64
+import importlib.util
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ads.benchmark_utils import default_output_path, percentile, write_results
+from ads.management.commands.benchmark_read_paths import BENCH_PASSWORD, Command as ReadPathsCommand, username_for
+from ads.models import ProgramRegistry
+
+# Ендпоінти списків, які фронтенд смикає на кожне відкриття сторінки
+SCENARIOS = [
+    ('/api/reseller/programs', {'program_status': 'CURRENT', 'offset': 0, 'limit': 20}),
+    ('/api/reseller/business-ids', {'program_status': 'CURRENT'}),
+    ('/api/reseller/available-filters', {'program_status': 'CURRENT'}),
+]
+
+# Сервер → (модуль, що має бути встановлений, команда, додаткове оточення)
+SERVERS = {
+    'runserver': (None, lambda port: [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'], {}),
+    'gunicorn': ('gunicorn', lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], {'ASYNC_VIEWS': '0'}),
+    'uvicorn': ('uvicorn', lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], {'ASYNC_VIEWS': '1'}),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test list endpoints against real app servers (runserver vs gunicorn gthread vs gunicorn+uvicorn): '
+        'closed-loop clients for --duration seconds, throughput and p50/p95/p99 per server'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=['runserver', 'gunicorn'])
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent keep-alive clients (default: 16)')
+        parser.add_argument('--duration', type=float, default=20, help='Measured seconds per server (default: 20)')
+        parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds before each run (default: 3)')
+        parser.add_argument('--workers', type=int, default=None, help='WEB_CONCURRENCY for gunicorn (default: from gunicorn.conf.py)')
+        parser.add_argument('--programs', type=int, default=5000, help='Seeded programs (default: 5000)')
+        parser.add_argument('--businesses', type=int, default=1000, help='Seeded businesses (default: 1000)')
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse data seeded by a previous run')
+        parser.add_argument('--output', default=None, help='JSON results path (default: benchmark_results/loadtest_<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        username = username_for(0)
+        if not options['skip_seed']:
+            ReadPathsCommand(stdout=self.stdout, stderr=self.stderr)._seed({
+                'users': 1, 'programs': options['programs'], 'businesses': options['businesses'],
+                'paused_share': 0.1, 'named_share': 0.9,
+            }, {'ACTIVE': 6, 'INACTIVE': 3, 'TERMINATED': 1})
+        if not ProgramRegistry.objects.filter(username=username).exists():
+            raise CommandError(f"No seeded data for {username}; run without --skip-seed first")
+        auth = 'Basic ' + base64.b64encode(f"{username}:{BENCH_PASSWORD}".encode()).decode()
+
+        self.stdout.write(
+            f"\n{'server':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'vs runserver':>14}"
+        )
+        results = []
+        for name in options['servers']:
+            module = SERVERS[name][0]
+            if module and importlib.util.find_spec(module) is None:
+                self.stdout.write(self.style.WARNING(f"⚠️  {name}: '{module}' is not installed, skipped"))
+                continue
+            row = self._run_server(name, auth, options)
+            results.append(row)
+            baseline = next((r for r in results if r['server'] == 'runserver'), None)
+            speedup = f"{row['rps'] / baseline['rps']:.1f}x" if baseline and baseline['rps'] and name != 'runserver' else '-'
+            self.stdout.write(
+                f"{name:<12}{row['rps']:>9.0f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                f"{row['errors']:>8}{speedup:>14}"
+            )
+
+        path = write_results(options['output'] or default_output_path('loadtest'), {
+            key: options[key] for key in ('servers', 'concurrency', 'duration', 'warmup', 'workers', 'programs')
+        } | {'cpus': os.cpu_count()}, results)
+        self.stdout.write(self.style.SUCCESS(f"\n💾 Results saved to {path}"))
+
+    def _run_server(self, name, auth, options):
+        _, command, extra_env = SERVERS[name]
+        port = free_port()
+        env = {**os.environ, **extra_env, 'GUNICORN_BIND': f'127.0.0.1:{port}', 'PYTHONUNBUFFERED': '1'}
+        if options['workers']:
+            env['WEB_CONCURRENCY'] = str(options['workers'])
+        env.setdefault('DJANGO_SETTINGS_MODULE', os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings'))
+
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(command(port), cwd=settings.BASE_DIR, env=env, stdout=log, stderr=log)
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                self._wait_ready(process, base_url, auth, log)
+                self._load(base_url, auth, options['concurrency'], options['warmup'])
+                row = self._load(base_url, auth, options['concurrency'], options['duration'])
+            finally:
+                process.send_signal(signal.SIGTERM)
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+        row['server'] = name
+        return row
+
+    @staticmethod
+    def _wait_ready(process, base_url, auth, log, timeout=60):
+        endpoint, params = SCENARIOS[0]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"Server exited with {process.returncode}:\n{log.read().decode(errors='replace')[-2000:]}")
+            try:
+                if requests.get(base_url + endpoint, params=params, headers={'Authorization': auth}, timeout=5).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f"Server at {base_url} not ready after {timeout}s")
+
+    @staticmethod
+    def _load(base_url, auth, concurrency, duration):
+        """Closed loop: кожен клієнт шле наступний запит, щойно отримав відповідь."""
+        deadline = time.monotonic() + duration
+        timings, errors = [], [0]
+        lock = threading.Lock()
+
+        def client(index):
+            session = requests.Session()
+            session.headers['Authorization'] = auth
+            local, failed, n = [], 0, index
+            while time.monotonic() < deadline:
+                endpoint, params = SCENARIOS[n % len(SCENARIOS)]
+                n += 1
+                started = time.perf_counter()
+                try:
+                    ok = session.get(base_url + endpoint, params=params, timeout=30).ok
+                except requests.RequestException:
+                    ok = False
+                local.append((time.perf_counter() - started) * 1000)
+                failed += not ok
+            session.close()
+            with lock:
+                timings.extend(local)
+                errors[0] += failed
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(client, range(concurrency)))
+        elapsed = time.monotonic() - started
+        return {
+            'requests': len(timings),
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'errors': errors[0],
+        }
@@ -0,0 +1,40 @@
+from aiohttp import web
+from django.core.management.base import BaseCommand
+
+from ads.partner_simulator import LATENCY_PROFILES, PartnerSimulator, SimulatorConfig
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local Yelp Partner/Fusion API simulator. '
+        'Point the app at it with YELP_SIMULATOR_URL=http://<host>:<port>'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--programs', type=int, default=1000, help='Number of programs (default: 1000)')
+        parser.add_argument('--businesses', type=int, default=200, help='Number of distinct businesses (default: 200)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--latency', choices=list(LATENCY_PROFILES), default='yelp', help='Partner API latency profile')
+        parser.add_argument('--fusion-latency', choices=list(LATENCY_PROFILES), default=None, help='Fusion API latency profile')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 5xx (0..1)')
+        parser.add_argument('--rate-limit', type=float, default=None, help='Requests/s per client before 429 (default: off)')
+        parser.add_argument('--burst', type=int, default=50, help='Token bucket burst for --rate-limit')
+
+    def handle(self, *args, **options):
+        simulator = PartnerSimulator(SimulatorConfig(
+            programs=options['programs'],
+            businesses=options['businesses'],
+            seed=options['seed'],
+            latency=options['latency'],
+            fusion_latency=options['fusion_latency'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            burst=options['burst'],
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"🧪 Partner simulator: {len(simulator.programs)} programs on http://{options['host']}:{options['port']} "
+            f"(latency={options['latency']}, error_rate={options['error_rate']}, rate_limit={options['rate_limit']})"
+        ))
+        web.run_app(simulator.build_app(), host=options['host'], port=options['port'], print=None)
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from ads.scheduler import ScheduledOperationScheduler
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run the unified scheduler for scheduled pauses and budget updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kinds',
+            nargs='+',
+            choices=sorted(ScheduledOperationScheduler.OPERATIONS.keys()),
+            default=None,
+            help='Operation kinds to execute (default: all)',
+        )
+        parser.add_argument(
+            '--max-workers',
+            type=int,
+            default=20,
+            help='Max operations executed concurrently (default: 20)',
+        )
+        parser.add_argument(
+            '--resync-interval',
+            type=int,
+            default=60,
+            help='Full DB resync interval in seconds; new schedules wake the worker earlier via Redis (default: 60)',
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=300,
+            help='How long a claimed operation stays leased to this worker before others may reclaim it (default: 300)',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Attempts before a transiently failing operation goes to DEAD_LETTER (default: 5)',
+        )
+        parser.add_argument(
+            '--retry-base-delay',
+            type=int,
+            default=30,
+            help='First retry delay in seconds, doubled on every next attempt (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ScheduledOperationScheduler(
+            kinds=options['kinds'],
+            max_workers=options['max_workers'],
+            resync_interval=options['resync_interval'],
+            lease_seconds=options['lease_seconds'],
+            max_attempts=options['max_attempts'],
+            retry_base_delay=options['retry_base_delay'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Scheduler started for {", ".join(scheduler.kinds)} '
+                f'(worker {scheduler.worker_id}, max workers: {scheduler.max_workers}, '
+                f'resync every {scheduler.resync_interval}s)'
+            )
+        )
+
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
+            self.stdout.write(self.style.SUCCESS('\nStopping scheduler...'))
@@ -0,0 +1,121 @@
+import os
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+OK, WARNING, ERROR = 'ok', 'warning', 'error'
+
+
+def check_system():
+    errors = [m for m in checks.run_checks(include_deployment_checks=False) if m.is_serious()]
+    if errors:
+        return ERROR, '; '.join(f"{m.id}: {m.msg}" for m in errors)
+    return OK, 'no errors'
+
+
+def check_database():
+    started = time.perf_counter()
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Exception as e:
+        return ERROR, f"{connection.vendor}: {e}"
+    return OK, f"{connection.vendor}, {(time.perf_counter() - started) * 1000:.0f} ms"
+
+
+def check_migrations():
+    connection = connections[DEFAULT_DB_ALIAS]
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        pending = ', '.join(f"{m.app_label}.{m.name}" for m, _ in plan[:5])
+        return ERROR, f"{len(plan)} unapplied ({pending}{', ...' if len(plan) > 5 else ''}) — run migrate"
+    return OK, 'up to date'
+
+
+def check_cache():
+    key = f"selfcheck:{os.getpid()}"
+    try:
+        cache.set(key, 'ok', 10)
+        value = cache.get(key)
+        cache.delete(key)
+    except Exception as e:
+        return WARNING, f"unavailable ({e}); views fall back to the database"
+    if value != 'ok':
+        return WARNING, 'round-trip returned nothing; views fall back to the database'
+    return OK, settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+
+
+def check_partner_credentials():
+    from ads.models import PartnerCredential
+
+    if getattr(settings, 'YELP_API_KEY', '') and getattr(settings, 'YELP_API_SECRET', ''):
+        return OK, 'YELP_API_KEY/YELP_API_SECRET set'
+    if PartnerCredential.objects.exists():
+        return OK, 'stored partner credentials'
+    return WARNING, 'no YELP_API_KEY/YELP_API_SECRET and no stored credentials; Partner API calls will fail until login'
+
+
+def check_metrics_dir():
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    if not directory:
+        if workers > 1:
+            return WARNING, f"PROMETHEUS_MULTIPROC_DIR unset with {workers} workers; /metrics shows one worker per scrape"
+        return OK, 'single process registry'
+    if not os.path.isdir(directory) or not os.access(directory, os.W_OK):
+        return ERROR, f"PROMETHEUS_MULTIPROC_DIR={directory} is not a writable directory"
+    return OK, directory
+
+
+def check_server_mode():
+    if settings.DEBUG:
+        return WARNING, 'DEBUG=True (slow, leaks tracebacks) — set DEBUG=False in production'
+    if settings.ASYNC_VIEWS:
+        return OK, 'ASGI (async views) — serve backend.asgi:application'
+    return OK, 'WSGI — serve backend.wsgi:application'
+
+
+CHECKS = [
+    ('system checks', check_system),
+    ('database', check_database),
+    ('migrations', check_migrations),
+    ('cache', check_cache),
+    ('partner credentials', check_partner_credentials),
+    ('metrics', check_metrics_dir),
+    ('server mode', check_server_mode),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Startup self-check before serving traffic: system checks, database, pending migrations, '
+        'cache, partner credentials, metrics directory, server mode. Exits non-zero on errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true', help='Treat warnings as errors')
+
+    def handle(self, *args, **options):
+        icons = {OK: '✅', WARNING: '⚠️ ', ERROR: '❌'}
+        failed = []
+        for name, check in CHECKS:
+            try:
+                level, detail = check()
+            except Exception as e:
+                level, detail = ERROR, f"check crashed: {e}"
+            self.stdout.write(f"{icons[level]} {name:<20} {detail}")
+            if level == ERROR or (level == WARNING and options['strict']):
+                failed.append(name)
+        connections.close_all()
+
+        if failed:
+            raise CommandError(f"Self-check failed: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS('🚀 Self-check passed'))
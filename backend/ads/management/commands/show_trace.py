@@ -0,0 +1,82 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ads.tracing import children_index, critical_path, load_spans, peak_concurrency, to_chrome_trace
+
+
+def _ms(ns):
+    return ns / 1e6
+
+
+class Command(BaseCommand):
+    help = (
+        'Show a sync trace recorded with TRACING_EXPORTER=file: span tree with offsets, '
+        'critical path and parallelism; optionally export Chrome trace JSON (ui.perfetto.dev)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Spans JSON lines (default: TRACING_FILE)')
+        parser.add_argument('--trace-id', default=None, help='Trace to show (default: the latest finished root span)')
+        parser.add_argument('--chrome', default=None, help='Write Chrome Trace Event JSON to this path')
+
+    def handle(self, *args, **options):
+        path = options['file'] or getattr(settings, 'TRACING_FILE', 'traces.jsonl')
+        try:
+            spans = load_spans(path, options['trace_id'])
+        except FileNotFoundError:
+            raise CommandError(f"No trace file at {path}; run a sync with TRACING_EXPORTER=file first")
+        if not spans:
+            raise CommandError(f"No spans found in {path}")
+
+        origin = min(s['startTimeUnixNano'] for s in spans)
+        total = max(s['endTimeUnixNano'] for s in spans) - origin
+        self.stdout.write(f"\n🧵 Trace {spans[0]['traceId']}: {len(spans)} spans, {_ms(total):.1f} ms")
+        self.stdout.write(f"{'offset ms':>10}{'dur ms':>10}  span")
+        index = children_index(spans)
+        known = {s['spanId'] for s in spans}
+        for root in (s for s in spans if s.get('parentSpanId') not in known):
+            self._print_tree(root, index, origin, depth=0)
+
+        self.stdout.write('\n🔥 Critical path:')
+        for s in critical_path(spans):
+            self.stdout.write(
+                f"{_ms(s['startTimeUnixNano'] - origin):>10.1f}"
+                f"{_ms(s['endTimeUnixNano'] - s['startTimeUnixNano']):>10.1f}  {s['name']}"
+            )
+
+        if options['chrome']:
+            with open(options['chrome'], 'w', encoding='utf-8') as f:
+                json.dump(to_chrome_trace(spans), f)
+            self.stdout.write(self.style.SUCCESS(f"\n💾 Chrome trace saved to {options['chrome']}"))
+
+    def _print_tree(self, span, index, origin, depth):
+        indent = '  ' * depth
+        duration = span['endTimeUnixNano'] - span['startTimeUnixNano']
+        attributes = ' '.join(f"{k}={v}" for k, v in span.get('attributes', {}).items() if k != 'db.statement')
+        line = (
+            f"{_ms(span['startTimeUnixNano'] - origin):>10.1f}{_ms(duration):>10.1f}  "
+            f"{indent}{span['name']} {attributes}".rstrip()
+        )
+        if span['status']['code'] != 'STATUS_CODE_OK':
+            line = self.style.ERROR(f"{line}  ✗ {span['status']['message']}")
+        self.stdout.write(line)
+
+        # Однойменні сусідні спани (сторінки API, asyncpg запити) згортаються в один рядок
+        groups = {}
+        for child in index.get(span['spanId'], []):
+            groups.setdefault(child['name'], []).append(child)
+        for name, children in groups.items():
+            if len(children) == 1:
+                self._print_tree(children[0], index, origin, depth + 1)
+                continue
+            start = min(c['startTimeUnixNano'] for c in children)
+            end = max(c['endTimeUnixNano'] for c in children)
+            durations = sorted(c['endTimeUnixNano'] - c['startTimeUnixNano'] for c in children)
+            errors = sum(1 for c in children if c['status']['code'] != 'STATUS_CODE_OK')
+            self.stdout.write(
+                f"{_ms(start - origin):>10.1f}{_ms(end - start):>10.1f}  {indent}  {name} ×{len(children)} "
+                f"(max {_ms(durations[-1]):.1f} ms, median {_ms(durations[len(durations) // 2]):.1f} ms, "
+                f"peak concurrency {peak_concurrency(children)}{f', {errors} errors' if errors else ''})"
+            )
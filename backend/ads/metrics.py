@@ -0,0 +1,157 @@
+"""
+Prometheus-метрики: вихідні виклики Yelp API, фази синхронізації, кеші, планувальник.
+
+Експортуються на /metrics (metrics_view). Під gunicorn з кількома воркерами задайте
+PROMETHEUS_MULTIPROC_DIR (спільний каталог для воркерів і run_scheduler) — тоді
+/metrics агрегує значення всіх процесів через MultiProcessCollector.
+"""
+import logging
+import os
+import re
+import time
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+HTTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+SYNC_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+LAG_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 900, 3600)
+
+YELP_API_REQUESTS = Counter(
+    'yelp_api_requests_total', 'Outbound Yelp API calls', ['api', 'endpoint', 'method', 'status'],
+)
+YELP_API_DURATION = Histogram(
+    'yelp_api_request_duration_seconds', 'Outbound Yelp API call latency', ['api', 'endpoint', 'method'],
+    buckets=HTTP_BUCKETS,
+)
+SYNC_PHASE_DURATION = Histogram(
+    'yelp_sync_phase_duration_seconds', 'Program sync phase duration', ['engine', 'phase'], buckets=SYNC_BUCKETS,
+)
+SYNC_ROWS = Counter('yelp_sync_rows_total', 'ProgramRegistry rows changed by sync', ['engine', 'operation'])
+SYNC_RUNS = Counter('yelp_sync_runs_total', 'Program sync runs', ['engine', 'result'])
+CACHE_REQUESTS = Counter('yelp_cache_requests_total', 'Cache lookups', ['cache', 'result'])
+SCHEDULER_LAG = Histogram(
+    'yelp_scheduler_lag_seconds', 'Delay between scheduled and actual execution', ['kind'], buckets=LAG_BUCKETS,
+)
+SCHEDULER_OPERATIONS = Counter('yelp_scheduler_operations_total', 'Scheduled operations executed', ['kind', 'result'])
+FEATURE_UPDATES = Counter(
+    'yelp_feature_updates_total', 'Program features updates by diff outcome (noop/diff/full)', ['outcome'],
+)
+REQUEST_BUDGET_EXCEEDED = Counter(
+    'yelp_request_budget_exceeded_total', 'Requests over their query/DB-time budget', ['path', 'budget'],
+)
+
+# Сегменти шляху, що є ідентифікаторами (program_id, business_id, job_id ...) → {id},
+# щоб кардинальність label-а endpoint не росла з кількістю програм
+_VERSION_SEGMENT = re.compile(r'^v\d+$')
+_WORD_SEGMENT = re.compile(r'^[a-z_]+$')
+
+
+def endpoint_label(url: str) -> Tuple[str, str]:
+    """URL → (api, шаблон шляху): ('partner', '/program/{id}/features/v1')."""
+    path = urlsplit(url).path or '/'
+    segments = [
+        segment if _VERSION_SEGMENT.match(segment) or _WORD_SEGMENT.match(segment) else '{id}'
+        for segment in path.strip('/').split('/') if segment
+    ]
+    api = 'fusion' if segments[:1] == ['v3'] else 'partner'
+    return api, '/' + '/'.join(segments)
+
+
+def observe_yelp_call(method: str, url: str, status, seconds: float):
+    """Один вихідний запит (status — HTTP код або 'error' для мережевих помилок)."""
+    try:
+        api, endpoint = endpoint_label(url)
+        method = method.upper()
+        YELP_API_REQUESTS.labels(api, endpoint, method, str(status)).inc()
+        YELP_API_DURATION.labels(api, endpoint, method).observe(seconds)
+        instrumentation.record_http(seconds)
+    except Exception as e:  # метрики ніколи не ламають сам запит
+        logger.debug(f"Failed to record Yelp call metric: {e}")
+
+
+def aiohttp_trace_config() -> aiohttp.TraceConfig:
+    """TraceConfig для aiohttp.ClientSession: кожен запит → observe_yelp_call."""
+
+    async def on_request_start(session, ctx, params):
+        ctx.started = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        observe_yelp_call(params.method, str(params.url), params.response.status, time.perf_counter() - ctx.started)
+
+    async def on_request_exception(session, ctx, params):
+        observe_yelp_call(params.method, str(params.url), 'error', time.perf_counter() - ctx.started)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+def record_cache(cache: str, result: str):
+    CACHE_REQUESTS.labels(cache, result).inc()
+    instrumentation.record_cache_result(result)
+
+
+def record_feature_update(outcome: str):
+    FEATURE_UPDATES.labels(outcome).inc()
+
+
+class SyncTimer:
+    """
+    Тривалості фаз одного запуску синхронізації.
+
+        timer = SyncTimer('sequential')
+        ...; timer.phase('api_fetch')   # час від попередньої позначки
+        ...; timer.finish(added, updated, deleted)
+    """
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self.started = self._last = time.monotonic()
+
+    def record(self, phase: str, seconds: float):
+        SYNC_PHASE_DURATION.labels(self.engine, phase).observe(seconds)
+
+    def phase(self, phase: str):
+        now = time.monotonic()
+        self.record(phase, now - self._last)
+        self._last = now
+
+    def finish(self, added: int = 0, updated: int = 0, deleted: int = 0, result: str = 'ok'):
+        self.record('total', time.monotonic() - self.started)
+        for operation, rows in (('added', added), ('updated', updated), ('deleted', deleted)):
+            if rows:
+                SYNC_ROWS.labels(self.engine, operation).inc(rows)
+        SYNC_RUNS.labels(self.engine, result).inc()
+
+
+def observe_scheduler_lag(kind: str, due_at, now):
+    SCHEDULER_LAG.labels(kind).observe(max(0.0, (now - due_at).total_seconds()))
+
+
+def _registry() -> CollectorRegistry:
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """GET /metrics у форматі Prometheus text exposition (METRICS_TOKEN → потрібен Bearer)."""
+    token: Optional[str] = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -1,71 +1,269 @@
 import logging
+import random
 import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import instrumentation, profiler
+from .logging_handlers import redact_body, redact_headers
+from .metrics import REQUEST_BUDGET_EXCEEDED
 
 logger = logging.getLogger('ads.requests')
 
 class RequestLoggingMiddleware:
+    """
+    Лог запитів/відповідей. REQUEST_LOG_MODE:
+
+    - 'compact' (за замовчуванням): один рядок на запит після відповіді, ліниве %-форматування,
+      структуровані поля в extra (для LOG_FORMAT=json). Успішні швидкі запити семплюються за
+      REQUEST_LOG_SAMPLE_RATES (найдовший префікс шляху → частка 0..1, інакше REQUEST_LOG_SAMPLE_RATE);
+      помилки (>= 400) і повільні запити (>= REQUEST_LOG_SLOW_MS) логуються завжди.
+    - 'verbose': окремі рядки REQUEST/RESPONSE і детальний дамп Program Features API
+      (заголовки й тіло з прихованими секретами) — для налагодження.
+
+    Працює і під WSGI, і під ASGI (async views не перемикаються в sync заради middleware).
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        start_time = time.time()
-        
-        # Детальний лог запиту з додатковою інформацією
+        if self.async_mode:
+            return self.__acall__(request)
+        verbose = getattr(settings, 'REQUEST_LOG_MODE', 'compact') == 'verbose'
+        is_features = verbose and self._log_request_verbose(request)
+        start_time = time.perf_counter()
+        response = self.get_response(request)
+        self._after_response(request, response, time.perf_counter() - start_time, verbose, is_features)
+        return response
+
+    async def __acall__(self, request):
+        verbose = getattr(settings, 'REQUEST_LOG_MODE', 'compact') == 'verbose'
+        is_features = verbose and self._log_request_verbose(request)
+        start_time = time.perf_counter()
+        response = await self.get_response(request)
+        self._after_response(request, response, time.perf_counter() - start_time, verbose, is_features)
+        return response
+
+    def _after_response(self, request, response, duration, verbose, is_features):
+        if verbose:
+            self._log_response(request, response, duration)
+            if is_features:
+                self._log_features_response(request, response, duration)
+        elif logger.isEnabledFor(logging.INFO) and self.should_log(request.path, response.status_code, duration):
+            self._log_response(request, response, duration)
+
+    @staticmethod
+    def sample_rate_for(path: str) -> float:
+        rates = getattr(settings, 'REQUEST_LOG_SAMPLE_RATES', {})
+        matches = [prefix for prefix in rates if path.startswith(prefix)]
+        if matches:
+            return rates[max(matches, key=len)]
+        return getattr(settings, 'REQUEST_LOG_SAMPLE_RATE', 1.0)
+
+    @classmethod
+    def should_log(cls, path: str, status_code: int, duration: float) -> bool:
+        if status_code >= 400 or duration * 1000 >= getattr(settings, 'REQUEST_LOG_SLOW_MS', 1000):
+            return True
+        rate = cls.sample_rate_for(path)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    @staticmethod
+    def _log_response(request, response, duration):
+        response_extra = {
+            'path': request.path,
+            'method': request.method,
+            'status_code': response.status_code,
+            'user': str(request.user) if hasattr(request, 'user') else 'Anonymous',
+            'duration': duration,
+            'request_id': getattr(request, 'request_id', None),
+        }
+        stats = getattr(request, 'instrumentation', None)
+        if stats is None:
+            logger.info(
+                "🔴 RESPONSE: %s %s -> %s (%.3fs)",
+                request.method, request.path, response.status_code, duration, extra=response_extra,
+            )
+            return
+        response_extra.update(stats.as_log_fields())
+        logger.info(
+            "🔴 RESPONSE: %s %s -> %s (%.3fs, %d queries/%.0fms db, %d http)",
+            request.method, request.path, response.status_code, duration,
+            stats.queries, stats.db_seconds * 1000, stats.http_calls, extra=response_extra,
+        )
+
+    @staticmethod
+    def _log_request_verbose(request) -> bool:
+        """Детальний лог запиту ('verbose'); True — це Program Features API (логуємо і відповідь)."""
         log_extra = {
             'path': request.path,
             'method': request.method,
             'user': str(request.user) if hasattr(request, 'user') else 'Anonymous',
         }
-        logger.info(f"🔵 REQUEST: {request.method} {request.path}", extra=log_extra)
+        logger.info("🔵 REQUEST: %s %s", request.method, request.path, extra=log_extra)
         
         # Додаткове логування для Program Features API
-        if '/program/' in request.path and '/features/' in request.path:
-            logger.info(f"🎯 PROGRAM_FEATURES_REQUEST: {request.method} {request.path}")
-            logger.info(f"🎯 PROGRAM_FEATURES_REQUEST: Headers: {dict(request.headers)}")
-            logger.info(f"🎯 PROGRAM_FEATURES_REQUEST: Content-Type: {getattr(request, 'content_type', 'Unknown')}")
-            logger.info(f"🎯 PROGRAM_FEATURES_REQUEST: User-Agent: {request.META.get('HTTP_USER_AGENT', 'Unknown')}")
-            logger.info(f"🎯 PROGRAM_FEATURES_REQUEST: Referer: {request.META.get('HTTP_REFERER', 'Unknown')}")
-            logger.info(f"🎯 PROGRAM_FEATURES_REQUEST: Remote IP: {request.META.get('REMOTE_ADDR', 'Unknown')}")
+        is_features = '/program/' in request.path and '/features/' in request.path
+        if is_features:
+            logger.info("🎯 PROGRAM_FEATURES_REQUEST: %s %s", request.method, request.path)
+            logger.info("🎯 PROGRAM_FEATURES_REQUEST: Headers: %s", redact_headers(request.headers))
+            logger.info("🎯 PROGRAM_FEATURES_REQUEST: Content-Type: %s", getattr(request, 'content_type', 'Unknown'))
+            logger.info("🎯 PROGRAM_FEATURES_REQUEST: User-Agent: %s", request.META.get('HTTP_USER_AGENT', 'Unknown'))
+            logger.info("🎯 PROGRAM_FEATURES_REQUEST: Referer: %s", request.META.get('HTTP_REFERER', 'Unknown'))
+            logger.info("🎯 PROGRAM_FEATURES_REQUEST: Remote IP: %s", request.META.get('REMOTE_ADDR', 'Unknown'))
             
             # Логування body для POST/PUT/DELETE
             if request.method in ['POST', 'PUT', 'DELETE']:
                 try:
                     body = request.body.decode('utf-8') if request.body else 'Empty body'
-                    logger.info(f"🎯 PROGRAM_FEATURES_REQUEST: Body: {body[:1000]}{'...' if len(body) > 1000 else ''}")
+                    logger.info("🎯 PROGRAM_FEATURES_REQUEST: Body: %s", redact_body(body))
                 except Exception as e:
-                    logger.warning(f"🎯 PROGRAM_FEATURES_REQUEST: Could not decode body: {e}")
-        
-        response = self.get_response(request)
-        
-        duration = time.time() - start_time
-        
-        # Лог відповіді з повною інформацією для database handler
-        response_extra = {
-            'path': request.path,
-            'method': request.method,
-            'status_code': response.status_code,
-            'user': str(request.user) if hasattr(request, 'user') else 'Anonymous',
-            'duration': duration,
-        }
-        logger.info(f"🔴 RESPONSE: {request.method} {request.path} -> {response.status_code} ({duration:.3f}s)", extra=response_extra)
-        
-        # Додаткове логування відповіді для Program Features API
-        if '/program/' in request.path and '/features/' in request.path:
-            logger.info(f"🎯 PROGRAM_FEATURES_RESPONSE: Status {response.status_code} for {request.method} {request.path}")
-            logger.info(f"🎯 PROGRAM_FEATURES_RESPONSE: Duration: {duration:.3f}s")
-            if hasattr(response, 'data'):
-                logger.info(f"🎯 PROGRAM_FEATURES_RESPONSE: Response data type: {type(response.data)}")
-        
+                    logger.warning("🎯 PROGRAM_FEATURES_REQUEST: Could not decode body: %s", e)
+        return is_features
+
+    @staticmethod
+    def _log_features_response(request, response, duration):
+        logger.info("🎯 PROGRAM_FEATURES_RESPONSE: Status %s for %s %s", response.status_code, request.method, request.path)
+        logger.info("🎯 PROGRAM_FEATURES_RESPONSE: Duration: %.3fs", duration)
+        if hasattr(response, 'data'):
+            logger.info("🎯 PROGRAM_FEATURES_RESPONSE: Response data type: %s", type(response.data))
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Per-request SQL/HTTP/cache/CPU статистика → Server-Timing, поля логу RequestLoggingMiddleware
+    та перевірка бюджетів (REQUEST_QUERY_BUDGET, REQUEST_DB_TIME_BUDGET_MS, REQUEST_BUDGET_OVERRIDES).
+
+    Ставиться після RequestLoggingMiddleware, щоб той логував уже повну статистику.
+    Також присвоює request.request_id (X-Request-ID) і, якщо PROFILING_ENABLED, профілює запит (ads.profiler).
+    Під ASGI (async views) профілювання та CPU не рахуються — event loop ділять усі запити воркера;
+    SQL з sync_to_async потоків теж не видно (інше з'єднання), HTTP до Yelp — рахується.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = self._start(request)
+        token = instrumentation.activate(stats)
+        profile = profiler.start('request', request.path, request.request_id)
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        response = None
+        try:
+            with self._db_wrappers(stats):
+                response = self.get_response(request)
+        finally:
+            stats.total_seconds = time.perf_counter() - started
+            stats.cpu_seconds = time.thread_time() - cpu_started
+            instrumentation.deactivate(token)
+            record = profiler.finish(
+                profile, method=request.method, status_code=getattr(response, 'status_code', 500),
+                user=str(getattr(request, 'user', '') or ''),
+            )
+
+        if record is not None:
+            response['X-Profile-URL'] = f"/api/profiles/{record.request_id}/"
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = self._start(request)
+        token = instrumentation.activate(stats)
+        started = time.perf_counter()
+        try:
+            with self._db_wrappers(stats):
+                response = await self.get_response(request)
+        finally:
+            stats.total_seconds = time.perf_counter() - started
+            instrumentation.deactivate(token)
+        return self._finish(request, response, stats)
+
+    @staticmethod
+    def _start(request) -> instrumentation.RequestStats:
+        request.request_id = request.headers.get('X-Request-ID', '')[:64] or profiler.new_request_id()
+        request.instrumentation = instrumentation.RequestStats()
+        return request.instrumentation
+
+    @staticmethod
+    def _db_wrappers(stats) -> ExitStack:
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats.db_wrapper))
+        return stack
+
+    def _finish(self, request, response, stats):
+        response['X-Request-ID'] = request.request_id
+        if getattr(settings, 'SERVER_TIMING_ENABLED', True):
+            response['Server-Timing'] = stats.server_timing()
+        self._check_budget(request, stats)
         return response
 
+    @staticmethod
+    def budget_for(path: str) -> dict:
+        """Бюджет для шляху: найдовший збіг префікса з REQUEST_BUDGET_OVERRIDES поверх дефолтів."""
+        budget = {
+            'queries': getattr(settings, 'REQUEST_QUERY_BUDGET', 50),
+            'db_ms': getattr(settings, 'REQUEST_DB_TIME_BUDGET_MS', 1000),
+        }
+        overrides = getattr(settings, 'REQUEST_BUDGET_OVERRIDES', {})
+        matches = [prefix for prefix in overrides if path.startswith(prefix)]
+        if matches:
+            budget.update(overrides[max(matches, key=len)])
+        return budget
+
+    def _check_budget(self, request, stats):
+        budget = self.budget_for(request.path)
+        exceeded = []
+        if budget.get('queries') is not None and stats.queries > budget['queries']:
+            exceeded.append(('queries', stats.queries, budget['queries']))
+        if budget.get('db_ms') is not None and stats.db_seconds * 1000 > budget['db_ms']:
+            exceeded.append(('db_ms', round(stats.db_seconds * 1000, 1), budget['db_ms']))
+        if not exceeded:
+            return
+
+        route = getattr(getattr(request, 'resolver_match', None), 'route', None) or 'unmatched'
+        details = ', '.join(f"{name}={actual} > {limit}" for name, actual, limit in exceeded)
+        for name, _, _ in exceeded:
+            REQUEST_BUDGET_EXCEEDED.labels(route, name).inc()
+        logger.warning(
+            f"🚨 BUDGET EXCEEDED: {request.method} {request.path} ({details})",
+            extra={'path': request.path, 'method': request.method, 'budget_exceeded': details, **stats.as_log_fields()},
+        )
+        if getattr(settings, 'REQUEST_BUDGET_RAISE', False):
+            raise instrumentation.QueryBudgetExceeded(f"{request.method} {request.path}: {details}")
+
 
 class SimpleCorsMiddleware:
     """Simple CORS middleware without external dependencies."""
-    
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
         # Handle preflight OPTIONS requests
         if request.method == 'OPTIONS':
             response = self._create_cors_response()
@@ -75,6 +273,14 @@ class SimpleCorsMiddleware:
         # Add CORS headers to all responses
         self._add_cors_headers(response)
         return response
+
+    async def __acall__(self, request):
+        if request.method == 'OPTIONS':
+            response = self._create_cors_response()
+        else:
+            response = await self.get_response(request)
+        self._add_cors_headers(response)
+        return response
     
     def _create_cors_response(self):
         """Create a response for preflight OPTIONS requests."""
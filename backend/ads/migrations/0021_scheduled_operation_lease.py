@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0020_scheduledbudgetupdate_is_autobid_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledbudgetupdate',
+            name='claimed_by',
+            field=models.CharField(blank=True, help_text='Scheduler worker holding the lease', max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='scheduledbudgetupdate',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, help_text='Lease expiry; expired leases can be reclaimed by another worker', null=True),
+        ),
+        migrations.AddField(
+            model_name='scheduledpause',
+            name='claimed_by',
+            field=models.CharField(blank=True, help_text='Scheduler worker holding the lease', max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='scheduledpause',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, help_text='Lease expiry; expired leases can be reclaimed by another worker', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledbudgetupdate',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='ads_schedul_status_2acb2f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledpause',
+            index=models.Index(fields=['status', 'lease_expires_at'], name='ads_schedul_status_ffcae0_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0021_scheduled_operation_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledbudgetupdate',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of execution attempts so far'),
+        ),
+        migrations.AddField(
+            model_name='scheduledbudgetupdate',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='Earliest time of the next retry (null = use scheduled_datetime)', null=True),
+        ),
+        migrations.AddField(
+            model_name='scheduledpause',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of execution attempts so far'),
+        ),
+        migrations.AddField(
+            model_name='scheduledpause',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='Earliest time of the next retry (null = use scheduled_datetime)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='scheduledbudgetupdate',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('EXECUTED', 'Executed'), ('CANCELLED', 'Cancelled'), ('FAILED', 'Failed'), ('DEAD_LETTER', 'Dead letter')], db_index=True, default='PENDING', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='scheduledpause',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('EXECUTED', 'Executed'), ('CANCELLED', 'Cancelled'), ('FAILED', 'Failed'), ('DEAD_LETTER', 'Dead letter')], db_index=True, default='PENDING', max_length=20),
+        ),
+    ]
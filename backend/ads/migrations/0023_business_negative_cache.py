@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0022_scheduled_operation_retry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='fetch_attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Consecutive failed API fetches'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='next_retry_at',
+            field=models.DateTimeField(blank=True, help_text="Negative cache: don't re-check the API before this time", null=True),
+        ),
+    ]
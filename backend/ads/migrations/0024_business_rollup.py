@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0023_business_negative_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(db_index=True, max_length=255)),
+                ('yelp_business_id', models.CharField(blank=True, help_text='Empty string groups programs without a business', max_length=100)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('active_count', models.PositiveIntegerField(default=0, help_text='program_status=ACTIVE')),
+                ('paused_count', models.PositiveIntegerField(default=0, help_text='program_pause_status=PAUSED')),
+                ('terminated_count', models.PositiveIntegerField(default=0, help_text='program_status=TERMINATED')),
+                ('total_budget', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_impressions', models.BigIntegerField(default=0)),
+                ('total_clicks', models.BigIntegerField(default=0)),
+                ('facet_counts', models.JSONField(blank=True, default=dict, help_text='Program counts per filter facet and program type: {facet: {program_type: count}}')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rollups', to='ads.business')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['username', '-total_count'], name='ads_busines_usernam_d4df72_idx')],
+                'unique_together': {('username', 'yelp_business_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0024_business_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_id', models.CharField(db_index=True, max_length=64)),
+                ('kind', models.CharField(choices=[('request', 'Request'), ('sync', 'Sync')], db_index=True, max_length=10)),
+                ('reason', models.CharField(choices=[('slow', 'Over threshold'), ('sampled', 'Random sample')], max_length=10)),
+                ('name', models.CharField(help_text='Request path or sync engine', max_length=500)),
+                ('method', models.CharField(blank=True, max_length=10, null=True)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('user', models.CharField(blank=True, max_length=100, null=True)),
+                ('duration', models.FloatField(help_text='Duration in seconds')),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('interval_ms', models.FloatField(help_text='Sampling interval in milliseconds')),
+                ('stacks', models.TextField(help_text='Collapsed stacks (flamegraph.pl / speedscope format)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -43,6 +43,8 @@ class Business(models.Model):
     # Metadata
     cached_at = models.DateTimeField(auto_now=True, help_text="Last updated from API")
     fetch_failed = models.BooleanField(default=False, help_text="API fetch failed")
+    fetch_attempts = models.PositiveIntegerField(default=0, help_text="Consecutive failed API fetches")
+    next_retry_at = models.DateTimeField(null=True, blank=True, help_text="Negative cache: don't re-check the API before this time")
     
     class Meta:
         db_table = 'ads_business'
@@ -242,6 +244,63 @@ class ProgramRegistry(models.Model):
         return f"{self.username}: {self.program_id} ({self.yelp_business_id})"
 
 
+class BusinessRollup(models.Model):
+    """
+    Попередньо пораховані агрегати програм ProgramRegistry по бізнесу.
+    Оновлюються інкрементально (лише змінені бізнеси) після sync та bulk-операцій,
+    тож дашборди читають O(бізнесів) рядків замість агрегації всіх програм.
+    """
+    
+    username = models.CharField(max_length=255, db_index=True)
+    yelp_business_id = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Empty string groups programs without a business"
+    )
+    business = models.ForeignKey(
+        'Business',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='rollups',
+    )
+    
+    # Лічильники (та сама семантика, що й у ProgramGroupingService)
+    total_count = models.PositiveIntegerField(default=0)
+    active_count = models.PositiveIntegerField(default=0, help_text="program_status=ACTIVE")
+    paused_count = models.PositiveIntegerField(default=0, help_text="program_pause_status=PAUSED")
+    terminated_count = models.PositiveIntegerField(default=0, help_text="program_status=TERMINATED")
+    
+    # Суми метрик (в доларах, як у ProgramRegistry)
+    total_budget = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_impressions = models.BigIntegerField(default=0)
+    total_clicks = models.BigIntegerField(default=0)
+    
+    facet_counts = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Program counts per filter facet and program type: {facet: {program_type: count}}"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('username', 'yelp_business_id')
+        indexes = [
+            models.Index(fields=['username', '-total_count']),
+        ]
+    
+    def facet_count(self, facet: str, program_type: str = None) -> int:
+        """Кількість програм у facet (див. BusinessRollupService.program_facets), опційно одного типу."""
+        by_type = self.facet_counts.get(facet, {})
+        if program_type:
+            return by_type.get(program_type, 0)
+        return sum(by_type.values())
+    
+    def __str__(self):
+        return f"{self.username}: {self.yelp_business_id or '—'} ({self.total_count} programs)"
+
+
 class YelpProgram(models.Model):
     """[DEPRECATED] Стара складна модель - використовуй ProgramRegistry"""
     
@@ -511,6 +570,38 @@ class LogEntry(models.Model):
         return f"[{self.level}] {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')} - {self.message[:50]}"
 
 
+class ProfileRecord(models.Model):
+    """Sampled stack profile of a slow (or randomly sampled) request / sync run (ads.profiler)"""
+
+    KIND_CHOICES = [
+        ('request', 'Request'),
+        ('sync', 'Sync'),
+    ]
+    REASON_CHOICES = [
+        ('slow', 'Over threshold'),
+        ('sampled', 'Random sample'),
+    ]
+
+    request_id = models.CharField(max_length=64, db_index=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, db_index=True)
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    name = models.CharField(max_length=500, help_text="Request path or sync engine")
+    method = models.CharField(max_length=10, null=True, blank=True)
+    status_code = models.IntegerField(null=True, blank=True)
+    user = models.CharField(max_length=100, null=True, blank=True)
+    duration = models.FloatField(help_text="Duration in seconds")
+    sample_count = models.PositiveIntegerField(default=0)
+    interval_ms = models.FloatField(help_text="Sampling interval in milliseconds")
+    stacks = models.TextField(help_text="Collapsed stacks (flamegraph.pl / speedscope format)")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"[{self.kind}] {self.name} {self.duration:.2f}s ({self.request_id})"
+
+
 class ScheduledPause(models.Model):
     """Schedule program pause in the future"""
     
@@ -519,6 +610,7 @@ class ScheduledPause(models.Model):
         ('EXECUTED', 'Executed'),
         ('CANCELLED', 'Cancelled'),
         ('FAILED', 'Failed'),
+        ('DEAD_LETTER', 'Dead letter'),  # retries exhausted
     ]
     
     program_id = models.CharField(max_length=100, db_index=True)
@@ -527,6 +619,12 @@ class ScheduledPause(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
     executed_at = models.DateTimeField(null=True, blank=True, help_text="When the pause was actually executed")
     error_message = models.TextField(null=True, blank=True, help_text="Error message if execution failed")
+    # Retry state: транзитні помилки (5xx, 429, мережа) повторюються з експоненційним backoff
+    attempt_count = models.PositiveIntegerField(default=0, help_text="Number of execution attempts so far")
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text="Earliest time of the next retry (null = use scheduled_datetime)")
+    # Lease: який воркер планувальника зараз виконує операцію і до якого часу
+    claimed_by = models.CharField(max_length=255, null=True, blank=True, help_text="Scheduler worker holding the lease")
+    lease_expires_at = models.DateTimeField(null=True, blank=True, help_text="Lease expiry; expired leases can be reclaimed by another worker")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -535,6 +633,7 @@ class ScheduledPause(models.Model):
             models.Index(fields=['program_id', 'status']),
             models.Index(fields=['scheduled_datetime', 'status']),
             models.Index(fields=['username', 'status']),
+            models.Index(fields=['status', 'lease_expires_at']),
         ]
         ordering = ['scheduled_datetime']
     
@@ -550,6 +649,7 @@ class ScheduledBudgetUpdate(models.Model):
         ('EXECUTED', 'Executed'),
         ('CANCELLED', 'Cancelled'),
         ('FAILED', 'Failed'),
+        ('DEAD_LETTER', 'Dead letter'),  # retries exhausted
     ]
     
     program_id = models.CharField(max_length=100, db_index=True)
@@ -562,6 +662,12 @@ class ScheduledBudgetUpdate(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
     executed_at = models.DateTimeField(null=True, blank=True, help_text="When the update was actually executed")
     error_message = models.TextField(null=True, blank=True, help_text="Error message if execution failed")
+    # Retry state: транзитні помилки (5xx, 429, мережа) повторюються з експоненційним backoff
+    attempt_count = models.PositiveIntegerField(default=0, help_text="Number of execution attempts so far")
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text="Earliest time of the next retry (null = use scheduled_datetime)")
+    # Lease: який воркер планувальника зараз виконує операцію і до якого часу
+    claimed_by = models.CharField(max_length=255, null=True, blank=True, help_text="Scheduler worker holding the lease")
+    lease_expires_at = models.DateTimeField(null=True, blank=True, help_text="Lease expiry; expired leases can be reclaimed by another worker")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -570,6 +676,7 @@ class ScheduledBudgetUpdate(models.Model):
             models.Index(fields=['program_id', 'status']),
             models.Index(fields=['scheduled_datetime', 'status']),
             models.Index(fields=['username', 'status']),
+            models.Index(fields=['status', 'lease_expires_at']),
         ]
         ordering = ['scheduled_datetime']
     
@@ -0,0 +1,383 @@
+"""
+Локальний симулятор Yelp Partner API та Fusion API (aiohttp) для тестів і бенчмарків.
+
+Емулює:
+- GET  /programs/v1 (offset/limit пагінація, payment_programs + total)
+- GET  /v1/programs/info/{program_id}
+- GET  /v1/reseller/status/{job_id}
+- GET/POST/DELETE /program/{program_id}/features/v1
+- POST /program/{program_id}/pause/v1, /resume/v1, /v1/reseller/program/{program_id}/edit
+- GET  /v3/businesses/{business_id} (Fusion)
+
+Дані детерміновані (seed), затримки беруться з LatencyProfile, помилки 5xx — з error_rate,
+а 429 віддає token bucket на кожного клієнта (Basic/Bearer credentials).
+
+Підключення: YELP_SIMULATOR_URL (або YELP_PARTNER_BASE / YELP_FUSION_BASE) у settings;
+у тестах — SimulatorServer як context manager.
+"""
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Union
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+FEATURES = [
+    'CUSTOM_LOCATION_TARGETING', 'NEGATIVE_KEYWORD_TARGETING', 'STRICT_CATEGORY_TARGETING',
+    'AD_SCHEDULING', 'CUSTOM_RADIUS_TARGETING', 'CUSTOM_AD_TEXT', 'CUSTOM_AD_PHOTO',
+    'BUSINESS_LOGO', 'YELP_PORTFOLIO', 'LINK_TRACKING', 'CALL_TRACKING', 'SERVICE_OFFERINGS_TARGETING',
+]
+PROGRAM_TYPES = ['CPC', 'BP', 'EP', 'RCA', 'CTA', 'LOGO']
+DEFAULT_STATUS_WEIGHTS = {'ACTIVE': 6, 'INACTIVE': 3, 'TERMINATED': 1}
+
+# Перцентиль 99 нормального розподілу — для переводу (median, p99) у sigma
+_Z99 = 2.326
+
+
+class LatencyProfile:
+    """Затримка відповіді: lognormal з заданими медіаною та p99 (або фіксована, якщо p99 не задано)."""
+
+    def __init__(self, median_ms: float = 0.0, p99_ms: Optional[float] = None):
+        self.median_ms = median_ms
+        self.p99_ms = p99_ms
+
+    def sample(self, rng: random.Random) -> float:
+        """Затримка в секундах."""
+        if self.median_ms <= 0:
+            return 0.0
+        if not self.p99_ms or self.p99_ms <= self.median_ms:
+            return self.median_ms / 1000
+        sigma = (math.log(self.p99_ms) - math.log(self.median_ms)) / _Z99
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+    def __repr__(self):
+        return f"<LatencyProfile median={self.median_ms}ms p99={self.p99_ms}ms>"
+
+
+LATENCY_PROFILES = {
+    'none': LatencyProfile(0),
+    'lan': LatencyProfile(2, 10),
+    'yelp': LatencyProfile(250, 1500),  # приблизно як живий partner API
+    'slow': LatencyProfile(800, 5000),
+}
+
+
+def get_latency_profile(profile: Union[str, LatencyProfile, None]) -> LatencyProfile:
+    if isinstance(profile, LatencyProfile):
+        return profile
+    return LATENCY_PROFILES[profile or 'none']
+
+
+class SimulatorConfig:
+    """Параметри симулятора."""
+
+    def __init__(
+        self,
+        programs: int = 1000,
+        businesses: int = 200,
+        seed: int = 42,
+        latency: Union[str, LatencyProfile] = 'none',
+        fusion_latency: Union[str, LatencyProfile, None] = None,
+        error_rate: float = 0.0,
+        rate_limit: Optional[float] = None,
+        burst: int = 50,
+        max_page_size: int = 40,
+    ):
+        self.programs = programs
+        self.businesses = businesses
+        self.seed = seed
+        self.latency = get_latency_profile(latency)
+        self.fusion_latency = get_latency_profile(fusion_latency) if fusion_latency is not None else self.latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit  # запитів/с на клієнта; None — без 429
+        self.burst = burst
+        self.max_page_size = max_page_size
+
+
+def build_programs(count: int, businesses: int, seed: int = 42,
+                   status_weights: Optional[Dict[str, float]] = None, paused_share: float = 0.1) -> List[Dict]:
+    """Детерміновані програми у форматі payment_programs з /programs/v1."""
+    rng = random.Random(seed)
+    status_weights = status_weights or DEFAULT_STATUS_WEIGHTS
+    business_ids = [f"{rng.getrandbits(64):016x}-biz{i}" for i in range(max(businesses, 1))]
+    today = date.today()
+    programs = []
+    for i in range(count):
+        business_id = business_ids[i % len(business_ids)] if i < len(business_ids) else rng.choice(business_ids)
+        program_status = rng.choices(list(status_weights), weights=list(status_weights.values()))[0]
+        start = today + timedelta(days=rng.randint(-400, 30))
+        program_type = rng.choice(PROGRAM_TYPES)
+        program = {
+            'program_id': f"{rng.getrandbits(80):020x}",
+            'program_type': program_type,
+            'program_status': program_status,
+            'program_pause_status': 'PAUSED' if rng.random() < paused_share else 'NOT_PAUSED',
+            'start_date': start.isoformat(),
+            'end_date': rng.choice([None, (start + timedelta(days=rng.randint(30, 720))).isoformat()]),
+            'businesses': [{'yelp_business_id': business_id, 'partner_business_id': f"partner-{i % 997}"}],
+            'active_features': rng.sample(FEATURES, rng.randint(0, 5)),
+            'available_features': FEATURES,
+        }
+        if program_type == 'CPC':
+            # Як і живий API: program_metrics є лише у CPC програм
+            program['program_metrics'] = {
+                'budget': rng.randint(1000, 500000),
+                'currency': 'USD',
+                'is_autobid': rng.random() < 0.7,
+                'max_bid': rng.choice([None, rng.randint(100, 2000)]),
+                'fee_period': rng.choice(['CALENDAR_MONTH', 'ROLLING_MONTH']),
+                'billed_impressions': rng.randint(0, 200000),
+                'billed_clicks': rng.randint(0, 5000),
+                'ad_cost': rng.randint(0, 400000),
+            }
+        programs.append(program)
+    return programs
+
+
+class _ClientLimiter:
+    """Неблокуючий token bucket на клієнта: False — відповідати 429."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, List[float]] = {}
+
+    def allow(self, client: str) -> bool:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (float(self.burst), now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[client] = [tokens, now]
+            return False
+        self._buckets[client] = [tokens - 1, now]
+        return True
+
+
+class PartnerSimulator:
+    """Стан симулятора (програми, фічі, бізнеси) та aiohttp handlers."""
+
+    def __init__(self, config: SimulatorConfig = None):
+        self.config = config or SimulatorConfig()
+        self.rng = random.Random(self.config.seed)
+        self.programs = build_programs(self.config.programs, self.config.businesses, self.config.seed)
+        self.programs_by_id = {p['program_id']: p for p in self.programs}
+        self.features: Dict[str, Dict[str, Dict]] = {
+            p['program_id']: {feature: {} for feature in p['active_features']} for p in self.programs
+        }
+        self.limiter = _ClientLimiter(self.config.rate_limit, self.config.burst) if self.config.rate_limit else None
+        self.stats = Counter()
+
+    # ------------------------------------------------------------- middleware
+
+    @web.middleware
+    async def faults(self, request: web.Request, handler):
+        """Auth → 429 → затримка → випадкова 5xx → handler."""
+        if request.path.startswith('/__simulator'):
+            return await handler(request)
+        fusion = request.path.startswith('/v3/')
+        self.stats['requests'] += 1
+        resource = request.match_info.route.resource
+        self.stats[f"{request.method} {resource.canonical if resource else request.path}"] += 1
+
+        client = request.headers.get('Authorization')
+        if not client:
+            self.stats['unauthorized'] += 1
+            return web.json_response({'error': {'id': 'UNAUTHORIZED', 'description': 'Missing credentials'}}, status=401)
+
+        if self.limiter and not self.limiter.allow(client):
+            self.stats['throttled'] += 1
+            return web.json_response(
+                {'error': {'id': 'TOO_MANY_REQUESTS', 'description': 'Rate limit exceeded'}},
+                status=429, headers={'Retry-After': '1'},
+            )
+
+        delay = (self.config.fusion_latency if fusion else self.config.latency).sample(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            self.stats['errors'] += 1
+            return web.json_response(
+                {'error': {'id': 'INTERNAL_ERROR', 'description': 'Simulated failure'}},
+                status=self.rng.choice([500, 502, 503]),
+            )
+        return await handler(request)
+
+    # ---------------------------------------------------------------- helpers
+
+    def _program_or_404(self, request: web.Request) -> Dict:
+        program = self.programs_by_id.get(request.match_info['program_id'])
+        if program is None:
+            raise web.HTTPNotFound(
+                text='{"error": {"id": "PROGRAM_NOT_FOUND", "description": "Program not found"}}',
+                content_type='application/json',
+            )
+        return program
+
+    @staticmethod
+    def _matches_status(program: Dict, program_status: str) -> bool:
+        if program_status in (None, '', 'ALL'):
+            return True
+        if program_status == 'CURRENT':
+            return program['program_status'] == 'ACTIVE'
+        if program_status == 'PAUSED':
+            return program['program_pause_status'] == 'PAUSED'
+        if program_status == 'PAST':
+            return program['program_status'] == 'INACTIVE'
+        if program_status == 'FUTURE':
+            return program['start_date'] > date.today().isoformat()
+        return program['program_status'] == program_status
+
+    # --------------------------------------------------------------- handlers
+
+    async def list_programs(self, request: web.Request):
+        offset = int(request.query.get('offset', 0))
+        limit = min(int(request.query.get('limit', 20)), self.config.max_page_size)
+        program_status = request.query.get('program_status', 'CURRENT')
+        matching = [p for p in self.programs if self._matches_status(p, program_status)]
+        return web.json_response({
+            'payment_programs': matching[offset:offset + limit],
+            'total': len(matching),
+            'offset': offset,
+            'limit': limit,
+        })
+
+    async def program_info(self, request: web.Request):
+        return web.json_response({'programs': [self._program_or_404(request)], 'errors': []})
+
+    async def job_status(self, request: web.Request):
+        job_id = request.match_info['job_id']
+        return web.json_response({
+            'job_id': job_id,
+            'status': 'COMPLETED',
+            'created_at': date.today().isoformat(),
+            'completed_at': date.today().isoformat(),
+            'business_results': [],
+        })
+
+    async def get_features(self, request: web.Request):
+        program = self._program_or_404(request)
+        return web.json_response({'program_id': program['program_id'], 'features': self.features[program['program_id']]})
+
+    async def update_features(self, request: web.Request):
+        program = self._program_or_404(request)
+        body = await request.json()
+        # YelpService надсилає вміст без обгортки 'features'; приймаємо обидві форми
+        self.features[program['program_id']].update(body['features'] if 'features' in body else body)
+        program['active_features'] = sorted(self.features[program['program_id']])
+        return web.json_response({'program_id': program['program_id'], 'features': self.features[program['program_id']]})
+
+    async def delete_features(self, request: web.Request):
+        program = self._program_or_404(request)
+        body = await request.json() if request.can_read_body else {}
+        for feature in body.get('features', []):
+            self.features[program['program_id']].pop(feature, None)
+        program['active_features'] = sorted(self.features[program['program_id']])
+        return web.json_response({'program_id': program['program_id'], 'features': self.features[program['program_id']]})
+
+    async def pause_program(self, request: web.Request):
+        self._program_or_404(request)['program_pause_status'] = 'PAUSED'
+        return web.Response(status=202)
+
+    async def resume_program(self, request: web.Request):
+        self._program_or_404(request)['program_pause_status'] = 'NOT_PAUSED'
+        return web.Response(status=202)
+
+    async def edit_program(self, request: web.Request):
+        program = self._program_or_404(request)
+        if 'budget' in request.query:
+            program.setdefault('program_metrics', {})['budget'] = int(float(request.query['budget']) * 100)
+        return web.json_response({'job_id': f"job-{program['program_id']}"}, status=202)
+
+    async def fusion_business(self, request: web.Request):
+        business_id = request.match_info['business_id']
+        return web.json_response({
+            'id': business_id,
+            'alias': business_id.lower(),
+            'name': f"Business {business_id.rsplit('-', 1)[-1]}",
+            'url': f"https://www.yelp.com/biz/{business_id.lower()}",
+        })
+
+    async def simulator_stats(self, request: web.Request):
+        return web.json_response(dict(self.stats))
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults])
+        app.router.add_get('/programs/v1', self.list_programs)
+        app.router.add_get('/v1/programs/info/{program_id}', self.program_info)
+        app.router.add_get('/v1/reseller/status/{job_id}', self.job_status)
+        app.router.add_get('/program/{program_id}/features/v1', self.get_features)
+        app.router.add_post('/program/{program_id}/features/v1', self.update_features)
+        app.router.add_delete('/program/{program_id}/features/v1', self.delete_features)
+        app.router.add_post('/program/{program_id}/pause/v1', self.pause_program)
+        app.router.add_post('/program/{program_id}/resume/v1', self.resume_program)
+        app.router.add_post('/v1/reseller/program/{program_id}/edit', self.edit_program)
+        app.router.add_get('/v3/businesses/{business_id}', self.fusion_business)
+        app.router.add_get('/__simulator/stats', self.simulator_stats)
+        return app
+
+
+class SimulatorServer:
+    """
+    Симулятор у фоновому потоці з власним event loop.
+
+        with SimulatorServer(SimulatorConfig(programs=500, latency='lan')) as server:
+            monkeypatch.setattr(YelpService, 'PARTNER_BASE', server.url)
+    """
+
+    def __init__(self, config: SimulatorConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.simulator = PartnerSimulator(config)
+        self.host = host
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def stats(self) -> Counter:
+        return self.simulator.stats
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.simulator.build_app(), access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self) -> 'SimulatorServer':
+        self._thread = threading.Thread(target=self._serve, name='partner-simulator', daemon=True)
+        self._thread.start()
+        if not self._started.wait(10):
+            raise RuntimeError('Partner simulator failed to start')
+        logger.info(f"🧪 [SIMULATOR] Listening on {self.url} ({len(self.simulator.programs)} programs)")
+        return self
+
+    def stop(self):
+        if self._loop and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def __enter__(self) -> 'SimulatorServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,235 @@
+"""
+Семплюючий профайлер повільних запитів і синхронізацій (opt-in: PROFILING_ENABLED).
+
+Один фоновий потік раз на PROFILING_INTERVAL_MS знімає sys._current_frames() і для
+кожного потоку з активним профілем додає згорнутий стек у лічильник. Код, що
+профілюється, не інструментується — накладні витрати обмежені частотою семплів.
+
+Профіль зберігається (ProfileRecord), якщо тривалість перевищила поріг
+(PROFILING_SLOW_REQUEST_MS / PROFILING_SLOW_SYNC_SECONDS) або потрапила у випадкову
+вибірку PROFILING_SAMPLE_RATE. Формат stacks — collapsed ("a;b;c 12" на рядок):
+відкривається у speedscope.app або flamegraph.pl.
+"""
+import functools
+import inspect
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 128
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _frame_label(code) -> str:
+    """'ads/views.py:get' — два останні компоненти шляху, без пробілів і ';'."""
+    path = code.co_filename.replace(os.sep, '/')
+    short = '/'.join(path.rsplit('/', 2)[-2:])
+    return f"{short}:{code.co_name}".replace(';', ':').replace(' ', '_')
+
+
+class Profile:
+    """Семпли одного запиту / запуску синхронізації в одному потоці."""
+
+    def __init__(self, kind: str, name: str, request_id: Optional[str] = None):
+        self.kind = kind
+        self.name = name
+        self.request_id = request_id or new_request_id()
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.samples: Counter = Counter()
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def collapsed(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class StackSampler:
+    """Фоновий потік-семплер; стартує при першій реєстрації профілю."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: Dict[int, List[Profile]] = {}
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, profile: Profile):
+        with self._lock:
+            self._profiles.setdefault(profile.thread_id, []).append(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def unregister(self, profile: Profile):
+        with self._lock:
+            profiles = self._profiles.get(profile.thread_id, [])
+            if profile in profiles:
+                profiles.remove(profile)
+            if not profiles:
+                self._profiles.pop(profile.thread_id, None)
+
+    def _collapse(self, frame) -> str:
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = _frame_label(code)
+            labels.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                targets = {ident: list(profiles) for ident, profiles in self._profiles.items()}
+                if not targets:
+                    self._wakeup.clear()
+            if not targets:
+                self._wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            for ident, profiles in targets.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = self._collapse(frame)
+                for profile in profiles:
+                    profile.samples[stack] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler: Optional[StackSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def _get_sampler() -> StackSampler:
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler(getattr(settings, 'PROFILING_INTERVAL_MS', 5) / 1000)
+        return _sampler
+
+
+def enabled() -> bool:
+    return getattr(settings, 'PROFILING_ENABLED', False)
+
+
+def start(kind: str, name: str, request_id: Optional[str] = None) -> Optional[Profile]:
+    """Почати профілювання поточного потоку; None, якщо профайлер вимкнений."""
+    if not enabled():
+        return None
+    profile = Profile(kind, name, request_id)
+    _get_sampler().register(profile)
+    return profile
+
+
+def _threshold_seconds(kind: str) -> float:
+    if kind == 'request':
+        return getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 1000) / 1000
+    return getattr(settings, 'PROFILING_SLOW_SYNC_SECONDS', 60)
+
+
+def finish(profile: Optional[Profile], method: Optional[str] = None, status_code: Optional[int] = None,
+           user: Optional[str] = None):
+    """Зупинити профіль і зберегти його, якщо він повільний або потрапив у вибірку. → ProfileRecord | None"""
+    if profile is None:
+        return None
+    _get_sampler().unregister(profile)
+    duration = time.perf_counter() - profile.started
+
+    if duration >= _threshold_seconds(profile.kind):
+        reason = 'slow'
+    elif random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0):
+        reason = 'sampled'
+    else:
+        return None
+    if not profile.samples:
+        return None
+
+    from .models import ProfileRecord
+    try:
+        record = ProfileRecord.objects.create(
+            request_id=profile.request_id,
+            kind=profile.kind,
+            reason=reason,
+            name=profile.name[:500],
+            method=method,
+            status_code=status_code,
+            user=(user or '')[:100] or None,
+            duration=duration,
+            sample_count=profile.sample_count,
+            interval_ms=_get_sampler().interval * 1000,
+            stacks=profile.collapsed(),
+        )
+        _prune()
+    except Exception as e:  # профайлер ніколи не ламає сам запит / синхронізацію
+        logger.warning(f"⚠️ Failed to store profile {profile.request_id}: {e}")
+        return None
+    logger.info(
+        f"🔥 PROFILE: {profile.kind} {profile.name} {duration:.2f}s ({reason}, "
+        f"{profile.sample_count} samples) → /api/profiles/{profile.request_id}/"
+    )
+    return record
+
+
+def _prune():
+    """Залишити лише PROFILING_MAX_STORED найновіших профілів."""
+    from .models import ProfileRecord
+    keep = getattr(settings, 'PROFILING_MAX_STORED', 500)
+    cutoff = list(ProfileRecord.objects.order_by('-id').values_list('id', flat=True)[keep:keep + 1])
+    if cutoff:
+        ProfileRecord.objects.filter(id__lte=cutoff[0]).delete()
+
+
+def profiled_iterator(iterator, kind: str, name: str, request_id: Optional[str] = None, user: Optional[str] = None):
+    """
+    Обгортка для генераторів (SSE синхронізація виконується вже після того, як
+    middleware повернув StreamingHttpResponse). Профілюється потік, що споживає ітератор.
+    """
+    profile = start(kind, name, request_id)
+    try:
+        yield from iterator
+    finally:
+        finish(profile, user=user)
+
+
+def profiled_sync(engine: str):
+    """
+    Декоратор для методів синхронізації (cls, username, ...); працює і для генераторів.
+    Семплюється лише потік, що викликав sync — воркери ThreadPoolExecutor не потрапляють у профіль.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(cls, username, *args, **kwargs):
+                return profiled_iterator(func(cls, username, *args, **kwargs), 'sync', engine, user=username)
+        else:
+            @functools.wraps(func)
+            def wrapper(cls, username, *args, **kwargs):
+                profile = start('sync', engine)
+                try:
+                    return func(cls, username, *args, **kwargs)
+                finally:
+                    finish(profile, user=username)
+        return wrapper
+    return decorator
@@ -3,45 +3,169 @@ Redis service for caching and batch processing of programs.
 
 This module implements external sorting with Redis for handling large datasets.
 It fetches all programs through pagination, caches them in Redis, and groups by business_id.
+
+Всі клієнти процесу (RedisService, кеші ProgramSyncService, Django cache) ділять
+модульні ConnectionPool-и: з'єднання перевіряються ліниво (health_check_interval),
+а недоступність Redis відстежує circuit breaker замість ping при кожному створенні.
 """
 import redis
-import json
 import hashlib
+import datetime
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 from django.conf import settings
+from django.db import connection
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache, RedisCacheClient
+
+from . import cache_codec
+from .metrics import record_cache
+from .stampede_cache import StampedeCache, MISS
 
 logger = logging.getLogger(__name__)
 
 
+class RedisCircuitBreaker:
+    """
+    Circuit breaker для Redis.
+
+    closed → (failure_threshold помилок поспіль) → open → (reset_timeout секунд) → half-open.
+    У стані half-open пропускаємо запити: перший успіх закриває breaker, помилка — знову відкриває.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """Чи можна зараз звертатись до Redis."""
+        if self._state == self.CLOSED:
+            return True
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                logger.info("🔌 [REDIS] Circuit half-open, probing Redis")
+            return self._state != self.OPEN
+
+    def record_success(self):
+        # Гарячий шлях: у закритому стані без помилок нічого не робимо (без lock)
+        if self._state == self.CLOSED and self._failures == 0:
+            return
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("✅ [REDIS] Circuit closed, Redis is back")
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self, error: Optional[Exception] = None):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                logger.warning(
+                    f"⚠️ [REDIS] Circuit opened for {self.reset_timeout}s after {self._failures} failure(s): {error}. "
+                    f"Falling back to non-cached mode."
+                )
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+
+
+redis_breaker = RedisCircuitBreaker(
+    failure_threshold=getattr(settings, 'REDIS_BREAKER_FAILURE_THRESHOLD', 3),
+    reset_timeout=getattr(settings, 'REDIS_BREAKER_RESET_TIMEOUT', 30),
+)
+
+
+class BreakerConnection(redis.Connection):
+    """Connection, що звітує circuit breaker-у про мережеві помилки та успішні відповіді."""
+
+    def send_packed_command(self, command, check_health=True):
+        try:
+            return super().send_packed_command(command, check_health=check_health)
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            redis_breaker.record_failure(e)
+            raise
+
+    def read_response(self, *args, **kwargs):
+        try:
+            response = super().read_response(*args, **kwargs)
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            redis_breaker.record_failure(e)
+            raise
+        redis_breaker.record_success()
+        return response
+
+
+_pools: Dict[bool, redis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(decode_responses: bool = True) -> redis.ConnectionPool:
+    """
+    Спільний для процесу ConnectionPool.
+
+    Окремі пули для str (decode_responses=True) та bytes відповідей: рядкові кеші
+    працюють з str, а Django cache і бінарні payload-и — з bytes.
+    """
+    pool = _pools.get(decode_responses)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(decode_responses)
+            if pool is None:
+                pool = redis.ConnectionPool(
+                    connection_class=BreakerConnection,
+                    host=getattr(settings, 'REDIS_HOST', 'localhost'),
+                    port=getattr(settings, 'REDIS_PORT', 6379),
+                    db=getattr(settings, 'REDIS_DB', 0),
+                    decode_responses=decode_responses,
+                    socket_connect_timeout=5,
+                    socket_timeout=5,
+                    health_check_interval=30,
+                    max_connections=getattr(settings, 'REDIS_MAX_CONNECTIONS', 50),
+                )
+                _pools[decode_responses] = pool
+    return pool
+
+
+def get_redis_client(decode_responses: bool = True) -> redis.Redis:
+    """Легкий клієнт поверх спільного пулу (створення не відкриває з'єднань)."""
+    return redis.Redis(connection_pool=get_connection_pool(decode_responses))
+
+
 class RedisService:
     """Service for Redis operations with program data."""
     
-    def __init__(self):
-        """Initialize Redis connection."""
-        redis_host = getattr(settings, 'REDIS_HOST', 'localhost')
-        redis_port = getattr(settings, 'REDIS_PORT', 6379)
-        redis_db = getattr(settings, 'REDIS_DB', 0)
-        
-        try:
-            self.client = redis.Redis(
-                host=redis_host,
-                port=redis_port,
-                db=redis_db,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-            )
-            # Test connection
-            self.client.ping()
-            logger.info(f"✅ Redis connected: {redis_host}:{redis_port}/{redis_db}")
-        except redis.ConnectionError as e:
-            logger.warning(f"⚠️ Redis not available: {e}. Falling back to non-cached mode.")
-            self.client = None
+    def __init__(self, decode_responses: bool = True):
+        """Use the shared connection pool; Redis health is tracked lazily by the circuit breaker."""
+        self.client = get_redis_client(decode_responses)
+        # Chunks та grouped results зберігаються бінарно (див. cache_codec)
+        self.binary_client = get_redis_client(decode_responses=False)
     
     def is_available(self) -> bool:
-        """Check if Redis is available."""
-        return self.client is not None
+        """Check if Redis is available (circuit breaker is not open)."""
+        return redis_breaker.allow()
     
     def cache_programs_chunk(self, chunk_key: str, programs: List[Dict], ttl: int = 300):
         """
@@ -56,12 +180,9 @@ class RedisService:
             return
         
         try:
-            self.client.setex(
-                chunk_key,
-                ttl,
-                json.dumps(programs)
-            )
-            logger.debug(f"📦 Cached {len(programs)} programs to {chunk_key}")
+            payload = cache_codec.encode(programs)
+            self.binary_client.setex(chunk_key, ttl, payload)
+            logger.debug(f"📦 Cached {len(programs)} programs to {chunk_key} ({len(payload)} bytes)")
         except Exception as e:
             logger.error(f"Failed to cache chunk {chunk_key}: {e}")
     
@@ -76,14 +197,17 @@ class RedisService:
             List of programs or None if not found
         """
         if not self.is_available():
+            record_cache('redis_chunk', 'unavailable')
             return None
         
         try:
-            data = self.client.get(chunk_key)
+            data = self.binary_client.get(chunk_key)
+            record_cache('redis_chunk', 'hit' if data else 'miss')
             if data:
-                return json.loads(data)
+                return cache_codec.decode(data)
             return None
         except Exception as e:
+            record_cache('redis_chunk', 'error')
             logger.error(f"Failed to get chunk {chunk_key}: {e}")
             return None
     
@@ -100,12 +224,9 @@ class RedisService:
             return
         
         try:
-            self.client.setex(
-                cache_key,
-                ttl,
-                json.dumps(grouped_data)
-            )
-            logger.info(f"💾 Cached grouped result to {cache_key} (TTL: {ttl}s)")
+            payload = cache_codec.encode(grouped_data)
+            self.binary_client.setex(cache_key, ttl, payload)
+            logger.info(f"💾 Cached grouped result to {cache_key} (TTL: {ttl}s, {len(payload)} bytes)")
         except Exception as e:
             logger.error(f"Failed to cache grouped result: {e}")
     
@@ -120,15 +241,18 @@ class RedisService:
             Grouped data or None if not found
         """
         if not self.is_available():
+            record_cache('redis_grouped', 'unavailable')
             return None
         
         try:
-            data = self.client.get(cache_key)
+            data = self.binary_client.get(cache_key)
+            record_cache('redis_grouped', 'hit' if data else 'miss')
             if data:
                 logger.info(f"✅ Retrieved cached grouped result from {cache_key}")
-                return json.loads(data)
+                return cache_codec.decode(data)
             return None
         except Exception as e:
+            record_cache('redis_grouped', 'error')
             logger.error(f"Failed to get grouped result: {e}")
             return None
     
@@ -185,6 +309,65 @@ class RedisService:
             logger.error(f"Failed to clear cache for user {username}: {e}")
 
 
+class RedisCodecCache:
+    """
+    Django-cache-подібний адаптер (get/set/add/delete) над RedisService.
+
+    Значення кодуються через cache_codec (бінарно), тож StampedeCache може
+    тримати великі grouped results у тому ж форматі, що й cache_grouped_result.
+    """
+
+    def __init__(self, redis_service: RedisService):
+        self.redis = redis_service
+
+    def get(self, key: str, default=None):
+        if not self.redis.is_available():
+            return default
+        try:
+            data = self.redis.binary_client.get(key)
+            return cache_codec.decode(data) if data else default
+        except Exception as e:
+            logger.error(f"Failed to get {key}: {e}")
+            return default
+
+    def set(self, key: str, value: Any, timeout: int):
+        if not self.redis.is_available():
+            return
+        try:
+            self.redis.binary_client.setex(key, timeout, cache_codec.encode(value))
+        except Exception as e:
+            logger.error(f"Failed to cache {key}: {e}")
+
+    def add(self, key: str, value: Any, timeout: int) -> bool:
+        if not self.redis.is_available():
+            return False
+        try:
+            return bool(self.redis.binary_client.set(key, cache_codec.encode(value), ex=timeout, nx=True))
+        except Exception as e:
+            logger.error(f"Failed to add {key}: {e}")
+            return False
+
+    def delete(self, key: str):
+        if not self.redis.is_available():
+            return
+        try:
+            self.redis.binary_client.delete(key)
+        except Exception as e:
+            logger.error(f"Failed to delete {key}: {e}")
+
+
+class IncompleteFetchError(Exception):
+    """Не всі сторінки програм завантажились; такий результат не можна кешувати."""
+
+    def __init__(self, programs: List[Dict], failed_offsets: List[int], total_count: int):
+        self.programs = programs
+        self.failed_offsets = failed_offsets
+        self.total_count = total_count
+        super().__init__(
+            f"Fetched {len(programs)}/{total_count} programs, failed offsets: {failed_offsets}"
+        )
+
+
 class ProgramGroupingService:
     """Service for grouping programs by business_id with external sorting."""
     
@@ -197,50 +380,73 @@ class ProgramGroupingService:
         """
         self.redis = redis_service
     
-    def fetch_all_programs_batch(self, fetch_function, batch_size: int = 40, username: str = None) -> List[Dict]:
+    def fetch_all_programs_batch(
+        self,
+        fetch_function,
+        batch_size: int = 40,
+        username: str = None,
+        max_workers: int = 10,
+    ) -> List[Dict]:
         """
-        Fetch all programs using pagination and caching.
+        Fetch all programs: first page for total_count, then the remaining pages in parallel.
         
         Args:
             fetch_function: Function to fetch programs (takes offset, limit, username)
             batch_size: Number of programs per batch
             username: Username for authentication
+            max_workers: Max concurrent page requests
             
         Returns:
-            List of all programs
+            List of all programs (ordered by offset, deduplicated by program_id)
+            
+        Raises:
+            IncompleteFetchError: if any page failed; carries the programs that were fetched
         """
-        all_programs = []
-        offset = 0
-        max_iterations = 1000  # Safety limit
-        
-        logger.info(f"🔄 Starting batch fetch with batch_size={batch_size}")
-        
-        for iteration in range(max_iterations):
+        def fetch_page(offset: int) -> Dict:
             try:
-                logger.info(f"📥 Fetching batch {iteration + 1} (offset={offset}, limit={batch_size})")
-                
-                # Fetch batch
-                result = fetch_function(offset=offset, limit=batch_size, program_status='ALL', username=username)
-                programs = result.get('programs', [])
-                total_count = result.get('total_count', 0)
-                
-                if not programs:
-                    logger.info(f"✅ No more programs. Total fetched: {len(all_programs)}")
-                    break
-                
-                all_programs.extend(programs)
-                logger.info(f"📊 Batch {iteration + 1}: {len(programs)} programs (total: {len(all_programs)}/{total_count})")
-                
-                # Check if we've fetched everything
-                if len(all_programs) >= total_count:
-                    logger.info(f"✅ Fetched all {len(all_programs)} programs")
-                    break
-                
-                offset += batch_size
-                
-            except Exception as e:
-                logger.error(f"❌ Error fetching batch at offset {offset}: {e}")
-                break
+                return fetch_function(offset=offset, limit=batch_size, program_status='ALL', username=username)
+            finally:
+                # Потоки пулу не мають закритих Django-з'єднань після себе
+                if threading.current_thread() is not threading.main_thread():
+                    connection.close()
+        
+        # 1. Перша сторінка дає total_count (помилка тут — одразу нагору)
+        first = fetch_function(offset=0, limit=batch_size, program_status='ALL', username=username)
+        total_count = first.get('total_count', 0)
+        pages = {0: first.get('programs', [])}
+        offsets = list(range(batch_size, total_count, batch_size))
+        failed_offsets = []
+        
+        logger.info(f"🔄 Fetching {total_count} programs: 1 + {len(offsets)} pages (batch_size={batch_size}, workers={max_workers})")
+        
+        # 2. Решта сторінок паралельно
+        if offsets:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as executor:
+                futures = {executor.submit(fetch_page, offset): offset for offset in offsets}
+                for future in as_completed(futures):
+                    offset = futures[future]
+                    try:
+                        pages[offset] = future.result().get('programs', [])
+                    except Exception as e:
+                        logger.error(f"❌ Error fetching batch at offset {offset}: {e}")
+                        failed_offsets.append(offset)
+        
+        # 3. Склеюємо за offset; при зсуві пагінації одна програма може прийти двічі
+        all_programs = []
+        seen = set()
+        for offset in sorted(pages):
+            for program in pages[offset]:
+                program_id = program.get('program_id')
+                if program_id in seen:
+                    continue
+                if program_id:
+                    seen.add(program_id)
+                all_programs.append(program)
+        
+        if failed_offsets:
+            raise IncompleteFetchError(all_programs, sorted(failed_offsets), total_count)
+        if len(all_programs) != total_count:
+            logger.warning(f"⚠️ Fetched {len(all_programs)} programs but API reported {total_count} (data changed during fetch)")
         
         logger.info(f"🎉 Batch fetch complete: {len(all_programs)} total programs")
         return all_programs
@@ -316,6 +522,154 @@ class ProgramGroupingService:
         logger.info(f"✅ Grouped into {len(result)} businesses")
         return result
     
+    @staticmethod
+    def _to_cents(amount) -> int:
+        return int(round(float(amount) * 100)) if amount else 0
+    
+    @classmethod
+    def _registry_row_to_program(cls, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Рядок ProgramRegistry.values() → програма у форматі /programs/v1 (суми в центах)."""
+        program = {
+            'program_id': row['program_id'],
+            'program_type': row['program_name'],
+            'program_status': row['program_status'] or row['status'],
+            'program_pause_status': row['program_pause_status'],
+            'yelp_business_id': row['yelp_business_id'],
+            'start_date': row['start_date'].isoformat() if row['start_date'] else None,
+            'end_date': row['end_date'].isoformat() if row['end_date'] else None,
+            'active_features': row['active_features'] or [],
+        }
+        if row['budget'] is not None:
+            program['program_metrics'] = {
+                'budget': cls._to_cents(row['budget']),
+                'currency': row['currency'] or 'USD',
+                'is_autobid': row['is_autobid'],
+                'max_bid': cls._to_cents(row['max_bid']) if row['max_bid'] else None,
+                'billed_impressions': row['billed_impressions'] or 0,
+                'billed_clicks': row['billed_clicks'] or 0,
+                'ad_cost': cls._to_cents(row['ad_cost']),
+                'fee_period': row['fee_period'],
+            }
+        return program
+    
+    def group_programs_from_db(
+        self,
+        username: str,
+        program_status: str = 'ALL',
+        include_programs: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Те саме групування, що й group_programs_by_business, але з БД: без фільтру статусу —
+        з готових BusinessRollup, з фільтром — одним GROUP BY по ProgramRegistry.
+        
+        Args:
+            username: Partner username
+            program_status: Фільтр по ProgramRegistry.status (CURRENT, PAST, FUTURE, PAUSED або ALL)
+            include_programs: Додати програми кожного бізнесу (ще один запит, без API)
+            
+        Returns:
+            List of grouped business data with statistics (суми в центах, як у API)
+        """
+        from django.db.models import Count, Q, Sum, Value
+        from django.db.models.functions import Coalesce, NullIf
+        from .models import ProgramRegistry
+        from .rollup_service import BusinessRollupService
+        
+        query = ProgramRegistry.objects.filter(username=username)
+        if program_status and program_status != 'ALL':
+            query = query.filter(status=program_status)
+        group_key = Coalesce(NullIf('yelp_business_id', Value('')), Value('Unknown'))
+        
+        if not program_status or program_status == 'ALL':
+            # Без фільтру — готові BusinessRollup
+            rows = [
+                {
+                    'group_business_id': rollup.yelp_business_id or 'Unknown',
+                    'total_count': rollup.total_count,
+                    'active_count': rollup.active_count,
+                    'paused_count': rollup.paused_count,
+                    'terminated_count': rollup.terminated_count,
+                    'total_budget': rollup.total_budget,
+                    'total_spend': rollup.total_spend,
+                    'total_impressions': rollup.total_impressions,
+                    'total_clicks': rollup.total_clicks,
+                }
+                for rollup in BusinessRollupService.get_rollups(username)
+            ]
+            rows.sort(key=lambda row: (row['total_count'], row['group_business_id']), reverse=True)
+        else:
+            rows = (
+                query
+                .annotate(group_business_id=group_key)
+                .values('group_business_id')
+                .annotate(
+                    total_count=Count('id'),
+                    active_count=Count('id', filter=Q(program_status='ACTIVE')),
+                    paused_count=Count('id', filter=Q(program_pause_status='PAUSED')),
+                    terminated_count=Count('id', filter=Q(program_status='TERMINATED')),
+                    total_budget=Sum('budget'),
+                    total_spend=Sum('ad_cost'),
+                    total_impressions=Sum('billed_impressions'),
+                    total_clicks=Sum('billed_clicks'),
+                )
+                .order_by('-total_count', '-group_business_id')
+            )
+        
+        result = [
+            {
+                'business_id': row['group_business_id'],
+                'programs': [],
+                'stats': {
+                    'total_count': row['total_count'],
+                    'active_count': row['active_count'],
+                    'paused_count': row['paused_count'],
+                    'terminated_count': row['terminated_count'],
+                    'total_budget': self._to_cents(row['total_budget']),
+                    'total_spend': self._to_cents(row['total_spend']),
+                    'total_impressions': row['total_impressions'] or 0,
+                    'total_clicks': row['total_clicks'] or 0,
+                },
+            }
+            for row in rows
+        ]
+        
+        if include_programs and result:
+            groups = {group['business_id']: group for group in result}
+            program_rows = (
+                query
+                .annotate(group_business_id=group_key)
+                .order_by('group_business_id', 'program_id')
+                .values(
+                    'group_business_id', 'program_id', 'program_name', 'program_status', 'status',
+                    'program_pause_status', 'yelp_business_id', 'start_date', 'end_date',
+                    'budget', 'currency', 'is_autobid', 'max_bid', 'billed_impressions',
+                    'billed_clicks', 'ad_cost', 'fee_period', 'active_features',
+                )
+            )
+            for row in program_rows.iterator(chunk_size=2000):
+                groups[row['group_business_id']]['programs'].append(self._registry_row_to_program(row))
+        
+        logger.info(f"✅ Grouped {username}'s programs into {len(result)} businesses in DB")
+        return result
+    
+    def get_grouped_programs_from_db(
+        self,
+        username: str,
+        program_status: str = 'ALL',
+        include_programs: bool = False,
+    ) -> Dict[str, Any]:
+        """Аналог get_all_grouped_programs без crawl-у API: дані з ProgramRegistry (станом на останній sync)."""
+        grouped = self.group_programs_from_db(username, program_status, include_programs)
+        return {
+            'total_programs': sum(group['stats']['total_count'] for group in grouped),
+            'total_businesses': len(grouped),
+            'grouped_by_business': grouped,
+            'from_cache': False,
+            'from_db': True,
+            'partial': False,
+            'cached_until': None,
+        }
+    
     def get_all_grouped_programs(
         self,
         fetch_function,
@@ -327,7 +681,7 @@ class ProgramGroupingService:
         """
         Main method to get all programs grouped by business_id.
         
-        Uses Redis caching to avoid repeated API calls.
+        Uses stampede-safe Redis caching (see StampedeCache) to avoid repeated API crawls.
         
         Args:
             fetch_function: Function to fetch programs from Yelp API
@@ -339,39 +693,111 @@ class ProgramGroupingService:
         Returns:
             Dictionary with grouped programs and metadata
         """
-        # Generate cache key
-        cache_key = self.redis.generate_cache_key(username, program_status)
+        def group(all_programs: List[Dict]) -> Dict[str, Any]:
+            grouped = self.group_programs_by_business(all_programs)
+            return {
+                'total_programs': len(all_programs),
+                'total_businesses': len(grouped),
+                'grouped_by_business': grouped,
+                'from_cache': False,
+                'partial': False,
+                'cached_until': (datetime.datetime.now() + datetime.timedelta(seconds=cache_ttl)).isoformat(),
+            }
+        
+        def build_result() -> Dict[str, Any]:
+            logger.info(f"🔄 Fetching all programs for {username} (status={program_status})")
+            result = group(self.fetch_all_programs_batch(fetch_function, batch_size=40, username=username))
+            logger.info(f"✅ Returning fresh grouped result: {result['total_programs']} programs in {result['total_businesses']} businesses")
+            return result
+        
+        def partial_result(error: IncompleteFetchError) -> Dict[str, Any]:
+            # Неповне групування віддаємо з позначкою, але ніколи не кешуємо
+            logger.warning(f"⚠️ Returning PARTIAL grouped result for {username}: {error}")
+            result = group(error.programs)
+            result.update({
+                'partial': True,
+                'expected_total_programs': error.total_count,
+                'failed_offsets': error.failed_offsets,
+                'cached_until': None,
+            })
+            return result
         
-        # Try to get from cache
-        if use_cache and self.redis.is_available():
-            cached = self.redis.get_grouped_result(cache_key)
-            if cached:
-                logger.info(f"💾 Returning cached result for {username}")
-                cached['from_cache'] = True
-                return cached
-        
-        # Fetch all programs
-        logger.info(f"🔄 Fetching all programs for {username} (status={program_status})")
-        all_programs = self.fetch_all_programs_batch(fetch_function, batch_size=40, username=username)
-        
-        # Group by business_id
-        grouped = self.group_programs_by_business(all_programs)
-        
-        # Prepare result
-        result = {
-            'total_programs': len(all_programs),
-            'total_businesses': len(grouped),
-            'grouped_by_business': grouped,
-            'from_cache': False,
-            'cached_until': None,
-        }
-        
-        # Cache result
-        if use_cache and self.redis.is_available():
-            self.redis.cache_grouped_result(cache_key, result, ttl=cache_ttl)
-            import datetime
-            result['cached_until'] = (datetime.datetime.now() + datetime.timedelta(seconds=cache_ttl)).isoformat()
-        
-        logger.info(f"✅ Returning fresh grouped result: {len(all_programs)} programs in {len(grouped)} businesses")
+        try:
+            if not (use_cache and self.redis.is_available()):
+                result = build_result()
+                result['cached_until'] = None
+                return result
+            
+            # Stampede-safe: crawl виконує лише один запит (lock), решта отримують stale
+            # результат ще cache_ttl секунд після soft TTL або чекають на свіжий.
+            # IncompleteFetchError з build_result не потрапляє в кеш (є stale — віддаємо його).
+            cache_key = self.redis.generate_cache_key(username, program_status)
+            stampede = StampedeCache(RedisCodecCache(self.redis), lock_timeout=600, wait_timeout=30)
+            result, cache_status = stampede.get_or_compute(cache_key, build_result, ttl=cache_ttl)
+            record_cache('grouped_programs', cache_status)
+        except IncompleteFetchError as e:
+            return partial_result(e)
+        
+        if cache_status != MISS:
+            logger.info(f"💾 Returning cached result for {username} ({cache_status})")
+            result['from_cache'] = True
         return result
 
+
+class SharedPoolRedisCacheClient(RedisCacheClient):
+    """Django RedisCacheClient, що бере з'єднання зі спільного (bytes) пулу замість власного."""
+
+    def _get_connection_pool(self, write):
+        return get_connection_pool(decode_responses=False)
+
+
+class SharedPoolRedisCache(RedisCache):
+    """
+    Django cache backend на спільному пулі з circuit breaker.
+
+    Поки breaker відкритий (або Redis падає), кеш поводиться як порожній:
+    читання повертають default, записи ігноруються — view-и працюють без кешу.
+    LOCATION ігнорується: адресу беремо з REDIS_HOST/REDIS_PORT/REDIS_DB.
+    """
+
+    _ERRORS = (redis.ConnectionError, redis.TimeoutError)
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = SharedPoolRedisCacheClient
+
+    def _guarded(self, fallback, method, *args, **kwargs):
+        if not redis_breaker.allow():
+            return fallback
+        try:
+            return method(*args, **kwargs)
+        except self._ERRORS as e:
+            logger.warning(f"⚠️ [CACHE] Redis cache unavailable: {e}")
+            return fallback
+
+    def get(self, key, default=None, version=None):
+        return self._guarded(default, super().get, key, default, version)
+
+    def get_many(self, keys, version=None):
+        return self._guarded({}, super().get_many, keys, version)
+
+    def has_key(self, key, version=None):
+        return self._guarded(False, super().has_key, key, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._guarded(False, super().add, key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._guarded(None, super().set, key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._guarded(list(data), super().set_many, data, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._guarded(False, super().touch, key, timeout, version)
+
+    def delete(self, key, version=None):
+        return self._guarded(False, super().delete, key, version)
+
+    def delete_many(self, keys, version=None):
+        return self._guarded(None, super().delete_many, keys, version)
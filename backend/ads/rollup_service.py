@@ -0,0 +1,242 @@
+"""
+Інкрементальне оновлення BusinessRollup.
+
+Bulk-операції передають набір змінених програм; sync порівнює знімок полів, від яких
+залежить rollup, до і після запису (snapshot / refresh_changed) — API повертає всі програми,
+але змінюється зазвичай кілька. Перераховуються лише бізнеси, яких торкнулись зміни
+(до і після), одним GROUP BY по ProgramRegistry.
+Споживачі (get_business_ids_for_user, AvailableFiltersView, групування) читають
+готові рядки через get_rollups.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+
+from .models import BusinessRollup, ProgramRegistry
+
+logger = logging.getLogger(__name__)
+
+
+# Поля ProgramRegistry, які читає refresh(): зміна будь-якого з них змінює rollup бізнесу
+ROLLUP_FIELDS = (
+    'yelp_business_id', 'business_id', 'status', 'program_name', 'program_status', 'program_pause_status',
+    'budget', 'ad_cost', 'billed_impressions', 'billed_clicks',
+)
+
+
+class BusinessRollupService:
+    """Підтримка та читання BusinessRollup."""
+
+    # Статуси фронтенду (AvailableFiltersView) → facet. FUTURE залежить від сьогоднішньої
+    # дати, тому не кешується в rollup (None = рахувати живим запитом).
+    FILTER_STATUS_FACETS = {
+        'ALL': 'ALL',
+        'CURRENT': 'program_status:ACTIVE',
+        'ACTIVE': 'program_status:ACTIVE',
+        'INACTIVE': 'program_status:INACTIVE',
+        'TERMINATED': 'program_status:TERMINATED',
+        'EXPIRED': 'program_status:EXPIRED',
+        'PAST': 'PAST',
+        'PAUSED': 'PAUSED',
+        'FUTURE': None,
+    }
+
+    @staticmethod
+    def program_facets(status: Optional[str], program_status: Optional[str], pause_status: Optional[str]) -> List[str]:
+        """Facet-и, до яких належить програма (див. фільтри BusinessIdsView та AvailableFiltersView)."""
+        facets = ['ALL']
+        if status:
+            facets.append(f'status:{status}')
+        if program_status:
+            facets.append(f'program_status:{program_status}')
+        if pause_status == 'PAUSED':
+            facets.append('PAUSED')
+        if program_status == 'INACTIVE' and pause_status == 'NOT_PAUSED':
+            facets.append('PAST')
+        return facets
+
+    @classmethod
+    def filter_status_facet(cls, program_status: Optional[str]) -> Optional[str]:
+        """Facet для program_status з AvailableFiltersView (невідомі статуси там не фільтрують → ALL)."""
+        if not program_status:
+            return 'ALL'
+        return cls.FILTER_STATUS_FACETS.get(program_status, 'ALL')
+
+    @staticmethod
+    def business_ids_for_programs(username: str, program_ids: Iterable[str]) -> Set[str]:
+        """Бізнеси (з БД) для програм; '' — програми без бізнесу."""
+        program_ids = list(program_ids)
+        if not program_ids:
+            return set()
+        return {
+            business_id or ''
+            for business_id in ProgramRegistry.objects.filter(
+                username=username, program_id__in=program_ids
+            ).values_list('yelp_business_id', flat=True).distinct()
+        }
+
+    @classmethod
+    def refresh(cls, username: str, business_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Перераховує rollup-и користувача.
+
+        Args:
+            username: Ім'я користувача
+            business_ids: Змінені бізнеси ('' — без бізнесу); None — всі
+
+        Returns:
+            Кількість збережених rollup-рядків
+        """
+        query = ProgramRegistry.objects.filter(username=username)
+        if business_ids is not None:
+            business_ids = set(business_ids)
+            if not business_ids:
+                return 0
+            business_filter = Q(yelp_business_id__in=business_ids - {''})
+            if '' in business_ids:
+                business_filter |= Q(yelp_business_id__isnull=True) | Q(yelp_business_id='')
+            query = query.filter(business_filter)
+
+        rows = (
+            query
+            .values('yelp_business_id', 'status', 'program_name', 'program_status', 'program_pause_status')
+            .annotate(
+                n=Count('id'),
+                budget=Sum('budget'),
+                spend=Sum('ad_cost'),
+                impressions=Sum('billed_impressions'),
+                clicks=Sum('billed_clicks'),
+                business_pk=Max('business_id'),
+            )
+        )
+
+        rollups: Dict[str, BusinessRollup] = {}
+        for row in rows:
+            business_id = row['yelp_business_id'] or ''
+            rollup = rollups.get(business_id)
+            if rollup is None:
+                rollup = rollups[business_id] = BusinessRollup(
+                    username=username, yelp_business_id=business_id,
+                    total_budget=Decimal('0'), total_spend=Decimal('0'), facet_counts={},
+                )
+            n = row['n']
+            rollup.total_count += n
+            if row['program_status'] == 'ACTIVE':
+                rollup.active_count += n
+            if row['program_status'] == 'TERMINATED':
+                rollup.terminated_count += n
+            if row['program_pause_status'] == 'PAUSED':
+                rollup.paused_count += n
+            rollup.total_budget += row['budget'] or 0
+            rollup.total_spend += row['spend'] or 0
+            rollup.total_impressions += row['impressions'] or 0
+            rollup.total_clicks += row['clicks'] or 0
+            if row['business_pk'] and not rollup.business_id:
+                rollup.business_id = row['business_pk']
+
+            program_type = row['program_name'] or ''
+            for facet in cls.program_facets(row['status'], row['program_status'], row['program_pause_status']):
+                by_type = rollup.facet_counts.setdefault(facet, defaultdict(int))
+                by_type[program_type] += n
+
+        for rollup in rollups.values():
+            rollup.facet_counts = {facet: dict(by_type) for facet, by_type in rollup.facet_counts.items()}
+
+        stale = BusinessRollup.objects.filter(username=username).exclude(yelp_business_id__in=list(rollups))
+        if business_ids is not None:
+            stale = stale.filter(yelp_business_id__in=business_ids)
+
+        with transaction.atomic():
+            deleted, _ = stale.delete()
+            if rollups:
+                BusinessRollup.objects.bulk_create(
+                    list(rollups.values()),
+                    update_conflicts=True,
+                    unique_fields=['username', 'yelp_business_id'],
+                    update_fields=[
+                        'business', 'total_count', 'active_count', 'paused_count', 'terminated_count',
+                        'total_budget', 'total_spend', 'total_impressions', 'total_clicks',
+                        'facet_counts', 'updated_at',
+                    ],
+                    batch_size=1000,
+                )
+
+        scope = 'all' if business_ids is None else len(business_ids)
+        logger.info(f"📊 [ROLLUP] {username}: refreshed {len(rollups)} business rollups (scope: {scope}), removed {deleted}")
+        return len(rollups)
+
+    @classmethod
+    def refresh_for_programs(cls, username: str, program_ids: Iterable[str], before: Iterable[str] = ()) -> int:
+        """
+        Оновлює rollup-и після зміни програм.
+
+        Args:
+            username: Ім'я користувача
+            program_ids: Змінені (створені/оновлені) програми — бізнеси беремо з БД після зміни
+            before: Бізнеси цих та видалених програм до зміни (див. business_ids_for_programs)
+        """
+        business_ids = set(before) | cls.business_ids_for_programs(username, program_ids)
+        return cls.refresh(username, business_ids)
+
+    @classmethod
+    def safe_refresh_for_programs(cls, username: str, program_ids: Iterable[str], before: Iterable[str] = ()) -> int:
+        """refresh_for_programs для sync/bulk: помилка rollup-у не повинна ламати саму операцію."""
+        try:
+            return cls.refresh_for_programs(username, program_ids, before)
+        except Exception as e:
+            logger.error(f"❌ [ROLLUP] Failed to refresh rollups for {username}: {e}", exc_info=True)
+            return 0
+
+    @staticmethod
+    def snapshot(username: str) -> Optional[Dict[str, Tuple]]:
+        """
+        program_id → значення ROLLUP_FIELDS (один SELECT по користувачу, без IN-списків).
+        None, якщо знімок не вдався — тоді refresh_changed перерахує все.
+        """
+        try:
+            return {
+                row[0]: row[1:]
+                for row in ProgramRegistry.objects.filter(username=username)
+                .values_list('program_id', *ROLLUP_FIELDS).iterator(chunk_size=5000)
+            }
+        except Exception as e:
+            logger.error(f"❌ [ROLLUP] Failed to snapshot programs of {username}: {e}", exc_info=True)
+            return None
+
+    @classmethod
+    def refresh_changed(cls, username: str, before: Optional[Dict[str, Tuple]]) -> int:
+        """Перераховує бізнеси програм, що додались, зникли або змінили ROLLUP_FIELDS після snapshot()."""
+        after = cls.snapshot(username) if before is not None else None
+        if after is None:
+            return cls.refresh(username)
+        business_ids = set()
+        for program_id in before.keys() | after.keys():
+            old, new = before.get(program_id), after.get(program_id)
+            if old != new:
+                business_ids.update(row[0] or '' for row in (old, new) if row is not None)
+        if not business_ids:
+            logger.info(f"📊 [ROLLUP] {username}: no rollup fields changed, nothing to refresh")
+            return 0
+        return cls.refresh(username, business_ids)
+
+    @classmethod
+    def safe_refresh_changed(cls, username: str, before: Optional[Dict[str, Tuple]]) -> int:
+        """refresh_changed для sync: помилка rollup-у не повинна ламати саму синхронізацію."""
+        try:
+            return cls.refresh_changed(username, before)
+        except Exception as e:
+            logger.error(f"❌ [ROLLUP] Failed to refresh rollups for {username}: {e}", exc_info=True)
+            return 0
+
+    @classmethod
+    def get_rollups(cls, username: str) -> List[BusinessRollup]:
+        """Rollup-и користувача (з Business для назв); якщо їх ще немає — будує з нуля."""
+        rollups = list(BusinessRollup.objects.filter(username=username).select_related('business'))
+        if not rollups and ProgramRegistry.objects.filter(username=username).exists():
+            cls.refresh(username)
+            rollups = list(BusinessRollup.objects.filter(username=username).select_related('business'))
+        return rollups
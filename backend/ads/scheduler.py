@@ -0,0 +1,405 @@
+"""
+Єдиний планувальник для відкладених операцій (ScheduledPause / ScheduledBudgetUpdate).
+
+Замість двох окремих циклів, які раз на хвилину опитували БД і виконували
+операції по одній, воркер:
+- тримає PENDING операції в in-memory heap, впорядкованому за scheduled_datetime;
+- спить рівно до найближчого дедлайну (або до сигналу в Redis про новий розклад);
+- виконує всі операції, що настали, паралельно в обмеженому пулі потоків;
+- бере lease (claimed_by / lease_expires_at) через SELECT ... FOR UPDATE SKIP LOCKED,
+  тож кілька воркерів можуть працювати одночасно без дублювання операцій.
+"""
+import heapq
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .metrics import SCHEDULER_OPERATIONS, observe_scheduler_lag
+from .models import ScheduledPause, ScheduledBudgetUpdate
+from .redis_service import RedisService
+from .services import YelpService
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_WAKEUP_CHANNEL = 'yelp_ads:scheduler:wakeup'
+
+
+def notify_scheduler(kind: str = None):
+    """
+    Будить воркер планувальника після створення/зміни розкладу.
+
+    Помилки Redis не критичні: воркер все одно перечитує БД кожні resync_interval секунд.
+    """
+    try:
+        redis_service = RedisService()
+        if redis_service.is_available():
+            redis_service.client.publish(SCHEDULER_WAKEUP_CHANNEL, kind or '')
+    except Exception as e:
+        logger.warning(f"⚠️ [SCHEDULER] Failed to publish wakeup signal: {e}")
+
+
+def execute_scheduled_pause(pause: ScheduledPause):
+    """Виконує одну заплановану паузу."""
+    return YelpService.pause_program(pause.program_id)
+
+
+def build_budget_update_payload(update: ScheduledBudgetUpdate) -> Dict:
+    """
+    Перетворює ScheduledBudgetUpdate у payload для YelpService.edit_program.
+
+    В моделі суми зберігаються в центах, а edit_program очікує долари.
+    """
+    payload = {}
+
+    if update.new_budget is not None:
+        payload['budget'] = float(update.new_budget) / 100
+
+    if update.is_autobid is not None:
+        payload['is_autobid'] = bool(update.is_autobid)
+        # max_bid має сенс лише для ручного бідінгу
+        if not update.is_autobid and update.max_bid is not None:
+            payload['max_bid'] = float(update.max_bid) / 100
+    elif update.max_bid is not None:
+        payload['max_bid'] = float(update.max_bid) / 100
+
+    if update.pacing_method:
+        payload['pacing_method'] = update.pacing_method
+
+    return payload
+
+
+def execute_scheduled_budget_update(update: ScheduledBudgetUpdate):
+    """Виконує одне заплановане оновлення параметрів програми."""
+    return YelpService.edit_program(update.program_id, build_budget_update_payload(update))
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Чи варто повторювати операцію після цієї помилки.
+
+    5xx/429 і мережеві збої - транзитні; 4xx та помилки валідації (ValueError) -
+    постійні, повтор нічого не змінить.
+    """
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is None or response.status_code >= 500 or response.status_code == 429
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class ScheduledOperationScheduler:
+    """
+    Воркер, що виконує відкладені операції точно в час і паралельно.
+
+    Heap містить кортежі (due_at, kind, id). Повний перелік PENDING
+    операцій перечитується з БД при сигналі або раз на resync_interval, тож
+    скасовані/видалені операції самі зникають з черги. Перед виконанням
+    операція claim-иться на lease_seconds; якщо воркер впаде, після закінчення
+    lease її підхопить інший воркер.
+
+    Транзитні помилки не переводять операцію у FAILED одразу: вона лишається
+    PENDING з next_attempt_at = now + backoff, а після max_attempts спроб
+    потрапляє в DEAD_LETTER.
+    """
+
+    OPERATIONS = {
+        'pause': (ScheduledPause, execute_scheduled_pause),
+        'budget': (ScheduledBudgetUpdate, execute_scheduled_budget_update),
+    }
+
+    def __init__(
+        self,
+        kinds: Optional[Iterable[str]] = None,
+        max_workers: int = 20,
+        resync_interval: int = 60,
+        lease_seconds: int = 300,
+        worker_id: Optional[str] = None,
+        max_attempts: int = 5,
+        retry_base_delay: int = 30,
+        retry_max_delay: int = 1800,
+    ):
+        self.kinds = list(kinds or self.OPERATIONS.keys())
+        unknown = set(self.kinds) - set(self.OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown scheduled operation kinds: {', '.join(sorted(unknown))}")
+
+        self.max_workers = max_workers
+        self.resync_interval = resync_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._heap: List[Tuple] = []
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._resync = threading.Event()
+        self._stop = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ------------------------------------------------------------------ heap
+
+    def refresh(self):
+        """
+        Перебудовує heap з усіх PENDING операцій у БД.
+
+        Операції, що чекають на retry, ставимо на next_attempt_at, а операції під
+        чужим активним lease - на момент закінчення lease (якщо той воркер впав,
+        ми підхопимо їх рівно тоді).
+        """
+        heap = []
+        for kind in self.kinds:
+            model, _ = self.OPERATIONS[kind]
+            rows = model.objects.filter(status='PENDING').values_list(
+                'id', 'scheduled_datetime', 'next_attempt_at', 'claimed_by', 'lease_expires_at'
+            )
+            for op_id, scheduled_at, next_attempt_at, claimed_by, lease_expires_at in rows:
+                due_at = max(scheduled_at, next_attempt_at) if next_attempt_at else scheduled_at
+                if claimed_by and claimed_by != self.worker_id and lease_expires_at:
+                    due_at = max(due_at, lease_expires_at)
+                heap.append((due_at, kind, op_id))
+
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+
+        logger.debug(f"🗓️ [SCHEDULER] Loaded {len(heap)} pending operations")
+
+    def _pop_due(self, now) -> List[Tuple[str, int]]:
+        """Знімає з heap усі операції з часом виконання <= now."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, kind, op_id = heapq.heappop(self._heap)
+                if (kind, op_id) not in self._in_flight:
+                    due.append((kind, op_id))
+        return due
+
+    def _seconds_until_next(self, now) -> float:
+        with self._lock:
+            if not self._heap:
+                return float(self.resync_interval)
+            delta = (self._heap[0][0] - now).total_seconds()
+        return max(0.0, min(delta, float(self.resync_interval)))
+
+    # ----------------------------------------------------------------- lease
+
+    def claim(self, kind: str, op_ids: List[int]) -> List[int]:
+        """
+        Атомарно бере lease на операції (SELECT ... FOR UPDATE SKIP LOCKED).
+
+        Рядки, які зараз claim-ить інший воркер, пропускаються без очікування;
+        операції з простроченим lease (воркер впав) забираються повторно.
+        """
+        if not op_ids:
+            return []
+
+        model, _ = self.OPERATIONS[kind]
+        now = timezone.now()
+        with transaction.atomic():
+            claimable = list(
+                model.objects.select_for_update(skip_locked=True)
+                .filter(id__in=op_ids, status='PENDING')
+                .filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now) | Q(claimed_by=self.worker_id))
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                .values_list('id', flat=True)
+            )
+            if claimable:
+                model.objects.filter(id__in=claimable).update(
+                    claimed_by=self.worker_id,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    updated_at=now,
+                )
+        return claimable
+
+    def _finish(self, kind: str, op_id: int, **fields) -> bool:
+        """Записує результат і знімає lease - лише якщо lease досі наш."""
+        model, _ = self.OPERATIONS[kind]
+        updated = model.objects.filter(id=op_id, claimed_by=self.worker_id).update(
+            claimed_by=None,
+            lease_expires_at=None,
+            updated_at=timezone.now(),
+            **fields,
+        )
+        if not updated:
+            logger.warning(f"⚠️ [SCHEDULER] Lost lease on {kind} #{op_id} before recording the result")
+        return bool(updated)
+
+    # ----------------------------------------------------------------- retry
+
+    def retry_delay(self, attempt: int) -> float:
+        """Експоненційний backoff з jitter: base * 2^(attempt-1), не більше retry_max_delay."""
+        delay = min(self.retry_base_delay * (2 ** (attempt - 1)), self.retry_max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _push(self, due_at, kind: str, op_id: int):
+        """Додає операцію в heap (без перечитування БД) і будить головний цикл."""
+        with self._lock:
+            heapq.heappush(self._heap, (due_at, kind, op_id))
+        self._wakeup.set()
+
+    def _handle_failure(self, kind: str, operation, error: Exception, attempt: int):
+        """FAILED для постійних помилок, PENDING + backoff для транзитних, DEAD_LETTER коли спроби вичерпано."""
+        if not is_transient_error(error):
+            self._finish(kind, operation.id, status='FAILED', error_message=str(error), attempt_count=attempt)
+            SCHEDULER_OPERATIONS.labels(kind, 'failed').inc()
+            logger.error(f"❌ [SCHEDULER] {kind} #{operation.id} for program {operation.program_id} failed: {error}")
+            return
+
+        if attempt >= self.max_attempts:
+            self._finish(
+                kind, operation.id, status='DEAD_LETTER', attempt_count=attempt,
+                error_message=f"Gave up after {attempt} attempts: {error}",
+            )
+            SCHEDULER_OPERATIONS.labels(kind, 'dead_letter').inc()
+            logger.error(
+                f"💀 [SCHEDULER] {kind} #{operation.id} for program {operation.program_id} "
+                f"moved to dead letter after {attempt} attempts: {error}"
+            )
+            return
+
+        next_attempt_at = timezone.now() + timedelta(seconds=self.retry_delay(attempt))
+        if self._finish(
+            kind, operation.id, attempt_count=attempt, next_attempt_at=next_attempt_at,
+            error_message=f"Attempt {attempt}/{self.max_attempts} failed: {error}",
+        ):
+            self._push(next_attempt_at, kind, operation.id)
+        SCHEDULER_OPERATIONS.labels(kind, 'retry').inc()
+        logger.warning(
+            f"🔁 [SCHEDULER] {kind} #{operation.id} for program {operation.program_id} failed "
+            f"(attempt {attempt}/{self.max_attempts}), retrying at {next_attempt_at}: {error}"
+        )
+
+    # ------------------------------------------------------------- execution
+
+    def execute(self, kind: str, op_id: int):
+        """Виконує одну операцію під lease цього воркера (в потоці пулу)."""
+        model, handler = self.OPERATIONS[kind]
+        try:
+            operation = model.objects.filter(id=op_id, status='PENDING', claimed_by=self.worker_id).first()
+            if operation is None:
+                # Скасовано, виконано або lease вже забрав інший воркер
+                return
+
+            logger.info(
+                f"⏰ [SCHEDULER] Executing {kind} #{op_id} for program {operation.program_id} "
+                f"(scheduled for {operation.scheduled_datetime})"
+            )
+            attempt = operation.attempt_count + 1
+            due_at = operation.scheduled_datetime
+            if operation.next_attempt_at and operation.next_attempt_at > due_at:
+                due_at = operation.next_attempt_at
+            observe_scheduler_lag(kind, due_at, timezone.now())
+            try:
+                handler(operation)
+            except Exception as e:
+                self._handle_failure(kind, operation, e, attempt)
+                return
+
+            self._finish(kind, op_id, status='EXECUTED', executed_at=timezone.now(), attempt_count=attempt)
+            SCHEDULER_OPERATIONS.labels(kind, 'executed').inc()
+            logger.info(f"✅ [SCHEDULER] {kind} #{op_id} for program {operation.program_id} executed")
+        except Exception as e:
+            logger.error(f"❌ [SCHEDULER] Unexpected error while executing {kind} #{op_id}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard((kind, op_id))
+            connection.close()
+
+    def dispatch_due(self) -> int:
+        """Claim-ить і відправляє в пул усі операції, час яких настав."""
+        due = self._pop_due(timezone.now())
+
+        by_kind: Dict[str, List[int]] = {}
+        for kind, op_id in due:
+            by_kind.setdefault(kind, []).append(op_id)
+
+        dispatched = 0
+        for kind, op_ids in by_kind.items():
+            claimed = self.claim(kind, op_ids)
+            with self._lock:
+                self._in_flight.update((kind, op_id) for op_id in claimed)
+            for op_id in claimed:
+                self._executor.submit(self.execute, kind, op_id)
+            dispatched += len(claimed)
+            if len(claimed) < len(op_ids):
+                logger.debug(f"🔒 [SCHEDULER] {len(op_ids) - len(claimed)} {kind} operations leased by other workers")
+
+        if dispatched:
+            logger.info(f"🚀 [SCHEDULER] Dispatched {dispatched} due operations")
+        return dispatched
+
+    # ---------------------------------------------------------------- wakeup
+
+    def _listen_for_wakeups(self):
+        """Фоновий потік: Redis pub/sub → self._wakeup."""
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                redis_service = RedisService()
+                if not redis_service.is_available():
+                    self._stop.wait(self.resync_interval)
+                    continue
+                pubsub = redis_service.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(SCHEDULER_WAKEUP_CHANNEL)
+                logger.info(f"📡 [SCHEDULER] Listening for wakeups on {SCHEDULER_WAKEUP_CHANNEL}")
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and (not message.get('data') or message['data'] in self.kinds):
+                        self._resync.set()
+                        self._wakeup.set()
+            except Exception as e:
+                logger.warning(f"⚠️ [SCHEDULER] Wakeup listener error: {e}, retrying in 5s")
+                self._stop.wait(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    # ------------------------------------------------------------------ loop
+
+    def run(self):
+        """Головний цикл воркера (блокує до stop() або KeyboardInterrupt)."""
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scheduler')
+        listener = threading.Thread(target=self._listen_for_wakeups, daemon=True)
+        listener.start()
+
+        last_refresh = 0.0
+        try:
+            while not self._stop.is_set():
+                self._wakeup.clear()
+                try:
+                    if self._resync.is_set() or time.monotonic() - last_refresh >= self.resync_interval:
+                        self._resync.clear()
+                        self.refresh()
+                        last_refresh = time.monotonic()
+
+                    self.dispatch_due()
+                except Exception as e:
+                    logger.error(f"❌ [SCHEDULER] Error in scheduler loop: {e}")
+                    connection.close()
+
+                self._wakeup.wait(self._seconds_until_next(timezone.now()))
+        finally:
+            self._stop.set()
+            self._executor.shutdown(wait=True)
+            logger.info("🛑 [SCHEDULER] Stopped")
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
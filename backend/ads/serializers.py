@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Program, Report, ProgramFeature, PortfolioProject, PortfolioPhoto, CustomSuggestedKeyword
 import re
+from decimal import Decimal
 
 class ProgramSerializer(serializers.ModelSerializer):
     program_id = serializers.SerializerMethodField()
@@ -485,3 +486,63 @@ class DuplicateProgramResponseSerializer(serializers.Serializer):
     original_program_id = serializers.CharField()
     copied_features = serializers.ListField(child=serializers.CharField())
     message = serializers.CharField()
+
+
+# ============= Bulk Program Operations Serializers =============
+
+class BulkProgramIdsSerializer(serializers.Serializer):
+    """Serializer for bulk pause/resume requests"""
+    program_ids = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        required=True,
+        help_text="List of program IDs to process"
+    )
+
+    MAX_PROGRAMS = 200
+
+    def validate_program_ids(self, value):
+        """Strip, deduplicate (preserving order) and cap the list"""
+        cleaned = list(dict.fromkeys(pid.strip() for pid in value if pid and pid.strip()))
+        if not cleaned:
+            raise serializers.ValidationError("At least one program_id is required")
+        if len(cleaned) > self.MAX_PROGRAMS:
+            raise serializers.ValidationError(
+                f"Too many programs: {len(cleaned)} (max {self.MAX_PROGRAMS})"
+            )
+        return cleaned
+
+
+class BulkEditProgramsSerializer(BulkProgramIdsSerializer):
+    """Serializer for bulk budget/bid edit requests (amounts in dollars)"""
+    budget = serializers.DecimalField(required=False, max_digits=12, decimal_places=2, help_text="Budget in dollars")
+    is_autobid = serializers.BooleanField(required=False)
+    max_bid = serializers.DecimalField(required=False, allow_null=True, max_digits=10, decimal_places=2, help_text="Max bid in dollars")
+    pacing_method = serializers.ChoiceField(required=False, choices=['paced', 'unpaced'])
+
+    def validate(self, data):
+        """Validate the shared edit payload once for all programs"""
+        if not any(field in data for field in ('budget', 'is_autobid', 'max_bid', 'pacing_method')):
+            raise serializers.ValidationError("Nothing to update: provide budget, is_autobid, max_bid or pacing_method")
+
+        budget = data.get('budget')
+        if budget is not None and budget < 25:
+            raise serializers.ValidationError("budget must be at least $25.00 (Yelp minimum requirement)")
+
+        max_bid = data.get('max_bid')
+        if max_bid is not None:
+            if data.get('is_autobid'):
+                raise serializers.ValidationError("max_bid cannot be set when is_autobid is true")
+            if max_bid < Decimal('0.25'):
+                raise serializers.ValidationError("max_bid must be at least $0.25")
+
+        return data
+
+
+class BulkProgramFeaturesSerializer(BulkProgramIdsSerializer, ProgramFeaturesRequestSerializer):
+    """Serializer for bulk features requests: the same features object for every program, validated once"""
+
+    def validate_features(self, value):
+        value = super().validate_features(value)
+        if not value:
+            raise serializers.ValidationError("Nothing to update: features must contain at least one feature type")
+        return value
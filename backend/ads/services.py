@@ -4,13 +4,32 @@ import threading
 import time
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
 from decimal import Decimal
-from .models import Program, Report, PartnerCredential, CustomSuggestedKeyword
+from .models import Program, Report, PartnerCredential, CustomSuggestedKeyword, ProgramFeature
+from .logging_handlers import redact_body, redact_headers
+from .feature_diff import BASELINE_NONE, diff_features
+from .metrics import observe_yelp_call, record_cache, record_feature_update
+from .stampede_cache import HIT, StampedeCache
 
 logger = logging.getLogger(__name__)
 
+# Потоки створюються ліниво при першому submit — безпечно для gunicorn preload (fork)
+_features_prewarm_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'FEATURES_PREWARM_CONCURRENCY', 4), thread_name_prefix='features-prewarm',
+)
+
+
+def _log_response_debug(label, resp):
+    """Заголовки й тіло відповіді Yelp — лише на DEBUG (без DEBUG нічого не форматується)."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📥 %s: Response headers: %s", label, redact_headers(resp.headers))
+        logger.debug("📥 %s: Raw response text: %s", label, redact_body(resp.text))
+
 
 def make_yelp_request_with_retry(method, url, **kwargs):
     """
@@ -34,7 +53,13 @@ def make_yelp_request_with_retry(method, url, **kwargs):
     for attempt in range(1, max_attempts + 1):
         try:
             logger.debug(f"Making {method} request to {url} (attempt {attempt}/{max_attempts})")
-            resp = requests.request(method, url, **kwargs)
+            started = time.perf_counter()
+            try:
+                resp = requests.request(method, url, **kwargs)
+            except requests.RequestException:
+                observe_yelp_call(method, url, 'error', time.perf_counter() - started)
+                raise
+            observe_yelp_call(method, url, resp.status_code, time.perf_counter() - started)
             
             # Only retry on server errors (5xx)
             if resp.status_code >= 500:
@@ -65,8 +90,8 @@ def make_yelp_request_with_retry(method, url, **kwargs):
     raise requests.HTTPError(f"Failed after {max_attempts} attempts")
 
 class YelpService:
-    PARTNER_BASE = 'https://partner-api.yelp.com'
-    FUSION_BASE = 'https://api.yelp.com'
+    PARTNER_BASE = getattr(settings, 'YELP_PARTNER_BASE', 'https://partner-api.yelp.com')
+    FUSION_BASE = getattr(settings, 'YELP_FUSION_BASE', 'https://api.yelp.com')
     headers_fusion = {'Authorization': f'Bearer {settings.YELP_FUSION_TOKEN}'}
     
     @classmethod
@@ -253,8 +278,12 @@ class YelpService:
         return resp.json()
 
     @classmethod
-    def edit_program(cls, program_id, payload):
-        """Edit existing program."""
+    def edit_program(cls, program_id, payload, auth=None):
+        """Edit existing program.
+
+        ``auth`` дозволяє передати вже отримані credentials (bulk операції
+        резолвлять їх один раз замість запиту до БД на кожну програму).
+        """
         logger.info(f"🔧 Edit: program_id = {program_id}")
         logger.info(f"🔧 Edit: Received payload = {json.dumps(payload, indent=2)}")
         logger.info(f"🔧 Edit: Payload keys = {list(payload.keys())}")
@@ -321,7 +350,7 @@ class YelpService:
 
         try:
             params_filtered = {k: v for k, v in params.items() if v is not None}
-            resp = make_yelp_request_with_retry('POST', url, params=params_filtered, auth=cls._get_partner_auth())
+            resp = make_yelp_request_with_retry('POST', url, params=params_filtered, auth=auth or cls._get_partner_auth())
             logger.debug(f"Edit response status: {resp.status_code}")
             logger.debug(f"Edit response text: {resp.text}")
             
@@ -403,21 +432,20 @@ class YelpService:
         return resp.json()
 
     @classmethod
-    def pause_program(cls, program_id):
+    def pause_program(cls, program_id, auth=None):
         logger.info(f"🔄 YelpService.pause_program: Starting pause for program_id '{program_id}'")
         url = f'{cls.PARTNER_BASE}/program/{program_id}/pause/v1'
         logger.info(f"🌐 YelpService.pause_program: Request URL: {url}")
         
         # Логуємо автентифікацію
-        auth_creds = cls._get_partner_auth()
-        logger.info(f"🔐 YelpService.pause_program: Using auth credentials - username: '{auth_creds[0]}', password: '{auth_creds[1][:4]}***'")
+        auth_creds = auth or cls._get_partner_auth()
+        logger.info(f"🔐 YelpService.pause_program: Using auth credentials - username: '{auth_creds[0]}'")
         
         try:
             logger.info(f"📤 YelpService.pause_program: Making POST request to pause program with retry logic...")
             resp = make_yelp_request_with_retry('POST', url, auth=auth_creds)
             logger.info(f"📥 YelpService.pause_program: Response status code: {resp.status_code}")
-            logger.info(f"📥 YelpService.pause_program: Response headers: {dict(resp.headers)}")
-            logger.info(f"📥 YelpService.pause_program: Raw response text: {resp.text}")
+            _log_response_debug('YelpService.pause_program', resp)
             
             logger.info(f"✅ YelpService.pause_program: Successfully paused program {program_id}")
             return {'status': resp.status_code}
@@ -436,21 +464,20 @@ class YelpService:
             raise
 
     @classmethod
-    def resume_program(cls, program_id):
+    def resume_program(cls, program_id, auth=None):
         logger.info(f"🔄 YelpService.resume_program: Starting resume for program_id '{program_id}'")
         url = f'{cls.PARTNER_BASE}/program/{program_id}/resume/v1'
         logger.info(f"🌐 YelpService.resume_program: Request URL: {url}")
         
         # Логуємо автентифікацію
-        auth_creds = cls._get_partner_auth()
-        logger.info(f"🔐 YelpService.resume_program: Using auth credentials - username: '{auth_creds[0]}', password: '{auth_creds[1][:4]}***'")
+        auth_creds = auth or cls._get_partner_auth()
+        logger.info(f"🔐 YelpService.resume_program: Using auth credentials - username: '{auth_creds[0]}'")
         
         try:
             logger.info(f"📤 YelpService.resume_program: Making POST request to resume program with retry logic...")
             resp = make_yelp_request_with_retry('POST', url, auth=auth_creds)
             logger.info(f"📥 YelpService.resume_program: Response status code: {resp.status_code}")
-            logger.info(f"📥 YelpService.resume_program: Response headers: {dict(resp.headers)}")
-            logger.info(f"📥 YelpService.resume_program: Raw response text: {resp.text}")
+            _log_response_debug('YelpService.resume_program', resp)
             
             logger.info(f"✅ YelpService.resume_program: Successfully resumed program {program_id}")
             return {'status': resp.status_code}
@@ -476,14 +503,13 @@ class YelpService:
         
         # Логуємо автентифікацію
         auth_creds = cls._get_partner_auth()
-        logger.info(f"🔐 YelpService.get_program_status: Using auth credentials - username: '{auth_creds[0]}', password: '{auth_creds[1][:4]}***'")
+        logger.info(f"🔐 YelpService.get_program_status: Using auth credentials - username: '{auth_creds[0]}'")
         
         try:
             logger.info(f"📤 YelpService.get_program_status: Making GET request to Yelp API...")
             resp = requests.get(url, auth=auth_creds)
             logger.info(f"📥 YelpService.get_program_status: Response status code: {resp.status_code}")
-            logger.info(f"📥 YelpService.get_program_status: Response headers: {dict(resp.headers)}")
-            logger.info(f"📥 YelpService.get_program_status: Raw response text: {resp.text}")
+            _log_response_debug('YelpService.get_program_status', resp)
             
             # Handle 500 errors gracefully (job_id expired or not found)
             if resp.status_code == 500:
@@ -682,13 +708,13 @@ class YelpService:
         
         # Логуємо автентифікацію
         auth_creds = cls._get_partner_auth(username=username)
-        logger.info(f"🔐 YelpService.get_all_programs: Using auth credentials - username: '{auth_creds[0]}', password: '{auth_creds[1][:4]}***'")
+        logger.info(f"🔐 YelpService.get_all_programs: Using auth credentials - username: '{auth_creds[0]}'")
         
         try:
             logger.info(f"📤 YelpService.get_all_programs: Making GET request to Yelp API with retry logic...")
             resp = make_yelp_request_with_retry('GET', url, params=params, auth=auth_creds)
             logger.info(f"📥 YelpService.get_all_programs: Response status code: {resp.status_code}")
-            logger.info(f"📥 YelpService.get_all_programs: Response headers: {dict(resp.headers)}")
+            _log_response_debug('YelpService.get_all_programs', resp)
 
             data = resp.json()
             logger.info(f"✅ YelpService.get_all_programs: Successfully parsed JSON response")
@@ -762,49 +788,89 @@ class YelpService:
     @classmethod
     def get_program_features(cls, program_id):
         """Get available and active features for a specific program.
-        Merges Yelp suggested keywords with custom suggested keywords for NEGATIVE_KEYWORD_TARGETING."""
+        Merges Yelp suggested keywords with custom suggested keywords for NEGATIVE_KEYWORD_TARGETING.
+
+        Read-through cache (FEATURES_CACHE_TTL): the merged response is kept per program and dropped
+        on update/delete of features or custom keywords."""
+        data, cache_status = StampedeCache(cache).get_or_compute(
+            cls.features_cache_key(program_id),
+            lambda: cls._fetch_program_features(program_id),
+            ttl=settings.FEATURES_CACHE_TTL,
+            stale_ttl=settings.FEATURES_CACHE_STALE_TTL,
+        )
+        record_cache('program_features', cache_status)
+        return data
+
+    @staticmethod
+    def features_cache_key(program_id):
+        return f"program_features:{program_id}"
+
+    @classmethod
+    def invalidate_program_features(cls, program_id):
+        """Drop cached features (after writes to Yelp or to custom suggested keywords); fetches in flight are discarded."""
+        try:
+            StampedeCache(cache).invalidate(cls.features_cache_key(program_id))
+        except Exception as e:
+            logger.warning(f"⚠️ YelpService.invalidate_program_features: Failed for {program_id}: {e}")
+
+    @classmethod
+    def prewarm_program_features(cls, program_ids):
+        """
+        Fetch features of programs that are not cached yet in the background (bounded pool),
+        so opening a program from the list hits the cache. Returns the number of programs queued.
+        """
+        program_ids = list(dict.fromkeys(program_ids))[:settings.FEATURES_PREWARM_LIMIT]
+        if not program_ids:
+            return 0
+        try:
+            cached = cache.get_many([cls.features_cache_key(program_id) for program_id in program_ids])
+        except Exception as e:
+            logger.warning(f"⚠️ YelpService.prewarm_program_features: Cache unavailable, skipping prewarm: {e}")
+            return 0
+        missing = [
+            program_id for program_id in program_ids
+            if cls.features_cache_key(program_id) not in cached
+            # Маркер на TTL: та сама програма (у т.ч. з помилкою Yelp) не ставиться в чергу з кожним списком
+            and cache.add(f"{cls.features_cache_key(program_id)}:prewarm", 1, settings.FEATURES_CACHE_TTL)
+        ]
+        for program_id in missing:
+            _features_prewarm_executor.submit(cls._prewarm_one, program_id)
+        if missing:
+            logger.info(f"🔥 YelpService.prewarm_program_features: Queued {len(missing)}/{len(program_ids)} programs")
+        return len(missing)
+
+    @classmethod
+    def _prewarm_one(cls, program_id):
+        try:
+            cls.get_program_features(program_id)
+        except Exception as e:
+            logger.debug(f"YelpService.prewarm_program_features: {program_id} skipped: {e}")
+        finally:
+            # Фоновий потік: не лишаємо відкритих DB з'єднань
+            connections.close_all()
+
+    @classmethod
+    def _fetch_program_features(cls, program_id):
+        """Live GET /program/{id}/features/v1 + custom keywords merge (no cache)."""
         logger.info(f"🔍 YelpService.get_program_features: Getting features for program '{program_id}'")
         url = f'{cls.PARTNER_BASE}/program/{program_id}/features/v1'
         logger.info(f"🌐 YelpService.get_program_features: Request URL: {url}")
         
         # Логуємо автентифікацію
         auth_creds = cls._get_partner_auth()
-        logger.info(f"🔐 YelpService.get_program_features: Using auth credentials - username: '{auth_creds[0]}', password: '{auth_creds[1][:4]}***'")
+        logger.info(f"🔐 YelpService.get_program_features: Using auth credentials - username: '{auth_creds[0]}'")
         
         try:
             logger.info(f"📤 YelpService.get_program_features: Making GET request to Yelp API with retry logic...")
             resp = make_yelp_request_with_retry('GET', url, auth=auth_creds)
             logger.info(f"📥 YelpService.get_program_features: Response status code: {resp.status_code}")
-            logger.info(f"📥 YelpService.get_program_features: Response headers: {dict(resp.headers)}")
-            logger.info(f"📥 YelpService.get_program_features: Raw response text: {resp.text}")
+            _log_response_debug('YelpService.get_program_features', resp)
             
             data = resp.json()
             logger.info(f"✅ YelpService.get_program_features: Successfully parsed JSON response")
             logger.info(f"📊 YelpService.get_program_features: Program {program_id} features: {list(data.get('features', {}).keys())}")
             
-            # Merge custom suggested keywords with Yelp suggested keywords for NEGATIVE_KEYWORD_TARGETING
-            if 'features' in data and 'NEGATIVE_KEYWORD_TARGETING' in data['features']:
-                try:
-                    negative_kw_feature = data['features']['NEGATIVE_KEYWORD_TARGETING']
-                    yelp_suggested = negative_kw_feature.get('suggested_keywords', [])
-                    
-                    # Get custom suggested keywords from database (safely)
-                    try:
-                        custom_keywords = CustomSuggestedKeyword.objects.filter(
-                            program_id=program_id
-                        ).values_list('keyword', flat=True)
-                    except Exception as db_error:
-                        logger.warning(f"⚠️ YelpService.get_program_features: Could not fetch custom keywords (table might not exist): {db_error}")
-                        custom_keywords = []
-                    
-                    # Merge and deduplicate
-                    all_suggested = list(set(yelp_suggested + list(custom_keywords)))
-                    negative_kw_feature['suggested_keywords'] = sorted(all_suggested)
-                    
-                    logger.info(f"📊 YelpService.get_program_features: Merged suggested keywords - "
-                               f"Yelp: {len(yelp_suggested)}, Custom: {len(custom_keywords)}, Total: {len(all_suggested)}")
-                except Exception as merge_error:
-                    logger.error(f"❌ YelpService.get_program_features: Error merging keywords: {merge_error}")
+            cls._merge_custom_keywords(program_id, data)
             
             return data
         except requests.HTTPError as e:
@@ -817,8 +883,75 @@ class YelpService:
             raise
 
     @classmethod
-    def update_program_features(cls, program_id, features_payload):
-        """Update features for a specific program."""
+    def _merge_custom_keywords(cls, program_id, data):
+        """Merge custom suggested keywords into NEGATIVE_KEYWORD_TARGETING of a features response (in place)."""
+        if 'features' in data and 'NEGATIVE_KEYWORD_TARGETING' in data['features']:
+            try:
+                negative_kw_feature = data['features']['NEGATIVE_KEYWORD_TARGETING']
+                yelp_suggested = negative_kw_feature.get('suggested_keywords', [])
+                
+                # Get custom suggested keywords from database (safely)
+                try:
+                    custom_keywords = CustomSuggestedKeyword.objects.filter(
+                        program_id=program_id
+                    ).values_list('keyword', flat=True)
+                except Exception as db_error:
+                    logger.warning(f"⚠️ YelpService.get_program_features: Could not fetch custom keywords (table might not exist): {db_error}")
+                    custom_keywords = []
+                
+                # Merge and deduplicate
+                all_suggested = list(set(yelp_suggested + list(custom_keywords)))
+                negative_kw_feature['suggested_keywords'] = sorted(all_suggested)
+                
+                logger.info(f"📊 YelpService.get_program_features: Merged suggested keywords - "
+                           f"Yelp: {len(yelp_suggested)}, Custom: {len(custom_keywords)}, Total: {len(all_suggested)}")
+            except Exception as merge_error:
+                logger.error(f"❌ YelpService.get_program_features: Error merging keywords: {merge_error}")
+
+    @classmethod
+    def _plan_features_update(cls, program_id, yelp_payload):
+        """
+        Diff оновлення features проти свіжого кешу: (FeatureDiff, кешована відповідь або None).
+        (None, None) — payload не словник типів, надсилаємо як є.
+        """
+        if not isinstance(yelp_payload, dict):
+            return None, None
+        try:
+            # Лише значення, прочитане з Yelp після останнього запису (покоління збігається)
+            cached, cache_status = StampedeCache(cache).peek(cls.features_cache_key(program_id), verify_generation=True)
+        except Exception as e:
+            logger.warning(f"⚠️ YelpService.update_program_features: Cache unavailable, sending full payload: {e}")
+            cached, cache_status = None, None
+        current = cached.get('features') if cache_status == HIT and isinstance(cached, dict) else None
+        return diff_features(current, yelp_payload), (cached if current is not None else None)
+
+    @classmethod
+    def _record_features_change(cls, program_id, diff):
+        """Компактний журнал змін: один рядок логу, метрика і останній надісланий стан у ProgramFeature."""
+        outcome = 'noop' if diff.is_noop else ('full' if diff.baseline == BASELINE_NONE else 'diff')
+        record_feature_update(outcome)
+        logger.info(f"🧮 YelpService.update_program_features: {program_id} {outcome} {diff.summary()}")
+        try:
+            for feature_type, configuration in diff.changed.items():
+                ProgramFeature.objects.update_or_create(
+                    program_id=program_id, feature_type=feature_type,
+                    defaults={'configuration': configuration if isinstance(configuration, dict) else {'value': configuration},
+                              'is_active': True},
+                )
+        except Exception as db_error:
+            logger.warning(f"⚠️ YelpService.update_program_features: Could not record change log for {program_id}: {db_error}")
+
+    @classmethod
+    def _record_features_deleted(cls, program_id, features_list):
+        logger.info(f"🧮 YelpService.delete_program_features: {program_id} deleted=[{','.join(features_list)}]")
+        try:
+            ProgramFeature.objects.filter(program_id=program_id, feature_type__in=features_list).update(is_active=False)
+        except Exception as db_error:
+            logger.warning(f"⚠️ YelpService.delete_program_features: Could not record change log for {program_id}: {db_error}")
+
+    @classmethod
+    def update_program_features(cls, program_id, features_payload, auth=None, retry=False):
+        """Update features for a specific program (retry=True - з повторами на 5xx/мережеві помилки, для bulk)."""
         logger.info(f"🔧 YelpService.update_program_features: Updating features for program '{program_id}'")
         logger.info(f"📝 YelpService.update_program_features: Payload: {features_payload}")
         url = f'{cls.PARTNER_BASE}/program/{program_id}/features/v1'
@@ -832,10 +965,20 @@ class YelpService:
         else:
             yelp_payload = features_payload
             logger.info(f"📦 YelpService.update_program_features: No wrapper found, using payload as-is: {yelp_payload}")
+
+        # Надсилаємо лише змінені типи features; без змін — взагалі не йдемо в Yelp
+        diff, cached = cls._plan_features_update(program_id, yelp_payload)
+        if diff is not None:
+            if diff.is_noop:
+                cls._record_features_change(program_id, diff)
+                return cached
+            yelp_payload = diff.changed
+        # Запис почався: паралельні читання/diff-и не повинні спиратись на кеш до нашої відповіді
+        cls.invalidate_program_features(program_id)
         
         # Логуємо автентифікацію
-        auth_creds = cls._get_partner_auth()
-        logger.info(f"🔐 YelpService.update_program_features: Using auth credentials - username: '{auth_creds[0]}', password: '{auth_creds[1][:4]}***'")
+        auth_creds = auth or cls._get_partner_auth()
+        logger.info(f"🔐 YelpService.update_program_features: Using auth credentials - username: '{auth_creds[0]}'")
         
         try:
             # Додаємо явний Content-Type header
@@ -851,13 +994,18 @@ class YelpService:
             json_data = json.dumps(yelp_payload, ensure_ascii=False, indent=2)
             logger.info(f"📄 YelpService.update_program_features: Exact JSON being sent to Yelp API: {json_data}")
             
-            resp = requests.post(url, json=yelp_payload, auth=auth_creds, headers=headers)
+            if retry:
+                resp = make_yelp_request_with_retry('POST', url, json=yelp_payload, auth=auth_creds, headers=headers)
+            else:
+                resp = requests.post(url, json=yelp_payload, auth=auth_creds, headers=headers)
             logger.info(f"📥 YelpService.update_program_features: Response status code: {resp.status_code}")
-            logger.info(f"📥 YelpService.update_program_features: Response headers: {dict(resp.headers)}")
-            logger.info(f"📥 YelpService.update_program_features: Raw response text: {resp.text}")
+            _log_response_debug('YelpService.update_program_features', resp)
             
             resp.raise_for_status()
             data = resp.json()
+            cls.invalidate_program_features(program_id)
+            if diff is not None:
+                cls._record_features_change(program_id, diff)
             logger.info(f"✅ YelpService.update_program_features: Successfully updated features for program {program_id}")
             return data
         except requests.HTTPError as e:
@@ -891,17 +1039,19 @@ class YelpService:
         
         # Логуємо автентифікацію
         auth_creds = cls._get_partner_auth()
-        logger.info(f"🔐 YelpService.delete_program_features: Using auth credentials - username: '{auth_creds[0]}', password: '{auth_creds[1][:4]}***'")
+        logger.info(f"🔐 YelpService.delete_program_features: Using auth credentials - username: '{auth_creds[0]}'")
         
         try:
             logger.info(f"📤 YelpService.delete_program_features: Making DELETE request to Yelp API...")
+            cls.invalidate_program_features(program_id)  # запис почався (див. update_program_features)
             resp = requests.delete(url, json=delete_payload, auth=auth_creds)
             logger.info(f"📥 YelpService.delete_program_features: Response status code: {resp.status_code}")
-            logger.info(f"📥 YelpService.delete_program_features: Response headers: {dict(resp.headers)}")
-            logger.info(f"📥 YelpService.delete_program_features: Raw response text: {resp.text}")
+            _log_response_debug('YelpService.delete_program_features', resp)
             
             resp.raise_for_status()
             data = resp.json()
+            cls.invalidate_program_features(program_id)
+            cls._record_features_deleted(program_id, features_list)
             logger.info(f"✅ YelpService.delete_program_features: Successfully deleted features for program {program_id}")
             logger.info(f"📊 YelpService.delete_program_features: Remaining features: {list(data.get('features', {}).keys())}")
             return data
@@ -929,7 +1079,7 @@ class YelpService:
             logger.info(f"📤 YelpService.get_portfolio_project: Making GET request...")
             resp = requests.get(url, auth=auth_creds)
             logger.info(f"📥 YelpService.get_portfolio_project: Response status: {resp.status_code}")
-            logger.info(f"📥 YelpService.get_portfolio_project: Response text: {resp.text}")
+            _log_response_debug('YelpService.get_portfolio_project', resp)
             
             resp.raise_for_status()
             data = resp.json()
@@ -963,7 +1113,7 @@ class YelpService:
             logger.info(f"📤 YelpService.update_portfolio_project: Making PUT request...")
             resp = requests.put(url, json=project_data, auth=auth_creds, headers=headers)
             logger.info(f"📥 YelpService.update_portfolio_project: Response status: {resp.status_code}")
-            logger.info(f"📥 YelpService.update_portfolio_project: Response text: {resp.text}")
+            _log_response_debug('YelpService.update_portfolio_project', resp)
             
             resp.raise_for_status()
             data = resp.json()
@@ -991,7 +1141,7 @@ class YelpService:
             logger.info(f"📤 YelpService.create_portfolio_project: Making POST request...")
             resp = requests.post(url, auth=auth_creds)
             logger.info(f"📥 YelpService.create_portfolio_project: Response status: {resp.status_code}")
-            logger.info(f"📥 YelpService.create_portfolio_project: Response text: {resp.text}")
+            _log_response_debug('YelpService.create_portfolio_project', resp)
             
             resp.raise_for_status()
             data = resp.json()
@@ -1051,7 +1201,7 @@ class YelpService:
             logger.info(f"📤 YelpService.upload_portfolio_photo: Making POST request...")
             resp = requests.post(url, json=photo_data, auth=auth_creds, headers=headers)
             logger.info(f"📥 YelpService.upload_portfolio_photo: Response status: {resp.status_code}")
-            logger.info(f"📥 YelpService.upload_portfolio_photo: Response text: {resp.text}")
+            _log_response_debug('YelpService.upload_portfolio_photo', resp)
             
             resp.raise_for_status()
             data = resp.json()
@@ -1079,7 +1229,7 @@ class YelpService:
             logger.info(f"📤 YelpService.get_portfolio_photos: Making GET request...")
             resp = requests.get(url, auth=auth_creds)
             logger.info(f"📥 YelpService.get_portfolio_photos: Response status: {resp.status_code}")
-            logger.info(f"📥 YelpService.get_portfolio_photos: Response text: {resp.text}")
+            _log_response_debug('YelpService.get_portfolio_photos', resp)
             
             resp.raise_for_status()
             data = resp.json()
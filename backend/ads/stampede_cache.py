@@ -0,0 +1,182 @@
+"""
+Stampede-safe кешування дорогих обчислень (списки програм, grouped results).
+
+Значення зберігається в конверті {'value', 'soft_expires_at', 'delta'}:
+- soft TTL — після нього значення "протухле", але ще віддається (stale-while-revalidate),
+  поки один запит під lock-ом перераховує його;
+- hard TTL = soft TTL + stale_ttl — фізичний TTL ключа;
+- probabilistic early expiration (XFetch): перерахунок стартує трохи раніше soft TTL
+  з імовірністю, що росте з часом обчислення (delta), тож ключ зазвичай оновлюється
+  ще до того, як протухне.
+
+Інвалідація (invalidate) не лише видаляє ключ, а й змінює його покоління ({key}:gen):
+обчислення, що стартувало до інвалідації (напр. GET, що був у польоті під час запису),
+після set бачить нове покоління і прибирає свій застарілий знімок.
+
+Store — будь-що з Django-cache API (get/set/add/delete): django.core.cache.cache
+або RedisCodecCache для бінарних payload-ів.
+"""
+import logging
+import math
+import random
+import time
+import uuid
+from typing import Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+
+# Покоління має пережити будь-яке обчислення в польоті
+GENERATION_TTL = 24 * 3600
+
+
+class StampedeCache:
+    """Обгортка над cache store з lock-based recompute та stale-while-revalidate."""
+
+    def __init__(self, store, lock_timeout: int = 30, wait_timeout: float = 5.0,
+                 poll_interval: float = 0.05, beta: float = 1.0):
+        self.store = store
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.beta = beta
+
+    @staticmethod
+    def lock_key(key: str) -> str:
+        return f"{key}:lock"
+
+    @staticmethod
+    def generation_key(key: str) -> str:
+        return f"{key}:gen"
+
+    def generation(self, key: str):
+        """Поточне покоління ключа (None, якщо ключ ще не інвалідувався)."""
+        return self.store.get(self.generation_key(key))
+
+    def invalidate(self, key: str):
+        """Видалити значення так, щоб обчислення, що вже в польоті, не записали назад старий знімок."""
+        self.store.set(self.generation_key(key), uuid.uuid4().hex, GENERATION_TTL)
+        self.store.delete(key)
+
+    def _store(self, key: str, envelope: dict, timeout: int, generation) -> bool:
+        """set конверта, обчисленого в поколінні generation; False — його інвалідували, значення прибрано."""
+        envelope['generation'] = generation
+        self.store.set(key, envelope, timeout)
+        # Перевірка після set: invalidate() між стартом обчислення і set-ом видно тут, а не раніше
+        if self.generation(key) != generation:
+            self.store.delete(key)
+            logger.info(f"🗑️ [CACHE] Dropped {key}: invalidated while it was being computed")
+            return False
+        return True
+
+    @staticmethod
+    def _is_envelope(value: Any) -> bool:
+        # Значення у старому форматі (без конверта) вважаємо відсутніми
+        return isinstance(value, dict) and 'soft_expires_at' in value and 'value' in value
+
+    def _should_refresh_early(self, envelope: dict, now: float) -> bool:
+        """XFetch: now - delta * beta * ln(rand) >= expiry."""
+        delta = envelope.get('delta') or 0
+        if delta <= 0 or self.beta <= 0:
+            return now >= envelope['soft_expires_at']
+        return now - delta * self.beta * math.log(random.random() or 1e-12) >= envelope['soft_expires_at']
+
+    def _acquire(self, key: str):
+        token = uuid.uuid4().hex
+        if self.store.add(self.lock_key(key), token, self.lock_timeout):
+            return token
+        return None
+
+    def _release(self, key: str, token: str):
+        lock_key = self.lock_key(key)
+        try:
+            if self.store.get(lock_key) == token:
+                self.store.delete(lock_key)
+        except Exception as e:
+            logger.warning(f"⚠️ [CACHE] Failed to release lock {lock_key}: {e}")
+
+    def _compute_and_store(self, key: str, compute: Callable[[], Any], ttl: int, stale_ttl: int) -> Any:
+        generation = self.generation(key)
+        started = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - started
+        envelope = {'value': value, 'soft_expires_at': time.time() + ttl, 'delta': delta}
+        self._store(key, envelope, ttl + stale_ttl, generation)
+        logger.debug(f"💾 [CACHE] Recomputed {key} in {delta:.3f}s")
+        return value
+
+    def peek(self, key: str, verify_generation: bool = False) -> Tuple[Any, str]:
+        """
+        (value, HIT/STALE) без перерахунку; (None, MISS), якщо значення немає (для async коду).
+        verify_generation — MISS і для значення, обчисленого до останньої інвалідації
+        (коли на значення спираються рішення про запис, а не лише читання).
+        """
+        envelope = self.store.get(key)
+        if not self._is_envelope(envelope):
+            return None, MISS
+        if verify_generation and envelope.get('generation') != self.generation(key):
+            return None, MISS
+        return envelope['value'], (STALE if time.time() >= envelope['soft_expires_at'] else HIT)
+
+    def put(self, key: str, value: Any, ttl: int, stale_ttl: int = None, generation=None) -> bool:
+        """
+        Записати значення, обчислене поза get_or_compute (напр. async fetch).
+        generation — self.generation(key), прочитане ДО обчислення.
+        """
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        envelope = {'value': value, 'soft_expires_at': time.time() + ttl, 'delta': 0}
+        return self._store(key, envelope, ttl + stale_ttl, generation)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: int,
+                       stale_ttl: int = None) -> Tuple[Any, str]:
+        """
+        Повертає (value, status), status — HIT / STALE / MISS.
+
+        Лише один процес (власник lock-а) перераховує значення; решта віддають
+        stale копію або, якщо кеш порожній, коротко чекають на результат власника.
+        Винятки з compute() прокидаються нагору і нічого не кешують.
+        """
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        envelope = self.store.get(key)
+        now = time.time()
+
+        if self._is_envelope(envelope):
+            if not self._should_refresh_early(envelope, now):
+                return envelope['value'], HIT
+            token = self._acquire(key)
+            if token is None:
+                # Хтось уже перераховує — віддаємо поточне значення
+                return envelope['value'], (STALE if now >= envelope['soft_expires_at'] else HIT)
+            try:
+                return self._compute_and_store(key, compute, ttl, stale_ttl), MISS
+            except Exception as e:
+                # Є що віддати — помилка перерахунку не має ламати запит
+                logger.warning(f"⚠️ [CACHE] Refresh of {key} failed, serving stale value: {e}")
+                return envelope['value'], STALE
+            finally:
+                self._release(key, token)
+
+        # Холодний кеш: рахує тільки власник lock-а, решта чекають на його результат
+        token = self._acquire(key)
+        deadline = time.monotonic() + self.wait_timeout
+        while token is None and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            envelope = self.store.get(key)
+            if self._is_envelope(envelope):
+                return envelope['value'], HIT
+            if self.store.get(self.lock_key(key)) is None:
+                # Власник завершився без результату (помилка) — пробуємо стати власником
+                token = self._acquire(key)
+                if token is None and self.store.get(self.lock_key(key)) is None:
+                    break  # store не тримає lock-и (Redis недоступний) — чекати немає сенсу
+
+        if token is None:
+            logger.warning(f"⚠️ [CACHE] No recompute lock for {key}, computing without cache")
+            return compute(), MISS
+        try:
+            return self._compute_and_store(key, compute, ttl, stale_ttl), MISS
+        finally:
+            self._release(key, token)
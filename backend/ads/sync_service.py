@@ -8,9 +8,12 @@ import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Tuple, Set
 from django.db import models
+from .metrics import SyncTimer
+from .profiler import profiled_sync
 from .models import ProgramRegistry
 from .services import YelpService
 from .redis_service import RedisService
+from .rollup_service import BusinessRollupService
 
 logger = logging.getLogger(__name__)
 
@@ -30,12 +33,12 @@ class ProgramSyncService:
     - Паралельні запити (50 потоків)
     """
     
-    # Redis client (ініціалізується один раз)
+    # Redis client поверх спільного пулу з'єднань (ініціалізується один раз)
     _redis = None
     
     @classmethod
     def _get_redis(cls):
-        """Отримує Redis клієнт (lazy initialization)"""
+        """Отримує Redis клієнт (lazy initialization, без ping — доступність відстежує circuit breaker)"""
         if cls._redis is None:
             cls._redis = RedisService()
         return cls._redis
@@ -111,7 +114,7 @@ class ProgramSyncService:
             cached_name = redis.client.get(cache_key)
             if cached_name:
                 logger.debug(f"✅ [REDIS] Cache HIT for business {business_id}")
-                return cached_name.decode('utf-8')
+                return cached_name
         except Exception as e:
             logger.warning(f"⚠️  [REDIS] Cache read failed for business {business_id}: {e}")
         
@@ -169,11 +172,8 @@ class ProgramSyncService:
             # Мапимо результати
             for business_id, cached_value in zip(business_ids, cached_values):
                 if cached_value:
-                    # Redis може повертати bytes або str залежно від конфігурації
-                    if isinstance(cached_value, bytes):
-                        result[business_id] = cached_value.decode('utf-8')
-                    else:
-                        result[business_id] = cached_value
+                    # Спільний пул має decode_responses=True — значення вже str
+                    result[business_id] = cached_value
             
             if result:
                 logger.debug(f"✅ [REDIS] Cache HIT for {len(result)}/{len(business_ids)} business names")
@@ -248,6 +248,7 @@ class ProgramSyncService:
         return count
     
     @classmethod
+    @profiled_sync('sequential')
     def sync_programs(cls, username: str, batch_size: int = 40) -> Dict:
         """
         Синхронізує програми для користувача.
@@ -271,6 +272,7 @@ class ProgramSyncService:
             }
         """
         logger.info(f"🔄 Starting improved sync for {username}")
+        timer = SyncTimer('sequential')
         
         # 1. Отримуємо всі program_id з БД
         db_program_ids = set(
@@ -323,6 +325,7 @@ class ProgramSyncService:
                     
         except Exception as e:
             logger.error(f"❌ Error fetching programs from API: {e}")
+            timer.finish(result='error')
             return {
                 'total_api': 0,
                 'total_db_before': total_db_before,
@@ -335,6 +338,7 @@ class ProgramSyncService:
             }
         
         logger.info(f"📊 API has {len(api_program_ids)} unique programs")
+        timer.phase('api_fetch')
         
         # 3. Знаходимо різницю
         missing_ids = api_program_ids - db_program_ids  # Програми яких немає в БД
@@ -345,6 +349,9 @@ class ProgramSyncService:
         logger.info(f"🗑️  Deleted from API: {len(deleted_ids)} programs")
         logger.info(f"🔄 Common programs: {len(common_ids)} programs")
         
+        # Знімок полів rollup-у до sync: перерахуємо лише бізнеси програм, що реально змінились
+        rollup_before = BusinessRollupService.snapshot(username)
+        
         # 4. Додаємо відсутні програми
         added = 0
         if missing_ids:
@@ -352,6 +359,7 @@ class ProgramSyncService:
             programs_to_add = [api_programs_map[pid] for pid in missing_ids if pid in api_programs_map]
             added = cls._save_programs_batch(username, programs_to_add)
             logger.info(f"✅ Added {added} programs")
+        timer.phase('db_insert')
         
         # 5. Оновлюємо існуючі програми (статус може змінитися)
         updated = 0
@@ -360,6 +368,7 @@ class ProgramSyncService:
             programs_to_update = [api_programs_map[pid] for pid in common_ids if pid in api_programs_map]
             updated = cls._save_programs_batch(username, programs_to_update)
             logger.info(f"✅ Updated {updated} programs")
+        timer.phase('db_update')
         
         # 6. Видаляємо програми яких немає в API (опціонально)
         deleted = 0
@@ -371,6 +380,10 @@ class ProgramSyncService:
                 program_id__in=deleted_ids
             ).delete()
             logger.info(f"🗑️  Deleted {deleted} programs from DB")
+        timer.phase('db_delete')
+        
+        BusinessRollupService.safe_refresh_changed(username, rollup_before)
+        timer.phase('rollup')
         
         total_db_after = cls.get_total_programs_in_db(username)
         
@@ -379,6 +392,7 @@ class ProgramSyncService:
         message = f'✅ Sync complete: +{added} added, ~{updated} updated, -{deleted} deleted'
         
         logger.info(f"📊 {message}")
+        timer.finish(added, updated, deleted)
         
         return {
             'total_api': len(api_program_ids),
@@ -778,49 +792,27 @@ class ProgramSyncService:
         Returns:
             Список словників: [{'business_id': str, 'program_count': int, 'active_count': int}]
         """
-        from django.db.models import Count
-        
-        # Базовий запит
-        query = (
-            ProgramRegistry.objects
-            .filter(username=username, yelp_business_id__isnull=False)
-            .exclude(yelp_business_id='')
-        )
-        
-        # Фільтр по статусу якщо вказано
-        if status and status != 'ALL':
-            query = query.filter(status=status)
-            logger.debug(f"🔍 Filtering business IDs by status: {status}")
-        
-        # Фільтр по типу програми якщо вказано
-        if program_type and program_type != 'ALL':
-            query = query.filter(program_name=program_type)
-            logger.debug(f"🔍 Filtering business IDs by program_type: {program_type}")
-        
-        # Групуємо по business_id і рахуємо програми
-        # Також беремо business_name з FK (використовуємо Max щоб отримати будь-яке непорожнє значення)
-        from django.db.models import Max
-        
-        results = (
-            query
-            .select_related('business')  # JOIN з Business таблицею
-            .values('yelp_business_id')
-            .annotate(
-                program_count=Count('program_id'),
-                business_name=Max('business__name')  # Беремо з Business FK
-            )
-            .order_by('-program_count')
-        )
-        
-        return [
-            {
-                'business_id': r['yelp_business_id'],
-                'business_name': r['business_name'] or r['yelp_business_id'],  # Фоллбек на ID
-                'program_count': r['program_count'],
-                'active_count': 0  # Не зберігаємо active статус окремо
-            }
-            for r in results
-        ]
+        # Читаємо готові BusinessRollup (O(бізнесів)) замість GROUP BY по всіх програмах
+        facet = f'status:{status}' if status and status != 'ALL' else 'ALL'
+        type_filter = program_type if program_type and program_type != 'ALL' else None
+        logger.debug(f"🔍 Business IDs from rollups: facet={facet}, program_type={type_filter or 'ALL'}")
+        
+        results = []
+        for rollup in BusinessRollupService.get_rollups(username):
+            if not rollup.yelp_business_id:
+                continue
+            program_count = rollup.facet_count(facet, type_filter)
+            if not program_count:
+                continue
+            results.append({
+                'business_id': rollup.yelp_business_id,
+                'business_name': (rollup.business.name if rollup.business else None) or rollup.yelp_business_id,  # Фоллбек на ID
+                'program_count': program_count,
+                'active_count': rollup.active_count,
+            })
+        
+        results.sort(key=lambda b: b['program_count'], reverse=True)
+        return results
     
     @classmethod
     def get_program_ids_for_business(
@@ -893,6 +885,7 @@ class ProgramSyncService:
         return list(programs)
     
     @classmethod
+    @profiled_sync('streaming')
     def sync_with_streaming(cls, username: str, batch_size: int = 40):
         """
         Синхронізація з генерацією подій прогресу для SSE.
@@ -906,6 +899,7 @@ class ProgramSyncService:
             - type: 'start' | 'info' | 'progress' | 'complete' | 'error'
             - various data fields depending on type
         """
+        timer = SyncTimer('streaming')
         try:
             # Початкова подія
             yield {
@@ -918,6 +912,7 @@ class ProgramSyncService:
             total_api = cls.get_total_programs_from_api(username)
             
             if total_api == 0:
+                timer.finish(result='error')
                 yield {
                     'type': 'error',
                     'message': 'Failed to get programs from API'
@@ -997,6 +992,7 @@ class ProgramSyncService:
             # Фінальний результат
             final_total = cls.get_total_programs_in_db(username)
             logger.info(f"📊 [STREAM] Sync complete: {added} added, {final_total} total")
+            timer.finish(added)
             
             yield {
                 'type': 'complete',
@@ -1008,12 +1004,14 @@ class ProgramSyncService:
             
         except Exception as e:
             logger.error(f"❌ [STREAM] Sync failed: {e}")
+            timer.finish(result='error')
             yield {
                 'type': 'error',
                 'message': str(e)
             }
     
     @classmethod
+    @profiled_sync('thread_pool')
     def sync_with_streaming_parallel(cls, username: str, batch_size: int = 40, max_workers: int = 50):
         """
         🚀 Паралельна синхронізація програм з SSE прогресом.
@@ -1036,6 +1034,7 @@ class ProgramSyncService:
         Yields:
             Dict з інформацією про прогрес (SSE події)
         """
+        timer = SyncTimer('thread_pool')
         try:
             yield {
                 'type': 'start',
@@ -1094,6 +1093,7 @@ class ProgramSyncService:
             try:
                 first_batch, total_api = fetch_batch(0, batch_size)
                 if total_api == 0:
+                    timer.finish(result='error')
                     yield {
                         'type': 'error',
                         'message': 'Failed to get programs from API'
@@ -1119,6 +1119,7 @@ class ProgramSyncService:
                 
             except Exception as e:
                 logger.error(f"❌ [PARALLEL] Failed to get API programs: {e}")
+                timer.finish(result='error')
                 yield {
                     'type': 'error',
                     'message': f'Failed to fetch programs from API: {str(e)}'
@@ -1176,11 +1177,13 @@ class ProgramSyncService:
                         logger.error(f"❌ [PARALLEL] Failed to fetch batch: {e}")
             
             logger.info(f"📊 [PARALLEL] Fetched {len(api_program_ids)} unique programs from API")
+            timer.phase('api_fetch')
             
             # 3. Знаходимо різницю
             missing_ids = api_program_ids - db_program_ids  # Програми яких немає в БД
             deleted_ids = db_program_ids - api_program_ids  # Програми яких немає в API
             common_ids = api_program_ids & db_program_ids   # Програми які є і там і там
+            rollup_before = BusinessRollupService.snapshot(username)
             
             logger.info(f"📥 [PARALLEL] Missing in DB: {len(missing_ids)} programs")
             logger.info(f"🗑️  [PARALLEL] Deleted from API: {len(deleted_ids)} programs")
@@ -1211,6 +1214,8 @@ class ProgramSyncService:
                     'percentage': 50
                 }
             
+            timer.phase('db_insert')
+            
             # 5. Оновлюємо існуючі програми
             updated = 0
             if common_ids:
@@ -1229,6 +1234,8 @@ class ProgramSyncService:
                     'percentage': 75
                 }
             
+            timer.phase('db_update')
+            
             # 6. Видаляємо програми яких немає в API
             deleted = 0
             if deleted_ids:
@@ -1250,6 +1257,11 @@ class ProgramSyncService:
                     'percentage': 90
                 }
             
+            timer.phase('db_delete')
+            
+            BusinessRollupService.safe_refresh_changed(username, rollup_before)
+            timer.phase('rollup')
+            
             # Фінальний результат
             total_db_after = cls.get_total_programs_in_db(username)
             message = f'✅ Sync complete: +{added} added, ~{updated} updated, -{deleted} deleted'
@@ -1277,6 +1289,8 @@ class ProgramSyncService:
                     }
             except Exception as e:
                 logger.warning(f"⚠️  [BACKFILL] Failed to backfill business names: {e}")
+            timer.phase('business_backfill')
+            timer.finish(added, updated, deleted)
             
             yield {
                 'type': 'complete',
@@ -1290,6 +1304,7 @@ class ProgramSyncService:
             
         except Exception as e:
             logger.error(f"❌ [PARALLEL] Sync failed: {e}")
+            timer.finish(result='error')
             yield {
                 'type': 'error',
                 'message': str(e)
@@ -1308,8 +1323,6 @@ class ProgramSyncService:
         Returns:
             Dict з інформацією про результат: {fetched: int, failed: int, total: int}
         """
-        import time
-        
         try:
             # Знаходимо всі business_id без назв або з неправильними назвами (коли business_name == business_id)
             from django.db.models import F
@@ -1339,32 +1352,17 @@ class ProgramSyncService:
             # Обмежуємо кількість
             to_fetch = business_ids_without_names[:max_fetch]
             
-            fetched = 0
-            failed = 0
-            business_names = {}
+            # Завантажуємо назви через AsyncBusinessService (DB кеш, негативний кеш, token bucket)
+            from .async_business_service import AsyncBusinessService
+            resolved = AsyncBusinessService.resolve(to_fetch)
             
-            # Завантажуємо назви з API
-            for i, business_id in enumerate(to_fetch):
-                try:
-                    logger.debug(f"📡 [BACKFILL] Fetching business name {i+1}/{len(to_fetch)}: {business_id}")
-                    details = YelpService.get_business_details(business_id)
-                    
-                    if details and details.get('name'):
-                        business_name = details['name']
-                        business_names[business_id] = business_name
-                        fetched += 1
-                        logger.debug(f"✅ [BACKFILL] Got name: {business_name}")
-                    else:
-                        failed += 1
-                        logger.warning(f"⚠️  [BACKFILL] No name returned for {business_id}")
-                    
-                    # Затримка між запитами (0.2 секунди)
-                    if i < len(to_fetch) - 1:
-                        time.sleep(0.2)
-                        
-                except Exception as e:
-                    failed += 1
-                    logger.error(f"❌ [BACKFILL] Failed to fetch name for {business_id}: {e}")
+            business_names = {
+                business_id: details['name']
+                for business_id, details in resolved.items()
+                if details.get('name')
+            }
+            fetched = len(business_names)
+            failed = len(to_fetch) - fetched
             
             # Зберігаємо назви в БД
             if business_names:
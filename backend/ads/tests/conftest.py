@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_features_prewarm(settings):
+    """Списки програм не ходять у фоні до справжнього Yelp API (тести, яким це треба, вмикають самі)."""
+    settings.FEATURES_PREWARM_LIMIT = 0
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+
+from ads import async_partner_client
+from ads.async_partner_client import AsyncPartnerClient, PartnerAPIError
+from ads.async_sync_service import AsyncProgramSyncService
+from ads.async_views import AsyncBulkProgramFeaturesView, AsyncProgramFeaturesView, AsyncProgramSyncStreamView
+from ads.middleware import RequestInstrumentationMiddleware
+from ads.models import ProgramRegistry
+from ads.partner_simulator import SimulatorConfig, SimulatorServer
+from ads.services import YelpService
+
+AUTH = {'headers': {'Authorization': 'Basic dTpw'}}  # u:p
+
+
+@pytest.fixture
+def simulator(monkeypatch, settings):
+    settings.YELP_FUSION_API_KEY = ''
+    with SimulatorServer(SimulatorConfig(programs=100, businesses=10)) as server:
+        monkeypatch.setattr(AsyncPartnerClient, 'PARTNER_BASE', server.url)
+        monkeypatch.setattr(AsyncProgramSyncService, 'PARTNER_BASE', server.url)
+        monkeypatch.setattr(YelpService, '_get_partner_auth', classmethod(lambda cls, username=None: ('u', 'p')))
+        yield server
+
+
+@pytest.mark.django_db
+def test_features_round_trip_through_async_middleware(simulator):
+    program = simulator.simulator.programs[0]
+    active = list(program['active_features'])
+    features_view = AsyncProgramFeaturesView.as_view()
+
+    async def get_response(request):
+        return await features_view(request, program_id=request.path.split('/')[3])
+
+    view = RequestInstrumentationMiddleware(get_response)
+    factory = AsyncRequestFactory()
+
+    async def scenario():
+        try:
+            got = await view(factory.get(f"/api/program/{program['program_id']}/features/v1", **AUTH))
+            deleted = await view(factory.delete(
+                f"/api/program/{program['program_id']}/features/v1", {'features': active},
+                content_type='application/json', **AUTH,
+            ))
+            missing = await view(factory.get('/api/program/nope/features/v1', **AUTH))
+        finally:
+            await async_partner_client.close()
+        return got, deleted, missing
+
+    got, deleted, missing = async_to_sync(scenario)()
+
+    assert view.async_mode
+    assert set(json.loads(got.content)['features']) == set(active)
+    assert 'http;dur=' in got['Server-Timing'] and got['X-Request-ID']
+    assert json.loads(deleted.content)['features'] == {}
+    assert (missing.status_code, json.loads(missing.content)) == (404, {'detail': 'Program not found'})
+
+
+@pytest.mark.django_db
+def test_sync_stream_emits_events_from_event_loop(simulator):
+    request = AsyncRequestFactory().post(
+        '/api/reseller/programs/sync-stream', {'batch_size': 40}, content_type='application/json', **AUTH,
+    )
+
+    async def scenario():
+        response = await AsyncProgramSyncStreamView.as_view()(request)
+        return response, [chunk async for chunk in response.streaming_content]
+
+    response, chunks = async_to_sync(scenario)()
+
+    events = [json.loads(chunk.decode()[len('data: '):]) for chunk in chunks]
+    assert response['Content-Type'] == 'text/event-stream'
+    assert events[0]['type'] == 'start' and events[-1]['type'] == 'complete'
+    assert events[-1]['added'] == 100 == ProgramRegistry.objects.filter(username='u').count()
+
+
+@pytest.mark.django_db
+def test_bulk_features_results_arrive_before_the_run_finishes(monkeypatch):
+    calls = []
+    gate = {}
+
+    async def fake_update(cls, program_id, payload, auth=None, retry=False):
+        calls.append((program_id, auth, retry))
+        if program_id == 'slow':
+            await gate['released'].wait()  # відпускаємо лише після того, як клієнт отримав result для 'fast'
+        if program_id == 'missing':
+            raise PartnerAPIError(404, {'error': 'not found'})
+        return {'features': payload['features']}
+
+    monkeypatch.setattr(AsyncPartnerClient, 'update_program_features', classmethod(fake_update))
+    monkeypatch.setattr(YelpService, '_get_partner_auth', classmethod(lambda cls, username=None: ('u', 'p')))
+    factory = AsyncRequestFactory()
+    body = {'program_ids': ['slow', 'fast', 'missing'], 'features': {'AD_SCHEDULING': {'uses_opening_hours': True}}}
+
+    async def scenario():
+        gate['released'] = asyncio.Event()
+        view = AsyncBulkProgramFeaturesView.as_view()
+        invalid = await view(factory.post(
+            '/api/reseller/programs/bulk-features', {'program_ids': ['p1'], 'features': {'NOPE': {}}},
+            content_type='application/json', **AUTH,
+        ))
+        response = await view(factory.post(
+            '/api/reseller/programs/bulk-features', body, content_type='application/json', **AUTH,
+        ))
+        events = []
+        async for chunk in response.streaming_content:
+            events.append(json.loads(chunk.decode()[len('data: '):]))
+            if events[-1].get('program_id') == 'fast':
+                gate['released'].set()
+        return invalid, response, events
+
+    invalid, response, events = async_to_sync(asyncio.wait_for)(scenario(), timeout=5)
+
+    assert invalid.status_code == 400
+    assert response['Content-Type'] == 'text/event-stream'
+    assert [e['type'] for e in events] == ['start', 'result', 'result', 'result', 'complete']
+    assert events[-2]['program_id'] == 'slow'
+    assert {e['program_id']: (e['success'], e.get('status_code')) for e in events[1:-1]} == {
+        'slow': (True, None), 'fast': (True, None), 'missing': (False, 404),
+    }
+    assert (events[-1]['succeeded'], events[-1]['failed']) == (2, 1)
+    assert sorted(calls) == [('fast', ('u', 'p'), True), ('missing', ('u', 'p'), True), ('slow', ('u', 'p'), True)]
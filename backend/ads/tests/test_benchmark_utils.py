@@ -0,0 +1,18 @@
+from django.core.cache import cache
+
+from ads.benchmark_utils import TrackedCache
+
+
+def test_tracked_cache_clears_only_keys_touched_inside_the_block():
+    cache.set('other-user', 1)
+    cache.set('bench-read', 2)
+
+    with TrackedCache() as tracked:
+        assert cache.get('bench-read') == 2
+        cache.set('bench-write', 3)
+        tracked.clear()
+        assert cache.get_many(['bench-read', 'bench-write']) == {}
+
+    assert cache.get('other-user') == 1
+    assert tracked.keys == {'bench-read', 'bench-write'}
+    cache.clear()
@@ -0,0 +1,91 @@
+import json
+import pytest
+import requests
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from ads.models import ProgramRegistry
+from ads.services import YelpService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client():
+    user = User.objects.create_user(username='bulk-user', password='secret')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def test_bulk_pause_reports_per_program_and_updates_registry(api_client, monkeypatch):
+    for pid in ('p1', 'p2'):
+        ProgramRegistry.objects.create(username='bulk-user', program_id=pid, status='CURRENT')
+
+    def fake_pause(cls, program_id, auth=None):
+        if program_id == 'p2':
+            resp = requests.Response()
+            resp.status_code = 404
+            resp._content = b'{"error": "not found"}'
+            raise requests.HTTPError('404', response=resp)
+        return {'status': 202}
+
+    monkeypatch.setattr(YelpService, 'pause_program', classmethod(fake_pause))
+
+    response = api_client.post(
+        '/api/reseller/programs/bulk-pause', {'program_ids': ['p1', 'p2', 'p1']}, format='json'
+    )
+
+    assert response.status_code == 207
+    assert response.data['total'] == 2
+    assert [r['program_id'] for r in response.data['results']] == ['p1', 'p2']
+    assert response.data['results'][1]['status_code'] == 404
+    assert response.data['registry_updated'] == 1
+    assert ProgramRegistry.objects.get(program_id='p1').program_pause_status == 'PAUSED'
+    assert ProgramRegistry.objects.get(program_id='p2').program_pause_status is None
+
+
+def test_bulk_edit_validates_once(api_client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        YelpService, 'edit_program',
+        classmethod(lambda cls, pid, payload, auth=None: calls.append(pid) or {}),
+    )
+
+    response = api_client.post(
+        '/api/reseller/programs/bulk-edit', {'program_ids': ['p1', 'p2'], 'budget': '10.00'}, format='json'
+    )
+
+    assert response.status_code == 400
+    assert calls == []
+
+
+def test_bulk_features_validates_once_and_streams_per_program_results(api_client, monkeypatch):
+    calls = []
+
+    def fake_update(cls, program_id, payload, auth=None, retry=False):
+        calls.append((program_id, retry))
+        if program_id == 'p2':
+            resp = requests.Response()
+            resp.status_code = 404
+            resp._content = b'{"error": "not found"}'
+            raise requests.HTTPError('404', response=resp)
+        return {'program_id': program_id, 'features': payload['features']}
+
+    monkeypatch.setattr(YelpService, 'update_program_features', classmethod(fake_update))
+    features = {'AD_SCHEDULING': {'uses_opening_hours': True}}
+
+    invalid = api_client.post(
+        '/api/reseller/programs/bulk-features', {'program_ids': ['p1'], 'features': {'NOPE': {}}}, format='json'
+    )
+    assert invalid.status_code == 400 and calls == []
+
+    response = api_client.post(
+        '/api/reseller/programs/bulk-features', {'program_ids': ['p1', 'p2', 'p3'], 'features': features}, format='json'
+    )
+    events = [json.loads(chunk.decode()[len('data: '):]) for chunk in response.streaming_content]
+
+    assert response['Content-Type'] == 'text/event-stream'
+    assert [e['type'] for e in events] == ['start', 'result', 'result', 'result', 'complete']
+    assert {e['program_id']: e['success'] for e in events[1:-1]} == {'p1': True, 'p2': False, 'p3': True}
+    assert (events[-1]['succeeded'], events[-1]['failed']) == (2, 1)
+    assert sorted(calls) == [('p1', True), ('p2', True), ('p3', True)]
@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+import pytest
+
+from ads.models import BusinessRollup, ProgramRegistry
+from ads.rollup_service import BusinessRollupService
+from ads.sync_service import ProgramSyncService
+
+pytestmark = pytest.mark.django_db
+
+
+def make_program(program_id, business_id, program_name='CPC', status='CURRENT', program_status='ACTIVE', **extra):
+    return ProgramRegistry.objects.create(
+        username='u', program_id=program_id, yelp_business_id=business_id, program_name=program_name,
+        status=status, program_status=program_status, program_pause_status='NOT_PAUSED', **extra
+    )
+
+
+def test_rollups_back_business_ids_with_filters():
+    make_program('p1', 'b1', budget=Decimal('10.00'))
+    make_program('p2', 'b1', program_name='BP')
+    make_program('p3', 'b2', status='PAST', program_status='INACTIVE')
+
+    assert ProgramSyncService.get_business_ids_for_user('u')[0]['program_count'] == 2
+    assert [b['business_id'] for b in ProgramSyncService.get_business_ids_for_user('u', status='PAST')] == ['b2']
+    assert ProgramSyncService.get_business_ids_for_user('u', program_type='BP')[0]['program_count'] == 1
+    assert BusinessRollup.objects.get(username='u', yelp_business_id='b1').total_budget == Decimal('10.00')
+
+
+def test_incremental_refresh_follows_moved_and_deleted_programs():
+    make_program('p1', 'b1')
+    make_program('p2', 'b2')
+    BusinessRollupService.refresh('u')
+
+    before = BusinessRollupService.business_ids_for_programs('u', ['p1', 'p2'])
+    ProgramRegistry.objects.filter(program_id='p1').update(yelp_business_id='b2')
+    ProgramRegistry.objects.filter(program_id='p2').delete()
+    BusinessRollupService.refresh_for_programs('u', ['p1'], before=before)
+
+    rollups = {r.yelp_business_id: r.total_count for r in BusinessRollup.objects.filter(username='u')}
+    assert rollups == {'b2': 1}
+
+
+def test_refresh_changed_touches_only_businesses_of_changed_programs():
+    make_program('p1', 'b1')
+    make_program('p2', 'b2')
+    make_program('p3', 'b3')
+    BusinessRollupService.refresh('u')
+    BusinessRollup.objects.filter(yelp_business_id='b3').update(total_count=99)  # маркер: b3 не чіпаємо
+
+    before = BusinessRollupService.snapshot('u')
+    ProgramRegistry.objects.filter(program_id='p1').update(status='PAUSED', program_pause_status='PAUSED')
+    ProgramRegistry.objects.filter(program_id='p2').delete()
+    make_program('p4', 'b4')
+    BusinessRollupService.refresh_changed('u', before)
+
+    rollups = {r.yelp_business_id: (r.total_count, r.paused_count) for r in BusinessRollup.objects.filter(username='u')}
+    assert rollups == {'b1': (1, 1), 'b3': (99, 0), 'b4': (1, 0)}
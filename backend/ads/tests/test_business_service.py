@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from ads.async_business_service import AsyncBusinessService, TokenBucket
+from ads.models import Business
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def fake_fusion(monkeypatch):
+    calls = []
+    responses = {}
+
+    async def fake_fetch(cls, business_ids, api_key, max_concurrent=None):
+        calls.append(set(business_ids))
+        return {bid: responses.get(bid) for bid in business_ids}
+
+    monkeypatch.setattr(AsyncBusinessService, 'fetch_from_api', classmethod(fake_fetch))
+    return calls, responses
+
+
+def test_resolve_uses_db_cache_and_negative_caches_failures(fake_fusion):
+    calls, responses = fake_fusion
+    Business.objects.create(yelp_business_id='cached', name='Cached Biz')
+    responses['new'] = {'name': 'New Biz', 'url': 'https://yelp.com/biz/new', 'alias': 'new'}
+
+    result = AsyncBusinessService.resolve(['cached', 'new', 'missing'], api_key='k')
+
+    assert calls == [{'new', 'missing'}]
+    assert result['cached']['name'] == 'Cached Biz'
+    assert result['new']['name'] == 'New Biz'
+    assert 'missing' not in result
+
+    missing = Business.objects.get(yelp_business_id='missing')
+    assert missing.fetch_failed and missing.fetch_attempts == 1
+    assert missing.next_retry_at > timezone.now()
+
+    # Negative cache: the failed id is not re-checked before next_retry_at
+    AsyncBusinessService.resolve(['cached', 'new', 'missing'], api_key='k')
+    assert len(calls) == 1
+
+    Business.objects.filter(yelp_business_id='missing').update(next_retry_at=timezone.now() - timedelta(seconds=1))
+    AsyncBusinessService.resolve(['missing'], api_key='k')
+    assert calls[-1] == {'missing'}
+    missing.refresh_from_db()
+    assert missing.fetch_attempts == 2
+    assert missing.next_retry_at - timezone.now() > AsyncBusinessService.negative_ttl(1)
+
+
+def test_token_bucket_reserves_beyond_burst():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+
+
+def test_enrich_programs_is_db_only_and_enqueues_unknown(monkeypatch, fake_fusion):
+    from ads.views import ProgramListView
+
+    calls, _ = fake_fusion
+    enqueued = []
+    monkeypatch.setattr(AsyncBusinessService, 'enqueue_refresh', classmethod(lambda cls, ids: enqueued.append(set(ids))))
+    Business.objects.create(yelp_business_id='known', name='Known Biz', url='https://yelp.com/biz/known')
+
+    programs = ProgramListView.enrich_programs_with_custom_names(
+        [{'program_id': 'p1', 'yelp_business_id': 'known'}, {'program_id': 'p2', 'yelp_business_id': 'unknown'}],
+        'user',
+    )
+
+    assert calls == []
+    assert enqueued == [{'unknown'}]
+    assert programs[0]['business_name'] == 'Known Biz'
+    assert programs[1]['business_name'] == 'unknown'
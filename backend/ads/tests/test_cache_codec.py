@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+from ads import cache_codec
+
+PAYLOAD = {'grouped_by_business': [{'business_id': 'b1', 'programs': [{'program_id': 'p1', 'budget': 100}]}]}
+
+
+@pytest.mark.parametrize('name', sorted(cache_codec.CODECS))
+def test_codec_roundtrip_with_header(name):
+    data = cache_codec.encode(PAYLOAD, name)
+
+    assert data[:2] == cache_codec.MAGIC and data[3] == cache_codec.CODECS[name].codec_id
+    assert cache_codec.decode(data) == PAYLOAD
+
+
+def test_legacy_json_and_unknown_codec():
+    assert cache_codec.decode(json.dumps(PAYLOAD).encode()) == PAYLOAD
+    assert cache_codec.get_codec('no-such-codec').name == cache_codec.FALLBACK_CODEC
+    with pytest.raises(cache_codec.CacheCodecError):
+        cache_codec.decode(cache_codec.MAGIC + bytes((cache_codec.VERSION, 250)) + b'x')
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+from django.core.cache import cache
+
+from ads.feature_diff import BASELINE_CACHE, BASELINE_NONE, diff_features
+from ads.models import ProgramFeature
+from ads.partner_simulator import SimulatorConfig, SimulatorServer
+from ads.services import YelpService
+from ads.stampede_cache import StampedeCache
+
+FEATURES_POST = 'POST /program/{program_id}/features/v1'
+
+
+def test_diff_ignores_read_only_fields_and_key_order():
+    current = {
+        'NEGATIVE_KEYWORD_TARGETING': {'blocked_keywords': ['a'], 'suggested_keywords': ['x', 'y']},
+        'LINK_TRACKING': {'website': 'https://a', 'menu': None},
+    }
+    diff = diff_features(current, {
+        'NEGATIVE_KEYWORD_TARGETING': {'blocked_keywords': ['a']},
+        'LINK_TRACKING': {'menu': None, 'website': 'https://b'},
+        'AD_GOAL': {'ad_goal': 'CALLS'},
+    })
+
+    assert diff.baseline == BASELINE_CACHE and not diff.is_noop
+    assert set(diff.changed) == {'LINK_TRACKING', 'AD_GOAL'}
+    assert diff.unchanged == ['NEGATIVE_KEYWORD_TARGETING']
+    assert diff_features(None, {'AD_GOAL': {}}).baseline == BASELINE_NONE
+
+
+@pytest.mark.django_db
+def test_update_sends_only_changed_features_and_skips_noops(monkeypatch):
+    cache.clear()
+    with SimulatorServer(SimulatorConfig(programs=5, businesses=2)) as server:
+        monkeypatch.setattr(YelpService, 'PARTNER_BASE', server.url)
+        monkeypatch.setattr(YelpService, '_get_partner_auth', classmethod(lambda cls, username=None: ('user', 'pass')))
+        program_id = server.simulator.programs[0]['program_id']
+        server.simulator.features[program_id] = {'LINK_TRACKING': {'website': 'https://a'}}
+
+        YelpService.get_program_features(program_id)  # свіжий кеш — база для diff
+        YelpService.update_program_features(program_id, {'features': {
+            'LINK_TRACKING': {'website': 'https://a'},
+            'CALL_TRACKING': {'enabled': True},
+        }})
+        assert server.stats[FEATURES_POST] == 1
+        assert list(ProgramFeature.objects.filter(program_id=program_id).values_list('feature_type', flat=True)) == [
+            'CALL_TRACKING',
+        ]
+
+        YelpService.get_program_features(program_id)
+        unchanged = YelpService.update_program_features(program_id, {'features': {'CALL_TRACKING': {'enabled': True}}})
+        assert server.stats[FEATURES_POST] == 1
+        assert unchanged['features']['CALL_TRACKING'] == {'enabled': True}
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_entry_from_before_the_last_write_is_not_a_noop_baseline(monkeypatch):
+    cache.clear()
+    with SimulatorServer(SimulatorConfig(programs=5, businesses=2)) as server:
+        monkeypatch.setattr(YelpService, 'PARTNER_BASE', server.url)
+        monkeypatch.setattr(YelpService, '_get_partner_auth', classmethod(lambda cls, username=None: ('user', 'pass')))
+        program_id = server.simulator.programs[0]['program_id']
+        server.simulator.features[program_id] = {'AD_GOAL': {'ad_goal': 'WEBSITE_CLICKS'}}
+        key = YelpService.features_cache_key(program_id)
+        stampede = StampedeCache(cache)
+
+        before_write = stampede.generation(key)
+        YelpService.update_program_features(program_id, {'features': {'AD_GOAL': {'ad_goal': 'CALLS'}}})
+        # Знімок X, прочитаний до запису X→Y, який потрапив у кеш уже після інвалідації
+        cache.set(key, {'value': {'features': {'AD_GOAL': {'ad_goal': 'WEBSITE_CLICKS'}}},
+                        'soft_expires_at': time.time() + 60, 'delta': 0, 'generation': before_write}, 120)
+
+        YelpService.update_program_features(program_id, {'features': {'AD_GOAL': {'ad_goal': 'WEBSITE_CLICKS'}}})
+
+        assert server.stats[FEATURES_POST] == 2
+        assert server.simulator.features[program_id]['AD_GOAL'] == {'ad_goal': 'WEBSITE_CLICKS'}
+    cache.clear()
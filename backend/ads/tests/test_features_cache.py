@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from ads.models import CustomSuggestedKeyword
+from ads.partner_simulator import SimulatorConfig, SimulatorServer
+from ads.services import YelpService
+
+FEATURES_GET = 'GET /program/{program_id}/features/v1'
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    cache.clear()
+    with SimulatorServer(SimulatorConfig(programs=30, businesses=5)) as server:
+        monkeypatch.setattr(YelpService, 'PARTNER_BASE', server.url)
+        monkeypatch.setattr(YelpService, '_get_partner_auth', classmethod(lambda cls, username=None: ('user', 'pass')))
+        yield server
+    cache.clear()
+
+
+def test_features_are_read_through_and_invalidated_on_writes(simulator):
+    program_id = simulator.simulator.programs[0]['program_id']
+
+    first = YelpService.get_program_features(program_id)
+    assert YelpService.get_program_features(program_id) == first
+    assert simulator.stats[FEATURES_GET] == 1
+
+    YelpService.delete_program_features(program_id, list(first['features']))
+    assert YelpService.get_program_features(program_id)['features'] == {}
+    assert simulator.stats[FEATURES_GET] == 2
+
+    CustomSuggestedKeyword.objects.create(program_id=program_id, keyword='cheap')
+    YelpService.invalidate_program_features(program_id)  # як CustomSuggestedKeywordsView.post
+    YelpService.get_program_features(program_id)
+    assert simulator.stats[FEATURES_GET] == 3
+
+
+def test_prewarm_fetches_only_uncached_programs(simulator, settings):
+    settings.FEATURES_PREWARM_LIMIT = 5
+    ids = [p['program_id'] for p in simulator.simulator.programs[:8]]
+    YelpService.get_program_features(ids[0])
+
+    assert YelpService.prewarm_program_features(ids) == 4  # ліміт 5, один уже в кеші
+
+    keys = [YelpService.features_cache_key(program_id) for program_id in ids]
+    deadline = time.monotonic() + 10
+    while len(cache.get_many(keys[:5])) < 5 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(cache.get_many(keys[:5])) == 5 and not cache.get_many(keys[5:])
+    assert simulator.stats[FEATURES_GET] == 5
+
+
+def test_fetch_in_flight_during_update_does_not_cache_pre_update_snapshot(simulator, monkeypatch):
+    program_id = simulator.simulator.programs[0]['program_id']
+    simulator.simulator.features[program_id] = {'AD_GOAL': {'ad_goal': None}}
+    fetched, release = threading.Event(), threading.Event()
+    live_fetch = YelpService._fetch_program_features.__func__
+
+    def slow_fetch(cls, pid):
+        data = live_fetch(cls, pid)  # знімок ДО оновлення
+        fetched.set()
+        release.wait(5)
+        return data
+
+    monkeypatch.setattr(YelpService, '_fetch_program_features', classmethod(slow_fetch))
+    reader = threading.Thread(target=YelpService.get_program_features, args=(program_id,))
+    reader.start()
+    assert fetched.wait(5)
+    monkeypatch.setattr(YelpService, '_fetch_program_features', classmethod(live_fetch))
+
+    YelpService.update_program_features(program_id, {'features': {'AD_GOAL': {'ad_goal': 'CALLS'}}})
+    release.set()
+    reader.join(5)
+
+    assert YelpService.get_program_features(program_id)['features']['AD_GOAL'] == {'ad_goal': 'CALLS'}
+    assert simulator.stats[FEATURES_GET] == 2
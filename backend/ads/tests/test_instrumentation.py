@@ -0,0 +1,47 @@
+import re
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+
+from ads.instrumentation import QueryBudgetExceeded
+from ads.models import ProgramRegistry
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def client():
+    cache.clear()
+    ProgramRegistry.objects.bulk_create([
+        ProgramRegistry(
+            username='u', program_id=f'p{i}', yelp_business_id=f'b{i % 4}', program_name='CPC',
+            status='CURRENT', program_status='ACTIVE', program_pause_status='NOT_PAUSED',
+        )
+        for i in range(30)
+    ])
+    return Client(HTTP_AUTHORIZATION='Basic dTpw')  # u:p
+
+
+def query_count(response):
+    return int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing']).group(1))
+
+
+def test_server_timing_reports_queries_and_does_not_grow_with_page_size(client):
+    client.get('/api/reseller/business-ids')  # перший запит створює PartnerCredential/User
+    small = client.get('/api/reseller/programs', {'program_status': 'ALL', 'limit': 5})
+    cache.clear()
+    large = client.get('/api/reseller/programs', {'program_status': 'ALL', 'limit': 25})
+
+    assert small.status_code == large.status_code == 200
+    assert 'total;dur=' in small['Server-Timing'] and 'cpu;dur=' in small['Server-Timing']
+    assert query_count(small) > 0
+    assert query_count(large) == query_count(small)
+
+
+def test_budget_violation_raises_when_configured(client, settings):
+    settings.REQUEST_BUDGET_RAISE = True
+    settings.REQUEST_BUDGET_OVERRIDES = {'/api/reseller/business-ids': {'queries': 1}}
+
+    with pytest.raises(QueryBudgetExceeded, match='queries='):
+        client.get('/api/reseller/business-ids')
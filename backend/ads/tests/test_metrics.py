@@ -0,0 +1,41 @@
+import pytest
+from django.test import Client
+
+from ads.metrics import endpoint_label
+from ads.partner_simulator import SimulatorConfig, SimulatorServer
+from ads.services import YelpService
+
+
+def test_endpoint_label_replaces_ids():
+    assert endpoint_label('https://partner-api.yelp.com/program/a1b2c3/features/v1') == (
+        'partner', '/program/{id}/features/v1'
+    )
+    assert endpoint_label('https://api.yelp.com/v3/businesses/iK1X5e2Gi6ENkN6gRfpX-A') == (
+        'fusion', '/v3/businesses/{id}'
+    )
+    assert endpoint_label('https://partner-api.yelp.com/programs/v1?offset=40') == ('partner', '/programs/v1')
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_exposes_yelp_calls(monkeypatch, settings):
+    settings.METRICS_TOKEN = ''
+    with SimulatorServer(SimulatorConfig(programs=3)) as server:
+        monkeypatch.setattr(YelpService, 'PARTNER_BASE', server.url)
+        monkeypatch.setattr(YelpService, '_get_partner_auth', classmethod(lambda cls, username=None: ('u', 'p')))
+        YelpService.get_program_info(server.simulator.programs[0]['program_id'])
+
+    response = Client().get('/metrics')
+
+    assert response.status_code == 200
+    body = response.content.decode()
+    assert (
+        'yelp_api_requests_total{api="partner",endpoint="/v1/programs/info/{id}",method="GET",status="200"}'
+        in body
+    )
+    assert 'yelp_api_request_duration_seconds_bucket' in body
+
+
+def test_metrics_endpoint_requires_token_when_configured(settings):
+    settings.METRICS_TOKEN = 'secret'
+    assert Client().get('/metrics').status_code == 401
+    assert Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code == 200
@@ -0,0 +1,55 @@
+import pytest
+import requests
+
+from ads.partner_simulator import SimulatorConfig, SimulatorServer
+from ads.services import YelpService
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    with SimulatorServer(SimulatorConfig(programs=95, businesses=10)) as server:
+        monkeypatch.setattr(YelpService, 'PARTNER_BASE', server.url)
+        monkeypatch.setattr(YelpService, '_get_partner_auth', classmethod(lambda cls, username=None: ('user', 'pass')))
+        yield server
+
+
+def test_get_all_programs_pages_through_simulator(simulator):
+    seen = []
+    for offset in range(0, 95, 40):
+        page = YelpService.get_all_programs(offset=offset, limit=40, program_status='ALL')
+        assert page['total_count'] == 95
+        seen.extend(p['program_id'] for p in page['programs'])
+
+    assert len(seen) == len(set(seen)) == 95
+    assert all(p['program_id'] in simulator.simulator.programs_by_id for p in page['programs'])
+
+
+def test_features_and_program_info(simulator):
+    program_id = simulator.simulator.programs[0]['program_id']
+
+    info = YelpService.get_program_info(program_id)
+    assert info['programs'][0]['program_id'] == program_id
+
+    features = YelpService.get_program_features(program_id)
+    assert set(features['features']) == set(simulator.simulator.programs[0]['active_features'])
+
+
+def test_rate_limit_returns_429_with_retry_after():
+    with SimulatorServer(SimulatorConfig(programs=5, rate_limit=1, burst=2)) as server:
+        statuses = [
+            requests.get(f"{server.url}/programs/v1", auth=('user', 'pass')).status_code
+            for _ in range(4)
+        ]
+        throttled = requests.get(f"{server.url}/programs/v1", auth=('user', 'pass'))
+        other_client = requests.get(f"{server.url}/programs/v1", auth=('other', 'pass'))
+
+    assert statuses[:2] == [200, 200]
+    assert 429 in statuses[2:]
+    assert throttled.status_code == 429 and throttled.headers['Retry-After'] == '1'
+    assert other_client.status_code == 200
+    assert server.stats['throttled'] >= 2
+
+
+def test_missing_credentials_is_unauthorized():
+    with SimulatorServer(SimulatorConfig(programs=5)) as server:
+        assert requests.get(f"{server.url}/programs/v1").status_code == 401
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+
+from ads import profiler
+from ads.models import ProfileRecord
+
+pytestmark = pytest.mark.django_db
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_SLOW_REQUEST_MS = 0
+    settings.PROFILING_SLOW_SYNC_SECONDS = 0.05
+    settings.PROFILING_SAMPLE_RATE = 0.0
+    return settings
+
+
+def test_slow_sync_is_stored_as_collapsed_stacks(profiling):
+    @profiler.profiled_sync('sequential')
+    def sync(cls, username):
+        busy_wait(0.1)
+
+    sync(None, 'u')
+
+    record = ProfileRecord.objects.get()
+    assert (record.kind, record.reason, record.name, record.user) == ('sync', 'slow', 'sequential', 'u')
+    assert record.sample_count > 0
+    stack, count = record.stacks.splitlines()[0].rsplit(' ', 1)
+    assert stack.endswith('tests/test_profiler.py:sync;tests/test_profiler.py:busy_wait') and int(count) > 0
+
+
+def test_fast_sync_is_not_stored(profiling):
+    profiling.PROFILING_SLOW_SYNC_SECONDS = 10
+    profiler.profiled_sync('sequential')(lambda cls, username: busy_wait(0.02))(None, 'u')
+    assert not ProfileRecord.objects.exists()
+
+
+def test_request_profile_is_downloadable_by_request_id(profiling):
+    client = Client(HTTP_AUTHORIZATION='Basic dTpw')  # u:p
+    response = client.get('/api/reseller/business-ids', HTTP_X_REQUEST_ID='req-1')
+
+    assert response['X-Request-ID'] == 'req-1'
+    assert response['X-Profile-URL'] == '/api/profiles/req-1/'
+    assert client.get('/api/profiles/req-1/').status_code == 403  # без PROFILES_TOKEN закрито
+
+    profiling.PROFILES_TOKEN = 'secret'
+    User.objects.filter(username='u').update(is_staff=True)
+    assert client.get('/api/profiles/req-1/').status_code == 403  # Basic (будь-який пароль) не рахується
+
+    ops = Client(HTTP_AUTHORIZATION='Bearer secret')
+    listing = ops.get('/api/profiles/', {'kind': 'request'}).json()
+    assert 'req-1' in [p['request_id'] for p in listing['profiles']]
+    download = ops.get('/api/profiles/req-1/')
+    assert download.status_code == 200
+    assert download['Content-Disposition'].startswith('attachment;')
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in download.content.decode().splitlines())
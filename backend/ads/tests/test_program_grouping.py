@@ -0,0 +1,107 @@
+import pytest
+
+from ads.redis_service import IncompleteFetchError, ProgramGroupingService
+
+
+class FakeRedisClient:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class FakeRedisService:
+    generate_cache_key = staticmethod(lambda username, status: f"grouped_programs:{username}:{status}")
+
+    def __init__(self):
+        self.binary_client = FakeRedisClient()
+
+    def is_available(self):
+        return True
+
+
+def make_fetch(total, fail_offsets=()):
+    def fetch(offset, limit, program_status, username):
+        if offset in fail_offsets:
+            raise ConnectionError(f"boom at {offset}")
+        ids = range(offset, min(offset + limit, total))
+        return {
+            'total_count': total,
+            'programs': [{'program_id': f'p{i}', 'yelp_business_id': f'b{i % 3}'} for i in ids],
+        }
+    return fetch
+
+
+def test_parallel_fetch_keeps_offset_order():
+    programs = ProgramGroupingService(FakeRedisService()).fetch_all_programs_batch(make_fetch(95), batch_size=10)
+
+    assert [p['program_id'] for p in programs] == [f'p{i}' for i in range(95)]
+
+
+def test_failed_page_raises_with_partial_data():
+    service = ProgramGroupingService(FakeRedisService())
+
+    with pytest.raises(IncompleteFetchError) as exc:
+        service.fetch_all_programs_batch(make_fetch(50, fail_offsets={20}), batch_size=10)
+
+    assert exc.value.failed_offsets == [20]
+    assert len(exc.value.programs) == 40
+
+
+def test_partial_grouping_is_marked_and_never_cached(monkeypatch):
+    redis = FakeRedisService()
+    service = ProgramGroupingService(redis)
+    monkeypatch.setattr(
+        service, 'fetch_all_programs_batch',
+        lambda fetch_function, batch_size, username: (_ for _ in ()).throw(
+            IncompleteFetchError([{'program_id': 'p1', 'yelp_business_id': 'b1'}], [40], 80)
+        ),
+    )
+
+    result = service.get_all_grouped_programs(fetch_function=None, username='u')
+
+    assert result['partial'] is True
+    assert result['expected_total_programs'] == 80 and result['total_programs'] == 1
+    assert 'grouped_programs:u:ALL' not in redis.binary_client.data
+
+
+@pytest.mark.django_db
+def test_db_grouping_matches_python_grouping():
+    from decimal import Decimal
+    from ads.models import ProgramRegistry
+
+    rows = [
+        ('p1', 'b1', 'ACTIVE', 'NOT_PAUSED', Decimal('10.50'), Decimal('3.25')),
+        ('p2', 'b1', 'ACTIVE', 'PAUSED', Decimal('20.00'), Decimal('0')),
+        ('p3', 'b2', 'TERMINATED', 'NOT_PAUSED', Decimal('0'), None),
+        ('p4', '', 'INACTIVE', 'NOT_PAUSED', Decimal('5.00'), Decimal('1.10')),
+    ]
+    for pid, bid, program_status, pause, budget, cost in rows:
+        ProgramRegistry.objects.create(
+            username='u', program_id=pid, yelp_business_id=bid, program_name='CPC',
+            program_status=program_status, program_pause_status=pause,
+            budget=budget, ad_cost=cost, billed_impressions=7, billed_clicks=2,
+        )
+    ProgramRegistry.objects.create(username='other', program_id='x', yelp_business_id='b1')
+
+    service = ProgramGroupingService(redis_service=None)
+    from_db = service.group_programs_from_db('u', include_programs=True)
+    in_python = service.group_programs_by_business(
+        [program for group in from_db for program in group['programs']]
+    )
+
+    assert [(g['business_id'], g['stats']) for g in from_db] == [(g['business_id'], g['stats']) for g in in_python]
+    assert from_db[0]['stats']['total_budget'] == 3050
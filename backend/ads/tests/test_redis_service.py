@@ -0,0 +1,45 @@
+import redis
+
+from ads import redis_service
+from ads.redis_service import RedisCircuitBreaker, RedisService, SharedPoolRedisCache
+
+
+def test_clients_share_pool_without_connecting():
+    first, second = RedisService(), RedisService()
+
+    assert first.client.connection_pool is second.client.connection_pool
+    assert first.client.connection_pool is redis_service.get_connection_pool()
+    assert redis_service.get_connection_pool(decode_responses=False) is not first.client.connection_pool
+
+
+def test_circuit_breaker_opens_and_half_opens(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(redis_service.time, 'monotonic', lambda: clock[0])
+    breaker = RedisCircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock[0] += 10
+    assert breaker.allow() and breaker.state == 'half-open'
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_shared_cache_degrades_to_miss_when_redis_is_down(monkeypatch):
+    monkeypatch.setattr(redis_service, 'redis_breaker', RedisCircuitBreaker(failure_threshold=1))
+    cache = SharedPoolRedisCache('redis://unused', {})
+
+    def down(*args, **kwargs):
+        raise redis.ConnectionError('down')
+
+    monkeypatch.setattr(redis_service.RedisCacheClient, 'get', down)
+
+    assert cache.get('key', 'fallback') == 'fallback'
@@ -0,0 +1,54 @@
+import json
+import logging
+
+import pytest
+from django.test import Client
+
+from ads.logging_handlers import JsonFormatter, redact_body, redact_headers
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def client():
+    client = Client(HTTP_AUTHORIZATION='Basic dTpw')  # u:p
+    client.get('/api/reseller/business-ids')  # перший запит створює PartnerCredential/User
+    return client
+
+
+def request_records(caplog):
+    return [r for r in caplog.records if r.name == 'ads.requests']
+
+
+def test_compact_mode_logs_one_structured_line_per_request(client, settings, caplog):
+    settings.REQUEST_LOG_MODE = 'compact'
+    settings.REQUEST_LOG_SAMPLE_RATES = {}
+
+    with caplog.at_level(logging.INFO, logger='ads.requests'):
+        client.get('/api/reseller/business-ids', HTTP_X_REQUEST_ID='req-7')
+
+    [record] = request_records(caplog)
+    assert record.getMessage().startswith('🔴 RESPONSE: GET /api/reseller/business-ids -> 200')
+    assert (record.status_code, record.request_id) == (200, 'req-7')
+    assert isinstance(record.queries, int)
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload['path'] == '/api/reseller/business-ids' and payload['request_id'] == 'req-7'
+
+
+def test_sampling_drops_successful_requests_but_keeps_errors(client, settings, caplog):
+    settings.REQUEST_LOG_SAMPLE_RATES = {'/api/reseller/': 0.0}
+
+    with caplog.at_level(logging.INFO, logger='ads.requests'):
+        client.get('/api/reseller/business-ids')
+        client.get('/api/reseller/no-such-endpoint')
+
+    assert [r.status_code for r in request_records(caplog)] == [404]
+
+
+def test_redaction():
+    assert redact_headers({'Authorization': 'Basic dTpw', 'Accept': 'application/json'}) == {
+        'Authorization': '***', 'Accept': 'application/json',
+    }
+    body = redact_body(json.dumps({'features': {'CUSTOM': {'api_key': 'k', 'url': 'x'}}, 'password': 'p'}))
+    assert json.loads(body) == {'features': {'CUSTOM': {'api_key': '***', 'url': 'x'}}, 'password': '***'}
+    assert redact_body('x' * 2000, limit=10) == 'xxxxxxxxxx... (2000 chars)'
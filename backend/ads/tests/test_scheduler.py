@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+import requests
+from django.utils import timezone
+from ads.models import ScheduledPause, ScheduledBudgetUpdate
+from ads.scheduler import ScheduledOperationScheduler, build_budget_update_payload
+from ads.services import YelpService
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scheduler_executes_only_due_operations(monkeypatch):
+    paused = []
+    monkeypatch.setattr(YelpService, 'pause_program', classmethod(lambda cls, pid, auth=None: paused.append(pid) or {}))
+
+    now = timezone.now()
+    due = [
+        ScheduledPause.objects.create(program_id=f'due-{i}', username='u', scheduled_datetime=now - timedelta(seconds=i))
+        for i in range(5)
+    ]
+    later = ScheduledPause.objects.create(program_id='later', username='u', scheduled_datetime=now + timedelta(hours=1))
+
+    scheduler = ScheduledOperationScheduler(kinds=['pause'], max_workers=4)
+    scheduler._executor = ThreadPoolExecutor(max_workers=4)
+    scheduler.refresh()
+    assert scheduler.dispatch_due() == 5
+    scheduler._executor.shutdown(wait=True)
+
+    assert sorted(paused) == sorted(p.program_id for p in due)
+    assert set(ScheduledPause.objects.filter(id__in=[p.id for p in due]).values_list('status', flat=True)) == {'EXECUTED'}
+    assert ScheduledPause.objects.get(id=later.id).status == 'PENDING'
+    assert 0 < scheduler._seconds_until_next(timezone.now()) <= scheduler.resync_interval
+
+
+def test_budget_update_payload_is_in_dollars():
+    update = ScheduledBudgetUpdate(new_budget=5000, is_autobid=False, max_bid=150, pacing_method='paced')
+
+    assert build_budget_update_payload(update) == {
+        'budget': 50.0,
+        'is_autobid': False,
+        'max_bid': 1.5,
+        'pacing_method': 'paced',
+    }
+
+
+@pytest.mark.django_db
+def test_claim_skips_active_foreign_lease_and_reclaims_expired():
+    now = timezone.now()
+    held = ScheduledPause.objects.create(
+        program_id='held', username='u', scheduled_datetime=now,
+        claimed_by='other-worker', lease_expires_at=now + timedelta(minutes=5),
+    )
+    expired = ScheduledPause.objects.create(
+        program_id='expired', username='u', scheduled_datetime=now,
+        claimed_by='dead-worker', lease_expires_at=now - timedelta(seconds=1),
+    )
+
+    scheduler = ScheduledOperationScheduler(kinds=['pause'], worker_id='me')
+
+    assert scheduler.claim('pause', [held.id, expired.id]) == [expired.id]
+    assert ScheduledPause.objects.get(id=expired.id).claimed_by == 'me'
+    assert ScheduledPause.objects.get(id=held.id).claimed_by == 'other-worker'
+
+
+def _http_error(status_code):
+    resp = requests.Response()
+    resp.status_code = status_code
+    return requests.HTTPError(str(status_code), response=resp)
+
+
+@pytest.mark.django_db
+def test_transient_failure_is_retried_then_dead_lettered(monkeypatch):
+    monkeypatch.setattr(YelpService, 'pause_program', classmethod(lambda cls, pid, auth=None: (_ for _ in ()).throw(_http_error(503))))
+    monkeypatch.setattr('ads.scheduler.connection.close', lambda: None)
+
+    pause = ScheduledPause.objects.create(program_id='flaky', username='u', scheduled_datetime=timezone.now())
+    scheduler = ScheduledOperationScheduler(kinds=['pause'], worker_id='me', max_attempts=2, retry_base_delay=60)
+
+    scheduler.claim('pause', [pause.id])
+    scheduler.execute('pause', pause.id)
+    pause.refresh_from_db()
+    assert (pause.status, pause.attempt_count, pause.claimed_by) == ('PENDING', 1, None)
+    assert pause.next_attempt_at > timezone.now()
+    assert scheduler.claim('pause', [pause.id]) == []  # not before next_attempt_at
+
+    ScheduledPause.objects.filter(id=pause.id).update(next_attempt_at=timezone.now())
+    scheduler.claim('pause', [pause.id])
+    scheduler.execute('pause', pause.id)
+    pause.refresh_from_db()
+    assert (pause.status, pause.attempt_count) == ('DEAD_LETTER', 2)
+
+
+@pytest.mark.django_db
+def test_client_error_fails_without_retry(monkeypatch):
+    monkeypatch.setattr(YelpService, 'pause_program', classmethod(lambda cls, pid, auth=None: (_ for _ in ()).throw(_http_error(404))))
+    monkeypatch.setattr('ads.scheduler.connection.close', lambda: None)
+
+    pause = ScheduledPause.objects.create(program_id='gone', username='u', scheduled_datetime=timezone.now())
+    scheduler = ScheduledOperationScheduler(kinds=['pause'], worker_id='me')
+
+    scheduler.claim('pause', [pause.id])
+    scheduler.execute('pause', pause.id)
+    pause.refresh_from_db()
+    assert (pause.status, pause.attempt_count) == ('FAILED', 1)
@@ -0,0 +1,38 @@
+import multiprocessing
+import runpy
+from pathlib import Path
+
+import pytest
+from django.core.management import CommandError, call_command
+
+GUNICORN_CONF = Path(__file__).resolve().parents[2] / 'gunicorn.conf.py'
+
+
+@pytest.mark.django_db
+def test_selfcheck_passes_on_migrated_database(capsys, monkeypatch):
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+    call_command('selfcheck')
+    out = capsys.readouterr().out
+    assert '✅ migrations' in out and 'Self-check passed' in out
+
+
+@pytest.mark.django_db
+def test_selfcheck_fails_on_unwritable_metrics_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path / 'missing'))
+    with pytest.raises(CommandError, match='metrics'):
+        call_command('selfcheck')
+
+
+def test_gunicorn_conf_picks_worker_model_from_async_views(monkeypatch):
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    monkeypatch.setenv('ASYNC_VIEWS', 'false')
+    wsgi = runpy.run_path(str(GUNICORN_CONF))
+    assert (wsgi['worker_class'], wsgi['wsgi_app']) == ('gthread', 'backend.wsgi:application')
+    assert wsgi['workers'] == 2 * multiprocessing.cpu_count() + 1 and wsgi['preload_app']
+
+    monkeypatch.setenv('ASYNC_VIEWS', 'true')
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    asgi = runpy.run_path(str(GUNICORN_CONF))
+    assert (asgi['worker_class'], asgi['wsgi_app'], asgi['workers']) == (
+        'uvicorn.workers.UvicornWorker', 'backend.asgi:application', 3,
+    )
@@ -0,0 +1,60 @@
+import threading
+import time
+import uuid
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from ads.stampede_cache import HIT, MISS, STALE, StampedeCache
+
+
+def make_cache():
+    return StampedeCache(LocMemCache(uuid.uuid4().hex, {}), wait_timeout=2, poll_interval=0.01, beta=0)
+
+
+def test_concurrent_cold_misses_compute_once():
+    cache = make_cache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'programs': [1, 2]}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute, ttl=60)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(value == {'programs': [1, 2]} for value, _ in results)
+    assert [status for _, status in results].count(MISS) == 1
+
+
+def test_stale_value_served_while_another_worker_refreshes():
+    cache = make_cache()
+    cache.get_or_compute('k', lambda: 'old', ttl=60)
+    envelope = cache.store.get('k')
+    envelope['soft_expires_at'] = time.time() - 1
+    cache.store.set('k', envelope, 60)
+
+    assert cache.store.add(cache.lock_key('k'), 'other-worker', 30)
+    assert cache.get_or_compute('k', lambda: 'new', ttl=60) == ('old', STALE)
+
+    cache.store.delete(cache.lock_key('k'))
+    assert cache.get_or_compute('k', lambda: 'new', ttl=60) == ('new', MISS)
+    assert cache.get_or_compute('k', lambda: 'newer', ttl=60) == ('new', HIT)
+
+
+def test_failed_refresh_keeps_serving_stale_value():
+    cache = make_cache()
+    cache.get_or_compute('k', lambda: 'old', ttl=0, stale_ttl=60)
+
+    def broken():
+        raise RuntimeError('partner API down')
+
+    assert cache.get_or_compute('k', broken, ttl=60) == ('old', STALE)
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ads import tracing
+from ads.async_sync_service import AsyncProgramSyncService
+from ads.benchmark_utils import QueryCounter
+from ads.models import PartnerCredential
+from ads.partner_simulator import SimulatorConfig, SimulatorServer
+
+
+@pytest.mark.django_db
+def test_asyncio_sync_exports_phase_and_page_spans(monkeypatch, settings, tmp_path):
+    settings.TRACING_EXPORTER = 'file'
+    settings.TRACING_FILE = str(tmp_path / 'spans.jsonl')
+    settings.YELP_FUSION_API_KEY = ''
+    PartnerCredential.objects.create(username='u', password='p')
+
+    with SimulatorServer(SimulatorConfig(programs=100)) as server:
+        monkeypatch.setattr(AsyncProgramSyncService, 'PARTNER_BASE', server.url)
+        events = list(AsyncProgramSyncService.sync_with_asyncio('u', batch_size=40))
+
+    assert events[-1]['type'] == 'complete'
+    spans = tracing.load_spans(settings.TRACING_FILE)
+    by_name = {s['name']: s for s in spans}
+    root = by_name['sync.asyncio']
+    assert root['parentSpanId'] is None and root['attributes'] == {'username': 'u'}
+    assert {'sync.credentials', 'sync.api_fetch', 'sync.diff', 'sync.add', 'sync.rollup'} <= set(by_name)
+    assert all(by_name[name]['parentSpanId'] == root['spanId'] for name in ('sync.api_fetch', 'sync.add'))
+
+    pages = [s for s in spans if s['name'] == 'yelp.programs.page']
+    assert sorted(s['attributes']['offset'] for s in pages) == [0, 40, 80]
+    assert {s['parentSpanId'] for s in pages} == {by_name['sync.api_fetch']['spanId']}
+    assert tracing.critical_path(spans)[0] is root
+
+
+def test_chrome_trace_puts_overlapping_siblings_on_separate_lanes():
+    def span(span_id, start, end, parent=None):
+        return {
+            'spanId': span_id, 'parentSpanId': parent, 'name': span_id, 'kind': tracing.KIND_INTERNAL,
+            'startTimeUnixNano': start, 'endTimeUnixNano': end, 'status': {'code': tracing.STATUS_OK},
+        }
+
+    spans = [span('root', 0, 100), span('a', 10, 50, 'root'), span('b', 20, 60, 'root'), span('c', 60, 90, 'root')]
+
+    lanes = {e['name']: e['tid'] for e in tracing.to_chrome_trace(spans)['traceEvents']}
+
+    assert lanes['root'] == lanes['a'] == lanes['c'] != lanes['b']
+    assert tracing.peak_concurrency(spans[1:]) == 2
+
+
+def test_query_counter_sees_asyncpg_statements_but_not_their_row_counts():
+    class FakeConnection:
+        def add_query_logger(self, callback):
+            self.logger = callback
+
+    conn = FakeConnection()
+    with QueryCounter() as counter:
+        asyncio.run(tracing.init_asyncpg_connection(conn))
+        conn.logger(SimpleNamespace(query='SELECT 1', elapsed=0.001, exception=None))
+        assert counter.rows_written == 0
+        conn.logger(SimpleNamespace(query='  UPDATE ads_programregistry SET ...', elapsed=0.002, exception=None))
+
+    assert counter.queries == 2 and counter.by_statement == {'SELECT': 1, 'UPDATE': 1}
+    assert counter.rows_written is None
+    assert tracing._asyncpg_observers == []
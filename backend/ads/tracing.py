@@ -0,0 +1,351 @@
+"""
+Легкий трейсинг (модель спанів як в OpenTelemetry) для фаз синхронізації,
+сторінок Partner API та asyncpg запитів.
+
+TRACING_EXPORTER: '' (вимкнено) | 'console' (stdout) | 'file' (TRACING_FILE, JSON lines).
+Кожен рядок — один завершений спан з полями OTLP/JSON (traceId, spanId, parentSpanId,
+startTimeUnixNano, ...); `manage.py show_trace` будує з них дерево / Chrome trace
+(chrome://tracing, ui.perfetto.dev) для аналізу критичного шляху та паралелізму.
+
+Поточний спан живе в contextvar, тому asyncio-задачі, створені всередині спану,
+автоматично стають його дочірніми (потоки ThreadPoolExecutor — ні).
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'yelp-ads-backend'
+KIND_INTERNAL = 'SPAN_KIND_INTERNAL'
+KIND_CLIENT = 'SPAN_KIND_CLIENT'
+STATUS_OK = 'STATUS_CODE_OK'
+STATUS_ERROR = 'STATUS_CODE_ERROR'
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('current_span', default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    """Один завершуваний інтервал роботи; end() віддає його експортеру."""
+
+    def __init__(self, name: str, kind: str = KIND_INTERNAL, parent: Optional['Span'] = None,
+                 attributes: Optional[Dict] = None, start_ns: Optional[int] = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_OK
+        self.status_message = ''
+        self._previous = None
+        self._activated = False
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_status(self, status: str, message: str = ''):
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException):
+        self.set_status(STATUS_ERROR, f"{type(exc).__name__}: {exc}")
+
+    def activate(self) -> 'Span':
+        """Зробити спан поточним (батьком для наступних спанів цього контексту)."""
+        self._previous = _current_span.get()
+        self._activated = True
+        _current_span.set(self)
+        return self
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self._activated:
+            # Не token.reset(): спани фаз генераторів завершуються між yield-ами
+            _current_span.set(self._previous)
+        _export(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': self.start_ns,
+            'endTimeUnixNano': self.end_ns,
+            'attributes': self.attributes,
+            'status': {'code': self.status, 'message': self.status_message},
+            'resource': {'service.name': SERVICE_NAME},
+        }
+
+
+class _NoopSpan:
+    """Повертається, коли трейсинг вимкнений — виклики нічого не коштують."""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_status(self, status, message=''):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+    def activate(self):
+        return self
+
+    def end(self, end_ns=None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class ConsoleExporter:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+
+
+class FileExporter:
+    """JSON lines; файл дописується, тож кілька запусків лежать поруч (розрізняються traceId)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+_exporter = None
+_exporter_key = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    """Експортер за налаштуваннями (перевизначається при зміні TRACING_EXPORTER/TRACING_FILE)."""
+    global _exporter, _exporter_key
+    key = (getattr(settings, 'TRACING_EXPORTER', ''), getattr(settings, 'TRACING_FILE', 'traces.jsonl'))
+    if key != _exporter_key:
+        with _exporter_lock:
+            kind, path = key
+            if kind == 'console':
+                _exporter = ConsoleExporter()
+            elif kind == 'file':
+                _exporter = FileExporter(path)
+            else:
+                _exporter = None
+            _exporter_key = key
+    return _exporter
+
+
+def enabled() -> bool:
+    return get_exporter() is not None
+
+
+def _export(span: Span):
+    exporter = get_exporter()
+    if exporter is None:
+        return
+    try:
+        exporter.export(span)
+    except Exception as e:  # трейсинг ніколи не ламає синхронізацію
+        logger.debug(f"Failed to export span {span.name}: {e}")
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(name: str, kind: str = KIND_INTERNAL, **attributes):
+    """Почати й активувати спан; завершити — span.end(). Для фаз, що перетинають yield."""
+    if not enabled():
+        return NOOP_SPAN
+    return Span(name, kind, parent=_current_span.get(), attributes=attributes).activate()
+
+
+@contextmanager
+def span(name: str, kind: str = KIND_INTERNAL, **attributes):
+    """with tracing.span('sync.db_delete', rows=n) as s: ... — виняток → статус ERROR."""
+    current = start_span(name, kind, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        current.end()
+
+
+def traced(name: str):
+    """
+    Декоратор кореневого спану методу синхронізації (cls, username, ...); працює і для
+    генераторів (SSE) — спан закривається, коли генератор вичерпано або закрито.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(cls, username, *args, **kwargs):
+                with span(name, username=username):
+                    yield from func(cls, username, *args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(cls, username, *args, **kwargs):
+                with span(name, username=username):
+                    return func(cls, username, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def asyncpg_query_logger(record):
+    """
+    asyncpg Connection.add_query_logger callback → спан 'db.asyncpg' (елапсед знає asyncpg,
+    callback викликається через loop.call_soon у контексті задачі, що виконувала запит).
+    """
+    parent = _current_span.get()
+    if parent is None or not enabled():
+        return
+    end_ns = time.time_ns()
+    statement = ' '.join(record.query.split())
+    db_span = Span(
+        'db.asyncpg', KIND_CLIENT, parent=parent, start_ns=end_ns - int(record.elapsed * 1e9),
+        attributes={'db.system': 'postgresql', 'db.statement': statement[:500]},
+    )
+    if record.exception is not None:
+        db_span.record_exception(record.exception)
+    db_span.end(end_ns)
+
+
+# Інші спостерігачі asyncpg-запитів (напр. benchmark_utils.QueryCounter): asyncpg іде повз
+# Django execute_wrappers, тож це єдине місце, де видно його запити
+_asyncpg_observers = []
+
+
+def add_asyncpg_observer(callback):
+    """callback(record) для кожного запиту з'єднань, створених після реєстрації."""
+    _asyncpg_observers.append(callback)
+
+
+def remove_asyncpg_observer(callback):
+    if callback in _asyncpg_observers:
+        _asyncpg_observers.remove(callback)
+
+
+def _asyncpg_query_hook(record):
+    asyncpg_query_logger(record)
+    for observer in list(_asyncpg_observers):
+        try:
+            observer(record)
+        except Exception as e:
+            logger.debug(f"asyncpg query observer failed: {e}")
+
+
+async def init_asyncpg_connection(conn):
+    """init= для asyncpg.create_pool: запити з'єднання йдуть у спани та спостерігачам (якщо є кому)."""
+    if enabled() or _asyncpg_observers:
+        conn.add_query_logger(_asyncpg_query_hook)
+
+
+# ---------------------------------------------------------------- offline аналіз
+
+def load_spans(path: str, trace_id: Optional[str] = None) -> list:
+    """Спани одного трейсу з JSON lines файлу (за замовчуванням — трейсу останнього кореневого спану)."""
+    with open(path, encoding='utf-8') as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    if trace_id is None:
+        roots = [s for s in spans if not s.get('parentSpanId')]
+        if not roots:
+            return []
+        trace_id = max(roots, key=lambda s: s['endTimeUnixNano'])['traceId']
+    return sorted((s for s in spans if s['traceId'] == trace_id), key=lambda s: s['startTimeUnixNano'])
+
+
+def children_index(spans: list) -> Dict[Optional[str], list]:
+    index: Dict[Optional[str], list] = {}
+    for s in spans:
+        index.setdefault(s.get('parentSpanId'), []).append(s)
+    return index
+
+
+def critical_path(spans: list) -> list:
+    """Ланцюжок від кореня: на кожному рівні — дочірній спан, що завершився останнім."""
+    index = children_index(spans)
+    known = {s['spanId'] for s in spans}
+    roots = [s for s in spans if s.get('parentSpanId') not in known]
+    if not roots:
+        return []
+    path = [max(roots, key=lambda s: s['endTimeUnixNano'])]
+    while index.get(path[-1]['spanId']):
+        path.append(max(index[path[-1]['spanId']], key=lambda s: s['endTimeUnixNano']))
+    return path
+
+
+def peak_concurrency(spans: list) -> int:
+    events = sorted(
+        [(s['startTimeUnixNano'], 1) for s in spans] + [(s['endTimeUnixNano'], -1) for s in spans],
+        key=lambda e: (e[0], e[1]),
+    )
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def to_chrome_trace(spans: list) -> Dict:
+    """
+    Chrome Trace Event формат: паралельні спани розкладаються по окремих доріжках (tid),
+    вкладені — лишаються на доріжці батька.
+    """
+    lanes: list = []  # стек end_ns відкритих спанів на кожній доріжці
+    events = []
+    for s in sorted(spans, key=lambda s: (s['startTimeUnixNano'], -s['endTimeUnixNano'])):
+        start, end = s['startTimeUnixNano'], s['endTimeUnixNano']
+        for lane_id, stack in enumerate(lanes):
+            while stack and stack[-1] <= start:
+                stack.pop()
+            if not stack or stack[-1] >= end:
+                break
+        else:
+            lanes.append([])
+            lane_id = len(lanes) - 1
+        lanes[lane_id].append(end)
+        events.append({
+            'name': s['name'],
+            'cat': s['kind'],
+            'ph': 'X',
+            'ts': start / 1000,
+            'dur': (end - start) / 1000,
+            'pid': 1,
+            'tid': lane_id,
+            'args': {**s.get('attributes', {}), 'status': s['status']['code']},
+        })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, re_path
 from .views import (
     CreateProgramView,
@@ -6,6 +7,10 @@ from .views import (
     UpdateProgramCustomNameView,
     PauseProgramView,
     ResumeProgramView,
+    BulkPauseProgramsView,
+    BulkResumeProgramsView,
+    BulkEditProgramsView,
+    BulkProgramFeaturesView,
     SchedulePauseProgramView,
     ScheduledPausesListView,
     ScheduleBudgetUpdateView,
@@ -40,14 +45,27 @@ from .views import (
     DuplicateProgramView,
     # Business IDs View
     BusinessIdsView,
+    GroupedProgramsView,
     AvailableFiltersView,  # 🧠 NEW - Smart Filters
     # Logs View
     LogsView,
+    ProfilesView,
+    ProfileDownloadView,
     # Cancel scheduled operations
     CancelScheduledPauseView,
     CancelScheduledBudgetUpdateView,
 )
 
+if settings.ASYNC_VIEWS:
+    # Ті ж шляхи й контракт, але очікування Yelp — в event loop (лише під ASGI)
+    from .async_views import (
+        AsyncBulkProgramFeaturesView as BulkProgramFeaturesView,
+        AsyncJobStatusView as JobStatusView,
+        AsyncPartnerProgramInfoView as PartnerProgramInfoView,
+        AsyncProgramFeaturesView as ProgramFeaturesView,
+        AsyncProgramSyncStreamView as ProgramSyncStreamView,
+    )
+
 urlpatterns = [
     # Auth endpoints
     path('auth/validate-credentials', ValidateCredentialsView.as_view()),
@@ -68,6 +86,10 @@ urlpatterns = [
     path('reseller/program/<str:program_id>/custom-name', UpdateProgramCustomNameView.as_view()),
     path('program/<str:program_id>/pause/v1', PauseProgramView.as_view()),
     path('program/<str:program_id>/resume/v1', ResumeProgramView.as_view()),
+    path('reseller/programs/bulk-pause', BulkPauseProgramsView.as_view()),
+    path('reseller/programs/bulk-resume', BulkResumeProgramsView.as_view()),
+    path('reseller/programs/bulk-edit', BulkEditProgramsView.as_view()),
+    path('reseller/programs/bulk-features', BulkProgramFeaturesView.as_view()),
     path('program/<str:program_id>/schedule-pause/v1', SchedulePauseProgramView.as_view()),
     path('reseller/scheduled-pauses', ScheduledPausesListView.as_view()),
     path('reseller/scheduled-pause/<int:pause_id>/cancel', CancelScheduledPauseView.as_view()),
@@ -82,6 +104,7 @@ urlpatterns = [
     path('reseller/programs/sync', ProgramSyncView.as_view()),  # NEW - синхронізація (старий метод)
     path('reseller/programs/sync-stream', ProgramSyncStreamView.as_view()),  # NEW - синхронізація з SSE прогресом
     path('reseller/business-ids', BusinessIdsView.as_view()),
+    path('reseller/programs/grouped', GroupedProgramsView.as_view()),
     path('reseller/available-filters', AvailableFiltersView.as_view()),  # 🧠 NEW - розумні фільтри
     path('reseller/get_program_info', ProgramInfoView.as_view()),
     path('reseller/business_programs/<str:business_id>', BusinessProgramsView.as_view()),
@@ -99,6 +122,8 @@ urlpatterns = [
 
     # Logs endpoint (for debugging and monitoring)
     path('logs/', LogsView.as_view()),
+    path('profiles/', ProfilesView.as_view()),
+    path('profiles/<str:request_id>/', ProfileDownloadView.as_view()),
 
     re_path(r'^reporting/businesses/(?P<period>[^/]+)/?$', RequestReportView.as_view()),
     re_path(r'^reporting/businesses/(?P<period>[^/]+)/(?P<report_id>[^/]+)/?$', FetchReportView.as_view()),
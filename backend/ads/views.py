@@ -7,7 +7,13 @@ import uuid
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.db import models
+from .auth import HasProfilesToken
 from .services import YelpService
+from .bulk_service import BulkProgramService
+from .scheduler import notify_scheduler
+from .stampede_cache import StampedeCache, MISS as CACHE_MISS
+from .metrics import record_cache
+from .rollup_service import BusinessRollupService
 from .models import Program, PortfolioProject, PortfolioPhoto, PartnerCredential, CustomSuggestedKeyword, ScheduledPause, ScheduledBudgetUpdate, ProgramRegistry
 from .serializers import (
     ProgramSerializer, ProgramFeaturesRequestSerializer, ProgramFeaturesDeleteSerializer,
@@ -15,7 +21,8 @@ from .serializers import (
     PortfolioPhotoUploadSerializer, PortfolioPhotoUploadResponseSerializer,
     PortfolioPhotoSerializer, CustomSuggestedKeywordSerializer,
     CustomSuggestedKeywordCreateSerializer, CustomSuggestedKeywordDeleteSerializer,
-    DuplicateProgramRequestSerializer, DuplicateProgramResponseSerializer
+    DuplicateProgramRequestSerializer, DuplicateProgramResponseSerializer,
+    BulkProgramIdsSerializer, BulkEditProgramsSerializer, BulkProgramFeaturesSerializer
 )
 from django.shortcuts import get_object_or_404
 
@@ -196,6 +203,97 @@ class ResumeProgramView(APIView):
             )
 
 
+def _bulk_report_response(report):
+    """202 якщо всі програми оброблено успішно, інакше 207 з per-program звітом"""
+    http_status = status.HTTP_202_ACCEPTED if report['failed'] == 0 else status.HTTP_207_MULTI_STATUS
+    return Response(report, status=http_status)
+
+
+class BulkPauseProgramsView(APIView):
+    """Pause many programs in one request"""
+
+    def post(self, request):
+        serializer = BulkProgramIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        program_ids = serializer.validated_data['program_ids']
+        username = request.user.username if request.user and request.user.is_authenticated else None
+        logger.info(f"⏸️ Bulk pause of {len(program_ids)} programs requested by {username}")
+
+        report = BulkProgramService.bulk_pause(program_ids, username=username)
+        logger.info(f"⏸️ Bulk pause finished: {report['succeeded']}/{report['total']} succeeded")
+        return _bulk_report_response(report)
+
+
+class BulkResumeProgramsView(APIView):
+    """Resume many programs in one request"""
+
+    def post(self, request):
+        serializer = BulkProgramIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        program_ids = serializer.validated_data['program_ids']
+        username = request.user.username if request.user and request.user.is_authenticated else None
+        logger.info(f"▶️ Bulk resume of {len(program_ids)} programs requested by {username}")
+
+        report = BulkProgramService.bulk_resume(program_ids, username=username)
+        logger.info(f"▶️ Bulk resume finished: {report['succeeded']}/{report['total']} succeeded")
+        return _bulk_report_response(report)
+
+
+class BulkEditProgramsView(APIView):
+    """Apply the same budget/bid change to many programs in one request"""
+
+    def post(self, request):
+        serializer = BulkEditProgramsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        payload = dict(serializer.validated_data)
+        program_ids = payload.pop('program_ids')
+        username = request.user.username if request.user and request.user.is_authenticated else None
+        logger.info(f"🔧 Bulk edit of {len(program_ids)} programs requested by {username}: {payload}")
+
+        report = BulkProgramService.bulk_edit(program_ids, payload, username=username)
+        logger.info(f"🔧 Bulk edit finished: {report['succeeded']}/{report['total']} succeeded")
+        return _bulk_report_response(report)
+
+
+class BulkProgramFeaturesView(APIView):
+    """
+    Apply the same features object to many programs; per-program results are streamed via SSE
+    as partner calls complete (start → result × N → complete).
+    """
+
+    def post(self, request):
+        from django.http import StreamingHttpResponse
+        import json
+
+        serializer = BulkProgramFeaturesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        program_ids = serializer.validated_data['program_ids']
+        features = serializer.validated_data['features']
+        username = request.user.username if request.user and request.user.is_authenticated else None
+        logger.info(f"🎯 Bulk features {list(features)} for {len(program_ids)} programs requested by {username}")
+
+        def event_stream():
+            try:
+                for event in BulkProgramService.bulk_update_features_stream(program_ids, features, username=username):
+                    yield f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+            except Exception as e:
+                logger.error(f"❌ Bulk features stream error for {username}: {e}", exc_info=True)
+                yield f"data: {json.dumps({'type': 'error', 'message': f'Bulk features failed: {e}'})}\n\n"
+
+        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Disable nginx buffering
+        return response
+
+
 class SchedulePauseProgramView(APIView):
     """Schedule program pause in the future"""
     
@@ -295,6 +393,7 @@ class SchedulePauseProgramView(APIView):
             )
             
             logger.info(f"Successfully scheduled pause for program {program_id} at {scheduled_datetime}")
+            notify_scheduler('pause')
             
             return Response({
                 "id": scheduled_pause.id,
@@ -362,6 +461,8 @@ class ScheduledPausesListView(APIView):
                 'status': pause.status,
                 'executed_at': pause.executed_at.isoformat() if pause.executed_at else None,
                 'error_message': pause.error_message,
+                'attempt_count': pause.attempt_count,
+                'next_attempt_at': pause.next_attempt_at.isoformat() if pause.next_attempt_at else None,
                 'created_at': pause.created_at.isoformat(),
             })
         
@@ -526,6 +627,7 @@ class ScheduleBudgetUpdateView(APIView):
             )
             
             logger.info(f"Successfully scheduled program update for program {program_id} at {scheduled_datetime}")
+            notify_scheduler('budget')
             
             update_parts = []
             if budget_cents:
@@ -603,6 +705,8 @@ class ScheduledBudgetUpdatesListView(APIView):
                 'status': update.status,
                 'executed_at': update.executed_at.isoformat() if update.executed_at else None,
                 'error_message': update.error_message,
+                'attempt_count': update.attempt_count,
+                'next_attempt_at': update.next_attempt_at.isoformat() if update.next_attempt_at else None,
                 'created_at': update.created_at.isoformat(),
             })
         
@@ -938,7 +1042,10 @@ class ProgramListView(APIView):
     @staticmethod
     def enrich_programs_with_custom_names(programs, username):
         """
-        Збагачує програми custom_name з локальної бази даних та деталями бізнесу з Yelp Fusion API.
+        Збагачує програми custom_name та деталями бізнесу - тільки з БД, без запитів до API.
+        
+        Невідомі (або застарілі) business_id віддаються фоновому резолверу
+        AsyncBusinessService, а у відповіді поки що стоїть сам id як placeholder.
         
         Args:
             programs: List of program dicts from Yelp API
@@ -948,7 +1055,7 @@ class ProgramListView(APIView):
             List of enriched programs with custom_name, business_name, and business_url fields
         """
         from .models import ProgramRegistry
-        from .services import YelpService
+        from .async_business_service import AsyncBusinessService
         
         if not programs or not username:
             return programs
@@ -968,54 +1075,31 @@ class ProgramListView(APIView):
         # Створюємо словник program_id -> custom_name
         custom_names = {item['program_id']: item['custom_name'] for item in registry_data}
         
-        # Створюємо словник business_id -> business_name з БД
-        business_names_from_db = {}
-        for item in registry_data:
-            if item['yelp_business_id'] and item['business_name']:
-                business_names_from_db[item['yelp_business_id']] = item['business_name']
-        
         # Збираємо унікальні business_ids
-        business_ids = set()
-        for program in programs:
+        def program_business_id(program):
             business_id = program.get('yelp_business_id')
             if not business_id and program.get('businesses'):
                 business_id = program['businesses'][0].get('yelp_business_id')
-            if business_id:
-                business_ids.add(business_id)
+            return business_id
         
-        # Отримуємо деталі бізнесів (спочатку з БД, потім з API тільки якщо немає в БД)
-        business_details = {}
-        business_ids_without_names = business_ids - set(business_names_from_db.keys())
+        business_ids = {bid for bid in map(program_business_id, programs) if bid}
         
-        # Для бізнесів без назв в БД - запитуємо API (обмежено для запобігання rate limit)
-        for business_id in list(business_ids_without_names)[:10]:
-            try:
-                details = YelpService.get_business_details(business_id)
-                if details:
-                    business_details[business_id] = {
-                        'name': details.get('name'),
-                        'url': details.get('url'),
-                        'alias': details.get('alias')
-                    }
-                    # Зберігаємо в БД для наступних використань
-                    if details.get('name'):
-                        ProgramRegistry.objects.filter(
-                            username=username,
-                            yelp_business_id=business_id
-                        ).update(business_name=details['name'])
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to get business details for {business_id}: {e}")
-                continue
+        # Деталі бізнесів з кешу Business (один запит), невідомі - у фонову чергу
+        business_details, unresolved = AsyncBusinessService.get_cached(business_ids)
         
-        # Додаємо назви з БД до business_details
-        for business_id, name in business_names_from_db.items():
-            if business_id not in business_details:
+        # Фоллбек на застарілу колонку ProgramRegistry.business_name
+        for item in registry_data:
+            business_id = item['yelp_business_id']
+            if business_id and item['business_name'] and business_id not in business_details:
                 business_details[business_id] = {
-                    'name': name,
-                    'url': None,  # URL не зберігається в БД
+                    'name': item['business_name'],
+                    'url': None,  # URL не зберігається в ProgramRegistry
                     'alias': None
                 }
         
+        if unresolved:
+            AsyncBusinessService.enqueue_refresh(unresolved)
+        
         # Додаємо custom_name та business details до кожної програми
         for program in programs:
             program_id = program.get('program_id')
@@ -1024,21 +1108,19 @@ class ProgramListView(APIView):
             if program_id and program_id in custom_names:
                 program['custom_name'] = custom_names[program_id]
             
-            # Додаємо business details
-            business_id = program.get('yelp_business_id')
-            if not business_id and program.get('businesses'):
-                business_id = program['businesses'][0].get('yelp_business_id')
+            # Додаємо business details (id як placeholder, поки резолвер не завантажить назву)
+            business_id = program_business_id(program)
+            if not business_id:
+                continue
             
-            if business_id and business_id in business_details:
-                program['business_name'] = business_details[business_id]['name']
-                program['business_url'] = business_details[business_id]['url']
-                program['business_alias'] = business_details[business_id]['alias']
+            details = business_details.get(business_id)
+            program['business_name'] = details['name'] if details else business_id
+            program['business_url'] = details['url'] if details else None
+            program['business_alias'] = details['alias'] if details else None
         
         return programs
 
     def get(self, request):
-        from .sync_service import ProgramSyncService
-        from .models import ProgramRegistry
         from django.core.cache import cache
         import hashlib
         
@@ -1061,49 +1143,195 @@ class ProgramListView(APIView):
         cache_key = f"programs:{username}:{program_status}:{business_id or 'all'}:{program_type or 'all'}:{offset}:{limit}:{load_all}"
         cache_key_hash = hashlib.md5(cache_key.encode()).hexdigest()
         
-        # Check cache (60 second TTL)
-        cached_data = cache.get(cache_key_hash)
-        if cached_data:
-            logger.info(f"✅ [CACHE HIT] Returning cached data for key: {cache_key[:50]}...")
-            cached_data['from_cache'] = True
-            return Response(cached_data)
+        # Stampede-safe кеш: soft TTL 60 секунд, ще 60 секунд віддаємо stale копію,
+        # поки один запит під lock-ом перераховує відповідь
+        try:
+            response_data, cache_status = StampedeCache(cache).get_or_compute(
+                cache_key_hash,
+                lambda: self._build_programs_response(
+                    username, offset, limit, load_all, program_status, business_id, program_type
+                ),
+                ttl=60,
+            )
+        except Exception as e:
+            logger.error(f"Error getting programs list: {e}")
+            status_code = getattr(getattr(e, 'response', None), 'status_code', status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({"detail": str(e)}, status=status_code)
         
-        logger.info(f"❌ [CACHE MISS] Fetching from database for key: {cache_key[:50]}...")
+        record_cache('program_list', cache_status)
+        if cache_status != CACHE_MISS:
+            logger.info(f"✅ [CACHE {cache_status.upper()}] Returning cached data for key: {cache_key[:50]}...")
+            response_data['from_cache'] = True
+        # Features програм цієї сторінки — у фоні в кеш, щоб відкриття програми не чекало Yelp
+        YelpService.prewarm_program_features(
+            p['program_id'] for p in response_data.get('programs', []) if p.get('program_id')
+        )
+        return Response(response_data)
+
+    def _build_programs_response(self, username, offset, limit, load_all, program_status, business_id, program_type):
+        """Збирає відповідь ProgramListView з БД (результат кешується в get)."""
+        from .sync_service import ProgramSyncService
+        from .models import ProgramRegistry
         
         # Yelp API не підтримує фільтр program_status=ACTIVE/INACTIVE
         # Тому завжди запитуємо ALL і фільтруємо локально
         api_status = 'ALL' if program_status in ['ACTIVE', 'INACTIVE'] else program_status
         logger.info(f"🔄 Mapping frontend status '{program_status}' -> API status '{api_status}'")
         
-        try:
-            # Фільтрація по business_id через API
-            if business_id and business_id != 'all' and username:
-                logger.info(f"🔍 Filtering by business_id: {business_id}, status: {program_status}, program_type: {program_type} from API")
+        # Фільтрація по business_id через API
+        if business_id and business_id != 'all' and username:
+            logger.info(f"🔍 Filtering by business_id: {business_id}, status: {program_status}, program_type: {program_type} from API")
+            
+            # Отримуємо program_ids для цього бізнесу з БД з фільтром по статусу та типу програми
+            program_ids = ProgramSyncService.get_program_ids_for_business(
+                username, 
+                business_id, 
+                status=program_status,
+                program_type=program_type
+            )
+            
+            if not program_ids:
+                logger.warning(f"⚠️  No programs found for business {business_id}")
+                response_data = {
+                    'programs': [],
+                    'total_count': 0,
+                    'offset': offset,
+                    'limit': limit,
+                    'business_id': business_id,
+                    'from_db': True
+                }
+                return response_data
+            
+            total_count = len(program_ids)
+            logger.info(f"📊 Found {total_count} program_ids for business {business_id}")
+            
+            # Пагінація program_ids
+            paginated_ids = program_ids[offset:offset + limit]
+            
+            # 🚀 ОПТИМІЗАЦІЯ: Отримуємо ВСІ програми ОДНИМ запитом використовуючи .values()
+            logger.info(f"⚡ Fetching {len(paginated_ids)} programs from DB using values()...")
+            
+            # Get data as dictionaries (NO ORM object creation)
+            programs_data = list(ProgramRegistry.objects.filter(
+                username=username,
+                program_id__in=paginated_ids
+            ).select_related('business').values(
+                'program_id', 'program_name', 'program_status', 'program_pause_status',
+                'yelp_business_id', 'start_date', 'end_date', 'custom_name',
+                'status', 'budget', 'currency', 'is_autobid', 'max_bid',
+                'billed_impressions', 'billed_clicks', 'ad_cost', 'fee_period',
+                'businesses', 'active_features', 'available_features',
+                'business__name'  # From related business
+            ))
+            
+            # Create map for preserving order
+            programs_map = {p['program_id']: p for p in programs_data}
+            
+            # Convert to frontend format (preserving order)
+            programs = []
+            for program_id in paginated_ids:
+                program_registry = programs_map.get(program_id)
+                if not program_registry:
+                    continue
                 
-                # Отримуємо program_ids для цього бізнесу з БД з фільтром по статусу та типу програми
-                program_ids = ProgramSyncService.get_program_ids_for_business(
-                    username, 
-                    business_id, 
-                    status=program_status,
-                    program_type=program_type
-                )
+                try:
+                    # Convert directly from dictionary (faster than ORM objects)
+                    program_data = {
+                        'program_id': program_registry['program_id'],
+                        'program_type': program_registry['program_name'],
+                        'program_status': program_registry['program_status'] or program_registry['status'],
+                        'program_pause_status': program_registry['program_pause_status'],
+                        'yelp_business_id': program_registry['yelp_business_id'],
+                        'business_id': program_registry['yelp_business_id'],
+                        'business_name': program_registry['business__name'] or program_registry['yelp_business_id'],
+                        'start_date': program_registry['start_date'].isoformat() if program_registry['start_date'] else None,
+                        'end_date': program_registry['end_date'].isoformat() if program_registry['end_date'] else None,
+                        'custom_name': program_registry['custom_name'],
+                        'businesses': program_registry['businesses'] or [],
+                        'active_features': program_registry['active_features'] or [],
+                        'available_features': program_registry['available_features'] or [],
+                    }
+                    
+                    # Add program_metrics if available
+                    if program_registry['budget'] is not None:
+                        program_data['program_metrics'] = {
+                            'budget': int(float(program_registry['budget']) * 100),
+                            'currency': program_registry['currency'] or 'USD',
+                            'is_autobid': program_registry['is_autobid'],
+                            'max_bid': int(float(program_registry['max_bid']) * 100) if program_registry['max_bid'] else None,
+                            'billed_impressions': program_registry['billed_impressions'] or 0,
+                            'billed_clicks': program_registry['billed_clicks'] or 0,
+                            'ad_cost': int(float(program_registry['ad_cost']) * 100) if program_registry['ad_cost'] else 0,
+                            'fee_period': program_registry['fee_period'],
+                        }
+                    
+                    programs.append(program_data)
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to process program {program_id}: {e}")
+                    continue
+            
+            logger.info(f"✅ Returning {len(programs)} programs from database for business {business_id}")
+            
+            response_data = {
+                'programs': programs,
+                'total_count': len(programs),
+                'offset': offset,
+                'limit': limit,
+                'business_id': business_id,
+                'from_db': True
+            }
+            
+            return response_data
+        else:
+            # Фільтрація по program_type без business_id
+            if program_type and program_type != 'ALL' and username:
+                logger.info(f"🔍 Filtering by program_type: {program_type} from DB")
+                
+                # Отримуємо всі program_ids з фільтром по статусу та типу
+                query = ProgramRegistry.objects.filter(username=username)
+                
+                if program_status and program_status != 'ALL':
+                    # Використовуємо ту ж логіку маппінгу статусів що і для availableFilters
+                    if program_status == 'CURRENT':
+                        query = query.filter(program_status='ACTIVE')
+                    elif program_status == 'ACTIVE':
+                        query = query.filter(program_status='ACTIVE')
+                    elif program_status == 'INACTIVE':
+                        query = query.filter(program_status='INACTIVE')
+                    elif program_status == 'TERMINATED':
+                        query = query.filter(program_status='TERMINATED')
+                    elif program_status == 'EXPIRED':
+                        query = query.filter(program_status='EXPIRED')
+                    elif program_status == 'PAST':
+                        query = query.filter(
+                            program_status='INACTIVE',
+                            program_pause_status='NOT_PAUSED'
+                        )
+                    elif program_status == 'FUTURE':
+                        from django.utils import timezone
+                        today = timezone.now().date()
+                        query = query.filter(start_date__gt=today)
+                    elif program_status == 'PAUSED':
+                        query = query.filter(program_pause_status='PAUSED')
+                
+                query = query.filter(program_name=program_type)
+                
+                program_ids = list(query.values_list('program_id', flat=True))
                 
                 if not program_ids:
-                    logger.warning(f"⚠️  No programs found for business {business_id}")
+                    logger.warning(f"⚠️  No programs found for program_type {program_type}")
                     response_data = {
                         'programs': [],
                         'total_count': 0,
                         'offset': offset,
                         'limit': limit,
-                        'business_id': business_id,
+                        'program_type': program_type,
                         'from_db': True
                     }
-                    # Cache the result for 60 seconds
-                    cache.set(cache_key_hash, response_data, 60)
-                    return Response(response_data)
+                    return response_data
                 
                 total_count = len(program_ids)
-                logger.info(f"📊 Found {total_count} program_ids for business {business_id}")
+                logger.info(f"📊 Found {total_count} program_ids for program_type {program_type}")
                 
                 # Пагінація program_ids
                 paginated_ids = program_ids[offset:offset + limit]
@@ -1133,7 +1361,7 @@ class ProgramListView(APIView):
                     program_registry = programs_map.get(program_id)
                     if not program_registry:
                         continue
-                    
+                        
                     try:
                         # Convert directly from dictionary (faster than ORM objects)
                         program_data = {
@@ -1170,297 +1398,151 @@ class ProgramListView(APIView):
                         logger.warning(f"⚠️  Failed to process program {program_id}: {e}")
                         continue
                 
-                logger.info(f"✅ Returning {len(programs)} programs from database for business {business_id}")
+                logger.info(f"✅ Returning {len(programs)} programs from ProgramRegistry for program_type {program_type}")
                 
                 response_data = {
                     'programs': programs,
-                    'total_count': len(programs),
+                    'total_count': len(programs),  # Return actual count of valid programs
                     'offset': offset,
                     'limit': limit,
-                    'business_id': business_id,
+                    'program_type': program_type,
                     'from_db': True
                 }
                 
-                # Cache the result for 60 seconds
-                cache.set(cache_key_hash, response_data, 60)
-                
-                return Response(response_data)
+                return response_data
             else:
-                # Фільтрація по program_type без business_id
-                if program_type and program_type != 'ALL' and username:
-                    logger.info(f"🔍 Filtering by program_type: {program_type} from DB")
-                    
-                    # Отримуємо всі program_ids з фільтром по статусу та типу
-                    query = ProgramRegistry.objects.filter(username=username)
-                    
-                    if program_status and program_status != 'ALL':
-                        # Використовуємо ту ж логіку маппінгу статусів що і для availableFilters
-                        if program_status == 'CURRENT':
-                            query = query.filter(program_status='ACTIVE')
-                        elif program_status == 'ACTIVE':
-                            query = query.filter(program_status='ACTIVE')
-                        elif program_status == 'INACTIVE':
-                            query = query.filter(program_status='INACTIVE')
-                        elif program_status == 'TERMINATED':
-                            query = query.filter(program_status='TERMINATED')
-                        elif program_status == 'EXPIRED':
-                            query = query.filter(program_status='EXPIRED')
-                        elif program_status == 'PAST':
-                            query = query.filter(
-                                program_status='INACTIVE',
-                                program_pause_status='NOT_PAUSED'
-                            )
-                        elif program_status == 'FUTURE':
-                            from django.utils import timezone
-                            today = timezone.now().date()
-                            query = query.filter(start_date__gt=today)
-                        elif program_status == 'PAUSED':
-                            query = query.filter(program_pause_status='PAUSED')
-                    
-                    query = query.filter(program_name=program_type)
-                    
+                # Без фільтру - отримуємо всі програми з БД
+                logger.info(f"🔍 Getting all programs from DB with status: {program_status}")
+                
+                query = ProgramRegistry.objects.filter(username=username)
+                
+                if program_status and program_status != 'ALL':
+                    # Використовуємо правильну логіку маппінгу статусів
+                    if program_status == 'CURRENT':
+                        query = query.filter(program_status='ACTIVE')
+                    elif program_status == 'ACTIVE':
+                        query = query.filter(program_status='ACTIVE')
+                    elif program_status == 'INACTIVE':
+                        query = query.filter(program_status='INACTIVE')
+                    elif program_status == 'TERMINATED':
+                        query = query.filter(program_status='TERMINATED')
+                    elif program_status == 'EXPIRED':
+                        query = query.filter(program_status='EXPIRED')
+                    elif program_status == 'PAST':
+                        query = query.filter(
+                            program_status='INACTIVE',
+                            program_pause_status='NOT_PAUSED'
+                        )
+                    elif program_status == 'FUTURE':
+                        from django.utils import timezone
+                        today = timezone.now().date()
+                        query = query.filter(start_date__gt=today)
+                    elif program_status == 'PAUSED':
+                        query = query.filter(program_pause_status='PAUSED')
+                
+                # Загальна кількість після фільтрів
+                total_count = query.count()
+                
+                # ⚡ ШВИДКИЙ РЕЖИМ: Якщо load_all=true, завантажуємо ВСЕ одразу без пагінації
+                if load_all:
+                    logger.info(f"⚡ FAST MODE: Loading ALL {total_count} programs in ONE request...")
                     program_ids = list(query.values_list('program_id', flat=True))
-                    
-                    if not program_ids:
-                        logger.warning(f"⚠️  No programs found for program_type {program_type}")
-                        response_data = {
-                            'programs': [],
-                            'total_count': 0,
-                            'offset': offset,
-                            'limit': limit,
-                            'program_type': program_type,
-                            'from_db': True
-                        }
-                        # Cache the result for 60 seconds
-                        cache.set(cache_key_hash, response_data, 60)
-                        return Response(response_data)
-                    
-                    total_count = len(program_ids)
-                    logger.info(f"📊 Found {total_count} program_ids for program_type {program_type}")
-                    
-                    # Пагінація program_ids
-                    paginated_ids = program_ids[offset:offset + limit]
-                    
-                    # 🚀 ОПТИМІЗАЦІЯ: Отримуємо ВСІ програми ОДНИМ запитом використовуючи .values()
-                    logger.info(f"⚡ Fetching {len(paginated_ids)} programs from DB using values()...")
-                    
-                    # Get data as dictionaries (NO ORM object creation)
-                    programs_data = list(ProgramRegistry.objects.filter(
-                        username=username,
-                        program_id__in=paginated_ids
-                    ).select_related('business').values(
-                        'program_id', 'program_name', 'program_status', 'program_pause_status',
-                        'yelp_business_id', 'start_date', 'end_date', 'custom_name',
-                        'status', 'budget', 'currency', 'is_autobid', 'max_bid',
-                        'billed_impressions', 'billed_clicks', 'ad_cost', 'fee_period',
-                        'businesses', 'active_features', 'available_features',
-                        'business__name'  # From related business
-                    ))
-                    
-                    # Create map for preserving order
-                    programs_map = {p['program_id']: p for p in programs_data}
-                    
-                    # Convert to frontend format (preserving order)
-                    programs = []
-                    for program_id in paginated_ids:
-                        program_registry = programs_map.get(program_id)
-                        if not program_registry:
-                            continue
-                            
-                        try:
-                            # Convert directly from dictionary (faster than ORM objects)
-                            program_data = {
-                                'program_id': program_registry['program_id'],
-                                'program_type': program_registry['program_name'],
-                                'program_status': program_registry['program_status'] or program_registry['status'],
-                                'program_pause_status': program_registry['program_pause_status'],
-                                'yelp_business_id': program_registry['yelp_business_id'],
-                                'business_id': program_registry['yelp_business_id'],
-                                'business_name': program_registry['business__name'] or program_registry['yelp_business_id'],
-                                'start_date': program_registry['start_date'].isoformat() if program_registry['start_date'] else None,
-                                'end_date': program_registry['end_date'].isoformat() if program_registry['end_date'] else None,
-                                'custom_name': program_registry['custom_name'],
-                                'businesses': program_registry['businesses'] or [],
-                                'active_features': program_registry['active_features'] or [],
-                                'available_features': program_registry['available_features'] or [],
-                            }
-                            
-                            # Add program_metrics if available
-                            if program_registry['budget'] is not None:
-                                program_data['program_metrics'] = {
-                                    'budget': int(float(program_registry['budget']) * 100),
-                                    'currency': program_registry['currency'] or 'USD',
-                                    'is_autobid': program_registry['is_autobid'],
-                                    'max_bid': int(float(program_registry['max_bid']) * 100) if program_registry['max_bid'] else None,
-                                    'billed_impressions': program_registry['billed_impressions'] or 0,
-                                    'billed_clicks': program_registry['billed_clicks'] or 0,
-                                    'ad_cost': int(float(program_registry['ad_cost']) * 100) if program_registry['ad_cost'] else 0,
-                                    'fee_period': program_registry['fee_period'],
-                                }
-                            
-                            programs.append(program_data)
-                        except Exception as e:
-                            logger.warning(f"⚠️  Failed to process program {program_id}: {e}")
-                            continue
-                    
-                    logger.info(f"✅ Returning {len(programs)} programs from ProgramRegistry for program_type {program_type}")
-                    
+                    # Оновлюємо offset та limit для response
+                    actual_offset = 0
+                    actual_limit = total_count
+                else:
+                    # Отримуємо program_ids з пагінацією
+                    program_ids = list(query.values_list('program_id', flat=True)[offset:offset + limit])
+                    actual_offset = offset
+                    actual_limit = limit
+                
+                if not program_ids:
+                    logger.info(f"⚠️  No programs found")
                     response_data = {
-                        'programs': programs,
-                        'total_count': len(programs),  # Return actual count of valid programs
+                        'programs': [],
+                        'total_count': 0,
                         'offset': offset,
                         'limit': limit,
-                        'program_type': program_type,
                         'from_db': True
                     }
-                    
-                    # Cache the result for 60 seconds
-                    cache.set(cache_key_hash, response_data, 60)
-                    
-                    return Response(response_data)
-                else:
-                    # Без фільтру - отримуємо всі програми з БД
-                    logger.info(f"🔍 Getting all programs from DB with status: {program_status}")
-                    
-                    query = ProgramRegistry.objects.filter(username=username)
-                    
-                    if program_status and program_status != 'ALL':
-                        # Використовуємо правильну логіку маппінгу статусів
-                        if program_status == 'CURRENT':
-                            query = query.filter(program_status='ACTIVE')
-                        elif program_status == 'ACTIVE':
-                            query = query.filter(program_status='ACTIVE')
-                        elif program_status == 'INACTIVE':
-                            query = query.filter(program_status='INACTIVE')
-                        elif program_status == 'TERMINATED':
-                            query = query.filter(program_status='TERMINATED')
-                        elif program_status == 'EXPIRED':
-                            query = query.filter(program_status='EXPIRED')
-                        elif program_status == 'PAST':
-                            query = query.filter(
-                                program_status='INACTIVE',
-                                program_pause_status='NOT_PAUSED'
-                            )
-                        elif program_status == 'FUTURE':
-                            from django.utils import timezone
-                            today = timezone.now().date()
-                            query = query.filter(start_date__gt=today)
-                        elif program_status == 'PAUSED':
-                            query = query.filter(program_pause_status='PAUSED')
-                    
-                    # Загальна кількість після фільтрів
-                    total_count = query.count()
-                    
-                    # ⚡ ШВИДКИЙ РЕЖИМ: Якщо load_all=true, завантажуємо ВСЕ одразу без пагінації
-                    if load_all:
-                        logger.info(f"⚡ FAST MODE: Loading ALL {total_count} programs in ONE request...")
-                        program_ids = list(query.values_list('program_id', flat=True))
-                        # Оновлюємо offset та limit для response
-                        actual_offset = 0
-                        actual_limit = total_count
-                    else:
-                        # Отримуємо program_ids з пагінацією
-                        program_ids = list(query.values_list('program_id', flat=True)[offset:offset + limit])
-                        actual_offset = offset
-                        actual_limit = limit
-                    
-                    if not program_ids:
-                        logger.info(f"⚠️  No programs found")
-                        response_data = {
-                            'programs': [],
-                            'total_count': 0,
-                            'offset': offset,
-                            'limit': limit,
-                            'from_db': True
+                    return response_data
+                
+                logger.info(f"📊 Found {len(program_ids)} program_ids (total: {total_count})")
+                
+                # 🚀 ОПТИМІЗАЦІЯ: Отримуємо ВСІ програми ОДНИМ запитом використовуючи .values()
+                logger.info(f"⚡ Fetching {len(program_ids)} programs from DB using values()...")
+                
+                # Get data as dictionaries (NO ORM object creation)
+                programs_data = list(ProgramRegistry.objects.filter(
+                    username=username,
+                    program_id__in=program_ids
+                ).select_related('business').values(
+                    'program_id', 'program_name', 'program_status', 'program_pause_status',
+                    'yelp_business_id', 'start_date', 'end_date', 'custom_name',
+                    'status', 'budget', 'currency', 'is_autobid', 'max_bid',
+                    'billed_impressions', 'billed_clicks', 'ad_cost', 'fee_period',
+                    'businesses', 'active_features', 'available_features',
+                    'business__name'  # From related business
+                ))
+                
+                # Create map for preserving order
+                programs_map = {p['program_id']: p for p in programs_data}
+                
+                # Convert to frontend format (preserving order)
+                programs = []
+                for program_id in program_ids:
+                    program_registry = programs_map.get(program_id)
+                    if not program_registry:
+                        continue
+                        
+                    try:
+                        # Convert directly from dictionary (faster than ORM objects)
+                        program_data = {
+                            'program_id': program_registry['program_id'],
+                            'program_type': program_registry['program_name'],
+                            'program_status': program_registry['program_status'] or program_registry['status'],
+                            'program_pause_status': program_registry['program_pause_status'],
+                            'yelp_business_id': program_registry['yelp_business_id'],
+                            'business_id': program_registry['yelp_business_id'],
+                            'business_name': program_registry['business__name'] or program_registry['yelp_business_id'],
+                            'start_date': program_registry['start_date'].isoformat() if program_registry['start_date'] else None,
+                            'end_date': program_registry['end_date'].isoformat() if program_registry['end_date'] else None,
+                            'custom_name': program_registry['custom_name'],
+                            'businesses': program_registry['businesses'] or [],
+                            'active_features': program_registry['active_features'] or [],
+                            'available_features': program_registry['available_features'] or [],
                         }
-                        # Cache the result for 60 seconds
-                        cache.set(cache_key_hash, response_data, 60)
-                        return Response(response_data)
-                    
-                    logger.info(f"📊 Found {len(program_ids)} program_ids (total: {total_count})")
-                    
-                    # 🚀 ОПТИМІЗАЦІЯ: Отримуємо ВСІ програми ОДНИМ запитом використовуючи .values()
-                    logger.info(f"⚡ Fetching {len(program_ids)} programs from DB using values()...")
-                    
-                    # Get data as dictionaries (NO ORM object creation)
-                    programs_data = list(ProgramRegistry.objects.filter(
-                        username=username,
-                        program_id__in=program_ids
-                    ).select_related('business').values(
-                        'program_id', 'program_name', 'program_status', 'program_pause_status',
-                        'yelp_business_id', 'start_date', 'end_date', 'custom_name',
-                        'status', 'budget', 'currency', 'is_autobid', 'max_bid',
-                        'billed_impressions', 'billed_clicks', 'ad_cost', 'fee_period',
-                        'businesses', 'active_features', 'available_features',
-                        'business__name'  # From related business
-                    ))
-                    
-                    # Create map for preserving order
-                    programs_map = {p['program_id']: p for p in programs_data}
-                    
-                    # Convert to frontend format (preserving order)
-                    programs = []
-                    for program_id in program_ids:
-                        program_registry = programs_map.get(program_id)
-                        if not program_registry:
-                            continue
-                            
-                        try:
-                            # Convert directly from dictionary (faster than ORM objects)
-                            program_data = {
-                                'program_id': program_registry['program_id'],
-                                'program_type': program_registry['program_name'],
-                                'program_status': program_registry['program_status'] or program_registry['status'],
-                                'program_pause_status': program_registry['program_pause_status'],
-                                'yelp_business_id': program_registry['yelp_business_id'],
-                                'business_id': program_registry['yelp_business_id'],
-                                'business_name': program_registry['business__name'] or program_registry['yelp_business_id'],
-                                'start_date': program_registry['start_date'].isoformat() if program_registry['start_date'] else None,
-                                'end_date': program_registry['end_date'].isoformat() if program_registry['end_date'] else None,
-                                'custom_name': program_registry['custom_name'],
-                                'businesses': program_registry['businesses'] or [],
-                                'active_features': program_registry['active_features'] or [],
-                                'available_features': program_registry['available_features'] or [],
+                        
+                        # Add program_metrics if available
+                        if program_registry['budget'] is not None:
+                            program_data['program_metrics'] = {
+                                'budget': int(float(program_registry['budget']) * 100),
+                                'currency': program_registry['currency'] or 'USD',
+                                'is_autobid': program_registry['is_autobid'],
+                                'max_bid': int(float(program_registry['max_bid']) * 100) if program_registry['max_bid'] else None,
+                                'billed_impressions': program_registry['billed_impressions'] or 0,
+                                'billed_clicks': program_registry['billed_clicks'] or 0,
+                                'ad_cost': int(float(program_registry['ad_cost']) * 100) if program_registry['ad_cost'] else 0,
+                                'fee_period': program_registry['fee_period'],
                             }
-                            
-                            # Add program_metrics if available
-                            if program_registry['budget'] is not None:
-                                program_data['program_metrics'] = {
-                                    'budget': int(float(program_registry['budget']) * 100),
-                                    'currency': program_registry['currency'] or 'USD',
-                                    'is_autobid': program_registry['is_autobid'],
-                                    'max_bid': int(float(program_registry['max_bid']) * 100) if program_registry['max_bid'] else None,
-                                    'billed_impressions': program_registry['billed_impressions'] or 0,
-                                    'billed_clicks': program_registry['billed_clicks'] or 0,
-                                    'ad_cost': int(float(program_registry['ad_cost']) * 100) if program_registry['ad_cost'] else 0,
-                                    'fee_period': program_registry['fee_period'],
-                                }
-                            
-                            programs.append(program_data)
-                        except Exception as e:
-                            logger.warning(f"⚠️  Failed to process program {program_id}: {e}")
-                            continue
-                    
-                    logger.info(f"✅ Returning {len(programs)} programs from database")
-                    
-                    response_data = {
-                        'programs': programs,
-                        'total_count': total_count,
-                        'offset': actual_offset,
-                        'limit': actual_limit,
-                        'from_db': True,
-                        'loaded_all': load_all  # Індикатор що завантажено все
-                    }
-                    
-                    # Cache the result for 60 seconds
-                    cache.set(cache_key_hash, response_data, 60)
-                    
-                    return Response(response_data)
+                        
+                        programs.append(program_data)
+                    except Exception as e:
+                        logger.warning(f"⚠️  Failed to process program {program_id}: {e}")
+                        continue
                 
-        except Exception as e:
-            logger.error(f"Error getting programs list: {e}")
-            status_code = getattr(getattr(e, 'response', None), 'status_code', status.HTTP_500_INTERNAL_SERVER_ERROR)
-            return Response({"detail": str(e)}, status=status_code)
+                logger.info(f"✅ Returning {len(programs)} programs from database")
+                
+                response_data = {
+                    'programs': programs,
+                    'total_count': total_count,
+                    'offset': actual_offset,
+                    'limit': actual_limit,
+                    'from_db': True,
+                    'loaded_all': load_all  # Індикатор що завантажено все
+                }
+                
+                return response_data
 
 
 class ProgramInfoView(APIView):
@@ -2084,6 +2166,8 @@ class CustomSuggestedKeywordsView(APIView):
                 else:
                     skipped_keywords.append(keyword)
             
+            if created_keywords:
+                YelpService.invalidate_program_features(program_id)
             logger.info(f"Added {len(created_keywords)} custom suggested keywords for program {program_id}")
             if skipped_keywords:
                 logger.info(f"Skipped {len(skipped_keywords)} duplicate keywords: {skipped_keywords}")
@@ -2120,6 +2204,8 @@ class CustomSuggestedKeywordsView(APIView):
                 keyword__in=keywords
             ).delete()
             
+            if deleted_count:
+                YelpService.invalidate_program_features(program_id)
             logger.info(f"Deleted {deleted_count} custom suggested keywords for program {program_id}")
             return Response({
                 "message": f"Successfully deleted {deleted_count} keywords",
@@ -2197,6 +2283,38 @@ class BusinessIdsView(APIView):
             )
 
 
+class GroupedProgramsView(APIView):
+    """
+    Програми користувача, згруповані по business_id, зі статистикою.
+    Агрегується в БД (GROUP BY по ProgramRegistry) — без crawl-у Yelp API.
+    """
+    
+    def get(self, request):
+        from .redis_service import ProgramGroupingService
+        
+        if not request.user or not request.user.is_authenticated:
+            return Response(
+                {"error": "Authentication required"},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        username = request.user.username
+        program_status = request.query_params.get('program_status', 'ALL')
+        include_programs = request.query_params.get('include_programs', 'false').lower() == 'true'
+        
+        try:
+            result = ProgramGroupingService(redis_service=None).get_grouped_programs_from_db(
+                username, program_status=program_status, include_programs=include_programs
+            )
+            return Response(result)
+        except Exception as e:
+            logger.error(f"❌ Error in GroupedProgramsView: {e}", exc_info=True)
+            return Response(
+                {"error": f"Failed to group programs: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class AvailableFiltersView(APIView):
     """
     🧠 РОЗУМНІ ФІЛЬТРИ: Повертає доступні опції для фільтрів на основі поточного вибору.
@@ -2321,26 +2439,43 @@ class AvailableFiltersView(APIView):
             available_program_types.insert(0, 'ALL')
             
             # 3. Доступні businesses (на основі вибраного статусу та program type)
-            available_businesses_qs = (
-                query
-                .exclude(yelp_business_id__isnull=True)
-                .exclude(yelp_business_id='')
-                .values('yelp_business_id')
-                .annotate(
-                    program_count=Count('program_id'),
-                    business_name=models.Max('business__name')  # Беремо з Business FK
+            # Без business_id та не FUTURE (залежить від дати) — з готових BusinessRollup
+            status_facet = BusinessRollupService.filter_status_facet(program_status)
+            if status_facet and not (business_id and business_id != 'all'):
+                type_filter = program_type if program_type and program_type != 'ALL' else None
+                available_businesses = []
+                for rollup in BusinessRollupService.get_rollups(username):
+                    if not rollup.yelp_business_id:
+                        continue
+                    program_count = rollup.facet_count(status_facet, type_filter)
+                    if program_count:
+                        available_businesses.append({
+                            'business_id': rollup.yelp_business_id,
+                            'business_name': (rollup.business.name if rollup.business else None) or rollup.yelp_business_id,
+                            'program_count': program_count,
+                        })
+                available_businesses.sort(key=lambda b: b['program_count'], reverse=True)
+            else:
+                available_businesses_qs = (
+                    query
+                    .exclude(yelp_business_id__isnull=True)
+                    .exclude(yelp_business_id='')
+                    .values('yelp_business_id')
+                    .annotate(
+                        program_count=Count('program_id'),
+                        business_name=models.Max('business__name')  # Беремо з Business FK
+                    )
+                    .order_by('-program_count')
                 )
-                .order_by('-program_count')
-            )
-            
-            available_businesses = [
-                {
-                    'business_id': b['yelp_business_id'],
-                    'business_name': b['business_name'] or b['yelp_business_id'],
-                    'program_count': b['program_count']
-                }
-                for b in available_businesses_qs
-            ]
+                
+                available_businesses = [
+                    {
+                        'business_id': b['yelp_business_id'],
+                        'business_name': b['business_name'] or b['yelp_business_id'],
+                        'program_count': b['program_count']
+                    }
+                    for b in available_businesses_qs
+                ]
             
             # Підрахунок загальної кількості програм для поточних фільтрів
             total_programs = query.count()
@@ -2444,3 +2579,62 @@ class LogsView(APIView):
                 {"error": f"Failed to retrieve logs: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class ProfilesView(APIView):
+    """
+    Stack profiles captured by ads.profiler for slow / sampled requests and sync runs.
+
+    Query parameters:
+    - kind: request | sync
+    - limit: Maximum number of profiles to return (default: 50, max: 500)
+    """
+    # Bearer PROFILES_TOKEN; Basic auth не застосовуємо (вона не перевіряє пароль і перезаписала б креденшали)
+    authentication_classes = []
+    permission_classes = [HasProfilesToken]
+
+    def get(self, request):
+        from .models import ProfileRecord
+
+        kind = request.query_params.get('kind')
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), 500)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        profiles = ProfileRecord.objects.defer('stacks')
+        if kind:
+            profiles = profiles.filter(kind=kind)
+        data = [{
+            'request_id': profile.request_id,
+            'kind': profile.kind,
+            'reason': profile.reason,
+            'name': profile.name,
+            'method': profile.method,
+            'status': profile.status_code,
+            'user': profile.user,
+            'duration': profile.duration,
+            'samples': profile.sample_count,
+            'interval_ms': profile.interval_ms,
+            'created_at': profile.created_at.isoformat(),
+            'download_url': f"/api/profiles/{profile.request_id}/",
+        } for profile in profiles[:limit]]
+        return Response({'count': len(data), 'profiles': data})
+
+
+class ProfileDownloadView(APIView):
+    """Collapsed stacks of one profile (flamegraph.pl / speedscope.app), as a .folded attachment."""
+    # Bearer PROFILES_TOKEN; Basic auth не застосовуємо (вона не перевіряє пароль і перезаписала б креденшали)
+    authentication_classes = []
+    permission_classes = [HasProfilesToken]
+
+    def get(self, request, request_id):
+        from django.http import HttpResponse
+        from .models import ProfileRecord
+
+        profile = ProfileRecord.objects.filter(request_id=request_id).first()
+        if profile is None:
+            return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(profile.stacks + '\n', content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.kind}-{profile.pk}.folded"'
+        return response
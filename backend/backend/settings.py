@@ -10,15 +10,74 @@ SECRET_KEY = env('SECRET_KEY', default='dummy-secret-key')
 DEBUG = env.bool('DEBUG', default=True)
 ALLOWED_HOSTS = ['*']
 LOG_LEVEL = env('LOG_LEVEL', default=('DEBUG' if DEBUG else 'INFO'))
+LOG_FORMAT = env('LOG_FORMAT', default='text')  # 'json' → один JSON-об'єкт на рядок з полями extra
+# RequestLoggingMiddleware: 'compact' (один рядок на запит, семплінг) або 'verbose' (детальний дамп)
+REQUEST_LOG_MODE = env('REQUEST_LOG_MODE', default='compact')
+REQUEST_LOG_SAMPLE_RATE = env.float('REQUEST_LOG_SAMPLE_RATE', default=1.0)
+REQUEST_LOG_SAMPLE_RATES = {
+    '/metrics': 0.0,
+    '/api/reseller/programs': 0.1,
+    '/api/reseller/available-filters': 0.1,
+    '/api/reseller/business-ids': 0.1,
+}
+REQUEST_LOG_SLOW_MS = env.int('REQUEST_LOG_SLOW_MS', default=1000)  # повільніші (і помилки) логуються завжди
 YELP_API_KEY = env('YELP_API_KEY')
 YELP_API_SECRET = env('YELP_API_SECRET')
 YELP_FUSION_TOKEN = env('YELP_FUSION_TOKEN')
 YELP_FUSION_API_KEY = env('YELP_FUSION_API_KEY', default=env('YELP_FUSION_TOKEN', default=''))
+# Fusion quota: token bucket shared by all business details requests
+YELP_FUSION_RATE_PER_SECOND = env.float('YELP_FUSION_RATE_PER_SECOND', default=5.0)
+YELP_FUSION_BURST = env.int('YELP_FUSION_BURST', default=10)
+BUSINESS_DETAILS_STALE_AFTER_DAYS = env.int('BUSINESS_DETAILS_STALE_AFTER_DAYS', default=30)
+# Кеш Program Features (YelpService.get_program_features): свіжий TTL + ще stale_ttl віддається під час оновлення;
+# FEATURES_PREWARM_LIMIT програм зі сторінки списку прогріваються у фоні (0 — вимкнено)
+FEATURES_CACHE_TTL = env.int('FEATURES_CACHE_TTL', default=120)
+FEATURES_CACHE_STALE_TTL = env.int('FEATURES_CACHE_STALE_TTL', default=60)
+FEATURES_PREWARM_LIMIT = env.int('FEATURES_PREWARM_LIMIT', default=20)
+FEATURES_PREWARM_CONCURRENCY = env.int('FEATURES_PREWARM_CONCURRENCY', default=4)
+# Base URLs of Yelp APIs; YELP_SIMULATOR_URL points both at ads.partner_simulator (run_partner_simulator)
+YELP_SIMULATOR_URL = env('YELP_SIMULATOR_URL', default='')
+YELP_PARTNER_BASE = env('YELP_PARTNER_BASE', default=YELP_SIMULATOR_URL or 'https://partner-api.yelp.com')
+YELP_FUSION_BASE = env('YELP_FUSION_BASE', default=YELP_SIMULATOR_URL or 'https://api.yelp.com')
+# /metrics (Prometheus): якщо задано, scraper має слати Authorization: Bearer <METRICS_TOKEN>
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+# Per-request бюджети (RequestInstrumentationMiddleware); overrides — за префіксом шляху
+SERVER_TIMING_ENABLED = env.bool('SERVER_TIMING_ENABLED', default=True)
+REQUEST_QUERY_BUDGET = env.int('REQUEST_QUERY_BUDGET', default=50)
+REQUEST_DB_TIME_BUDGET_MS = env.int('REQUEST_DB_TIME_BUDGET_MS', default=1000)
+REQUEST_BUDGET_OVERRIDES = {
+    '/api/reseller/programs': {'queries': 15},
+    '/api/reseller/business-ids': {'queries': 10},
+    '/api/reseller/available-filters': {'queries': 15},
+}
+REQUEST_BUDGET_RAISE = env.bool('REQUEST_BUDGET_RAISE', default=False)  # True у тестах/CI: N+1 → виняток
+# Семплюючий профайлер (ads.profiler): профілі повільних запитів/синхронізацій → /api/profiles/
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=False)
+PROFILING_INTERVAL_MS = env.float('PROFILING_INTERVAL_MS', default=5)
+PROFILING_SLOW_REQUEST_MS = env.int('PROFILING_SLOW_REQUEST_MS', default=1000)
+PROFILING_SLOW_SYNC_SECONDS = env.float('PROFILING_SLOW_SYNC_SECONDS', default=60)
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)  # частка швидших запитів, що профілюються все одно
+PROFILING_MAX_STORED = env.int('PROFILING_MAX_STORED', default=500)
+# /api/profiles/ відкриваються лише з Authorization: Bearer <PROFILES_TOKEN>; порожній — закрито
+PROFILES_TOKEN = env('PROFILES_TOKEN', default='')
+# Трейсинг фаз синхронізації (ads.tracing): '' | 'console' | 'file' → TRACING_FILE (JSON lines, manage.py show_trace)
+TRACING_EXPORTER = env('TRACING_EXPORTER', default='')
+TRACING_FILE = env('TRACING_FILE', default=str(BASE_DIR / 'traces.jsonl'))
+# ASGI режим (backend.asgi:application): features / job status / program info / sync-stream —
+# нативні async views (ads.async_views). Під WSGI лишайте False: Django буферизує async стрімінг.
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
+ASYNC_PARTNER_POOL_SIZE = env.int('ASYNC_PARTNER_POOL_SIZE', default=100)  # з'єднань aiohttp до Yelp на воркер
 
 # Redis settings (for caching and batch processing)
 REDIS_HOST = env('REDIS_HOST', default='redis')
 REDIS_PORT = env.int('REDIS_PORT', default=6379)
 REDIS_DB = env.int('REDIS_DB', default=0)
+REDIS_MAX_CONNECTIONS = env.int('REDIS_MAX_CONNECTIONS', default=50)
+# Circuit breaker: після N помилок поспіль Redis вважається недоступним на RESET_TIMEOUT секунд
+REDIS_BREAKER_FAILURE_THRESHOLD = env.int('REDIS_BREAKER_FAILURE_THRESHOLD', default=3)
+REDIS_BREAKER_RESET_TIMEOUT = env.int('REDIS_BREAKER_RESET_TIMEOUT', default=30)
+# Кодек для chunks/grouped results у Redis: msgpack-zstd | msgpack-lz4 | msgpack | json-zlib | json
+REDIS_CACHE_CODEC = env('REDIS_CACHE_CODEC', default='msgpack-zstd')
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -36,6 +95,7 @@ MIDDLEWARE = [
     'ads.middleware.SimpleCorsMiddleware',  # Наш простий CORS middleware
     'django.middleware.security.SecurityMiddleware',
     'ads.middleware.RequestLoggingMiddleware',  # Додаємо логування запитів
+    'ads.middleware.RequestInstrumentationMiddleware',  # SQL/HTTP/cache/CPU на запит + Server-Timing
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,7 +127,8 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 DATABASES = {
     'default': {
         **env.db('DATABASE_URL'),
-        'CONN_MAX_AGE': 600,  # Reuse connections for 10 minutes
+        # Reuse connections for 10 minutes; під ASGI кожен запит має власне з'єднання, тож persistent вимкнено
+        'CONN_MAX_AGE': 0 if ASYNC_VIEWS else 600,
         'OPTIONS': {
             'connect_timeout': 10,
         }
@@ -77,7 +138,8 @@ DATABASES = {
 # Django Cache Configuration with Redis
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        # Спільний з RedisService пул з'єднань + circuit breaker (див. ads/redis_service.py)
+        'BACKEND': 'ads.redis_service.SharedPoolRedisCache',
         'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}',
         'KEY_PREFIX': 'yelp_ads',
         'TIMEOUT': 60,  # 60 seconds default TTL
@@ -115,11 +177,14 @@ LOGGING = {
         'simple': {
             'format': '%(levelname)s %(message)s'
         },
+        'json': {
+            '()': 'ads.logging_handlers.JsonFormatter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
             'level': LOG_LEVEL,
         },
         'database': {
@@ -0,0 +1,76 @@
+"""
+Gunicorn (production) — `gunicorn -c gunicorn.conf.py`.
+
+Воркери:
+- ASYNC_VIEWS=False (за замовчуванням): backend.wsgi, gthread — кожен потік тримає один запит,
+  тож довгий SSE sync займає потік, а не весь процес; heartbeat воркера йде з головного потоку,
+  тому `timeout` не вбиває sync, що триває хвилини.
+- ASYNC_VIEWS=True: backend.asgi на uvicorn воркерах — async views (ads.async_views) чекають
+  Yelp в event loop.
+
+Усе налаштовується змінними оточення (GUNICORN_*, WEB_CONCURRENCY) без зміни файлу.
+"""
+import multiprocessing
+import os
+
+
+def _env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+ASYNC_VIEWS = _env_bool('ASYNC_VIEWS')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+wsgi_app = 'backend.asgi:application' if ASYNC_VIEWS else 'backend.wsgi:application'
+
+# 2×CPU+1 для sync/gthread; event loop воркеру вистачає одного на ядро
+_cpus = multiprocessing.cpu_count()
+workers = int(os.environ.get('WEB_CONCURRENCY', _cpus if ASYNC_VIEWS else 2 * _cpus + 1))
+worker_class = 'uvicorn.workers.UvicornWorker' if ASYNC_VIEWS else 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))  # лише для gthread
+
+# Django/DRF/моделі імпортуються один раз у master — copy-on-write пам'ять, швидкий рестарт воркерів
+preload_app = _env_bool('GUNICORN_PRELOAD', True)
+
+# nginx тримає keep-alive до upstream; трохи довше за його keepalive_timeout не потрібно
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Тиша воркера (не тривалість запиту для gthread/uvicorn) — після неї master його перезапускає
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# SIGTERM/HUP: даємо SSE синхронізаціям у польоті (~10-60s для тисяч програм) завершитись
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 300))
+# Періодичний рестарт воркерів проти повільного росту пам'яті; jitter — щоб не всі разом
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None  # RequestLoggingMiddleware вже логує запити
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+
+def on_starting(server):
+    # prometheus_client multiprocess: файли мертвих воркерів з минулого запуску дали б подвійний рахунок
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith('.db'):
+                os.remove(os.path.join(directory, name))
+
+
+def when_ready(server):
+    # preload_app: з'єднання, відкриті master-ом під час імпорту, не повинні успадкуватись воркерами
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+    server.log.info(
+        f"🚀 {worker_class}: {workers} workers"
+        f"{f' x {threads} threads' if worker_class == 'gthread' else ''}, app={wsgi_app}, "
+        f"preload={preload_app}, timeout={timeout}s, graceful_timeout={graceful_timeout}s, keepalive={keepalive}s"
+    )
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)